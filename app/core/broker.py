@@ -0,0 +1,18 @@
+import dramatiq
+from dramatiq.broker import Broker
+
+from app.core.config import settings
+
+# Dramatiq binds actors to the global broker when they are declared, so task
+# modules call `configure_broker` before declaring any. Workers are started
+# with `dramatiq app.features.pipeline.tasks`; tests install a StubBroker first.
+
+def configure_broker() -> Broker:
+    """
+    Returns the global broker, installing a Redis broker on REDIS_URL unless one was set already.
+    """
+    if dramatiq.broker.global_broker is None:
+        from dramatiq.brokers.redis import RedisBroker # deferred: only workers and producers need Redis
+
+        dramatiq.set_broker(RedisBroker(url=settings.REDIS_URL))
+    return dramatiq.get_broker()
@@ -0,0 +1,147 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import redis
+
+from app.core import metrics
+from app.core.codec import pack_columns, unpack_columns # re-exported for the feature cache modules
+from app.core.config import settings
+
+# Read-through Redis cache with versioned keys.
+#
+# Every cached entry embeds the current version of the data it was built from
+# (one counter per instrument, or per collection such as "instruments"). A write
+# bumps the version, so later reads miss and reload while stale entries are
+# never read again and simply expire with their TTL. A reader that races a
+# writer can at worst store an entry under the old version, which nobody asks
+# for any more. If Redis is unreachable, reads go straight to the database.
+
+KEY_PREFIX = "fcm:v1"
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+
+class CacheStats:
+    """
+    Process-wide hit/miss/error counters per cache namespace.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, namespace: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(namespace, {"hits": 0, "misses": 0, "errors": 0})
+            counts[outcome] += 1
+        metrics.CACHE_REQUESTS.inc(namespace=namespace, outcome=outcome)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {namespace: dict(counts) for namespace, counts in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+
+def get_client() -> Optional[redis.Redis]:
+    """
+    Returns the shared Redis client, created on first use, or None when caching is disabled.
+    """
+    global _client
+    if not settings.CACHE_ENABLED:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    settings.REDIS_URL, socket_timeout=settings.CACHE_SOCKET_TIMEOUT,
+                    socket_connect_timeout=settings.CACHE_SOCKET_TIMEOUT,
+                )
+    return _client
+
+
+def set_client(client: Optional[redis.Redis]):
+    """
+    Replaces the shared client (e.g. with a differently configured one).
+    """
+    global _client
+    _client = client
+
+
+def _version_key(scope: str) -> str:
+    return f"{KEY_PREFIX}:version:{scope}"
+
+
+def _current_version(client: redis.Redis, scope: str) -> int:
+    version = client.get(_version_key(scope))
+    if version is None:
+        # Start from the clock, so a version key lost to eviction never
+        # reuses a number that older entries were stored under
+        client.set(_version_key(scope), int(time.time() * 1000), nx=True)
+        version = client.get(_version_key(scope))
+    return int(version)
+
+
+def invalidate(scopes: Iterable[str]):
+    """
+    Bumps the version of each scope, making every entry built from it unreachable.
+    """
+    client = get_client()
+    if client is None:
+        return
+    try:
+        for scope in scopes:
+            client.set(_version_key(scope), int(time.time() * 1000), nx=True)
+            client.incr(_version_key(scope))
+    except redis.RedisError:
+        stats.record("invalidate", "errors")
+
+
+def instrument_scope(instrument_id: int) -> str:
+    return f"instrument:{instrument_id}"
+
+
+def invalidate_instruments(instrument_ids: Iterable[int]):
+    invalidate(instrument_scope(instrument_id) for instrument_id in set(instrument_ids))
+
+
+def read_through(
+    namespace: str,
+    scope: str,
+    key: str,
+    loader: Callable[[], Any],
+    encode: Callable[[Any], bytes],
+    decode: Callable[[bytes], Any],
+    ttl: Optional[int] = None,
+) -> Any:
+    """
+    Returns the cached value for `key` under the current version of `scope`,
+    or calls `loader`, stores its encoded result with a TTL and returns it.
+    """
+    client = get_client()
+    if client is None:
+        return loader()
+    try:
+        cache_key = f"{KEY_PREFIX}:{namespace}:{scope}:{_current_version(client, scope)}:{key}"
+        payload = client.get(cache_key)
+    except redis.RedisError:
+        stats.record(namespace, "errors")
+        return loader()
+
+    if payload is not None:
+        stats.record(namespace, "hits")
+        return decode(payload)
+    stats.record(namespace, "misses")
+    value = loader()
+    try:
+        client.set(cache_key, encode(value), ex=ttl or settings.CACHE_TTL_SECONDS)
+    except redis.RedisError:
+        stats.record(namespace, "errors")
+    return value
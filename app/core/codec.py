@@ -0,0 +1,65 @@
+import json
+import struct
+import zlib
+from typing import Any, Dict
+
+import numpy as np
+
+# Compact binary encoding of named columns, shared by the Redis cache and the
+# columnar API responses. Layout: a one-byte marker (raw or zlib), then a
+# uint32 header length, a JSON header describing the columns, and the raw
+# column buffers back to back.
+
+# Payloads above this size are zlib-compressed
+_COMPRESS_ABOVE = 4096
+_RAW, _ZLIB = b"R", b"Z"
+
+
+def pack_columns(columns: Dict[str, Any]) -> bytes:
+    """
+    Serialises named columns (NumPy arrays, or sequences of str) into a compact
+    binary payload: a small JSON header followed by the raw column buffers.
+    Strings are stored as UTF-8 with an offsets array.
+    """
+    header, buffers = [], []
+    for name, column in columns.items():
+        array = np.asarray(column)
+        if array.dtype.kind in "OU":
+            encoded = [str(value).encode() for value in column]
+            offsets = np.cumsum([0] + [len(value) for value in encoded], dtype=np.int64)
+            blob = b"".join(encoded)
+            header.append([name, "str", offsets.nbytes, len(blob)])
+            buffers.extend([offsets.tobytes(), blob])
+        else:
+            array = np.ascontiguousarray(array)
+            header.append([name, array.dtype.str, array.nbytes])
+            buffers.append(array.tobytes())
+    encoded_header = json.dumps(header, separators=(",", ":")).encode()
+    payload = struct.pack("<I", len(encoded_header)) + encoded_header + b"".join(buffers)
+    if len(payload) > _COMPRESS_ABOVE:
+        return _ZLIB + zlib.compress(payload, 1)
+    return _RAW + payload
+
+
+def unpack_columns(payload: bytes) -> Dict[str, Any]:
+    """
+    Inverse of `pack_columns`: numeric columns come back as read-only arrays
+    viewing the payload, string columns as lists.
+    """
+    payload = zlib.decompress(payload[1:]) if payload[:1] == _ZLIB else payload[1:]
+    (header_size,) = struct.unpack_from("<I", payload)
+    offset = 4 + header_size
+    columns = {}
+    for entry in json.loads(payload[4:offset]):
+        name, kind, size = entry[0], entry[1], entry[2]
+        if kind == "str":
+            offsets = np.frombuffer(payload, dtype=np.int64, count=size // 8, offset=offset)
+            offset += size
+            blob = payload[offset:offset + entry[3]]
+            offset += entry[3]
+            columns[name] = [blob[start:stop].decode() for start, stop in zip(offsets[:-1], offsets[1:])]
+        else:
+            dtype = np.dtype(kind)
+            columns[name] = np.frombuffer(payload, dtype=dtype, count=size // dtype.itemsize, offset=offset)
+            offset += size
+    return columns
@@ -0,0 +1,59 @@
+import hashlib
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional, Union
+
+# Conditional GET support: responses carry an ETag derived from the request and
+# the freshness of the data behind it (e.g. the latest ingested bar), plus a
+# Last-Modified date or time (naive UTC). Clients that send back a matching
+# If-None-Match (or an If-Modified-Since no older than the data) get a 304
+# without a body.
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Weak ETag over the given parts (query parameters, latest dates, row ids...).
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def http_date(moment: Union[date, datetime]) -> str:
+    return format_datetime(_utc_seconds(moment), usegmt=True)
+
+
+def _utc_seconds(moment: Union[date, datetime]) -> datetime:
+    # HTTP dates have whole-second precision; a date stands for its midnight
+    if not isinstance(moment, datetime):
+        moment = datetime.combine(moment, time(0))
+    return moment.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def validator_headers(etag: str, last_modified: Optional[Union[date, datetime]] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(
+    request_headers: Mapping[str, str], etag: str, last_modified: Optional[Union[date, datetime]] = None
+) -> bool:
+    """
+    True when the client's cached copy is still current. If-None-Match takes
+    precedence over If-Modified-Since, as in RFC 9110.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags or etag.replace("W/", "") in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if isinstance(last_modified, datetime):
+            return since >= _utc_seconds(last_modified)
+        return since.date() >= last_modified
+    return False
@@ -1,7 +1,9 @@
 import logging
-import structlog
+from typing import Any
 
 def setup_logging():
+    import structlog # deferred: only needed once the application starts
+
     logging.basicConfig(level=logging.INFO, format="%(message)s")
     structlog.configure(
         processors=[
@@ -20,3 +22,25 @@ def setup_logging():
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
+
+class _LazyLogger:
+    """
+    Stand-in for a structlog logger that imports structlog when the first event
+    is logged, so modules can create their logger at import time for free.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._logger = None
+
+    def __getattr__(self, method: str) -> Any:
+        if self._logger is None:
+            import structlog
+            self._logger = structlog.get_logger(self._name)
+        return getattr(self._logger, method)
+
+def get_logger(name: str) -> Any:
+    """
+    Returns a structured logger for `name`; events are rendered as configured by `setup_logging`.
+    """
+    return _LazyLogger(name)
@@ -0,0 +1,321 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.logging import get_logger
+
+# In-process instrumentation of the hot paths.
+#
+# `span(stage)` times a block of work. Every finished span is observed in the
+# stage duration histogram and logged as a structured "span" event carrying its
+# duration, the database statements run inside it and any fields set on it.
+# Spans nest: only a top-level span (e.g. one symbol's ingestion) is logged,
+# at info level, with the time spent in each stage nested in it. Nested spans
+# are observed in the histogram but not logged themselves, which keeps the
+# per-symbol hot path at one log event. Statements are counted and timed through
+# SQLAlchemy engine events and attributed to every open span of the thread (or
+# task) that ran them.
+#
+# Metrics live in process memory and are served in the Prometheus text format
+# by the API's /metrics endpoint. Batch runs log their spans instead.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = get_logger(__name__)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        (metric name, labels, value) of every series, in the exposition order.
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonic total per label set.
+    """
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in sorted(self._values.items())]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, with their sum and count.
+    """
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def total(self, **labels) -> float:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[1] if series else 0.0
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    samples.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    """
+    The metrics served by one /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                rendered = ",".join(f'{label}="{_escape(text)}"' for label, text in labels.items())
+                lines.append(f"{name}{{{rendered}}} {_format_value(value)}" if rendered else f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Clears every recorded value (the metrics stay registered).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram("fcm_stage_duration_seconds", "Duration of pipeline stages.", ("stage",))
+DB_QUERIES = Counter("fcm_db_queries_total", "Database statements executed, by statement type.", ("statement",))
+DB_QUERY_SECONDS = Histogram("fcm_db_query_duration_seconds", "Database statement durations.", ("statement",))
+CACHE_REQUESTS = Counter("fcm_cache_requests_total", "Cache lookups and invalidations by outcome.", ("namespace", "outcome"))
+ROWS_WRITTEN = Counter("fcm_ingested_rows_total", "Daily bars written by ingestion, per symbol.", ("symbol",))
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+# --- Spans ---
+
+class Span:
+    """
+    One timed stage. Fields set while it runs are logged with it.
+    """
+
+    def __init__(self, stage: str, fields: Dict[str, Any], parent: Optional["Span"]):
+        self.stage = stage
+        self.fields = fields
+        self.parent = parent
+        self.queries = 0
+        self.query_seconds = 0.0
+        # Seconds spent in nested stages, by stage name
+        self.stages: Dict[str, float] = {}
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("fcm_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(stage: str, **fields) -> Iterator[Span]:
+    """
+    Times the enclosed block as `stage`, observes the duration and logs it.
+    """
+    current = Span(stage, dict(fields), _current_span.get())
+    token = _current_span.set(current)
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _current_span.reset(token)
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        if current.parent is not None:
+            ancestor = current.parent
+            while ancestor is not None:
+                ancestor.stages[stage] = ancestor.stages.get(stage, 0.0) + seconds
+                ancestor = ancestor.parent
+        else:
+            event = dict(
+                stage=stage, status=status, duration_ms=round(seconds * 1000, 3),
+                db_queries=current.queries, db_ms=round(current.query_seconds * 1000, 3), **current.fields,
+            )
+            if current.stages:
+                event["stages_ms"] = {name: round(value * 1000, 3) for name, value in current.stages.items()}
+            logger.info("span", **event)
+
+
+def timed(stage: str) -> Callable:
+    """
+    Decorator running every call of the function in a span named `stage`.
+    """
+    def decorate(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- Database statements ---
+
+_STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY", "CREATE", "DROP", "ALTER"}
+_QUERY_STARTS_KEY = "fcm_query_starts"
+
+
+def statement_type(statement: str) -> str:
+    words = statement.split(None, 1)
+    word = words[0].upper() if words else ""
+    return word if word in _STATEMENT_TYPES else "OTHER"
+
+
+def record_query(statement: str, seconds: float):
+    """
+    Counts one statement in the query metrics and in every open span.
+    """
+    kind = statement_type(statement)
+    DB_QUERIES.inc(statement=kind)
+    DB_QUERY_SECONDS.observe(seconds, statement=kind)
+    current = _current_span.get()
+    while current is not None:
+        current.queries += 1
+        current.query_seconds += seconds
+        current = current.parent
+
+
+def instrument_engine(engine: Engine):
+    """
+    Counts and times every statement `engine` executes. Safe to call more than once.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_STARTS_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_QUERY_STARTS_KEY)
+    if starts:
+        record_query(statement, time.perf_counter() - starts.pop())
+
+
+def _handle_error(context):
+    # The failed statement never reaches after_cursor_execute; still count it
+    starts = context.connection.info.get(_QUERY_STARTS_KEY) if context.connection is not None else None
+    if starts:
+        record_query(context.statement or "", time.perf_counter() - starts.pop())
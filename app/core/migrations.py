@@ -0,0 +1,79 @@
+import importlib
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.database import Base, get_engine
+
+# Schema setup is an explicit deployment step (`python -m scripts.migrate_database`),
+# not something the API does while importing. Every module defining models is
+# listed here so their tables are registered on Base.metadata before it runs.
+MODEL_MODULES = (
+    "app.features.data_ingestion.models",
+    "app.features.signal_generation.models",
+    "app.features.pipeline.models",
+    "app.features.portfolio_management.models",
+    "app.features.performance_analytics.models",
+)
+
+def load_models():
+    """
+    Imports every model module, registering its tables on Base.metadata.
+    """
+    for module in MODEL_MODULES:
+        importlib.import_module(module)
+
+# Modules with an `upgrade(engine)` for changes create_all cannot make to an
+# existing table (e.g. column types), run in order after it
+UPGRADE_MODULES = (
+    "app.features.data_ingestion.migrations",
+)
+
+def _dedupe_market_data(connection: Connection):
+    # Tables from before the unique key may hold a bar twice; keep the newest copy
+    connection.execute(text(
+        "DELETE FROM market_data WHERE id NOT IN "
+        "(SELECT MAX(id) FROM market_data GROUP BY instrument_id, date)"
+    ))
+
+def _dedupe_signals(connection: Connection):
+    # Re-runs used to insert the same signal again; keep the newest copy
+    connection.execute(text(
+        "DELETE FROM signals WHERE id NOT IN "
+        "(SELECT MAX(id) FROM signals GROUP BY instrument_id, date, signal_type)"
+    ))
+
+# Data fixes that must run before an index can be added to an existing table
+_BEFORE_INDEX: Dict[str, Callable[[Connection], None]] = {
+    "uq_market_data_instrument_date": _dedupe_market_data,
+    "uq_signals_instrument_date_type": _dedupe_signals,
+}
+
+def create_missing_indexes(engine: Engine):
+    """
+    Adds the indexes declared on the models to tables created before they were declared.
+    """
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    if index.name in _BEFORE_INDEX:
+                        _BEFORE_INDEX[index.name](connection)
+                    index.create(connection)
+
+def run_migrations(engine: Optional[Engine] = None):
+    """
+    Creates any missing tables, upgrades existing ones whose layout changed and
+    adds missing indexes. Safe to run repeatedly.
+    """
+    load_models()
+    engine = engine or get_engine()
+    Base.metadata.create_all(bind=engine)
+    for module in UPGRADE_MODULES:
+        importlib.import_module(module).upgrade(engine)
+    create_missing_indexes(engine)
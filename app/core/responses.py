@@ -0,0 +1,43 @@
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Sequence, Tuple
+
+from app.core import streaming
+
+# FastAPI glue for the keyset-paginated streaming endpoints.
+
+# Rows fetched per keyset query while streaming a page
+STREAM_BATCH_SIZE = 5_000
+
+
+def parse_cursor(cursor: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """
+    Decodes a request cursor, answering 400 if it is malformed.
+    """
+    try:
+        return streaming.decode_cursor(cursor, types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def streaming_response(
+    session_factory: Callable[[], Session],
+    batches: Callable[[Session], Iterable[Dict[str, Any]]],
+    format: str,
+    headers: Mapping[str, str],
+) -> StreamingResponse:
+    """
+    Streams `batches(session)` as NDJSON or columnar frames, with a session
+    that lives exactly as long as the response body.
+    """
+    def body() -> Iterator[bytes]:
+        session = session_factory()
+        try:
+            render = streaming.columnar_stream if format == "columnar" else streaming.ndjson_stream
+            yield from render(batches(session))
+        finally:
+            session.close()
+
+    media_type = streaming.COLUMNAR_MEDIA_TYPE if format == "columnar" else streaming.NDJSON_MEDIA_TYPE
+    return StreamingResponse(body(), media_type=media_type, headers=dict(headers))
@@ -0,0 +1,88 @@
+import base64
+import json
+import struct
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, Sequence, Tuple
+
+import numpy as np
+
+from app.core.codec import pack_columns
+
+# Helpers for keyset-paginated, streamed API responses.
+#
+# A cursor is the opaque, URL-safe encoding of the sort key of the last row a
+# client has seen, e.g. (instrument_id, date). The next page is "rows with a
+# key greater than the cursor", which an index on the key answers directly
+# however deep the client has paged.
+#
+# Bodies are written batch by batch, either as NDJSON (one JSON object per
+# line) or as columnar frames: a little-endian uint32 length followed by an
+# `app.core.codec.pack_columns` payload per batch.
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+COLUMNAR_MEDIA_TYPE = "application/vnd.fcm.columnar"
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """
+    Encodes a sort key (ints, strings and dates) as an opaque cursor string.
+    """
+    values = [value.isoformat() if isinstance(value, date) else value for value in key]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """
+    Decodes a cursor produced by `encode_cursor` into a key of the given types.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong number of cursor fields")
+        return tuple(
+            date.fromisoformat(value) if kind is date else kind(value) for kind, value in zip(types, values)
+        )
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def ndjson_stream(batches: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Renders batches of named columns as NDJSON, one chunk per batch.
+    Date columns (datetime64[D]) are written as ISO dates.
+    """
+    for batch in batches:
+        names = list(batch)
+        columns = [_json_column(batch[name]) for name in names]
+        lines = [json.dumps(dict(zip(names, row)), separators=(",", ":")) for row in zip(*columns)]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
+def columnar_stream(batches: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Renders batches of named columns as length-prefixed columnar frames.
+    Date columns are sent as int32 days since 1970-01-01.
+    """
+    for batch in batches:
+        columns = {
+            name: (np.asarray(column) - _EPOCH).astype(np.int32) if _is_date(column) else column
+            for name, column in batch.items()
+        }
+        frame = pack_columns(columns)
+        yield struct.pack("<I", len(frame)) + frame
+
+
+def _is_date(column: Any) -> bool:
+    return isinstance(column, np.ndarray) and column.dtype.kind == "M"
+
+
+def _json_column(column: Any) -> list:
+    if _is_date(column):
+        return np.datetime_as_string(column, unit="D").tolist()
+    if isinstance(column, np.ndarray):
+        return column.tolist()
+    return list(column)
@@ -0,0 +1,266 @@
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import schemas
+from app.features.signal_generation import indicators, relative_strength
+from app.features.signal_generation import service as signal_service
+
+# Weekly bars per year, for annualising the Sharpe ratio
+PERIODS_PER_YEAR = 52
+
+# Exit reasons, in the order they are checked
+STOP_EXIT = "ATR_STOP"
+SELL_EXIT = "SELL_SIGNAL"
+CAST_OFF_EXIT = "CAST_OFF"
+TIME_EXIT = "TIME"
+END_EXIT = "END_OF_DATA"
+EXIT_REASONS = (STOP_EXIT, SELL_EXIT, CAST_OFF_EXIT, TIME_EXIT, END_EXIT)
+
+# All arrays are (n_instruments, n_weeks) weekly bars on a shared date axis, the
+# layout `BarArrays.to_matrix` produces. Decisions are taken on a week's close and
+# filled at the next week's open, so no rule sees a price before it could trade.
+# The simulation steps through time because positions, stops and cash carry
+# state, but every step is vectorised across the instruments.
+
+
+@dataclass(frozen=True)
+class EntryInputs:
+    """
+    Signal-dependent inputs of a simulation, computed once per signal and
+    relative-strength parameter set and reused across the exit parameters.
+    """
+    buy: np.ndarray # bool, composite BUY on this week's close
+    sell: np.ndarray # bool, composite SELL (counter-signal exit)
+    atr: np.ndarray
+    scores: np.ndarray # relative-strength score, ranks allocation between qualifiers
+    percentiles: np.ndarray # relative-strength percentile, drives the cast-off exit
+
+
+@dataclass(frozen=True)
+class BacktestResult:
+    dates: np.ndarray # datetime64[D]
+    equity: np.ndarray # equity at each week's close
+    trades: List[schemas.Trade]
+    summary: schemas.BacktestSummary
+
+
+def signal_inputs(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, params: schemas.SignalParameters
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Composite entry flags and ATR, using the same signal logic as the live engine.
+    Returns (buy, sell, atr).
+    """
+    values = indicators.indicator_values(open_, high, low, close, params)
+    votes = indicators.votes_from_values(open_, high, low, close, values, params)
+    buy, sell = signal_service.composite_entry_signals(votes, params.alignment_window)
+    return buy, sell, values["atr"]
+
+
+def ranking_inputs(
+    instrument_ids: Sequence[int], dates: np.ndarray, close: np.ndarray, params: schemas.RelativeStrengthParameters
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Relative-strength scores and percentiles for every week. Returns (scores, percentiles).
+    """
+    ranking, _ = relative_strength.relative_strength(instrument_ids, dates, close, params)
+    return ranking.scores, ranking.percentiles
+
+
+def prepare_inputs(
+    instrument_ids: Sequence[int],
+    dates: np.ndarray,
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    params: schemas.BacktestParameters,
+) -> EntryInputs:
+    buy, sell, atr = signal_inputs(open_, high, low, close, params.signal)
+    scores, percentiles = ranking_inputs(instrument_ids, dates, close, params.relative_strength)
+    return EntryInputs(buy=buy, sell=sell, atr=atr, scores=scores, percentiles=percentiles)
+
+
+def run_backtest(
+    instrument_ids: Sequence[int],
+    dates: np.ndarray,
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    params: Optional[schemas.BacktestParameters] = None,
+) -> BacktestResult:
+    """
+    Backtests the strategy over preloaded weekly price matrices and returns the
+    trade list, the equity curve and summary statistics.
+    """
+    params = params or schemas.BacktestParameters()
+    inputs = prepare_inputs(instrument_ids, dates, open_, high, low, close, params)
+    return simulate(instrument_ids, dates, open_, high, close, inputs, params)
+
+
+def simulate(
+    instrument_ids: Sequence[int],
+    dates: np.ndarray,
+    open_: np.ndarray,
+    high: np.ndarray,
+    close: np.ndarray,
+    inputs: EntryInputs,
+    params: schemas.BacktestParameters,
+    with_trades: bool = True,
+) -> BacktestResult:
+    """
+    Runs the portfolio rules over precomputed entry inputs (`with_trades=False`
+    skips building the trade list, for sweeps that only need the summary):
+    - BUY signals enter at the next open, strongest relative strength first,
+      into equal-sized slots of `max_positions`;
+    - an ATR trailing stop (highest high since entry minus `atr_multiplier` x ATR,
+      only ever tightened) exits on a close below it;
+    - a SELL signal exits;
+    - the cast-off rule exits once a position that reached the cast-off
+      percentile drops below it;
+    - positions are closed after `max_holding_weeks`.
+    Positions still open at the end are closed at the last close.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    n, n_weeks = close.shape
+    marks = _forward_fill(close)
+    # Orders fill at the open; fall back to the last close when the open is missing
+    fills = np.where(np.isfinite(open_), open_, np.hstack([marks[:, :1], marks[:, :-1]]))
+    rs = params.relative_strength
+
+    cash = params.initial_capital
+    held = np.zeros(n, dtype=bool)
+    shares = np.zeros(n)
+    entry_week = np.full(n, -1)
+    entry_price = np.full(n, np.nan)
+    highest = np.full(n, np.nan)
+    stop = np.full(n, np.nan)
+    reached_top = np.zeros(n, dtype=bool)
+    pending_exit = np.full(n, -1) # index into EXIT_REASONS, -1 for none
+    pending_entry = np.empty(0, dtype=np.int64) # instrument rows in allocation order
+    equity = np.empty(n_weeks)
+    trades: List[Tuple[int, int, float, int, float, float, int]] = []
+
+    def close_positions(rows: np.ndarray, week: int, prices: np.ndarray, reasons: np.ndarray):
+        nonlocal cash
+        cash += float(np.dot(shares[rows], prices[rows]))
+        trades.extend(zip(
+            rows.tolist(), entry_week[rows].tolist(), entry_price[rows].tolist(), [week] * len(rows),
+            prices[rows].tolist(), shares[rows].tolist(), reasons.tolist(),
+        ))
+        held[rows] = False
+        shares[rows] = 0.0
+
+    for t in range(n_weeks):
+        price = fills[:, t]
+        exiting = np.flatnonzero(pending_exit >= 0)
+        if len(exiting):
+            close_positions(exiting, t, price, pending_exit[exiting])
+            pending_exit[exiting] = -1
+
+        entering = pending_entry[np.isfinite(price[pending_entry])]
+        if len(entering):
+            slot = equity[t - 1] / params.max_positions
+            budget = np.full(len(entering), slot)
+            spent_before = np.cumsum(budget) - budget
+            amounts = np.clip(cash - spent_before, 0.0, slot)
+            entering, amounts = entering[amounts > 0], amounts[amounts > 0]
+            cash -= float(amounts.sum())
+            shares[entering] = amounts / price[entering]
+            held[entering] = True
+            entry_week[entering] = t
+            entry_price[entering] = price[entering]
+            highest[entering] = np.nan
+            stop[entering] = np.nan
+            reached_top[entering] = False
+        pending_entry = pending_entry[:0]
+
+        equity[t] = cash + float(np.dot(shares[held], marks[held, t]))
+        if t == n_weeks - 1:
+            break
+
+        # Trailing stop: highest high since entry minus k x ATR, never loosened
+        highest = np.where(held, np.fmax(highest, high[:, t]), np.nan)
+        stop = np.where(held, np.fmax(stop, highest - params.atr_multiplier * inputs.atr[:, t]), np.nan)
+
+        with np.errstate(invalid="ignore"):
+            in_top = inputs.percentiles[:, t] >= rs.cast_off_percentile
+            below_top = inputs.percentiles[:, t] < rs.cast_off_percentile
+            reached_top |= held & in_top
+            conditions = np.stack([
+                close[:, t] < stop,
+                inputs.sell[:, t],
+                reached_top & below_top,
+                t - entry_week + 1 >= params.max_holding_weeks,
+            ])
+        triggered = held & conditions.any(axis=0)
+        pending_exit[triggered] = conditions[:, triggered].argmax(axis=0)
+
+        free_slots = params.max_positions - int(held.sum()) + int(triggered.sum())
+        candidates = np.flatnonzero(inputs.buy[:, t] & ~held & np.isfinite(close[:, t]))
+        if free_slots > 0 and len(candidates):
+            score = inputs.scores[candidates, t]
+            order = np.argsort(np.where(np.isfinite(score), -score, np.inf), kind="stable")
+            pending_entry = candidates[order[:free_slots]]
+
+    still_open = np.flatnonzero(held)
+    if len(still_open):
+        close_positions(still_open, n_weeks - 1, marks[:, -1], np.full(len(still_open), EXIT_REASONS.index(END_EXIT)))
+        equity[-1] = cash
+
+    trade_returns = np.array([exit_price / entry for _, _, entry, _, exit_price, _, _ in trades]) - 1.0
+    return BacktestResult(
+        dates=dates,
+        equity=equity,
+        trades=_trades(instrument_ids, dates, trades) if with_trades else [],
+        summary=summarize(equity, params.initial_capital, trade_returns),
+    )
+
+
+def summarize(equity: np.ndarray, initial_capital: float, trade_returns: np.ndarray) -> schemas.BacktestSummary:
+    """
+    Total return, annualised Sharpe ratio and maximum drawdown of an equity
+    curve, plus the trade count and win rate.
+    """
+    curve = np.concatenate([[initial_capital], equity])
+    returns = curve[1:] / curve[:-1] - 1.0
+    volatility = returns.std()
+    sharpe = float(returns.mean() / volatility * math.sqrt(PERIODS_PER_YEAR)) if volatility > 0 else 0.0
+    drawdown = 1.0 - curve / np.maximum.accumulate(curve)
+    return schemas.BacktestSummary(
+        final_equity=float(curve[-1]),
+        total_return=float(curve[-1] / initial_capital - 1.0),
+        sharpe_ratio=sharpe,
+        max_drawdown=float(drawdown.max()),
+        trade_count=len(trade_returns),
+        win_rate=float((trade_returns > 0).mean()) if len(trade_returns) else None,
+    )
+
+
+def _trades(instrument_ids: Sequence[int], dates: np.ndarray, rows) -> List[schemas.Trade]:
+    ids = np.asarray(instrument_ids)
+    day_dates = dates.astype(object)
+    return sorted(
+        (
+            schemas.Trade(
+                instrument_id=int(ids[row]), entry_date=day_dates[entry], entry_price=entry_price,
+                exit_date=day_dates[exit_], exit_price=exit_price, shares=shares,
+                return_pct=exit_price / entry_price - 1.0, exit_reason=EXIT_REASONS[reason],
+            )
+            for row, entry, entry_price, exit_, exit_price, shares, reason in rows
+        ),
+        key=lambda trade: (trade.entry_date, trade.instrument_id),
+    )
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """
+    Carries the last finite value forward along the time axis.
+    """
+    index = np.where(np.isfinite(values), np.arange(values.shape[-1]), 0)
+    np.maximum.accumulate(index, axis=-1, out=index)
+    return np.take_along_axis(values, index, axis=-1)
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import Any, Dict, Optional
+
+from app.features.signal_generation.schemas import RelativeStrengthParameters, SignalParameters
+
+# Parameters of one backtest run (docs/specs.md, sections 3-6)
+class BacktestParameters(BaseModel):
+    signal: SignalParameters = Field(default_factory=SignalParameters)
+    relative_strength: RelativeStrengthParameters = Field(default_factory=RelativeStrengthParameters)
+    atr_multiplier: float = 3.0 # trailing stop distance below the highest high since entry
+    max_holding_weeks: int = 4 # time-based safety exit
+    max_positions: int = 5 # capital is split equally across this many slots
+    initial_capital: float = 5000.0
+
+class Trade(BaseModel):
+    instrument_id: int
+    entry_date: date
+    entry_price: float
+    exit_date: date
+    exit_price: float
+    shares: float
+    return_pct: float
+    exit_reason: str
+
+class BacktestSummary(BaseModel):
+    final_equity: float
+    total_return: float
+    sharpe_ratio: float # annualised from weekly returns, zero risk-free rate
+    max_drawdown: float # largest peak-to-trough loss of the equity curve, as a fraction
+    trade_count: int
+    win_rate: Optional[float] = None
+
+class SweepResult(BaseModel):
+    parameters: Dict[str, Any] # the grid point, as dotted parameter names
+    summary: BacktestSummary
@@ -0,0 +1,58 @@
+from datetime import date
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import engine, schemas, sweep
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.data_ingestion.storage import BarStore, load_completed_weekly_bars
+
+def _load_weekly_prices(
+    db: Optional[Session],
+    instrument_ids: Optional[Sequence[int]],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    store: Optional[BarStore] = None,
+):
+    if store is not None:
+        bars = load_completed_weekly_bars(store, instrument_ids, start_date, end_date)
+    else:
+        bars = market_data_repository.load_weekly_bar_arrays(db, instrument_ids, start_date, end_date, completed_only=True)
+    return bars.to_matrix(instrument_ids=instrument_ids)
+
+
+def run_backtest(
+    db: Optional[Session],
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    params: Optional[schemas.BacktestParameters] = None,
+    store: Optional[BarStore] = None,
+) -> engine.BacktestResult:
+    """
+    Backtests the strategy on the stored weekly bars of the chosen instruments
+    and date range, loaded in a single columnar query. With a `store` (e.g. the
+    memory-mapped history) the weekly bars are resampled from its daily bars
+    instead, and no database session is needed.
+    """
+    ids, dates, prices = _load_weekly_prices(db, instrument_ids, start_date, end_date, store)
+    return engine.run_backtest(ids, dates, prices["open"], prices["high"], prices["low"], prices["close"], params)
+
+
+def run_parameter_sweep(
+    db: Optional[Session],
+    grid: Dict[str, Sequence[Any]],
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    base: Optional[schemas.BacktestParameters] = None,
+    max_workers: Optional[int] = None,
+    store: Optional[BarStore] = None,
+) -> List[schemas.SweepResult]:
+    """
+    Loads the weekly bars once (from `store` when given, see `run_backtest`) and
+    backtests every point of `grid` across a process pool.
+    """
+    ids, dates, prices = _load_weekly_prices(db, instrument_ids, start_date, end_date, store)
+    return sweep.run_sweep(
+        ids, dates, prices["open"], prices["high"], prices["low"], prices["close"], grid, base=base, max_workers=max_workers
+    )
@@ -0,0 +1,111 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import engine, schemas
+
+# Parameter sweeps fan grid points out over a process pool. The price matrices
+# are copied once into a shared-memory block that every worker maps read-only,
+# so a task only carries its (small) parameter set. Workers cache the
+# signal and relative-strength inputs per parameter set, so grid points that
+# only vary exit rules reuse them.
+
+_worker_prices: Optional[np.ndarray] = None # (4, n_instruments, n_weeks): open, high, low, close
+_worker_ids: Optional[np.ndarray] = None
+_worker_dates: Optional[np.ndarray] = None
+_worker_block: Optional[shared_memory.SharedMemory] = None
+_worker_cache: Dict[Tuple[str, str], engine.EntryInputs] = {}
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    Cartesian product of a parameter grid, e.g.
+    {"signal.rsi_buy_below": [25, 30], "atr_multiplier": [2.5, 3.0]} gives four points.
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def apply_overrides(base: schemas.BacktestParameters, overrides: Dict[str, Any]) -> schemas.BacktestParameters:
+    """
+    Returns a copy of `base` with dotted parameter names (e.g. "signal.macd_buy_below")
+    replaced by the given values.
+    """
+    data = base.model_dump()
+    for name, value in overrides.items():
+        *path, field = name.split(".")
+        target = data
+        for part in path:
+            if not isinstance(target.get(part), dict):
+                raise ValueError(f"Unknown backtest parameter: {name}")
+            target = target[part]
+        if field not in target:
+            raise ValueError(f"Unknown backtest parameter: {name}")
+        target[field] = value
+    return schemas.BacktestParameters(**data)
+
+
+def run_sweep(
+    instrument_ids: Sequence[int],
+    dates: np.ndarray,
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    grid: Dict[str, Sequence[Any]],
+    base: Optional[schemas.BacktestParameters] = None,
+    max_workers: Optional[int] = None,
+) -> List[schemas.SweepResult]:
+    """
+    Backtests every point of `grid` (applied on top of `base`) across a process
+    pool and returns their summaries in grid order.
+    """
+    base = base or schemas.BacktestParameters()
+    points = expand_grid(grid)
+    if not points:
+        return []
+    max_workers = max_workers or os.cpu_count() or 1
+    prices = np.stack([open_, high, low, close]).astype(np.float64)
+
+    block = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+    try:
+        np.ndarray(prices.shape, dtype=np.float64, buffer=block.buf)[:] = prices
+        initargs = (block.name, prices.shape, np.asarray(instrument_ids, dtype=np.int64), np.asarray(dates, dtype="datetime64[D]"))
+        # Dispatch points sharing signal parameters together so chunks hit the worker cache
+        tasks = [apply_overrides(base, point) for point in points]
+        order = sorted(range(len(tasks)), key=lambda i: _inputs_key(tasks[i]))
+        chunksize = max(1, len(tasks) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_prices, initargs=initargs) as pool:
+            summaries = dict(zip(order, pool.map(_run_point, [tasks[i] for i in order], chunksize=chunksize)))
+    finally:
+        block.close()
+        block.unlink()
+    return [schemas.SweepResult(parameters=point, summary=summaries[i]) for i, point in enumerate(points)]
+
+
+def _inputs_key(params: schemas.BacktestParameters) -> Tuple[str, str]:
+    return params.signal.model_dump_json(), params.relative_strength.model_dump_json()
+
+
+def _attach_prices(block_name: str, shape: Tuple[int, ...], instrument_ids: np.ndarray, dates: np.ndarray):
+    global _worker_prices, _worker_ids, _worker_dates, _worker_block
+    # Pool workers share the parent's resource tracker, so attaching does not
+    # register a second owner; the parent unlinks the block when the sweep ends
+    _worker_block = shared_memory.SharedMemory(name=block_name)
+    _worker_prices = np.ndarray(shape, dtype=np.float64, buffer=_worker_block.buf)
+    _worker_prices.flags.writeable = False
+    _worker_ids, _worker_dates = instrument_ids, dates
+    _worker_cache.clear()
+
+
+def _run_point(params: schemas.BacktestParameters) -> schemas.BacktestSummary:
+    open_, high, low, close = _worker_prices
+    key = _inputs_key(params)
+    inputs = _worker_cache.get(key)
+    if inputs is None:
+        inputs = _worker_cache[key] = engine.prepare_inputs(_worker_ids, _worker_dates, open_, high, low, close, params)
+    return engine.simulate(_worker_ids, _worker_dates, open_, high, close, inputs, params, with_trades=False).summary
@@ -0,0 +1,46 @@
+import numpy as np
+
+# Largest-Triangle-Three-Buckets downsampling (Steinarsson, 2013).
+#
+# The first and last points are kept; the points in between are split into
+# equal buckets and from each bucket the point forming the largest triangle
+# with the previously selected point and the average of the next bucket is
+# kept. Peaks, troughs and trend changes survive, unlike with plain striding,
+# so a 2-year chart drawn at a few hundred pixels still looks like the data.
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the `n_out` points of the (x, y) series that LTTB keeps, in
+    ascending order. The whole series is returned when it already fits.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 0)]
+
+    # Bucket i spans [edges[i], edges[i + 1]); the last edge is the final point
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    # Average of each bucket, the final point standing in for the one after the last bucket
+    sums_x, sums_y = np.add.reduceat(x[1:n - 1], edges[:-1] - 1), np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    average_x = np.append(sums_x / counts, x[-1])
+    average_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_x, next_y = average_x[bucket + 1], average_y[bucket + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
@@ -0,0 +1,63 @@
+import math
+import numpy as np
+from datetime import date
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.core import streaming
+from app.core.codec import pack_columns
+from app.core.database import get_db
+
+router = APIRouter()
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+@router.get("/charts/{instrument_id}")
+def get_chart(
+    instrument_id: int,
+    response: Response,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    width: Optional[int] = Query(800, ge=3, le=20_000),
+    format: str = Query("json", pattern="^(json|columnar)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Weekly bars, indicator panes and signal markers of one instrument, ready
+    to draw: by default the last two years, at most `width` bars (LTTB
+    downsampled). `format=columnar` returns one packed columnar frame with
+    dates as int32 days since 1970-01-01; `X-Total-Bars` gives the number of
+    bars in the range before downsampling.
+    """
+    from . import service # deferred: the cache pulls in the Redis client, which the app imports lazily
+
+    chart = service.get_chart(db, instrument_id, start_date, end_date, width)
+    headers = {"X-Total-Bars": str(chart["total_bars"])}
+    response.headers.update(headers)
+    if format == "columnar":
+        frame = {
+            name: (column - _EPOCH).astype(np.int32) if name in ("date", "marker_date") else column
+            for name, column in chart.items() if name != "total_bars"
+        }
+        return Response(pack_columns(frame), media_type=streaming.COLUMNAR_MEDIA_TYPE, headers=headers)
+
+    return {
+        "instrument_id": instrument_id,
+        "total_bars": chart["total_bars"],
+        "date": np.datetime_as_string(chart["date"], unit="D").tolist(),
+        "panes": {
+            pane: {name: _json_series(chart[name]) for name in names}
+            for pane, names in service.PANES.items()
+        },
+        "markers": {
+            "date": np.datetime_as_string(chart["marker_date"], unit="D").tolist(),
+            "signal_type": list(chart["marker_type"]),
+        },
+    }
+
+
+def _json_series(values: np.ndarray) -> list:
+    # Indicator warm-up bars are NaN, which JSON cannot carry
+    return [None if math.isnan(value) else value for value in values.tolist()]
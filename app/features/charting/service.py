@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .downsampling import lttb_indices
+from app.core import cache, metrics
+from app.core.config import settings
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.signal_generation import indicators
+from app.features.signal_generation import repository as signal_repository
+from app.features.signal_generation.schemas import SignalParameters
+
+# Chart data for one instrument: weekly price bars, the indicator panes the
+# composite rule is built from, and the stored signals as markers.
+#
+# Indicators are computed over the instrument's whole weekly history (so no
+# pane starts with a warm-up gap inside the requested range) and cached per
+# instrument under its cache version, which ingestion and signal runs bump.
+# Requests then only slice a date range out of the cached columns and, when
+# it holds more bars than the chart is wide, downsample it with LTTB on the
+# close. Every series is sampled at the same bars, so the panes stay aligned.
+
+# Series in each pane of the chart, in payload order
+PANES = {
+    "price": ("open", "high", "low", "close", "volume", "trend_fast", "trend_slow"),
+    "macd": ("macd", "macd_signal", "macd_histogram", "macd_scaled"),
+    "rsi": ("rsi",),
+    "stochastic": ("stoch_fast", "stoch_slow"),
+}
+SERIES = tuple(name for names in PANES.values() for name in names)
+# Default range: two years of weekly bars (US-5)
+DEFAULT_WEEKS = 104
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def chart_columns(db: Session, instrument_id: int, params: Optional[SignalParameters] = None) -> Dict[str, Any]:
+    """
+    Computes the full-history chart columns of an instrument: "date"
+    (datetime64[D] week ends), every series in SERIES, and the signal markers
+    "marker_date" and "marker_type".
+    """
+    params = params or SignalParameters()
+    bars = market_data_repository.load_weekly_bar_arrays(db, [instrument_id])
+    values = indicators.indicator_values(bars.open, bars.high, bars.low, bars.close, params)
+    macd_line, macd_signal, macd_histogram = indicators.macd(bars.close, params.macd_fast, params.macd_slow, params.macd_signal)
+    signals = signal_repository.get_signals_for_instrument(db, instrument_id)
+    return {
+        "date": bars.dates,
+        "open": bars.open, "high": bars.high, "low": bars.low, "close": bars.close,
+        "volume": bars.volume.astype(np.float64),
+        "trend_fast": values["trend_fast"], "trend_slow": values["trend_slow"],
+        "macd": macd_line, "macd_signal": macd_signal, "macd_histogram": macd_histogram,
+        "macd_scaled": values["macd_scaled"],
+        "rsi": values["rsi"],
+        "stoch_fast": values["stoch_fast"], "stoch_slow": values["stoch_slow"],
+        "marker_date": np.array([s.date for s in signals], dtype="datetime64[D]"),
+        "marker_type": [s.signal_type for s in signals],
+    }
+
+
+def cached_chart_columns(db: Session, instrument_id: int) -> Dict[str, Any]:
+    """
+    `chart_columns` with the default parameters, read through the cache until
+    the instrument's bars or signals change.
+    """
+    return cache.read_through(
+        "chart", cache.instrument_scope(instrument_id), f"weekly:{settings.WEEK_END_WEEKDAY}",
+        lambda: chart_columns(db, instrument_id), _encode_columns, _decode_columns,
+    )
+
+
+@metrics.timed("charting.chart")
+def get_chart(
+    db: Session,
+    instrument_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    width: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Chart data for a date range (by default the last DEFAULT_WEEKS weeks),
+    downsampled to at most `width` bars. Returns {"date", the SERIES columns,
+    "marker_date", "marker_type", "total_bars"} where `total_bars` is the
+    number of bars in the range before downsampling.
+    """
+    columns = cached_chart_columns(db, instrument_id)
+    dates = columns["date"]
+    if end_date is None and len(dates):
+        end_date = dates[-1].astype(object)
+    if start_date is None and end_date is not None:
+        start_date = end_date - timedelta(weeks=DEFAULT_WEEKS - 1)
+    first, last = np.datetime64(start_date or date.min, "D"), np.datetime64(end_date or date.max, "D")
+    rows = np.arange(np.searchsorted(dates, first, side="left"), np.searchsorted(dates, last, side="right"))
+
+    total = len(rows)
+    if width is not None and total > width:
+        rows = rows[lttb_indices((dates[rows] - _EPOCH).astype(np.float64), columns["close"][rows], width)]
+
+    marker_dates = columns["marker_date"]
+    markers = np.flatnonzero((marker_dates >= first) & (marker_dates <= last))
+    return {
+        "date": dates[rows],
+        **{name: columns[name][rows] for name in SERIES},
+        "marker_date": marker_dates[markers],
+        "marker_type": [columns["marker_type"][i] for i in markers],
+        "total_bars": total,
+    }
+
+
+def _encode_columns(columns: Dict[str, Any]) -> bytes:
+    return cache.pack_columns({
+        name: (column - _EPOCH).astype(np.int32) if name in ("date", "marker_date") else column
+        for name, column in columns.items()
+    })
+
+
+def _decode_columns(payload: bytes) -> Dict[str, Any]:
+    columns = cache.unpack_columns(payload)
+    for name in ("date", "marker_date"):
+        columns[name] = _EPOCH + columns[name].astype("timedelta64[D]")
+    return columns
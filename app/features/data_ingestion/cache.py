@@ -0,0 +1,110 @@
+import numpy as np
+from datetime import date
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from . import repository, schemas
+from app.core import cache
+
+# Cached counterparts of the repository reads used by the API and dashboard:
+# the instrument pages of /instruments/ and the single-instrument windows of
+# /market-data/. Entries are keyed by the instrument's cache version, which
+# every bar write (ingestion, DatabaseBarStore) bumps after its commit.
+
+INSTRUMENTS_SCOPE = "instruments"
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def get_instruments_page(db: Session, after_id: Optional[int] = None, limit: int = 100) -> List[schemas.Instrument]:
+    """
+    Cached `repository.get_instruments_page`.
+    """
+    def load():
+        return [
+            schemas.Instrument.model_validate(instrument)
+            for instrument in repository.get_instruments_page(db, after_id, limit)
+        ]
+
+    return cache.read_through(
+        "instruments", INSTRUMENTS_SCOPE, f"{after_id}:{limit}", load, _encode_instruments, _decode_instruments
+    )
+
+
+def get_market_data_for_instrument(
+    db: Session, instrument_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None
+) -> List[schemas.MarketData]:
+    """
+    Cached `repository.get_market_data_for_instrument`.
+    """
+    def load():
+        return [
+            schemas.MarketData.model_validate(bar)
+            for bar in repository.get_market_data_for_instrument(db, instrument_id, start_date, end_date)
+        ]
+
+    return cache.read_through(
+        "market_data", cache.instrument_scope(instrument_id), f"{start_date}:{end_date}",
+        load, _encode_market_data, _decode_market_data,
+    )
+
+
+def invalidate_instrument(instrument_id: int):
+    """
+    Drops every cached read built from this instrument's data.
+    """
+    cache.invalidate_instruments([instrument_id])
+
+
+def invalidate_instruments(instrument_ids: List[int]):
+    cache.invalidate_instruments(instrument_ids)
+
+
+def invalidate_instruments_list():
+    cache.invalidate([INSTRUMENTS_SCOPE])
+
+
+def _encode_instruments(instruments: List[schemas.Instrument]) -> bytes:
+    return cache.pack_columns({
+        "id": np.array([i.id for i in instruments], dtype=np.int64),
+        "symbol": [i.symbol for i in instruments],
+        "name": [i.name for i in instruments],
+        "asset_class": [i.asset_class for i in instruments],
+    })
+
+
+def _decode_instruments(payload: bytes) -> List[schemas.Instrument]:
+    columns = cache.unpack_columns(payload)
+    return [
+        schemas.Instrument.model_construct(id=id_, symbol=symbol, name=name, asset_class=asset_class)
+        for id_, symbol, name, asset_class in zip(
+            columns["id"].tolist(), columns["symbol"], columns["name"], columns["asset_class"]
+        )
+    ]
+
+
+def _encode_market_data(bars: List[schemas.MarketData]) -> bytes:
+    return cache.pack_columns({
+        "id": np.array([bar.id for bar in bars], dtype=np.int64),
+        "instrument_id": np.array([bar.instrument_id for bar in bars], dtype=np.int64),
+        "date": (np.array([bar.date for bar in bars], dtype="datetime64[D]") - _EPOCH).astype(np.int32),
+        "open": np.array([bar.open for bar in bars], dtype=np.float64),
+        "high": np.array([bar.high for bar in bars], dtype=np.float64),
+        "low": np.array([bar.low for bar in bars], dtype=np.float64),
+        "close": np.array([bar.close for bar in bars], dtype=np.float64),
+        "volume": np.array([bar.volume for bar in bars], dtype=np.int64),
+    })
+
+
+def _decode_market_data(payload: bytes) -> List[schemas.MarketData]:
+    columns = cache.unpack_columns(payload)
+    dates = (_EPOCH + columns["date"].astype("timedelta64[D]")).astype(object)
+    return [
+        schemas.MarketData.model_construct(
+            id=id_, instrument_id=instrument_id, date=day, open=open_, high=high, low=low, close=close, volume=volume
+        )
+        for id_, instrument_id, day, open_, high, low, close, volume in zip(
+            columns["id"].tolist(), columns["instrument_id"].tolist(), dates, columns["open"].tolist(),
+            columns["high"].tolist(), columns["low"].tolist(), columns["close"].tolist(), columns["volume"].tolist(),
+        )
+    ]
@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+
+@dataclass(frozen=True)
+class BarArrays:
+    """
+    Column-oriented OHLCV bars for one or more instruments.
+    Rows are sorted by (instrument_id, date); every attribute is a 1-D NumPy
+    array of the same length, so no per-bar Python objects are involved.
+    """
+    instrument_ids: np.ndarray # int64
+    dates: np.ndarray # datetime64[D]
+    open: np.ndarray # float64
+    high: np.ndarray # float64
+    low: np.ndarray # float64
+    close: np.ndarray # float64
+    volume: np.ndarray # int64
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def empty(cls) -> "BarArrays":
+        return cls(
+            instrument_ids=np.empty(0, dtype=np.int64),
+            dates=np.empty(0, dtype="datetime64[D]"),
+            open=np.empty(0), high=np.empty(0), low=np.empty(0), close=np.empty(0),
+            volume=np.empty(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_columns(cls, instrument_ids, dates, open, high, low, close, volume) -> "BarArrays":
+        """
+        Builds a BarArrays from column sequences, coercing dtypes and sorting rows.
+        """
+        bars = cls(
+            instrument_ids=np.asarray(instrument_ids, dtype=np.int64),
+            dates=np.asarray(dates, dtype="datetime64[D]"),
+            open=np.asarray(open, dtype=np.float64),
+            high=np.asarray(high, dtype=np.float64),
+            low=np.asarray(low, dtype=np.float64),
+            close=np.asarray(close, dtype=np.float64),
+            volume=np.asarray(volume, dtype=np.int64),
+        )
+        order = np.lexsort((bars.dates, bars.instrument_ids))
+        if np.all(order[1:] > order[:-1]):
+            return bars
+        return bars.take(order)
+
+    def take(self, indices: np.ndarray) -> "BarArrays":
+        """
+        Returns the rows at `indices` (a view when `indices` is a slice).
+        """
+        return BarArrays(
+            instrument_ids=self.instrument_ids[indices], dates=self.dates[indices],
+            open=self.open[indices], high=self.high[indices], low=self.low[indices],
+            close=self.close[indices], volume=self.volume[indices],
+        )
+
+    def unique_instrument_ids(self) -> np.ndarray:
+        return np.unique(self.instrument_ids)
+
+    def for_instrument(self, instrument_id: int) -> "BarArrays":
+        """
+        Zero-copy slice with one instrument's bars.
+        """
+        start, stop = np.searchsorted(self.instrument_ids, [instrument_id, instrument_id + 1])
+        return self.take(slice(start, stop))
+
+    def to_matrix(
+        self, fields: Sequence[str] = PRICE_FIELDS, instrument_ids: Optional[Sequence[int]] = None
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Aligns the bars on a shared date axis.
+        Returns (instrument_ids, dates, {field: matrix}) where each matrix has shape
+        (n_instruments, n_dates) and NaN wherever an instrument has no bar, which is
+        the layout the signal engine consumes.
+        """
+        ids = np.unique(self.instrument_ids) if instrument_ids is None else np.asarray(instrument_ids, dtype=np.int64)
+        dates = np.unique(self.dates)
+        cols = np.searchsorted(dates, self.dates)
+        if len(ids):
+            # Map each bar to its row in `ids`, which may be in any order
+            order = np.argsort(ids, kind="stable")
+            positions = np.minimum(np.searchsorted(ids, self.instrument_ids, sorter=order), len(ids) - 1)
+            rows = order[positions]
+            keep = ids[rows] == self.instrument_ids
+        else:
+            rows = np.zeros(len(self), dtype=np.int64)
+            keep = np.zeros(len(self), dtype=bool)
+
+        matrices = {}
+        for field in fields:
+            matrix = np.full((len(ids), len(dates)), np.nan)
+            matrix[rows[keep], cols[keep]] = getattr(self, field)[keep]
+            matrices[field] = matrix
+        return ids, dates, matrices
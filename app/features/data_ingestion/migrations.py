@@ -0,0 +1,339 @@
+import time
+from datetime import date
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Index, MetaData, inspect, text
+from sqlalchemy.engine import Connection, Dialect, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex
+
+from . import models
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Layout upgrades of market_data that create_all cannot apply to an existing
+# table: column type changes (FLOAT prices to NUMERIC(10, 4), INTEGER volume to
+# BIGINT) and range partitioning by year.
+#
+# On PostgreSQL the table is rebuilt online rather than altered, since ALTER
+# COLUMN TYPE rewrites it under an exclusive lock. The new table is created
+# next to the old one and kept in sync by a trigger while the existing rows are
+# copied over in date-ordered batches, one short transaction each, so
+# ingestion and reads carry on. The copy in date order also gives the BRIN
+# index on date the physical ordering it relies on. Finally both tables swap
+# names in one brief transaction. The old table is kept as market_data_previous
+# until it is dropped by hand.
+#
+# SQLite (development and tests) copies the table in a single transaction.
+
+TABLE = "market_data"
+REBUILD_TABLE = "market_data_rebuild"
+PREVIOUS_TABLE = "market_data_previous"
+DEFAULT_PARTITION = "default"
+
+BACKFILL_BATCH_SIZE = 50_000
+
+_SYNC_TRIGGER = "market_data_rebuild_sync"
+_BACKFILL_INDEX = "market_data_backfill_date_idx"
+_SWAP_LOCK_TIMEOUT = "5s"
+_SWAP_ATTEMPTS = 10
+
+
+def upgrade(engine: Engine, partition_by_year: Optional[bool] = None, batch_size: int = BACKFILL_BATCH_SIZE):
+    """
+    Brings market_data to the layout of the model, partitioned by year when
+    `partition_by_year` (default: MARKET_DATA_PARTITION_BY_YEAR) on PostgreSQL.
+    Does nothing when the table is current; keeps yearly partitions ahead of the data.
+    """
+    partition_by_year = settings.MARKET_DATA_PARTITION_BY_YEAR if partition_by_year is None else partition_by_year
+    if partition_by_year and engine.dialect.name != "postgresql":
+        raise ValueError("Partitioning market_data by year needs PostgreSQL")
+    with engine.connect() as connection:
+        outdated = is_outdated(connection, partition_by_year)
+    if outdated:
+        logger.info("market_data_rebuild_started", partition_by_year=partition_by_year)
+        if engine.dialect.name == "postgresql":
+            _rebuild_online(engine, partition_by_year, batch_size)
+        else:
+            _rebuild_offline(engine)
+        logger.info("market_data_rebuild_finished")
+    if partition_by_year:
+        with engine.begin() as connection:
+            add_missing_partitions(connection, date.today().year + 1)
+
+
+def is_outdated(connection: Connection, partition_by_year: bool = False) -> bool:
+    """
+    True when market_data exists with column types (or partitioning) other than the model's.
+    """
+    inspector = inspect(connection)
+    if not inspector.has_table(TABLE):
+        return False
+    dialect = connection.dialect
+    current = {column["name"]: column["type"].compile(dialect) for column in inspector.get_columns(TABLE)}
+    wanted = {column.name: column.type.compile(dialect) for column in models.MarketData.__table__.columns}
+    if current != wanted:
+        return True
+    return dialect.name == "postgresql" and partition_by_year != _is_partitioned(connection, TABLE)
+
+
+def rebuild_name(name: str) -> str:
+    """
+    Name of an object of the rebuilt table while it sits next to the live one,
+    e.g. uq_market_data_instrument_date -> uq_market_data_rebuild_instrument_date.
+    """
+    return name.replace(TABLE, REBUILD_TABLE, 1)
+
+
+def create_table_statements(
+    dialect: Dialect, sequence: Optional[str] = None, years: Optional[Sequence[int]] = None
+) -> List[str]:
+    """
+    DDL of the rebuild table and its indexes (named with `rebuild_name`). With
+    `years` it is range-partitioned by date, one partition per year plus a
+    default partition, and the primary key includes the partition key as
+    PostgreSQL requires. `sequence` is the live table's id sequence, which the
+    rebuilt table takes over.
+    """
+    definitions = []
+    for column in models.MarketData.__table__.columns:
+        definition = f"{column.name} {column.type.compile(dialect)}"
+        if column.name == "id" and sequence is not None:
+            definition += f" DEFAULT nextval('{sequence}'::regclass)"
+        if not column.nullable:
+            definition += " NOT NULL"
+        definitions.append(definition)
+    definitions.append(f"PRIMARY KEY ({'id, date' if years is not None else 'id'})")
+    definitions.append("FOREIGN KEY (instrument_id) REFERENCES instruments (id)")
+    statements = [
+        f"CREATE TABLE {REBUILD_TABLE} ({', '.join(definitions)})"
+        + (" PARTITION BY RANGE (date)" if years is not None else "")
+    ]
+    if years is not None:
+        statements += [_partition_statement(REBUILD_TABLE, year) for year in years]
+        statements.append(f"CREATE TABLE {REBUILD_TABLE}_{DEFAULT_PARTITION} PARTITION OF {REBUILD_TABLE} DEFAULT")
+
+    metadata = MetaData()
+    models.Instrument.__table__.to_metadata(metadata)
+    table = models.MarketData.__table__.to_metadata(metadata, name=REBUILD_TABLE)
+    for index in sorted(models.MarketData.__table__.indexes, key=lambda index: index.name):
+        if index.dialect_options["postgresql"]["using"] and dialect.name != "postgresql":
+            continue
+        copy = Index(
+            rebuild_name(index.name), *[table.c[column.name] for column in index.columns],
+            unique=index.unique, **index.dialect_kwargs,
+        )
+        statements.append(str(CreateIndex(copy).compile(dialect=dialect)))
+    return statements
+
+
+def sync_trigger_statements() -> List[str]:
+    """
+    A row trigger on the live table that applies every insert, update and
+    delete to the rebuild table while the existing rows are copied over.
+    """
+    columns = [column.name for column in models.MarketData.__table__.columns]
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in columns if name not in ("instrument_id", "date"))
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {_SYNC_TRIGGER}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                DELETE FROM {REBUILD_TABLE} WHERE instrument_id = OLD.instrument_id AND date = OLD.date;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            INSERT INTO {REBUILD_TABLE} ({', '.join(columns)})
+            VALUES ({', '.join(f'NEW.{name}' for name in columns)})
+            ON CONFLICT (instrument_id, date) DO UPDATE SET {updates};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"DROP TRIGGER IF EXISTS {_SYNC_TRIGGER} ON {TABLE}",
+        f"CREATE TRIGGER {_SYNC_TRIGGER} AFTER INSERT OR UPDATE OR DELETE ON {TABLE} "
+        f"FOR EACH ROW EXECUTE FUNCTION {_SYNC_TRIGGER}()",
+    ]
+
+
+def add_missing_partitions(connection: Connection, through_year: int) -> List[str]:
+    """
+    Adds yearly partitions to a partitioned market_data up to `through_year`,
+    so new bars do not pile up in the default partition. A year that already
+    has rows in the default partition is left there. Returns the partitions added.
+    """
+    if not _is_partitioned(connection, TABLE):
+        return []
+    existing = set(_partitions(connection, TABLE))
+    first_year = connection.execute(text(f"SELECT MIN(date) FROM {TABLE}")).scalar()
+    added = []
+    for year in range(first_year.year if first_year else date.today().year, through_year + 1):
+        if f"{TABLE}_y{year}" in existing:
+            continue
+        in_default = connection.execute(
+            text(f"SELECT 1 FROM {TABLE}_{DEFAULT_PARTITION} WHERE date >= :start AND date < :end LIMIT 1"),
+            {"start": date(year, 1, 1), "end": date(year + 1, 1, 1)},
+        ).first()
+        if in_default:
+            logger.warning("market_data_partition_skipped", year=year, reason="rows in the default partition")
+            continue
+        connection.execute(text(_partition_statement(TABLE, year)))
+        added.append(f"{TABLE}_y{year}")
+    return added
+
+
+def _partition_statement(table: str, year: int) -> str:
+    return (
+        f"CREATE TABLE {table}_y{year} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{date(year, 1, 1)}') TO ('{date(year + 1, 1, 1)}')"
+    )
+
+
+def _rebuild_online(engine: Engine, partition_by_year: bool, batch_size: int):
+    with engine.begin() as connection:
+        # Leftovers of an interrupted rebuild start over; the table kept by the last rebuild goes
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {_SYNC_TRIGGER} ON {TABLE}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {REBUILD_TABLE} CASCADE"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {PREVIOUS_TABLE} CASCADE"))
+        sequence = connection.execute(text(f"SELECT pg_get_serial_sequence('{TABLE}', 'id')")).scalar()
+        years = None
+        if partition_by_year:
+            first, last = connection.execute(text(f"SELECT MIN(date), MAX(date) FROM {TABLE}")).first()
+            this_year = date.today().year
+            # Through next year, so the coming bars have a partition
+            years = range(first.year if first else this_year, max(last.year if last else this_year, this_year) + 2)
+        for statement in create_table_statements(engine.dialect, sequence, years):
+            connection.execute(text(statement))
+        for statement in sync_trigger_statements():
+            connection.execute(text(statement))
+
+    # An index to walk the old table in date order; CONCURRENTLY cannot run in a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_BACKFILL_INDEX} ON {TABLE} (date)"))
+
+    copied = _backfill(engine, batch_size)
+
+    _swap(engine, sequence)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"ANALYZE {TABLE}"))
+    logger.info("market_data_backfilled", rows=copied)
+
+
+def _swap(engine: Engine, sequence: Optional[str]):
+    # Waits for the exclusive lock only briefly, so queued reads are not held up
+    # behind it for long; retried until in-flight transactions let it through.
+    for attempt in range(1, _SWAP_ATTEMPTS + 1):
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(f"SET LOCAL lock_timeout = '{_SWAP_LOCK_TIMEOUT}'"))
+                connection.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+                connection.execute(text(f"DROP TRIGGER {_SYNC_TRIGGER} ON {TABLE}"))
+                connection.execute(text(f"DROP FUNCTION {_SYNC_TRIGGER}()"))
+                connection.execute(text(f"DROP INDEX {_BACKFILL_INDEX}"))
+                for statement in _rename_statements(connection, TABLE, PREVIOUS_TABLE):
+                    connection.execute(text(statement))
+                for statement in _rename_statements(connection, REBUILD_TABLE, TABLE):
+                    connection.execute(text(statement))
+                if sequence:
+                    connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+            return
+        except OperationalError as e:
+            if attempt == _SWAP_ATTEMPTS:
+                raise
+            logger.warning("market_data_swap_retry", attempt=attempt, error=str(e))
+            time.sleep(attempt)
+
+
+def _backfill(engine: Engine, batch_size: int) -> int:
+    # Whole days per batch, in (date, instrument_id) order. Rows the trigger
+    # already copied are newer and win; among duplicate bars the newest id wins.
+    columns = ", ".join(column.name for column in models.MarketData.__table__.columns)
+    copied, after = 0, None
+    while True:
+        with engine.begin() as connection:
+            if after is None:
+                after = connection.execute(text(f"SELECT MIN(date) - 1 FROM {TABLE}")).scalar()
+                if after is None:
+                    return copied
+            until = connection.execute(
+                text(f"SELECT date FROM {TABLE} WHERE date > :after ORDER BY date OFFSET :offset LIMIT 1"),
+                {"after": after, "offset": batch_size - 1},
+            ).scalar()
+            if until is None:
+                until = connection.execute(text(f"SELECT MAX(date) FROM {TABLE}")).scalar()
+            result = connection.execute(text(
+                f"INSERT INTO {REBUILD_TABLE} ({columns}) "
+                f"SELECT {columns} FROM {TABLE} WHERE date > :after AND date <= :until "
+                f"ORDER BY date, instrument_id, id DESC "
+                f"ON CONFLICT (instrument_id, date) DO NOTHING"
+            ), {"after": after, "until": until})
+            copied += result.rowcount
+        logger.info("market_data_backfill_batch", through=str(until), rows=copied)
+        if until is None or until <= after:
+            return copied
+        after = until
+
+
+def _rename_statements(connection: Connection, table: str, new_table: str) -> List[str]:
+    # The table, its partitions and its indexes, with `table` replaced by `new_table` in their names
+    statements = [
+        f"ALTER INDEX {name} RENAME TO {name.replace(table, new_table, 1)}"
+        for name in _index_names(connection, table) if table in name
+    ]
+    statements += [
+        f"ALTER TABLE {table} RENAME CONSTRAINT {name} TO {name.replace(table, new_table, 1)}"
+        for name in _foreign_key_names(connection, table) if table in name
+    ]
+    statements += [
+        f"ALTER TABLE {name} RENAME TO {name.replace(table, new_table, 1)}" for name in _partitions(connection, table)
+    ]
+    return statements + [f"ALTER TABLE {table} RENAME TO {new_table}"]
+
+
+def _is_partitioned(connection: Connection, table: str) -> bool:
+    kind = connection.execute(text("SELECT relkind FROM pg_class WHERE relname = :table"), {"table": table}).scalar()
+    return kind == "p"
+
+
+def _partitions(connection: Connection, table: str) -> List[str]:
+    return list(connection.execute(text(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid WHERE parent.relname = :table"
+    ), {"table": table}).scalars())
+
+
+def _index_names(connection: Connection, table: str) -> List[str]:
+    return list(connection.execute(text(
+        "SELECT child.relname FROM pg_index JOIN pg_class child ON child.oid = pg_index.indexrelid "
+        "JOIN pg_class parent ON parent.oid = pg_index.indrelid WHERE parent.relname = :table"
+    ), {"table": table}).scalars())
+
+
+def _foreign_key_names(connection: Connection, table: str) -> List[str]:
+    return list(connection.execute(text(
+        "SELECT conname FROM pg_constraint JOIN pg_class ON pg_class.oid = pg_constraint.conrelid "
+        "WHERE pg_class.relname = :table AND contype = 'f'"
+    ), {"table": table}).scalars())
+
+
+def _rebuild_offline(engine: Engine):
+    columns = ", ".join(column.name for column in models.MarketData.__table__.columns)
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {REBUILD_TABLE}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {PREVIOUS_TABLE}"))
+        statements = create_table_statements(connection.dialect)
+        connection.execute(text(statements[0]))
+        connection.execute(text(
+            f"INSERT INTO {REBUILD_TABLE} ({columns}) SELECT {columns} FROM {TABLE} "
+            f"WHERE id IN (SELECT MAX(id) FROM {TABLE} GROUP BY instrument_id, date)"
+        ))
+        # Index names are global in SQLite: drop the old table's so the new ones can take them
+        for index in inspect(connection).get_indexes(TABLE):
+            connection.execute(text(f"DROP INDEX {index['name']}"))
+        connection.execute(text(f"ALTER TABLE {TABLE} RENAME TO {PREVIOUS_TABLE}"))
+        connection.execute(text(f"ALTER TABLE {REBUILD_TABLE} RENAME TO {TABLE}"))
+        for statement in statements[1:]:
+            connection.execute(text(statement.replace(REBUILD_TABLE, TABLE)))
@@ -0,0 +1,240 @@
+import json
+import os
+import shutil
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .columnar import BarArrays
+from .storage import BarStore, Revision
+
+# Memory-mapped columnar history store.
+#
+# Every instrument has a directory under the root holding one fixed-width,
+# little-endian file per column:
+#     <root>/<instrument_id>/date.i8     int64 days since 1970-01-01, ascending
+#     <root>/<instrument_id>/open.f8     float64, likewise high, low and close
+#     <root>/<instrument_id>/volume.i8   int64
+# The date file is the index: its length is the row count, and a date range is
+# two binary searches over it. Readers map the files read-only, so the arrays
+# they get are views onto the OS page cache that any number of processes share.
+#
+# Files are append-only. The date file is appended last and is the commit
+# point: value columns longer than it (an interrupted append) are truncated
+# before the next one. Bars that replace stored dates are written in place;
+# the rare bar that lands between stored dates rewrites the instrument's files
+# into a new directory that is then swapped in. One writer per store is
+# assumed; readers may run concurrently in any process.
+#
+# <root>/revisions.json holds the source write counters each instrument was
+# last copied at (see storage.copy_new_bars), replaced atomically on update.
+
+_DATE_COLUMN = ("date", "<i8")
+_VALUE_COLUMNS = (("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<i8"))
+_ROW_BYTES = 8
+_REVISIONS_FILE = "revisions.json"
+
+
+def _file_name(column: str, dtype: str) -> str:
+    return f"{column}.{dtype[1:]}"
+
+
+class MemoryMappedBarStore(BarStore):
+    """
+    BarStore over per-instrument column files on local disk.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Mapped bars per instrument, with the (inode, size) of the date file they were mapped at
+        self._mapped: Dict[int, Tuple[Tuple[int, int], BarArrays]] = {}
+
+    def instrument_ids(self) -> List[int]:
+        return sorted(int(entry.name) for entry in self.root.iterdir() if entry.is_dir() and entry.name.isdigit())
+
+    # --- Reading ---
+
+    def instrument_bars(
+        self, instrument_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> BarArrays:
+        """
+        One instrument's bars within the date range as zero-copy views of the mapped files.
+        """
+        bars = self._open(int(instrument_id))
+        start, stop = 0, len(bars)
+        if start_date is not None:
+            start = np.searchsorted(bars.dates, np.datetime64(start_date, "D"), side="left")
+        if end_date is not None:
+            stop = np.searchsorted(bars.dates, np.datetime64(end_date, "D"), side="right")
+        return bars.take(slice(start, max(start, stop)))
+
+    def load_bars(
+        self,
+        instrument_ids: Optional[Sequence[int]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> BarArrays:
+        """
+        Bars of several instruments. A single instrument comes back as views of
+        the mapped files; several are concatenated into one set of arrays.
+        """
+        ids = self.instrument_ids() if instrument_ids is None else sorted({int(i) for i in instrument_ids})
+        parts = [self.instrument_bars(i, start_date, end_date) for i in ids]
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return BarArrays.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return BarArrays(**{
+            field: np.concatenate([getattr(part, field) for part in parts])
+            for field in ("instrument_ids", "dates", "open", "high", "low", "close", "volume")
+        })
+
+    def latest_dates(self, instrument_ids: Optional[Sequence[int]] = None) -> Dict[int, date]:
+        ids = self.instrument_ids() if instrument_ids is None else sorted({int(i) for i in instrument_ids})
+        latest = {}
+        for instrument_id in ids:
+            dates = self._open(instrument_id).dates
+            if len(dates):
+                latest[instrument_id] = dates[-1].astype(object)
+        return latest
+
+    def revisions(self, instrument_ids: Optional[Sequence[int]] = None) -> Dict[int, Revision]:
+        try:
+            recorded = json.loads((self.root / _REVISIONS_FILE).read_text())
+        except FileNotFoundError:
+            return {}
+        revisions = {int(i): Revision(*counters) for i, counters in recorded.items()}
+        if instrument_ids is None:
+            return revisions
+        return {i: revisions[i] for i in sorted({int(i) for i in instrument_ids}) if i in revisions}
+
+    def _open(self, instrument_id: int) -> BarArrays:
+        directory = self.root / str(instrument_id)
+        try:
+            info = os.stat(directory / _file_name(*_DATE_COLUMN))
+        except FileNotFoundError:
+            return BarArrays.empty()
+        signature = (info.st_ino, info.st_size)
+        cached = self._mapped.get(instrument_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        count = info.st_size // _ROW_BYTES
+        if count == 0:
+            return BarArrays.empty()
+        columns = {
+            column: np.memmap(directory / _file_name(column, dtype), dtype=dtype, mode="r", shape=(count,))
+            for column, dtype in (_DATE_COLUMN,) + _VALUE_COLUMNS
+        }
+        bars = BarArrays(
+            instrument_ids=np.broadcast_to(np.int64(instrument_id), (count,)),
+            dates=columns["date"].view("datetime64[D]"),
+            open=columns["open"], high=columns["high"], low=columns["low"], close=columns["close"],
+            volume=columns["volume"],
+        )
+        self._mapped[instrument_id] = (signature, bars)
+        return bars
+
+    # --- Writing ---
+
+    def write_bars(self, bars: BarArrays) -> int:
+        """
+        Appends bars after each instrument's last stored date, overwrites bars
+        on stored dates in place, and rewrites an instrument's files only when
+        a bar falls between stored dates. Returns the number of bars written.
+        """
+        written = 0
+        with self._lock:
+            for instrument_id in bars.unique_instrument_ids().tolist():
+                written += self._write_instrument(int(instrument_id), bars.for_instrument(instrument_id))
+        return written
+
+    def record_revisions(self, revisions: Dict[int, Revision]) -> None:
+        if not revisions:
+            return
+        with self._lock:
+            recorded = self.revisions()
+            recorded.update(revisions)
+            path = self.root / _REVISIONS_FILE
+            staging = path.with_name(f"{path.name}.tmp")
+            staging.write_text(json.dumps({str(i): [r.number, r.rewritten] for i, r in sorted(recorded.items())}))
+            os.replace(staging, path)
+
+    def _write_instrument(self, instrument_id: int, bars: BarArrays) -> int:
+        # Keep the last of duplicate dates, like the database upsert
+        last = np.ones(len(bars), dtype=bool)
+        last[:-1] = bars.dates[1:] != bars.dates[:-1]
+        bars = bars.take(last)
+        days = bars.dates.astype(np.int64)
+
+        directory = self.root / str(instrument_id)
+        directory.mkdir(exist_ok=True)
+        stored = np.fromfile(directory / _file_name(*_DATE_COLUMN), dtype=_DATE_COLUMN[1]) \
+            if (directory / _file_name(*_DATE_COLUMN)).exists() else np.empty(0, dtype=np.int64)
+
+        positions = np.searchsorted(stored, days)
+        existing = positions < len(stored)
+        existing[existing] = stored[positions[existing]] == days[existing]
+        appended = days > (stored[-1] if len(stored) else np.iinfo(np.int64).min)
+        if not np.all(existing | appended):
+            self._rewrite(directory, stored, bars, days)
+            return len(bars)
+
+        if existing.any():
+            self._overwrite(directory, len(stored), positions[existing], bars.take(existing))
+        if appended.any():
+            self._append(directory, len(stored), bars.take(appended), days[appended])
+        return len(bars)
+
+    def _overwrite(self, directory: Path, count: int, rows: np.ndarray, bars: BarArrays):
+        for column, dtype in _VALUE_COLUMNS:
+            mapped = np.memmap(directory / _file_name(column, dtype), dtype=dtype, mode="r+", shape=(count,))
+            mapped[rows] = getattr(bars, column)
+            mapped.flush()
+            del mapped
+
+    def _append(self, directory: Path, count: int, bars: BarArrays, days: np.ndarray):
+        for column, dtype in _VALUE_COLUMNS:
+            self._append_column(directory / _file_name(column, dtype), count, getattr(bars, column).astype(dtype))
+        self._append_column(directory / _file_name(*_DATE_COLUMN), count, days.astype(_DATE_COLUMN[1]))
+
+    @staticmethod
+    def _append_column(path: Path, count: int, values: np.ndarray):
+        with open(path, "ab") as handle:
+            # Drop the tail of an append that was interrupted before its date file was written
+            handle.truncate(count * _ROW_BYTES)
+            handle.write(values.tobytes())
+
+    def _rewrite(self, directory: Path, stored: np.ndarray, bars: BarArrays, days: np.ndarray):
+        current = self._read_columns(directory, len(stored))
+        keep = ~np.isin(stored, days)
+        merged_days = np.concatenate([stored[keep], days])
+        order = np.argsort(merged_days, kind="stable")
+
+        staging = directory.with_name(f"{directory.name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        for column, dtype in _VALUE_COLUMNS:
+            values = np.concatenate([current[column][keep], getattr(bars, column).astype(dtype)])[order]
+            values.astype(dtype).tofile(staging / _file_name(column, dtype))
+        merged_days[order].astype(_DATE_COLUMN[1]).tofile(staging / _file_name(*_DATE_COLUMN))
+
+        # Readers that already mapped the old files keep reading them until they remap
+        retired = directory.with_name(f"{directory.name}.old")
+        shutil.rmtree(retired, ignore_errors=True)
+        os.replace(directory, retired)
+        os.replace(staging, directory)
+        shutil.rmtree(retired, ignore_errors=True)
+
+    @staticmethod
+    def _read_columns(directory: Path, count: int) -> Dict[str, np.ndarray]:
+        return {
+            column: np.fromfile(directory / _file_name(column, dtype), dtype=dtype, count=count)
+            for column, dtype in _VALUE_COLUMNS
+        }
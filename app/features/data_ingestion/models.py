@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, JSON, Numeric, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
+# Daily prices as NUMERIC(10, 4), as in the design: exact to the 1/10000 providers
+# quote in, read back as floats so the columnar code paths are unchanged.
+Price = Numeric(10, 4, asdecimal=False)
+
 class Instrument(Base):
     __tablename__ = "instruments"
 
@@ -11,18 +15,80 @@ class Instrument(Base):
     asset_class = Column(String) # e.g., ETF, FX, Commodity
 
     market_data = relationship("MarketData", back_populates="instrument")
+    weekly_market_data = relationship("WeeklyMarketData", back_populates="instrument")
     signals = relationship("Signal", back_populates="instrument")
 
 class MarketData(Base):
     __tablename__ = "market_data"
+    __table_args__ = (
+        # One bar per instrument per day: the conflict target for upserts and the
+        # index behind every per-instrument range read. A unique index rather than
+        # a constraint, so the migration can add it to an existing table; it holds
+        # the partition key, so it is valid on the table partitioned by year too.
+        Index("uq_market_data_instrument_date", "instrument_id", "date", unique=True),
+        # Bars arrive in date order, so a block-range index on date stays small and
+        # selective for cross-sectional date-range reads (PostgreSQL only)
+        Index("brin_market_data_date", "date", postgresql_using="brin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     instrument_id = Column(Integer, ForeignKey("instruments.id"), nullable=False)
     date = Column(Date, nullable=False)
+    open = Column(Price)
+    high = Column(Price)
+    low = Column(Price)
+    close = Column(Price)
+    volume = Column(BigInteger)
+
+    instrument = relationship("Instrument", back_populates="market_data")
+
+class MarketDataRevision(Base):
+    """
+    Write counter per instrument, bumped in the same transaction as every write
+    to its market data, so readers can tell whether any bar (not only the
+    latest) changed without scanning market_data.
+    """
+    __tablename__ = "market_data_revisions"
+
+    instrument_id = Column(Integer, ForeignKey("instruments.id"), primary_key=True)
+    revision = Column(BigInteger, nullable=False)
+    # Revision of the latest write that replaced or backfilled bars on or before
+    # latest_date, rather than only appending after it
+    rewritten_revision = Column(BigInteger, nullable=False)
+    latest_date = Column(Date, nullable=False) # latest bar date written
+    updated_at = Column(DateTime, nullable=False) # naive UTC time of the latest write
+
+class WeeklyMarketData(Base):
+    """
+    Weekly OHLCV bars resampled from market_data; all indicators run on these.
+    """
+    __tablename__ = "weekly_market_data"
+    __table_args__ = (
+        UniqueConstraint("instrument_id", "week_end", name="uq_weekly_market_data_instrument_week_end"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    instrument_id = Column(Integer, ForeignKey("instruments.id"), nullable=False)
+    week_end = Column(Date, nullable=False)
     open = Column(Float)
     high = Column(Float)
     low = Column(Float)
     close = Column(Float)
     volume = Column(Integer)
+    last_date = Column(Date, nullable=False) # last daily bar folded into this week
+    is_complete = Column(Boolean, nullable=False, default=False) # no more daily bars can land in it
 
-    instrument = relationship("Instrument", back_populates="market_data")
+    instrument = relationship("Instrument", back_populates="weekly_market_data")
+
+class InstrumentValidation(Base):
+    """
+    Latest data-integrity status per instrument. A quarantined instrument stays
+    halted until re-validation of its data finds no issues or it is released.
+    """
+    __tablename__ = "instrument_validations"
+
+    instrument_id = Column(Integer, ForeignKey("instruments.id"), primary_key=True)
+    quarantined = Column(Boolean, nullable=False, default=False)
+    issues = Column(JSON, nullable=False) # [date, issue names...] of the flagged bars
+    first_issue_date = Column(Date) # where re-validation of a quarantined instrument starts
+    validated_through = Column(Date, nullable=False) # latest daily bar checked
@@ -0,0 +1,353 @@
+import asyncio
+import random
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+# Connectors for the external market data providers (docs/specs.md, section 9.2).
+#
+# All requests go through one ProviderPool: an httpx.AsyncClient whose
+# keep-alive connection pool is shared by every provider, driven by an event
+# loop on a background thread. The threaded ingestion workers call
+# `fetch_bars` synchronously, so their requests overlap on that loop and reuse
+# warm connections instead of opening one per call. Each provider has its own
+# token bucket; failed requests are retried with exponential backoff, then the
+# next provider takes over. A request that is merely slow is hedged: after
+# `hedge_after` seconds in flight the next provider is asked too and the first
+# answer wins. The clock starts once the request has its token, so time spent
+# queued behind our own rate limit never spends the next provider's quota.
+
+Bar = Dict[str, Any]
+
+# HTTP statuses worth retrying: rate limited or a server-side failure
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """
+    A provider could not deliver bars for a symbol.
+    """
+
+
+class _RetryableError(ProviderError):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Asynchronous token bucket: `rate` tokens per second, bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class DataProvider:
+    """
+    One market data API: how to ask it for a symbol's daily bars and how to read
+    the answer. Subclasses implement `request` and `parse`.
+    """
+    name = "provider"
+
+    def __init__(self, base_url: str, api_key: str = "", requests_per_second: float = 1.0, burst: int = 1):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.bucket = TokenBucket(requests_per_second, burst)
+
+    def request(self, symbol: str, start_date: Optional[date]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Returns the (path, query parameters) of the request for `symbol`'s bars since `start_date`.
+        """
+        raise NotImplementedError
+
+    def parse(self, payload: Any) -> List[Bar]:
+        """
+        Converts a response body into bars with date, open, high, low, close and volume.
+        """
+        raise NotImplementedError
+
+
+class AlphaVantageProvider(DataProvider):
+    name = "alphavantage"
+
+    # The compact output holds the latest 100 sessions, about 140 calendar days
+    _COMPACT_DAYS = 140
+
+    def request(self, symbol: str, start_date: Optional[date]) -> Tuple[str, Dict[str, Any]]:
+        compact = start_date is not None and (date.today() - start_date).days < self._COMPACT_DAYS
+        return "/query", {
+            "function": "TIME_SERIES_DAILY", "symbol": symbol,
+            "outputsize": "compact" if compact else "full", "apikey": self.api_key,
+        }
+
+    def parse(self, payload: Any) -> List[Bar]:
+        # Errors and throttling come back as HTTP 200 with a message instead of data
+        if "Note" in payload or "Information" in payload:
+            raise _RetryableError(f"{self.name} throttled: {payload.get('Note') or payload.get('Information')}")
+        if "Error Message" in payload:
+            raise ProviderError(f"{self.name}: {payload['Error Message']}")
+        series = payload.get("Time Series (Daily)")
+        if series is None:
+            raise ProviderError(f"{self.name}: unexpected response format")
+        return [
+            {
+                "date": date.fromisoformat(day), "open": float(bar["1. open"]), "high": float(bar["2. high"]),
+                "low": float(bar["3. low"]), "close": float(bar["4. close"]), "volume": int(float(bar["5. volume"])),
+            }
+            for day, bar in series.items()
+        ]
+
+
+class PolygonProvider(DataProvider):
+    name = "polygon"
+
+    # Lower bound when the whole history is requested
+    _EARLIEST = date(1990, 1, 1)
+
+    def request(self, symbol: str, start_date: Optional[date]) -> Tuple[str, Dict[str, Any]]:
+        start = (start_date or self._EARLIEST).isoformat()
+        return f"/v2/aggs/ticker/{symbol}/range/1/day/{start}/{date.today().isoformat()}", {
+            "adjusted": "true", "sort": "asc", "limit": 50000, "apiKey": self.api_key,
+        }
+
+    def parse(self, payload: Any) -> List[Bar]:
+        if payload.get("status") not in ("OK", "DELAYED"):
+            raise ProviderError(f"{self.name}: {payload.get('error') or payload.get('status')}")
+        return [
+            {
+                "date": datetime.fromtimestamp(bar["t"] / 1000, tz=timezone.utc).date(), "open": float(bar["o"]),
+                "high": float(bar["h"]), "low": float(bar["l"]), "close": float(bar["c"]), "volume": int(bar["v"]),
+            }
+            for bar in payload.get("results") or []
+        ]
+
+
+class ProviderPool:
+    """
+    Fetches bars from a list of providers (in order of preference) over one
+    shared keep-alive connection pool.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[DataProvider],
+        max_connections: int = 20,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        hedge_after: Optional[float] = None,
+    ):
+        if not providers:
+            raise ValueError("At least one data provider is required")
+        self.providers = list(providers)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # --- Synchronous entry points, for the threaded ingestion workers ---
+
+    def fetch_bars(self, symbol: str, start_date: Optional[date] = None) -> List[Bar]:
+        """
+        Fetches `symbol`'s daily bars dated on or after `start_date`, blocking
+        until one provider answers. Raises ProviderError if none can.
+        """
+        return asyncio.run_coroutine_threadsafe(self.fetch(symbol, start_date), self._running_loop()).result()
+
+    def close(self):
+        """
+        Closes the pooled connections and stops the background loop.
+        """
+        with self._lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_client(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def _running_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="provider-pool", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _close_client(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --- Asynchronous API ---
+
+    async def fetch(self, symbol: str, start_date: Optional[date] = None) -> List[Bar]:
+        """
+        Asks the providers in turn, moving on when one fails, or in parallel
+        once the current one takes longer than `hedge_after`. Returns the first
+        successful answer, sorted by date.
+        """
+        tasks: Dict[asyncio.Task, DataProvider] = {}
+        errors: List[str] = []
+        launched = 0
+        hedge: Optional[asyncio.Task] = None # fires `hedge_after` seconds after the latest request was sent
+
+        def launch():
+            nonlocal launched, hedge
+            if launched < len(self.providers):
+                provider = self.providers[launched]
+                launched += 1
+                sent = asyncio.Event()
+                tasks[asyncio.ensure_future(self._fetch_from(provider, symbol, start_date, sent))] = provider
+                if hedge is not None:
+                    hedge.cancel()
+                hedge = None
+                if self.hedge_after is not None and launched < len(self.providers):
+                    hedge = asyncio.ensure_future(self._hedge_timer(sent))
+
+        launch()
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    [*tasks, *([hedge] if hedge is not None else [])], return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in [task for task in done if task in tasks]:
+                    provider = tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{provider.name}: {task.exception()}")
+                if not tasks or (hedge is not None and hedge.done()):
+                    launch()
+        finally:
+            for task in [*tasks, *([hedge] if hedge is not None else [])]:
+                task.cancel()
+        raise ProviderError(f"No provider could deliver {symbol}: {'; '.join(errors)}")
+
+    async def fetch_many(self, symbols: Sequence[str], start_dates: Optional[Dict[str, date]] = None) -> Dict[str, Any]:
+        """
+        Fetches many symbols concurrently. Returns {symbol: bars or the ProviderError raised}.
+        """
+        start_dates = start_dates or {}
+        results = await asyncio.gather(
+            *(self.fetch(symbol, start_dates.get(symbol)) for symbol in symbols), return_exceptions=True
+        )
+        return dict(zip(symbols, results))
+
+    async def _hedge_timer(self, sent: asyncio.Event):
+        await sent.wait()
+        await asyncio.sleep(self.hedge_after)
+
+    async def _fetch_from(
+        self, provider: DataProvider, symbol: str, start_date: Optional[date], sent: Optional[asyncio.Event] = None
+    ) -> List[Bar]:
+        path, params = provider.request(symbol, start_date)
+        for attempt in range(self.max_retries + 1):
+            await provider.bucket.acquire()
+            if sent is not None:
+                sent.set()
+            try:
+                response = await self._get_client().get(provider.base_url + path, params=params)
+                if response.status_code in _RETRY_STATUSES:
+                    retry_after = response.headers.get("Retry-After")
+                    raise _RetryableError(
+                        f"HTTP {response.status_code}", float(retry_after) if retry_after and retry_after.isdigit() else None
+                    )
+                if response.status_code >= 400:
+                    raise ProviderError(f"HTTP {response.status_code}")
+                bars = provider.parse(response.json())
+            except (httpx.TransportError, _RetryableError) as e:
+                if attempt == self.max_retries:
+                    raise ProviderError(f"gave up after {attempt + 1} attempts: {e}") from e
+                delay = getattr(e, "retry_after", None) or self.backoff * 2 ** attempt * (0.5 + random.random())
+                await asyncio.sleep(delay)
+                continue
+            except ValueError as e: # malformed JSON or fields
+                raise ProviderError(f"unreadable response: {e}") from e
+            bars = [bar for bar in bars if start_date is None or bar["date"] >= start_date]
+            return sorted(bars, key=lambda bar: bar["date"])
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created on the pool's loop, which is the only one that uses it
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+
+_pool: Optional[ProviderPool] = None
+_pool_lock = threading.Lock()
+
+
+def default_providers() -> List[DataProvider]:
+    """
+    The configured providers, primary first.
+    """
+    return [
+        AlphaVantageProvider(
+            settings.ALPHA_VANTAGE_URL, settings.API_KEY_FINANCIAL_DATA, settings.ALPHA_VANTAGE_REQUESTS_PER_SECOND
+        ),
+        PolygonProvider(settings.POLYGON_URL, settings.POLYGON_API_KEY, settings.POLYGON_REQUESTS_PER_SECOND),
+    ]
+
+
+def get_provider_pool() -> ProviderPool:
+    """
+    Returns the shared provider pool, created on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProviderPool(
+                    default_providers(),
+                    max_connections=settings.PROVIDER_MAX_CONNECTIONS,
+                    timeout=settings.PROVIDER_TIMEOUT_SECONDS,
+                    max_retries=settings.PROVIDER_MAX_RETRIES,
+                    backoff=settings.PROVIDER_BACKOFF_SECONDS,
+                    hedge_after=settings.PROVIDER_HEDGE_AFTER_SECONDS,
+                )
+    return _pool
+
+
+def set_provider_pool(pool: Optional[ProviderPool]):
+    """
+    Replaces the shared pool (e.g. with one pointing at other providers), closing the old one.
+    """
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, pool
+    if old is not None and old is not pool:
+        old.close()
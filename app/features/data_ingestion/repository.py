@@ -1,8 +1,26 @@
+import csv
+import io
+import functools
+import numpy as np
+from sqlalchemy import Date, Float, bindparam, case, cast, func, literal, select, tuple_
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import date
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from datetime import date, datetime, timezone
 
 from . import models, schemas
+from .columnar import BarArrays
+
+# Rows per COPY / INSERT batch. Keeps the staging buffer (and, for the
+# fallback path, the bound parameter count) bounded on large backfills.
+UPSERT_BATCH_SIZE = 50_000
+_INSERT_BATCH_SIZE = 1_000
+
+_MARKET_DATA_COLUMNS = ("instrument_id", "date", "open", "high", "low", "close", "volume")
+_MARKET_DATA_STAGING_TABLE = "market_data_staging"
+
+# Keyset pagination key of market data: (instrument_id, date)
+BarKey = Tuple[int, date]
 
 # --- Instrument Repository ---
 
@@ -28,6 +46,22 @@ def get_instruments(db: Session, skip: int = 0, limit: int = 100) -> List[models
     """
     return db.query(models.Instrument).offset(skip).limit(limit).all()
 
+def get_instruments_page(db: Session, after_id: Optional[int] = None, limit: int = 100) -> List[models.Instrument]:
+    """
+    Retrieves up to `limit` instruments with ids greater than `after_id` (keyset pagination).
+    """
+    query = db.query(models.Instrument)
+    if after_id is not None:
+        query = query.filter(models.Instrument.id > after_id)
+    return query.order_by(models.Instrument.id).limit(limit).all()
+
+def get_instruments_marker(db: Session) -> Tuple[int, Optional[int]]:
+    """
+    Returns (count, max id) of the instruments table, which changes whenever an instrument is added.
+    """
+    count, max_id = db.query(func.count(models.Instrument.id), func.max(models.Instrument.id)).one()
+    return count, max_id
+
 
 # --- Market Data Repository ---
 
@@ -37,11 +71,191 @@ def bulk_create_market_data(db: Session, market_data_list: List[schemas.MarketDa
     """
     db_market_data_list = [models.MarketData(**md.model_dump()) for md in market_data_list]
     db.add_all(db_market_data_list)
+    _bump_market_data_revisions(db, ((md.instrument_id, md.date) for md in market_data_list))
     db.commit()
     # The objects in db_market_data_list will have their IDs populated after the commit.
     return db_market_data_list
 
 
+def bulk_upsert_market_data(db: Session, market_data_list: List[schemas.MarketDataCreate]) -> int:
+    """
+    Idempotently writes market data, inserting new (instrument_id, date) bars and
+    overwriting existing ones. Returns the number of distinct bars written.
+
+    On PostgreSQL with psycopg2 the rows are streamed with COPY into a temporary
+    staging table and merged with a single INSERT ... ON CONFLICT per batch.
+    Other backends (e.g. SQLite in tests) use a multi-row INSERT ... ON CONFLICT.
+    """
+    return _upsert_market_data_rows(db, _dedupe_market_data(market_data_list))
+
+
+def upsert_bar_arrays(db: Session, bars: BarArrays) -> int:
+    """
+    Same as `bulk_upsert_market_data`, for bars that are already columnar.
+    """
+    # Rows are sorted by (instrument_id, date); keep the last of any duplicates
+    last = np.ones(len(bars), dtype=bool)
+    last[:-1] = (bars.instrument_ids[1:] != bars.instrument_ids[:-1]) | (bars.dates[1:] != bars.dates[:-1])
+    bars = bars.take(last)
+    return _upsert_market_data_rows(db, list(zip(
+        bars.instrument_ids.tolist(), bars.dates.astype(object), bars.open.tolist(), bars.high.tolist(),
+        bars.low.tolist(), bars.close.tolist(), bars.volume.tolist(),
+    )))
+
+
+def _upsert_market_data_rows(db: Session, rows: List[Tuple]) -> int:
+    if not rows:
+        return 0
+
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        _copy_upsert_market_data(db, rows)
+    else:
+        _insert_upsert_market_data(db, rows)
+    _bump_market_data_revisions(db, (row[:2] for row in rows))
+    db.commit()
+    return len(rows)
+
+
+def _bump_market_data_revisions(db: Session, keys: Iterable[Tuple[int, date]]) -> None:
+    """
+    Advances the write counters of the instruments of the written (instrument_id,
+    date) keys, within the caller's transaction.
+    """
+    spans: Dict[int, Tuple[date, date]] = {}
+    for instrument_id, day in keys:
+        first, last = spans.get(instrument_id, (day, day))
+        spans[instrument_id] = (min(first, day), max(last, day))
+    if not spans:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    db.execute(_revision_upsert(db.get_bind().dialect.name), [
+        {"instrument_id": instrument_id, "revision": 1, "rewritten_revision": 1, "latest_date": last,
+         "first_date": first, "updated_at": now}
+        for instrument_id, (first, last) in sorted(spans.items())
+    ])
+
+
+@functools.lru_cache(maxsize=None)
+def _revision_upsert(dialect_name: str):
+    # Runs on every market data write: built once per dialect, against the
+    # table rather than the mapped class, so neither the statement nor the ORM
+    # bulk-insert machinery is set up per call
+    table = models.MarketDataRevision.__table__
+    stmt = (postgresql.insert if dialect_name == "postgresql" else sqlite.insert)(table)
+    revision = table.c.revision + 1
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.instrument_id],
+        set_={
+            "revision": revision,
+            # A write starting on or before the latest bar replaces or backfills history
+            "rewritten_revision": case(
+                (bindparam("first_date", type_=Date) <= table.c.latest_date, revision), else_=table.c.rewritten_revision
+            ),
+            "latest_date": case(
+                (stmt.excluded.latest_date > table.c.latest_date, stmt.excluded.latest_date), else_=table.c.latest_date
+            ),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def get_market_data_revisions(
+    db: Session, instrument_ids: Optional[Sequence[int]] = None
+) -> Dict[int, Tuple[int, int]]:
+    """
+    Returns (revision, rewritten revision) per instrument with recorded writes.
+    """
+    rev = models.MarketDataRevision
+    query = db.query(rev.instrument_id, rev.revision, rev.rewritten_revision)
+    if instrument_ids is not None:
+        query = query.filter(rev.instrument_id.in_(list(instrument_ids)))
+    return {instrument_id: (revision, rewritten) for instrument_id, revision, rewritten in query}
+
+
+def get_market_data_marker(
+    db: Session, instrument_ids: Optional[Sequence[int]] = None
+) -> Tuple[Tuple[int, int], Optional[datetime]]:
+    """
+    Returns ((count, sum of write counters), time of the latest write) over the
+    instruments' (default: all) market data revisions. The pair changes with
+    every write to their bars, historical rewrites included, and reads one
+    small row per instrument rather than market_data itself.
+    """
+    rev = models.MarketDataRevision
+    query = db.query(func.count(rev.instrument_id), func.coalesce(func.sum(rev.revision), 0), func.max(rev.updated_at))
+    if instrument_ids is not None:
+        query = query.filter(rev.instrument_id.in_(list(instrument_ids)))
+    count, total, updated_at = query.one()
+    return (count, int(total)), updated_at
+
+
+def _dedupe_market_data(market_data_list: List[schemas.MarketDataCreate]) -> List[Tuple]:
+    """
+    Collapses duplicate (instrument_id, date) rows, keeping the last occurrence.
+    ON CONFLICT cannot touch the same target row twice within one statement.
+    """
+    latest: Dict[Tuple[int, date], Tuple] = {}
+    for md in market_data_list:
+        latest[(md.instrument_id, md.date)] = (
+            md.instrument_id, md.date, md.open, md.high, md.low, md.close, md.volume
+        )
+    return list(latest.values())
+
+
+def _copy_upsert_market_data(db: Session, rows: List[Tuple]) -> None:
+    """
+    COPY rows into a session-local staging table, then merge into market_data.
+    """
+    columns = ", ".join(_MARKET_DATA_COLUMNS)
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in _MARKET_DATA_COLUMNS[2:])
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {_MARKET_DATA_STAGING_TABLE} ("
+            "instrument_id integer, date date, open double precision, high double precision, "
+            "low double precision, close double precision, volume bigint"
+            ") ON COMMIT DELETE ROWS"
+        )
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows[start:start + UPSERT_BATCH_SIZE])
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {_MARKET_DATA_STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            cursor.execute(
+                f"INSERT INTO market_data ({columns}) "
+                f"SELECT {columns} FROM {_MARKET_DATA_STAGING_TABLE} "
+                f"ON CONFLICT (instrument_id, date) DO UPDATE SET {updates}"
+            )
+            cursor.execute(f"TRUNCATE {_MARKET_DATA_STAGING_TABLE}")
+    finally:
+        cursor.close()
+
+
+def _insert_upsert_market_data(db: Session, rows: List[Tuple]) -> None:
+    """
+    Portable upsert using the dialect's INSERT ... ON CONFLICT construct.
+    """
+    _insert_upsert(db, models.MarketData, _MARKET_DATA_COLUMNS, rows, ["instrument_id", "date"])
+
+
+def _insert_upsert(db: Session, model, columns: Sequence[str], rows: List[Tuple], key_columns: List[str]) -> None:
+    """
+    Batched multi-row INSERT ... ON CONFLICT (key_columns) DO UPDATE for any model.
+    """
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    for start in range(0, len(rows), _INSERT_BATCH_SIZE):
+        values = [dict(zip(columns, row)) for row in rows[start:start + _INSERT_BATCH_SIZE]]
+        stmt = dialect_insert(model).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={col: stmt.excluded[col] for col in columns if col not in key_columns},
+        )
+        db.execute(stmt)
+
+
 def get_market_data_for_instrument(
     db: Session, instrument_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None
 ) -> List[models.MarketData]:
@@ -54,3 +268,262 @@ def get_market_data_for_instrument(
     if end_date:
         query = query.filter(models.MarketData.date <= end_date)
     return query.order_by(models.MarketData.date.asc()).all()
+
+
+def get_latest_market_data_dates(db: Session, instrument_ids: Optional[List[int]] = None) -> Dict[int, date]:
+    """
+    Returns the latest stored bar date per instrument (its ingestion high-water mark)
+    in a single grouped query. Instruments without data are absent from the result.
+    """
+    query = db.query(models.MarketData.instrument_id, func.max(models.MarketData.date))
+    if instrument_ids is not None:
+        query = query.filter(models.MarketData.instrument_id.in_(instrument_ids))
+    return dict(query.group_by(models.MarketData.instrument_id).all())
+
+
+def get_trading_dates(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> np.ndarray:
+    """
+    Returns the distinct dates any instrument has a daily bar on (datetime64[D],
+    ascending): the sessions the market was open, as seen by the whole universe.
+    """
+    query = db.query(models.MarketData.date).distinct()
+    if start_date is not None:
+        query = query.filter(models.MarketData.date >= start_date)
+    if end_date is not None:
+        query = query.filter(models.MarketData.date <= end_date)
+    return np.sort(np.array([day for (day,) in query.all()], dtype="datetime64[D]"))
+
+
+def get_latest_weekly_dates(
+    db: Session, instrument_ids: Optional[List[int]] = None, completed_only: bool = True
+) -> Dict[int, date]:
+    """
+    Returns the latest weekly bar date per instrument in a single grouped query.
+    """
+    wmd = models.WeeklyMarketData
+    query = db.query(wmd.instrument_id, func.max(wmd.week_end))
+    if instrument_ids is not None:
+        query = query.filter(wmd.instrument_id.in_(instrument_ids))
+    if completed_only:
+        query = query.filter(wmd.is_complete.is_(True))
+    return dict(query.group_by(wmd.instrument_id).all())
+
+
+def load_bar_arrays(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> BarArrays:
+    """
+    Loads bars for a set of instruments and a date range in a single query and
+    returns them as columnar NumPy arrays, without building ORM objects.
+    On PostgreSQL/psycopg2 the result is streamed with COPY ... TO STDOUT and
+    parsed by NumPy directly.
+    """
+    md = models.MarketData
+    return _load_bar_arrays(db, md, md.date, instrument_ids, start_date, end_date)
+
+
+def find_bar_page_end(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    after: Optional[BarKey] = None,
+    limit: int = 10_000,
+) -> Tuple[Optional[BarKey], bool]:
+    """
+    Locates the last bar of the page of `limit` bars after the `after` key.
+    Returns (last key of the page or None if the page is empty, whether more bars follow).
+    Only reads the (instrument_id, date) index, so it is cheap next to streaming the page.
+    """
+    md = models.MarketData
+    query = select(md.instrument_id, md.date).where(*_bar_filters(instrument_ids, start_date, end_date, after))
+    rows = db.execute(query.order_by(md.instrument_id, md.date).offset(limit - 1).limit(2)).all()
+    if rows:
+        return tuple(rows[0]), len(rows) > 1
+    # Fewer than `limit` bars remain: the page ends at the last one
+    last = db.execute(query.order_by(md.instrument_id.desc(), md.date.desc()).limit(1)).first()
+    return (tuple(last) if last else None), False
+
+
+def iter_bar_batches(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    after: Optional[BarKey] = None,
+    until: Optional[BarKey] = None,
+    batch_size: int = 5_000,
+) -> Iterator[BarArrays]:
+    """
+    Yields the bars with keys in (after, until] as columnar batches of at most
+    `batch_size` rows, each fetched with its own keyset query so memory stays
+    bounded by one batch.
+    """
+    md = models.MarketData
+    while True:
+        conditions = _bar_filters(None, None, None, after)
+        if until is not None:
+            conditions.append(tuple_(md.instrument_id, md.date) <= tuple_(*until))
+        batch = _load_bar_arrays(db, md, md.date, instrument_ids, start_date, end_date, *conditions, limit=batch_size)
+        if len(batch):
+            yield batch
+        if len(batch) < batch_size:
+            return
+        after = (int(batch.instrument_ids[-1]), batch.dates[-1].astype(object))
+
+
+def _bar_filters(instrument_ids, start_date, end_date, after) -> list:
+    md = models.MarketData
+    conditions = []
+    if instrument_ids is not None:
+        conditions.append(md.instrument_id.in_(list(instrument_ids)))
+    if start_date:
+        conditions.append(md.date >= start_date)
+    if end_date:
+        conditions.append(md.date <= end_date)
+    if after is not None:
+        conditions.append(tuple_(md.instrument_id, md.date) > tuple_(*after))
+    return conditions
+
+
+def _load_bar_arrays(
+    db: Session, model, date_column, instrument_ids, start_date, end_date, *conditions, limit: Optional[int] = None
+) -> BarArrays:
+    query = select(
+        model.instrument_id, date_column, model.open, model.high, model.low, model.close,
+        func.coalesce(model.volume, 0),
+    ).order_by(model.instrument_id, date_column)
+    if instrument_ids is not None:
+        query = query.where(model.instrument_id.in_(list(instrument_ids)))
+    if start_date:
+        query = query.where(date_column >= start_date)
+    if end_date:
+        query = query.where(date_column <= end_date)
+    for condition in conditions:
+        query = query.where(condition)
+    if limit is not None:
+        query = query.limit(limit)
+
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        return _copy_load_bar_arrays(db, query, model, date_column)
+
+    rows = db.execute(query).all()
+    if not rows:
+        return BarArrays.empty()
+    return BarArrays.from_columns(*zip(*rows))
+
+
+def _copy_load_bar_arrays(db: Session, query, model, date_column) -> BarArrays:
+    """
+    COPY the query result out as CSV (dates as epoch days, NULL prices as NaN)
+    and parse it with NumPy in one call.
+    """
+    nan = cast(literal("NaN"), Float)
+    query = query.with_only_columns(
+        model.instrument_id,
+        date_column - literal(date(1970, 1, 1), Date),
+        func.coalesce(model.open, nan), func.coalesce(model.high, nan),
+        func.coalesce(model.low, nan), func.coalesce(model.close, nan),
+        func.coalesce(model.volume, 0),
+    )
+    compiled = query.compile(dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True})
+    cursor = db.connection().connection.cursor()
+    try:
+        sql = cursor.mogrify(str(compiled), compiled.params).decode()
+        buffer = io.StringIO()
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+    buffer.seek(0)
+    if not buffer.getvalue():
+        return BarArrays.empty()
+    table = np.loadtxt(buffer, delimiter=",", ndmin=2)
+    return BarArrays(
+        instrument_ids=table[:, 0].astype(np.int64),
+        dates=table[:, 1].astype(np.int64).astype("datetime64[D]"),
+        open=table[:, 2], high=table[:, 3], low=table[:, 4], close=table[:, 5],
+        volume=table[:, 6].astype(np.int64),
+    )
+
+
+# --- Weekly Market Data Repository ---
+
+_WEEKLY_COLUMNS = ("instrument_id", "week_end", "open", "high", "low", "close", "volume", "last_date", "is_complete")
+
+
+def upsert_weekly_market_data(db: Session, weekly: BarArrays, last_dates: np.ndarray, complete: np.ndarray) -> int:
+    """
+    Inserts or replaces weekly bars keyed by (instrument_id, week_end).
+    Returns the number of weekly bars written.
+    """
+    rows = list(zip(
+        weekly.instrument_ids.tolist(), weekly.dates.astype(object), weekly.open.tolist(), weekly.high.tolist(),
+        weekly.low.tolist(), weekly.close.tolist(), weekly.volume.tolist(), last_dates.astype(object),
+        complete.tolist(),
+    ))
+    if rows:
+        _insert_upsert(db, models.WeeklyMarketData, _WEEKLY_COLUMNS, rows, ["instrument_id", "week_end"])
+        db.commit()
+    return len(rows)
+
+
+def load_weekly_bar_arrays(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    completed_only: bool = False,
+) -> BarArrays:
+    """
+    Loads weekly bars (dated by week end) as columnar arrays. With `completed_only`
+    the current, still-changing week is left out.
+    """
+    wmd = models.WeeklyMarketData
+    conditions = [wmd.is_complete.is_(True)] if completed_only else []
+    return _load_bar_arrays(db, wmd, wmd.week_end, instrument_ids, start_date, end_date, *conditions)
+
+
+# --- Validation Status Repository ---
+
+_VALIDATION_COLUMNS = ("instrument_id", "quarantined", "issues", "first_issue_date", "validated_through")
+
+
+def get_validation_statuses(
+    db: Session, instrument_ids: Optional[Sequence[int]] = None
+) -> Dict[int, models.InstrumentValidation]:
+    """
+    Returns the stored integrity status per instrument.
+    """
+    query = db.query(models.InstrumentValidation)
+    if instrument_ids is not None:
+        query = query.filter(models.InstrumentValidation.instrument_id.in_(list(instrument_ids)))
+    return {status.instrument_id: status for status in query.all()}
+
+
+def save_validation_statuses(db: Session, statuses: List[schemas.InstrumentValidation]) -> int:
+    """
+    Inserts or replaces the integrity status of each instrument in one batch.
+    """
+    rows = [
+        (s.instrument_id, s.quarantined, s.issues, s.first_issue_date, s.validated_through) for s in statuses
+    ]
+    if rows:
+        _insert_upsert(db, models.InstrumentValidation, _VALIDATION_COLUMNS, rows, ["instrument_id"])
+        db.commit()
+    return len(rows)
+
+
+def get_quarantined_instrument_ids(db: Session, instrument_ids: Optional[Sequence[int]] = None) -> List[int]:
+    """
+    Returns the ids of the instruments currently halted by data validation.
+    """
+    iv = models.InstrumentValidation
+    query = db.query(iv.instrument_id).filter(iv.quarantined.is_(True))
+    if instrument_ids is not None:
+        query = query.filter(iv.instrument_id.in_(list(instrument_ids)))
+    return sorted(instrument_id for (instrument_id,) in query.all())
@@ -0,0 +1,64 @@
+from typing import Tuple
+
+import numpy as np
+
+from .columnar import BarArrays
+
+# numpy's datetime64 epoch (1970-01-01) fell on a Thursday
+_EPOCH_WEEKDAY = 3
+
+FRIDAY = 4
+
+
+def week_ending(dates: np.ndarray, week_end_weekday: int = FRIDAY) -> np.ndarray:
+    """
+    Maps each date to the end of its week, where weeks end on `week_end_weekday`
+    (Monday=0 ... Sunday=6).
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    weekday = (days.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+    return days + ((week_end_weekday - weekday) % 7).astype("timedelta64[D]")
+
+
+def week_starting(dates: np.ndarray, week_end_weekday: int = FRIDAY) -> np.ndarray:
+    """
+    Maps each date to the first day of its week.
+    """
+    return week_ending(dates, week_end_weekday) - np.timedelta64(6, "D")
+
+
+def resample_weekly(bars: BarArrays, week_end_weekday: int = FRIDAY) -> Tuple[BarArrays, np.ndarray, np.ndarray]:
+    """
+    Aggregates daily bars into weekly bars: first open, max high, min low,
+    last close and summed volume per (instrument, week). Dates of the result are
+    the week-end dates.
+    Returns (weekly_bars, last_dates, complete) where `last_dates` is the last
+    daily bar in each week, and `complete` marks weeks that can no longer change:
+    the week-end day itself is present, or a later week exists for the instrument.
+    """
+    if len(bars) == 0:
+        empty = np.empty(0, dtype=bool)
+        return BarArrays.empty(), np.empty(0, dtype="datetime64[D]"), empty
+
+    week_ends = week_ending(bars.dates, week_end_weekday)
+    new_group = np.empty(len(bars), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = (bars.instrument_ids[1:] != bars.instrument_ids[:-1]) | (week_ends[1:] != week_ends[:-1])
+    starts = np.flatnonzero(new_group)
+    ends = np.append(starts[1:], len(bars)) - 1
+
+    weekly = BarArrays(
+        instrument_ids=bars.instrument_ids[starts],
+        dates=week_ends[starts],
+        open=bars.open[starts],
+        high=np.fmax.reduceat(bars.high, starts),
+        low=np.fmin.reduceat(bars.low, starts),
+        close=bars.close[ends],
+        volume=np.add.reduceat(bars.volume, starts),
+    )
+    last_dates = bars.dates[ends]
+
+    has_later_week = np.zeros(len(starts), dtype=bool)
+    has_later_week[:-1] = weekly.instrument_ids[1:] == weekly.instrument_ids[:-1]
+    complete = (last_dates == weekly.dates) | has_later_week
+    return weekly, last_dates, complete
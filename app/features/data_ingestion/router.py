@@ -0,0 +1,128 @@
+import numpy as np
+from datetime import date
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import repository, schemas
+from app.core import conditional, streaming
+from app.core.database import get_db, get_session_factory
+from app.core.responses import STREAM_BATCH_SIZE, parse_cursor, streaming_response
+
+router = APIRouter()
+
+
+@router.get("/instruments/", response_model=List[schemas.Instrument])
+def list_instruments(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1_000),
+    db: Session = Depends(get_db),
+):
+    """
+    Lists instruments ordered by id, read through the cache. The cursor for the
+    next page, if any, is returned in the X-Next-Cursor header.
+    """
+    from . import cache # deferred: the cache pulls in the Redis client, which the app imports lazily
+
+    after_id = parse_cursor(cursor, (int,))[0] if cursor else None
+    etag = conditional.make_etag("instruments", after_id, limit, repository.get_instruments_marker(db))
+    if conditional.is_not_modified(request.headers, etag):
+        return Response(status_code=304, headers=conditional.validator_headers(etag))
+
+    instruments = cache.get_instruments_page(db, after_id=after_id, limit=limit + 1)
+    response.headers.update(conditional.validator_headers(etag))
+    if len(instruments) > limit:
+        instruments = instruments[:limit]
+        response.headers["X-Next-Cursor"] = streaming.encode_cursor([instruments[-1].id])
+    return instruments
+
+
+@router.get("/market-data/")
+def stream_market_data(
+    request: Request,
+    instrument_id: Optional[List[int]] = Query(None),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100_000, ge=1, le=1_000_000),
+    format: str = Query("ndjson", pattern="^(ndjson|columnar)$"),
+    db: Session = Depends(get_db),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+):
+    """
+    Streams daily bars ordered by (instrument_id, date), up to `limit` rows per
+    page, as NDJSON or columnar frames (see app.core.streaming). The cursor for
+    the next page, if any, is returned in the X-Next-Cursor header. The ETag
+    and Last-Modified headers follow the write counters of the requested
+    instruments, which every write to their bars advances, so an unchanged
+    history is answered with 304. A single instrument's window, which the
+    dashboard requests over and over, is read through the cache.
+    """
+    after = parse_cursor(cursor, (int, date)) if cursor else None
+    marker, last_modified = repository.get_market_data_marker(db, instrument_id)
+    etag = conditional.make_etag(
+        "market-data", sorted(instrument_id or []), start_date, end_date, after, limit, format, marker
+    )
+    headers = conditional.validator_headers(etag, last_modified)
+    if conditional.is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    if instrument_id is not None and len(set(instrument_id)) == 1:
+        return _stream_cached_bars(db, session_factory, instrument_id[0], start_date, end_date, after, limit, format, headers)
+
+    until, has_more = repository.find_bar_page_end(db, instrument_id, start_date, end_date, after, limit)
+    if has_more:
+        headers["X-Next-Cursor"] = streaming.encode_cursor(until)
+
+    def batches(session: Session) -> Iterator[dict]:
+        if until is None:
+            return
+        for bars in repository.iter_bar_batches(
+            session, instrument_id, start_date, end_date, after, until, STREAM_BATCH_SIZE
+        ):
+            yield {
+                "instrument_id": bars.instrument_ids, "date": bars.dates, "open": bars.open,
+                "high": bars.high, "low": bars.low, "close": bars.close, "volume": bars.volume,
+            }
+
+    return streaming_response(session_factory, batches, format, headers)
+
+
+def _stream_cached_bars(
+    db: Session,
+    session_factory: Callable[[], Session],
+    instrument_id: int,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    after: Optional[Tuple[int, date]],
+    limit: int,
+    format: str,
+    headers: Dict[str, str],
+):
+    """
+    One page of an instrument's bars, sliced from its cached window.
+    """
+    from . import cache
+
+    bars = cache.get_market_data_for_instrument(db, instrument_id, start_date, end_date)
+    if after is not None:
+        bars = [bar for bar in bars if (bar.instrument_id, bar.date) > tuple(after)]
+    if len(bars) > limit:
+        bars = bars[:limit]
+        headers["X-Next-Cursor"] = streaming.encode_cursor([instrument_id, bars[-1].date])
+
+    def batches(session: Session) -> Iterator[Dict[str, Any]]:
+        for start in range(0, len(bars), STREAM_BATCH_SIZE):
+            chunk = bars[start:start + STREAM_BATCH_SIZE]
+            yield {
+                "instrument_id": np.array([bar.instrument_id for bar in chunk], dtype=np.int64),
+                "date": np.array([bar.date for bar in chunk], dtype="datetime64[D]"),
+                **{
+                    column: np.array([getattr(bar, column) for bar in chunk], dtype=np.float64)
+                    for column in ("open", "high", "low", "close")
+                },
+                "volume": np.array([bar.volume for bar in chunk], dtype=np.int64),
+            }
+
+    return streaming_response(session_factory, batches, format, headers)
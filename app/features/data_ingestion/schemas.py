@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
+from typing import List, Optional
 
 # Pydantic schema for Instrument
 class InstrumentBase(BaseModel):
@@ -34,3 +35,29 @@ class MarketData(MarketDataBase):
 
     class Config:
         from_attributes = True
+
+# Outcome of ingesting a single symbol in a batch run
+class IngestionResult(BaseModel):
+    symbol: str
+    succeeded: bool
+    elapsed_seconds: float
+    error: Optional[str] = None
+
+# Thresholds of the data-integrity checks (docs/specs.md, section 9.2)
+class ValidationParameters(BaseModel):
+    max_missing_sessions: int = 1 # tolerates a single exchange holiday the rest of the universe traded through
+    holidays: List[date] = [] # non-trading days on top of weekends and universe-wide closures
+    outlier_window: int = 60 # trailing daily returns the median and MAD are taken over
+    outlier_threshold: float = 10.0 # in scaled MADs (about standard deviations); genuine moves that trip it are released by hand
+    max_stale_repeats: int = 5 # consecutive sessions a close may repeat
+
+# Integrity status of one instrument; quarantined instruments get no signals
+class InstrumentValidation(BaseModel):
+    instrument_id: int
+    quarantined: bool
+    issues: List[List[str]] # [date, issue names...] of the flagged bars, oldest first
+    first_issue_date: Optional[date] = None
+    validated_through: date
+
+    class Config:
+        from_attributes = True
@@ -1,60 +1,286 @@
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 
-from . import repository, schemas
+import numpy as np
+
+from . import cache, providers, repository, resampling, schemas, validation
+from .columnar import BarArrays
+from app.core import metrics
 from app.core.config import settings
+from app.core.logging import get_logger
+
+# Upper bound on symbols ingested at once. Each worker holds one pooled
+# connection, so keep this within the engine's pool_size + max_overflow.
+DEFAULT_INGESTION_WORKERS = 8
+
+logger = get_logger(__name__)
+
+def fetch_data_from_source(symbol: str, start_date: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Fetches daily bars from the external data providers through the shared
+    connection pool, failing over to the secondary provider if the primary
+    cannot deliver. Only bars dated on or after `start_date` are requested when
+    it is given.
+    """
+    logger.debug("fetch_requested", symbol=symbol, start_date=str(start_date or "inception"))
+    return providers.get_provider_pool().fetch_bars(symbol, start_date)
 
-def fetch_data_from_source(symbol: str) -> List[Dict[str, Any]]:
+def latest_expected_bar_date(as_of: date) -> date:
     """
-    Placeholder function to fetch data from an external API.
-    In a real scenario, this would connect to a financial data provider.
+    Returns the most recent weekday on or before `as_of`, i.e. the newest bar
+    a daily provider can have published.
     """
-    # This is a mock implementation.
-    # Replace with a real API call, e.g., to Alpha Vantage, Polygon.io, etc.
-    print(f"Fetching data for {symbol} from external source...")
-    # Returning dummy data for now
-    return [
-        {'date': date.today() - timedelta(days=1), 'open': 100, 'high': 110, 'low': 99, 'close': 105, 'volume': 10000},
-        {'date': date.today(), 'open': 105, 'high': 115, 'low': 103, 'close': 110, 'volume': 12000},
-    ]
+    while as_of.weekday() >= 5:
+        as_of -= timedelta(days=1)
+    return as_of
 
-def ingest_data_for_symbol(db: Session, symbol: str):
+def ingest_data_for_symbol(
+    db: Session, symbol: str, latest_dates: Optional[Dict[int, date]] = None, as_of: Optional[date] = None
+) -> List[schemas.MarketDataCreate]:
     """
     Orchestrates the data ingestion process for a given symbol.
-    1. Fetches new data from the external source.
-    2. Checks if the instrument exists, creates it if not.
-    3. Saves the new market data to the database.
+    1. Looks up the instrument and its high-water mark (latest stored bar date).
+       Batch callers pass `latest_dates` from one grouped query instead.
+    2. Skips the symbol if it is already current; otherwise fetches only bars
+       after the high-water mark from the external source.
+    3. Creates the instrument if it does not exist yet.
+    4. Upserts the market data, so re-running for the same dates is a no-op,
+       and invalidates the instrument's cached reads.
+    Returns the bars that were written (empty when there was nothing new), so
+    downstream stages can advance by exactly those bars.
+    Each step is timed as a stage of the "ingest.daily_bars" span.
     """
-    # 1. Fetch new data
-    try:
-        market_data_raw = fetch_data_from_source(symbol)
+    with metrics.span("ingest.daily_bars", symbol=symbol) as symbol_span:
+        # 1. Check for instrument and how far its history goes
+        with metrics.span("ingest.lookup"):
+            instrument = repository.get_instrument_by_symbol(db, symbol=symbol)
+            last_date = None
+            if instrument:
+                if latest_dates is None:
+                    latest_dates = repository.get_latest_market_data_dates(db, instrument_ids=[instrument.id])
+                last_date = latest_dates.get(instrument.id)
+        if last_date is not None and last_date >= latest_expected_bar_date(as_of or date.today()):
+            logger.info("ingest_skipped", symbol=symbol, reason="current", last_date=str(last_date))
+            symbol_span.set(rows=0)
+            return []
+
+        # 2. Fetch new data
+        start_date = last_date + timedelta(days=1) if last_date else None
+        try:
+            with metrics.span("ingest.fetch") as fetch_span:
+                market_data_raw = fetch_data_from_source(symbol, start_date=start_date)
+                fetch_span.set(bars=len(market_data_raw))
+        except Exception as e:
+            logger.error("ingest_fetch_failed", symbol=symbol, error=str(e))
+            raise e
+        # Providers may ignore the lower bound; never rewrite bars we already hold.
+        if last_date is not None:
+            market_data_raw = [data for data in market_data_raw if data['date'] > last_date]
         if not market_data_raw:
-            print(f"No new data found for {symbol}.")
-            return
-    except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
-        raise e
-
-    # 2. Check for instrument
-    instrument = repository.get_instrument_by_symbol(db, symbol=symbol)
-    if not instrument:
-        print(f"Instrument {symbol} not found, creating new one.")
-        instrument_create = schemas.InstrumentCreate(
-            symbol=symbol,
-            name=f"{symbol} Name", # Placeholder name
-            asset_class="Unknown" # Placeholder asset class
+            logger.info("ingest_skipped", symbol=symbol, reason="no new data")
+            symbol_span.set(rows=0)
+            return []
+
+        # 3. Create the instrument if needed
+        if not instrument:
+            with metrics.span("ingest.create_instrument"):
+                instrument_create = schemas.InstrumentCreate(
+                    symbol=symbol,
+                    name=f"{symbol} Name", # Placeholder name
+                    asset_class="Unknown" # Placeholder asset class
+                )
+                instrument = repository.create_instrument(db, instrument=instrument_create)
+                cache.invalidate_instruments_list()
+            logger.info("instrument_created", symbol=symbol, instrument_id=instrument.id)
+
+        # 4. Prepare and save market data
+        with metrics.span("ingest.write", rows=len(market_data_raw)):
+            market_data_to_create = [
+                schemas.MarketDataCreate(
+                    instrument_id=instrument.id,
+                    **data
+                ) for data in market_data_raw
+            ]
+            repository.bulk_upsert_market_data(db, market_data_list=market_data_to_create)
+            # After the commit, so no reader can cache the old bars under the new version
+            cache.invalidate_instrument(instrument.id)
+        metrics.ROWS_WRITTEN.inc(len(market_data_to_create), symbol=symbol)
+        symbol_span.set(rows=len(market_data_to_create))
+        return market_data_to_create
+
+
+@metrics.timed("ingest.resample")
+def refresh_weekly_bars(
+    db: Session, since_by_instrument: Dict[int, date], week_end_weekday: Optional[int] = None
+) -> BarArrays:
+    """
+    Recomputes the weekly bars touched by daily bars dated on or after each
+    instrument's `since` date, in one read and one write for all instruments.
+    The week before is recomputed too, so a week whose closing day was a holiday
+    is marked complete once the next week's data arrives.
+    Returns the completed weekly bars among those recomputed.
+    """
+    if not since_by_instrument:
+        return BarArrays.empty()
+    weekday = settings.WEEK_END_WEEKDAY if week_end_weekday is None else week_end_weekday
+    ids = np.array(sorted(since_by_instrument), dtype=np.int64)
+    starts = resampling.week_starting(
+        np.array([since_by_instrument[i] for i in ids], dtype="datetime64[D]"), weekday
+    ) - np.timedelta64(7, "D")
+
+    daily = repository.load_bar_arrays(db, ids.tolist(), start_date=starts.min().astype(object))
+    # Each instrument has its own window start; drop rows before it
+    daily = daily.take(daily.dates >= starts[np.searchsorted(ids, daily.instrument_ids)])
+    weekly, last_dates, complete = resampling.resample_weekly(daily, weekday)
+    repository.upsert_weekly_market_data(db, weekly, last_dates, complete)
+    # Weekly reads (charts) were cached against the daily write's version
+    cache.invalidate_instruments(np.unique(weekly.instrument_ids).tolist())
+    return weekly.take(complete)
+
+
+# Issues listed per instrument in its validation status; the flags cover every bar
+_MAX_REPORTED_ISSUES = 20
+
+
+@metrics.timed("ingest.validate")
+def validate_universe(
+    db: Session, instrument_ids: Optional[List[int]] = None, params: Optional[schemas.ValidationParameters] = None
+) -> Dict[int, schemas.InstrumentValidation]:
+    """
+    Checks the daily bars of many instruments for gaps, outliers, stale closes
+    and inconsistent OHLC values in one vectorised pass, and stores each
+    instrument's quarantine status. Only bars not validated yet are checked,
+    plus, for a quarantined instrument, everything from its first issue on, so
+    bars rewritten in place (e.g. a corrected backfill upserted through the
+    storage layer) lift the quarantine. Ingestion never rewrites bars it
+    already holds, so otherwise an instrument stays quarantined until
+    `release_instrument`. Earlier bars are loaded as context for the rolling
+    checks, and gaps are judged against the sessions of the whole universe,
+    however few instruments are checked. Returns the updated statuses.
+    """
+    params = params or schemas.ValidationParameters()
+    latest = repository.get_latest_market_data_dates(db, instrument_ids)
+    statuses = repository.get_validation_statuses(db, list(latest))
+    check_from: Dict[int, Optional[date]] = {}
+    for instrument_id, last_date in latest.items():
+        status = statuses.get(instrument_id)
+        if status is None:
+            check_from[instrument_id] = None
+        elif status.quarantined:
+            check_from[instrument_id] = status.first_issue_date
+        elif status.validated_through < last_date:
+            check_from[instrument_id] = status.validated_through + timedelta(days=1)
+    if not check_from:
+        return {}
+
+    ids = np.array(sorted(check_from), dtype=np.int64)
+    starts = np.array([check_from[i] or date.min for i in ids], dtype="datetime64[D]")
+    # Calendar days covering the rolling windows (in sessions) before the first checked bar
+    sessions = max(params.outlier_window + 1, params.max_stale_repeats + 1, 2)
+    context = np.timedelta64(sessions * 7 // 5 + 14, "D")
+    load_from = None if None in check_from.values() else (starts.min() - context).astype(object)
+    bars = repository.load_bar_arrays(db, ids.tolist(), start_date=load_from)
+    checked = bars.dates >= starts[np.searchsorted(ids, bars.instrument_ids)]
+    trading_dates = repository.get_trading_dates(db, start_date=load_from)
+    flags = validation.validate_bars(bars, params, rows=checked, trading_dates=trading_dates)
+
+    results = {}
+    flagged = np.flatnonzero(checked & (flags > 0))
+    for instrument_id in ids.tolist():
+        start, stop = np.searchsorted(bars.instrument_ids[flagged], [instrument_id, instrument_id + 1])
+        rows = flagged[start:stop]
+        issues = [
+            [str(bars.dates[row])] + validation.issue_names(int(flags[row])) for row in rows[:_MAX_REPORTED_ISSUES]
+        ]
+        results[instrument_id] = schemas.InstrumentValidation(
+            instrument_id=instrument_id,
+            quarantined=len(rows) > 0,
+            issues=issues,
+            first_issue_date=bars.dates[rows[0]].astype(object) if len(rows) else None,
+            validated_through=latest[instrument_id],
         )
-        instrument = repository.create_instrument(db, instrument=instrument_create)
-
-    # 3. Prepare and save market data
-    market_data_to_create = [
-        schemas.MarketDataCreate(
-            instrument_id=instrument.id,
-            **data
-        ) for data in market_data_raw
-    ]
-
-    repository.bulk_create_market_data(db, market_data_list=market_data_to_create)
-    print(f"Successfully ingested {len(market_data_to_create)} data points for {symbol}.")
+        if len(rows):
+            logger.warning("instrument_quarantined", instrument_id=instrument_id, bad_bars=len(rows), first_issue=issues[0])
+    repository.save_validation_statuses(db, list(results.values()))
+    return results
+
+
+def release_instrument(db: Session, instrument_id: int) -> schemas.InstrumentValidation:
+    """
+    Lifts an instrument's quarantine after its flagged data was reviewed and
+    accepted as correct (e.g. a genuine price jump); its bars so far count as validated.
+    """
+    latest = repository.get_latest_market_data_dates(db, [instrument_id])
+    if instrument_id not in latest:
+        raise ValueError(f"Instrument {instrument_id} has no market data")
+    status = schemas.InstrumentValidation(
+        instrument_id=instrument_id, quarantined=False, issues=[], validated_through=latest[instrument_id]
+    )
+    repository.save_validation_statuses(db, [status])
+    return status
+
+
+def ingest_symbol(
+    db: Session,
+    symbol: str,
+    latest_dates: Optional[Dict[int, date]] = None,
+    after_ingest: Optional[Callable[[Session, BarArrays], Any]] = None,
+) -> List[schemas.MarketDataCreate]:
+    """
+    Runs the per-symbol ingestion stages: fetch and upsert the new daily bars,
+    refresh the weekly bars they touch, then hand the completed weekly bars to
+    `after_ingest` (e.g. to advance the signal state).
+    """
+    with metrics.span("ingest.symbol", symbol=symbol) as symbol_span:
+        new_bars = ingest_data_for_symbol(db, symbol, latest_dates=latest_dates)
+        symbol_span.set(rows=len(new_bars))
+        if new_bars:
+            weekly = refresh_weekly_bars(db, {new_bars[0].instrument_id: min(bar.date for bar in new_bars)})
+            if after_ingest and len(weekly):
+                with metrics.span("ingest.after_ingest"):
+                    after_ingest(db, weekly)
+        return new_bars
+
+
+def ingest_symbols_concurrently(
+    session_factory: Callable[[], Session],
+    symbols: List[str],
+    max_workers: int = DEFAULT_INGESTION_WORKERS,
+    after_ingest: Optional[Callable[[Session, BarArrays], Any]] = None,
+) -> List[schemas.IngestionResult]:
+    """
+    Ingests many symbols in parallel on a bounded thread pool.
+    Provider fetches overlap on I/O, and every symbol runs in its own session so a
+    failure is rolled back in isolation. Results are returned in input order.
+    High-water marks for the whole universe are read once, up front.
+    `after_ingest` is passed on to `ingest_symbol`.
+    """
+    def ingest_one(symbol: str) -> schemas.IngestionResult:
+        started = time.perf_counter()
+        db = session_factory()
+        try:
+            ingest_symbol(db, symbol, latest_dates=latest_dates, after_ingest=after_ingest)
+            return schemas.IngestionResult(
+                symbol=symbol, succeeded=True, elapsed_seconds=time.perf_counter() - started
+            )
+        except Exception as e:
+            db.rollback()
+            return schemas.IngestionResult(
+                symbol=symbol, succeeded=False, elapsed_seconds=time.perf_counter() - started, error=str(e)
+            )
+        finally:
+            db.close()
+
+    if not symbols:
+        return []
+    db = session_factory()
+    try:
+        latest_dates = repository.get_latest_market_data_dates(db)
+    finally:
+        db.close()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+        return list(pool.map(ingest_one, symbols))
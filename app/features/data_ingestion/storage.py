@@ -0,0 +1,180 @@
+import abc
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import repository, resampling
+from .columnar import BarArrays
+from app.core.config import settings
+
+# Daily price history sits behind the BarStore interface, so readers such as
+# backtests and indicator runs do not care where it lives. The database
+# (market_data) is the system of record that ingestion writes to; the
+# memory-mapped store in mmap_store.py is a local columnar copy that scans
+# decades of bars without a round-trip, kept current with `copy_new_bars`.
+# The copy records the source's write counters (Revision) it is current with,
+# so a bar corrected or backfilled in the database is copied again too.
+
+
+@dataclass(frozen=True)
+class Revision:
+    """
+    Write counters of an instrument's bars: `number` advances with every write,
+    `rewritten` is the number of the latest write that replaced or backfilled
+    bars rather than only appending after the latest one.
+    """
+    number: int
+    rewritten: int
+
+
+class BarStore(abc.ABC):
+    """
+    Storage backend for daily OHLCV bars keyed by (instrument_id, date).
+    """
+
+    @abc.abstractmethod
+    def write_bars(self, bars: BarArrays) -> int:
+        """
+        Inserts new bars and replaces existing ones with the same key.
+        Returns the number of bars written.
+        """
+
+    @abc.abstractmethod
+    def load_bars(
+        self,
+        instrument_ids: Optional[Sequence[int]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> BarArrays:
+        """
+        Returns the bars of the given instruments (all when None) within the
+        date range, sorted by (instrument_id, date).
+        """
+
+    @abc.abstractmethod
+    def latest_dates(self, instrument_ids: Optional[Sequence[int]] = None) -> Dict[int, date]:
+        """
+        Returns the latest stored bar date per instrument; instruments without bars are absent.
+        """
+
+    def revisions(self, instrument_ids: Optional[Sequence[int]] = None) -> Dict[int, Revision]:
+        """
+        Returns the write counters per instrument; a store kept as a copy returns
+        the source counters it was last copied at (see `record_revisions`).
+        Instruments without counters are absent.
+        """
+        return {}
+
+    def record_revisions(self, revisions: Dict[int, Revision]) -> None:
+        """
+        Records the source counters a copy of the instruments is now current
+        with. Stores that count their own writes ignore it.
+        """
+
+
+class DatabaseBarStore(BarStore):
+    """
+    BarStore over the market_data table.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def write_bars(self, bars: BarArrays) -> int:
+        from . import cache # deferred: the cache pulls in the Redis client, which the app imports lazily
+
+        written = repository.upsert_bar_arrays(self.db, bars)
+        # After the commit, so no reader can cache the old bars under the new version
+        cache.invalidate_instruments(bars.unique_instrument_ids().tolist())
+        return written
+
+    def load_bars(
+        self,
+        instrument_ids: Optional[Sequence[int]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> BarArrays:
+        return repository.load_bar_arrays(self.db, instrument_ids, start_date, end_date)
+
+    def latest_dates(self, instrument_ids: Optional[Sequence[int]] = None) -> Dict[int, date]:
+        ids = None if instrument_ids is None else [int(i) for i in instrument_ids]
+        return repository.get_latest_market_data_dates(self.db, ids)
+
+    def revisions(self, instrument_ids: Optional[Sequence[int]] = None) -> Dict[int, Revision]:
+        ids = None if instrument_ids is None else [int(i) for i in instrument_ids]
+        return {i: Revision(*counters) for i, counters in repository.get_market_data_revisions(self.db, ids).items()}
+
+
+def get_bar_store(db: Optional[Session] = None, backend: Optional[str] = None) -> BarStore:
+    """
+    Returns the configured bar store (settings.BAR_STORE_BACKEND unless `backend` is given).
+    """
+    backend = backend or settings.BAR_STORE_BACKEND
+    if backend == "mmap":
+        from .mmap_store import MemoryMappedBarStore
+        return MemoryMappedBarStore(settings.BAR_STORE_PATH)
+    if backend == "database":
+        if db is None:
+            raise ValueError("The database bar store needs a session")
+        return DatabaseBarStore(db)
+    raise ValueError(f"Unknown bar store backend: {backend}")
+
+
+def copy_new_bars(source: BarStore, target: BarStore, instrument_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Copies the bars `target` does not have yet, i.e. those after its latest date
+    per instrument, and copies again in full the instruments whose bars the
+    source replaced or backfilled since the target's copy. Returns the number
+    of bars copied.
+    """
+    # Counters first: a write landing during the copy is at worst copied again next time
+    current = source.revisions(instrument_ids)
+    available = source.latest_dates(instrument_ids)
+    copied = target.revisions(list(available))
+    held = target.latest_dates(list(available))
+    pending = {}
+    for i, last in available.items():
+        # A copy without recorded counters predates them and is refreshed once
+        rewritten = i in current and (i not in copied or current[i].rewritten > copied[i].number)
+        if i not in held or rewritten:
+            pending[i] = None
+        elif held[i] < last:
+            pending[i] = held[i]
+
+    written = 0
+    if pending:
+        ids = np.array(sorted(pending), dtype=np.int64)
+        known = [pending[i] for i in ids if pending[i] is not None]
+        start = min(known) + timedelta(days=1) if len(known) == len(ids) else None
+        bars = source.load_bars(ids.tolist(), start_date=start)
+        after = np.array([pending[i] or date.min for i in ids], dtype="datetime64[D]")
+        written = target.write_bars(bars.take(bars.dates > after[np.searchsorted(ids, bars.instrument_ids)]))
+    target.record_revisions({i: current[i] for i in available if i in current and copied.get(i) != current[i]})
+    return written
+
+
+def load_completed_weekly_bars(
+    store: BarStore,
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    week_end_weekday: Optional[int] = None,
+) -> BarArrays:
+    """
+    Resamples a store's daily bars into completed weekly bars with week ends
+    within the date range, matching `repository.load_weekly_bar_arrays(completed_only=True)`.
+    """
+    weekday = settings.WEEK_END_WEEKDAY if week_end_weekday is None else week_end_weekday
+    first_day = None
+    if start_date is not None:
+        first_day = resampling.week_starting(np.array([start_date], dtype="datetime64[D]"), weekday)[0].astype(object)
+    weekly, _, complete = resampling.resample_weekly(store.load_bars(instrument_ids, first_day, end_date), weekday)
+    keep = complete
+    if start_date is not None:
+        keep = keep & (weekly.dates >= np.datetime64(start_date, "D"))
+    if end_date is not None:
+        keep = keep & (weekly.dates <= np.datetime64(end_date, "D"))
+    return weekly.take(keep)
@@ -0,0 +1,160 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .columnar import BarArrays
+from .schemas import ValidationParameters
+
+# Data-integrity checks (docs/specs.md, section 9.2), run over a whole universe
+# of daily bars at once. Bars are sorted by (instrument_id, date), so every
+# check is an array expression over all rows, with rolling windows masked
+# where they would reach back into the previous instrument. The result is one
+# bit set of issues per bar.
+
+GAP = 1 # sessions missing before this bar
+OUTLIER = 2 # return far outside the instrument's recent distribution
+STALE = 4 # close repeated for too many sessions
+OHLC = 8 # prices inconsistent with each other (or missing / not positive)
+ISSUE_NAMES = {GAP: "GAP", OUTLIER: "OUTLIER", STALE: "STALE", OHLC: "OHLC"}
+
+# Scales the median absolute deviation to a standard deviation for normal data
+_MAD_SCALE = 1.4826
+# Rows per chunk of rolling windows, bounding the temporary (rows x window) matrices
+_WINDOW_CHUNK_ROWS = 250_000
+
+
+def issue_names(flags: int) -> List[str]:
+    return [name for bit, name in ISSUE_NAMES.items() if flags & bit]
+
+
+def ohlc_issues(bars: BarArrays) -> np.ndarray:
+    """
+    Bars whose prices are missing, not positive, or violate low <= open/close <= high.
+    """
+    # fmin/fmax would skip a missing open or close, so missing prices are checked first
+    present = np.isfinite(bars.open) & np.isfinite(bars.high) & np.isfinite(bars.low) & np.isfinite(bars.close)
+    with np.errstate(invalid="ignore"):
+        consistent = (
+            present
+            & (bars.low > 0)
+            & (bars.low <= np.fmin(bars.open, bars.close))
+            & (np.fmax(bars.open, bars.close) <= bars.high)
+        )
+    return ~consistent
+
+
+def gap_issues(
+    bars: BarArrays,
+    max_missing_sessions: int = 1,
+    holidays: Optional[Sequence] = None,
+    weekmask: str = "1111100",
+    trading_dates: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Bars preceded by more than `max_missing_sessions` missing sessions since the
+    instrument's previous bar. Sessions are the `weekmask` days that are not
+    `holidays` and on which at least one instrument traded, so market closures
+    seen across the whole universe are never counted as gaps. `trading_dates`
+    are the dates any instrument in the universe has a bar on; without them
+    only the instruments in `bars` are seen, which cannot tell a single
+    instrument's missing sessions from closures.
+    """
+    if len(bars) < 2:
+        return np.zeros(len(bars), dtype=bool)
+    traded = bars.dates if trading_dates is None else np.union1d(bars.dates, trading_dates)
+    closed = np.setdiff1d(
+        np.arange(bars.dates.min(), bars.dates.max() + np.timedelta64(1, "D"), dtype="datetime64[D]"),
+        traded,
+    )
+    if holidays is not None and len(holidays):
+        closed = np.union1d(closed, np.asarray(holidays, dtype="datetime64[D]"))
+    calendar = np.busdaycalendar(weekmask=weekmask, holidays=closed)
+
+    gaps = np.zeros(len(bars), dtype=bool)
+    same = bars.instrument_ids[1:] == bars.instrument_ids[:-1]
+    missing = np.busday_count(bars.dates[:-1] + np.timedelta64(1, "D"), bars.dates[1:], busdaycal=calendar)
+    gaps[1:] = same & (missing > max_missing_sessions)
+    return gaps
+
+
+def outlier_issues(
+    bars: BarArrays, window: int = 60, threshold: float = 10.0, rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Bars whose log return differs from the median of the previous `window`
+    returns by more than `threshold` scaled median absolute deviations.
+    Bars with less than `window` returns of history are not checked, and with
+    a boolean `rows` mask only those bars are (the rest serve as history).
+    """
+    flagged = np.zeros(len(bars), dtype=bool)
+    if len(bars) < window + 2:
+        return flagged
+    returns = np.full(len(bars), np.nan)
+    same = bars.instrument_ids[1:] == bars.instrument_ids[:-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = np.where(same, np.log(bars.close[1:] / bars.close[:-1]), np.nan)
+
+    # Row i is checked against returns[i - window:i]; a window containing an
+    # instrument's first row (NaN return) reaches into another instrument and
+    # yields NaN, so it is never flagged
+    candidates = np.arange(window, len(bars))
+    if rows is not None:
+        candidates = candidates[rows[window:]]
+    windows = sliding_window_view(returns[:-1], window)
+    for start in range(0, len(candidates), _WINDOW_CHUNK_ROWS):
+        chunk_rows = candidates[start:start + _WINDOW_CHUNK_ROWS]
+        chunk = windows[chunk_rows - window]
+        median = _row_medians(chunk)
+        mad = _row_medians(np.abs(chunk - median[:, np.newaxis]))
+        with np.errstate(invalid="ignore"):
+            # A window with no movement at all is a staleness issue, not a scale for outliers
+            flagged[chunk_rows] = (mad > 0) & (np.abs(returns[chunk_rows] - median) > threshold * _MAD_SCALE * mad)
+    return flagged
+
+
+def _row_medians(rows: np.ndarray) -> np.ndarray:
+    """
+    Median of each row, NaN if the row has a NaN. For short rows a full sort is
+    several times faster than np.median's partition.
+    """
+    ordered = np.sort(rows, axis=1) # NaN sorts last
+    n = rows.shape[1]
+    medians = 0.5 * (ordered[:, (n - 1) // 2] + ordered[:, n // 2])
+    medians[np.isnan(ordered[:, -1])] = np.nan
+    return medians
+
+
+def stale_issues(bars: BarArrays, max_repeats: int = 5) -> np.ndarray:
+    """
+    Bars whose close repeats the previous close for more than `max_repeats`
+    consecutive sessions. Every bar from the first offending one to the end of
+    the run is flagged.
+    """
+    repeated = np.zeros(len(bars), dtype=bool)
+    repeated[1:] = (bars.instrument_ids[1:] == bars.instrument_ids[:-1]) & (bars.close[1:] == bars.close[:-1])
+    # Length of the current run of repeats at each row
+    counts = np.cumsum(repeated)
+    run_start = np.maximum.accumulate(np.where(repeated, 0, counts))
+    return (counts - run_start) > max_repeats
+
+
+def validate_bars(
+    bars: BarArrays,
+    params: Optional[ValidationParameters] = None,
+    rows: Optional[np.ndarray] = None,
+    trading_dates: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Runs every check over `bars` and returns the issue bits of each bar (uint8).
+    `rows` (boolean) limits the rolling outlier check, the only costly one, to
+    the bars being validated; the other checks are cheap enough to run on all.
+    `trading_dates` is the universe's session calendar for the gap check.
+    """
+    params = params or ValidationParameters()
+    flags = np.zeros(len(bars), dtype=np.uint8)
+    flags[gap_issues(bars, params.max_missing_sessions, params.holidays, trading_dates=trading_dates)] |= GAP
+    flags[outlier_issues(bars, params.outlier_window, params.outlier_threshold, rows)] |= OUTLIER
+    flags[stale_issues(bars, params.max_stale_repeats)] |= STALE
+    flags[ohlc_issues(bars)] |= OHLC
+    return flags
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Date, JSON, LargeBinary
+from app.core.database import Base
+
+class PerformanceRollupState(Base):
+    """
+    Weekly equity series of the strategy or its benchmark, with the rollups
+    that answer window metrics without rescanning the history.
+    """
+    __tablename__ = "performance_rollups"
+
+    series = Column(String(20), primary_key=True) # "strategy" or "benchmark"
+    last_date = Column(Date, nullable=False) # latest week end appended
+    params = Column(JSON, nullable=False) # PerformanceParameters the rollup was built with
+    sources = Column(JSON, nullable=False) # what the marks were built from, to detect edits
+    state = Column(LargeBinary, nullable=False)
@@ -0,0 +1,30 @@
+from datetime import date
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+
+from . import models
+
+# --- Performance Rollup Repository ---
+
+def get_rollups(db: Session) -> Dict[str, models.PerformanceRollupState]:
+    """
+    Retrieves every stored rollup, keyed by series, in one query.
+    """
+    return {row.series: row for row in db.query(models.PerformanceRollupState).all()}
+
+
+def save_rollup(
+    db: Session, series: str, last_date: date, params: Dict[str, Any], sources: Any, state: bytes
+) -> models.PerformanceRollupState:
+    """
+    Inserts or replaces the rollup of a series. Does not commit.
+    """
+    row = db.get(models.PerformanceRollupState, series)
+    if row is None:
+        row = models.PerformanceRollupState(series=series)
+        db.add(row)
+    row.last_date = last_date
+    row.params = params
+    row.sources = sources
+    row.state = state
+    return row
@@ -0,0 +1,190 @@
+import io
+import math
+from datetime import date
+from typing import Optional, Tuple
+
+import numpy as np
+
+from . import schemas
+from app.features.backtesting.engine import PERIODS_PER_YEAR
+
+# Window metrics of a weekly equity curve without rescanning it.
+#
+# Weekly returns are kept as prefix sums of r and r^2, so the total return,
+# mean and volatility (hence the Sharpe ratio) of any window are a couple of
+# subtractions. Drawdown does not decompose that way. The inception-to-date
+# figure is a running peak and running maximum drawdown, carried forward as
+# weeks are appended. For any other window a segment tree holds, per node, the
+# (max, min, max drawdown) of its range. Two adjacent ranges combine as
+# max(dd_left, dd_right, 1 - min_right / max_left), so a window's maximum
+# drawdown is assembled from O(log n) nodes. Appending a week updates its leaf
+# and the O(log n) nodes above it. Metrics use the same definitions as the
+# backtest summary.
+
+_EMPTY = (-math.inf, math.inf, 0.0) # identity node: (max, min, max drawdown)
+
+
+class PerformanceRollup:
+    """
+    Incrementally maintained rollups of one weekly equity series.
+    """
+
+    def __init__(self, state: Optional[bytes] = None):
+        self.dates = np.empty(0, dtype="datetime64[D]")
+        self.equity = np.empty(0)
+        self.return_sums = np.empty(0) # prefix sums of weekly returns; [k] covers weeks 1..k
+        self.square_sums = np.empty(0) # prefix sums of squared weekly returns
+        self.peak = -math.inf # running maximum of the equity
+        self.max_drawdown = 0.0 # largest drawdown since inception, as a fraction
+        self._capacity = 1
+        self._tree = np.tile(np.array(_EMPTY), (2, 1)) # rows are nodes; leaves start at _capacity
+        if state is not None:
+            self._load(state)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def last_date(self) -> Optional[date]:
+        return self.dates[-1].astype(object) if len(self.dates) else None
+
+    def append(self, dates: np.ndarray, equity: np.ndarray):
+        """
+        Adds the equity marks of weeks after the last one, in date order.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        equity = np.asarray(equity, dtype=np.float64)
+        if not len(dates):
+            return
+        if len(self.dates) and dates[0] <= self.dates[-1]:
+            raise ValueError(f"week {dates[0]} is not after the last week {self.dates[-1]}")
+        start = len(self.equity)
+        if start:
+            returns = equity / np.concatenate([self.equity[-1:], equity[:-1]]) - 1.0
+        else:
+            returns = np.concatenate([[0.0], equity[1:] / equity[:-1] - 1.0]) # the first week has no return
+        sums, squares = (self.return_sums[-1], self.square_sums[-1]) if start else (0.0, 0.0)
+        self.return_sums = np.concatenate([self.return_sums, sums + np.cumsum(returns)])
+        self.square_sums = np.concatenate([self.square_sums, squares + np.cumsum(returns * returns)])
+
+        peaks = np.maximum.accumulate(np.concatenate([[self.peak], equity]))[1:]
+        self.peak = float(peaks[-1])
+        self.max_drawdown = max(self.max_drawdown, float((1.0 - equity / peaks).max()))
+        self.dates = np.concatenate([self.dates, dates])
+        self.equity = np.concatenate([self.equity, equity])
+        self._grow_tree(start)
+
+    def truncated(self, before: date) -> "PerformanceRollup":
+        """
+        The rollup without the weeks on or after `before`, e.g. because the marks
+        they were built from changed; they are appended again afterwards.
+        """
+        keep = int(np.searchsorted(self.dates, np.datetime64(before, "D")))
+        if keep == len(self.dates):
+            return self
+        rollup = PerformanceRollup()
+        rollup.append(self.dates[:keep], self.equity[:keep])
+        return rollup
+
+    def window(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Optional[schemas.PerformanceMetrics]:
+        """
+        Metrics of the weeks ending within [start_date, end_date] (default: all),
+        measured from the mark of the week before the window. None when the
+        window holds no return.
+        """
+        first = int(np.searchsorted(self.dates, np.datetime64(start_date, "D"))) if start_date else 0
+        last = int(np.searchsorted(self.dates, np.datetime64(end_date, "D"), side="right")) - 1 if end_date else len(self) - 1
+        base = max(first - 1, 0)
+        weeks = last - base
+        if weeks < 1:
+            return None
+
+        mean = (self.return_sums[last] - self.return_sums[base]) / weeks
+        variance = max((self.square_sums[last] - self.square_sums[base]) / weeks - mean * mean, 0.0)
+        volatility = math.sqrt(variance)
+        if base == 0 and last == len(self) - 1:
+            max_drawdown = self.max_drawdown
+        else:
+            max_drawdown = self._query_drawdown(base, last)
+        return schemas.PerformanceMetrics(
+            start_date=self.dates[base].astype(object),
+            end_date=self.dates[last].astype(object),
+            weeks=weeks,
+            total_return=float(self.equity[last] / self.equity[base] - 1.0),
+            sharpe_ratio=float(mean / volatility * math.sqrt(PERIODS_PER_YEAR)) if volatility > 1e-12 else 0.0,
+            volatility=volatility * math.sqrt(PERIODS_PER_YEAR),
+            max_drawdown=max_drawdown,
+        )
+
+    def to_state(self) -> bytes:
+        """
+        Serialises the series with its prefix sums, drawdown state and tree.
+        """
+        buffer = io.BytesIO()
+        np.savez(
+            buffer, dates=self.dates, equity=self.equity, return_sums=self.return_sums,
+            square_sums=self.square_sums, drawdown=np.array([self.peak, self.max_drawdown]), tree=self._tree,
+        )
+        return buffer.getvalue()
+
+    def _load(self, state: bytes):
+        with np.load(io.BytesIO(state)) as saved:
+            self.dates = saved["dates"]
+            self.equity = saved["equity"]
+            self.return_sums = saved["return_sums"]
+            self.square_sums = saved["square_sums"]
+            self.peak, self.max_drawdown = (float(v) for v in saved["drawdown"])
+            self._tree = saved["tree"]
+        self._capacity = len(self._tree) // 2
+
+    def _grow_tree(self, start: int):
+        """
+        Writes the leaves from `start` on and recomputes the nodes above them,
+        one vectorised step per level. Doubles the capacity when full, which
+        rebuilds every level once.
+        """
+        n = len(self.equity)
+        if n > self._capacity:
+            while self._capacity < n:
+                self._capacity *= 2
+            self._tree = np.tile(np.array(_EMPTY), (2 * self._capacity, 1))
+            start = 0
+        leaves = self._capacity + np.arange(start, n)
+        self._tree[leaves] = np.column_stack([self.equity[start:], self.equity[start:], np.zeros(n - start)])
+        low, high = leaves[0] // 2, leaves[-1] // 2
+        while low >= 1:
+            nodes = np.arange(low, high + 1)
+            self._tree[nodes] = _combine(self._tree[2 * nodes], self._tree[2 * nodes + 1])
+            low, high = low // 2, high // 2
+
+    def _query_drawdown(self, first: int, last: int) -> float:
+        left, right = _EMPTY, _EMPTY
+        lo, hi = first + self._capacity, last + self._capacity + 1
+        while lo < hi:
+            if lo & 1:
+                left = _combine_one(left, tuple(self._tree[lo]))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right = _combine_one(tuple(self._tree[hi]), right)
+            lo //= 2
+            hi //= 2
+        return float(_combine_one(left, right)[2])
+
+
+def _combine(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Merges adjacent (max, min, max drawdown) rows, left range first.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        across = np.where(np.isfinite(left[:, 0]) & np.isfinite(right[:, 1]), 1.0 - right[:, 1] / left[:, 0], 0.0)
+    return np.column_stack([
+        np.maximum(left[:, 0], right[:, 0]),
+        np.minimum(left[:, 1], right[:, 1]),
+        np.maximum(np.maximum(left[:, 2], right[:, 2]), across),
+    ])
+
+
+def _combine_one(left: Tuple[float, float, float], right: Tuple[float, float, float]) -> Tuple[float, float, float]:
+    across = 1.0 - right[1] / left[0] if math.isfinite(left[0]) and math.isfinite(right[1]) else 0.0
+    return max(left[0], right[0]), min(left[1], right[1]), max(left[2], right[2], across)
@@ -0,0 +1,20 @@
+from datetime import date
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from . import schemas
+from app.core.database import get_db
+
+router = APIRouter()
+
+
+@router.get("/performance/", response_model=schemas.PerformanceReport)
+def performance(start_date: Optional[date] = None, end_date: Optional[date] = None, db: Session = Depends(get_db)):
+    """
+    Strategy and benchmark metrics over the weeks ending within the selected
+    range, read from the rollups the weekly pipeline maintains.
+    """
+    from . import service # deferred: loads the backtest engine and the cache client
+
+    return service.get_performance(db, start_date, end_date)
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import Optional
+
+class PerformanceMetrics(BaseModel):
+    start_date: date # week whose mark the returns are measured from
+    end_date: date
+    weeks: int # weekly returns in the window
+    total_return: float
+    sharpe_ratio: float # annualised from weekly returns, zero risk-free rate
+    volatility: float # annualised standard deviation of weekly returns
+    max_drawdown: float # largest peak-to-trough loss in the window, as a fraction
+
+class PerformanceReport(BaseModel):
+    strategy: Optional[PerformanceMetrics] = None
+    benchmark: Optional[PerformanceMetrics] = None
+
+# Parameters the stored rollups are built with; changing them rebuilds the rollups
+class PerformanceParameters(BaseModel):
+    initial_capital: float = 5000.0 # docs/specs.md, section 5
+    benchmark_symbol: str = "SPY" # the S&P 500 benchmark of the PRD
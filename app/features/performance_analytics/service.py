@@ -0,0 +1,196 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import repository, rollups, schemas
+from app.core import metrics
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.data_ingestion.resampling import week_ending
+from app.features.portfolio_management import models as portfolio_models
+from app.features.portfolio_management import repository as portfolio_repository
+
+logger = get_logger(__name__)
+
+STRATEGY = "strategy"
+BENCHMARK = "benchmark"
+
+# Weekly bars loaded before the first week to mark, so an instrument without a
+# bar in a given week is marked at its previous close
+_MARK_LOOKBACK_WEEKS = 8
+
+# The strategy's equity at a week end is the capital, plus the realised P&L of
+# the positions closed by then, plus the open positions marked at that week's
+# close. Recorded positions can be edited after the fact. The rollup therefore
+# keeps what each position looked like when it was marked. Only the weeks from
+# the earliest date an edit touches are dropped and marked again.
+
+
+@metrics.timed("performance.refresh")
+def refresh_performance(
+    db: Session, week_end: Optional[date] = None, params: Optional[schemas.PerformanceParameters] = None
+) -> Dict[str, int]:
+    """
+    Appends the completed weeks since the last refresh, up to `week_end`
+    (default: the latest completed week), to the strategy and benchmark rollups.
+    Only new weeks are marked, apart from the weeks an edited position affects.
+    A change of parameters rebuilds the rollups. Returns the weeks appended per
+    series.
+    """
+    params = params or schemas.PerformanceParameters()
+    latest = market_data_repository.get_latest_weekly_dates(db)
+    last_week = week_end or (max(latest.values()) if latest else None)
+    if last_week is None:
+        return {}
+    rows = repository.get_rollups(db)
+    appended = {
+        STRATEGY: _refresh_strategy(db, rows.get(STRATEGY), last_week, params),
+        BENCHMARK: _refresh_benchmark(db, rows.get(BENCHMARK), last_week, params),
+    }
+    db.commit()
+    logger.info("performance_refreshed", **appended)
+    return appended
+
+
+def get_performance(
+    db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None
+) -> schemas.PerformanceReport:
+    """
+    Total return, Sharpe ratio, volatility and maximum drawdown of the strategy
+    and its benchmark over the weeks ending within [start_date, end_date],
+    answered from the stored rollups without touching positions or prices.
+    Without a start date the benchmark is measured over the strategy's history.
+    """
+    rows = repository.get_rollups(db)
+    report = schemas.PerformanceReport()
+    if STRATEGY in rows:
+        report.strategy = rollups.PerformanceRollup(rows[STRATEGY].state).window(start_date, end_date)
+    if BENCHMARK in rows:
+        if start_date is None and report.strategy is not None:
+            start_date = report.strategy.start_date + timedelta(days=1)
+            end_date = end_date or report.strategy.end_date
+        report.benchmark = rollups.PerformanceRollup(rows[BENCHMARK].state).window(start_date, end_date)
+    return report
+
+
+def portfolio_equity(
+    week_ends: np.ndarray,
+    positions: Sequence[portfolio_models.Position],
+    instrument_ids: np.ndarray,
+    dates: np.ndarray,
+    close: np.ndarray,
+    initial_capital: float,
+) -> np.ndarray:
+    """
+    Marks the positions at every week end in one array pass. `close` is the
+    (n_instruments, n_dates) weekly close matrix for `instrument_ids` (sorted);
+    a missing close falls back to the latest earlier one, then to the entry price.
+    """
+    week_ends = np.asarray(week_ends, dtype="datetime64[D]")
+    # Forward-fill the closes, then pick each week end's column
+    filled = np.where(np.isfinite(close), np.arange(close.shape[1]), -1)
+    np.maximum.accumulate(filled, axis=1, out=filled)
+    columns = np.searchsorted(dates, week_ends, side="right") - 1
+
+    rows = np.searchsorted(instrument_ids, [p.instrument_id for p in positions])
+    entry_dates = np.array([p.entry_date for p in positions], dtype="datetime64[D]")
+    exit_dates = np.array([p.exit_date for p in positions], dtype="datetime64[D]")
+    entry_prices = np.array([p.entry_price for p in positions], dtype=float)
+    exit_prices = np.array([np.nan if p.exit_price is None else p.exit_price for p in positions], dtype=float)
+    units = np.array([p.size for p in positions], dtype=float) * np.where(
+        np.array([p.direction for p in positions]) == "SHORT", -1.0, 1.0
+    )
+
+    source = np.where(columns >= 0, filled[rows][:, np.maximum(columns, 0)], -1)
+    marks = np.where(source >= 0, close[rows[:, np.newaxis], np.maximum(source, 0)], np.nan)
+    marks = np.where(np.isfinite(marks), marks, entry_prices[:, np.newaxis])
+    closed = exit_dates[:, np.newaxis] <= week_ends
+    held = (entry_dates[:, np.newaxis] <= week_ends) & ~closed
+    realised = np.where(closed, (np.nan_to_num(exit_prices) - entry_prices)[:, np.newaxis], 0.0)
+    unrealised = np.where(held, marks - entry_prices[:, np.newaxis], 0.0)
+    return initial_capital + (units[:, np.newaxis] * (realised + unrealised)).sum(axis=0)
+
+
+def _refresh_strategy(db: Session, row, last_week: date, params: schemas.PerformanceParameters) -> int:
+    positions = portfolio_repository.get_positions(db)
+    if not positions:
+        return 0
+    sources = {str(p.id): _position_source(p) for p in positions}
+    first_week = _week_end(min(p.entry_date for p in positions)) - np.timedelta64(7, "D") # marked at the capital
+    rollup = rollups.PerformanceRollup()
+    if row is not None and row.params == params.model_dump():
+        rollup = rollups.PerformanceRollup(row.state)
+        edited = _earliest_edit(row.sources, sources)
+        if edited is not None:
+            rollup = rollup.truncated(edited)
+        if len(rollup) and rollup.dates[0] != first_week:
+            rollup = rollups.PerformanceRollup() # an edit moved the first entry
+
+    start = rollup.dates[-1] + np.timedelta64(7, "D") if len(rollup) else first_week
+    week_ends = np.arange(start, np.datetime64(last_week, "D") + np.timedelta64(1, "D"), np.timedelta64(7, "D"))
+    if len(week_ends):
+        ids = np.unique([p.instrument_id for p in positions])
+        bars = market_data_repository.load_weekly_bar_arrays(
+            db, ids.tolist(), start_date=(start - np.timedelta64(7 * _MARK_LOOKBACK_WEEKS, "D")).astype(object),
+            end_date=last_week, completed_only=True,
+        )
+        _, dates, prices = bars.to_matrix(fields=("close",), instrument_ids=ids)
+        rollup.append(week_ends, portfolio_equity(week_ends, positions, ids, dates, prices["close"], params.initial_capital))
+    if len(rollup):
+        repository.save_rollup(db, STRATEGY, rollup.last_date, params.model_dump(), sources, rollup.to_state())
+    return len(week_ends)
+
+
+def _refresh_benchmark(db: Session, row, last_week: date, params: schemas.PerformanceParameters) -> int:
+    instrument = market_data_repository.get_instrument_by_symbol(db, params.benchmark_symbol)
+    if instrument is None:
+        return 0
+    sources = {"instrument_id": instrument.id}
+    if row is not None and row.params == params.model_dump() and row.sources == sources:
+        rollup, start_date = rollups.PerformanceRollup(row.state), row.last_date + timedelta(days=1)
+    else:
+        rollup, start_date = rollups.PerformanceRollup(), None
+    bars = market_data_repository.load_weekly_bar_arrays(
+        db, [instrument.id], start_date=start_date, end_date=last_week, completed_only=True
+    )
+    valid = np.isfinite(bars.close)
+    rollup.append(bars.dates[valid], bars.close[valid])
+    if len(rollup):
+        repository.save_rollup(db, BENCHMARK, rollup.last_date, params.model_dump(), sources, rollup.to_state())
+    return int(valid.sum())
+
+
+def _position_source(position: portfolio_models.Position) -> List[Any]:
+    """
+    The fields a position's marks depend on, as stored with the rollup:
+    [instrument_id, entry_date, entry_price, size, direction, exit_date, exit_price].
+    """
+    return [
+        position.instrument_id, position.entry_date.isoformat(), position.entry_price, position.size,
+        position.direction, position.exit_date.isoformat() if position.exit_date else None, position.exit_price,
+    ]
+
+
+def _earliest_edit(stored: Dict[str, List[Any]], current: Dict[str, List[Any]]) -> Optional[date]:
+    """
+    The earliest date whose mark a difference between the stored and current
+    positions changes: from the entry for a new, removed or re-entered
+    position, from the exit when only the exit changed.
+    """
+    dates = []
+    for key in stored.keys() | current.keys():
+        old, new = stored.get(key), current.get(key)
+        if old == new:
+            continue
+        if old is not None and new is not None and old[:5] == new[:5]:
+            dates.extend(version[5] for version in (old, new) if version[5] is not None)
+        else:
+            dates.extend(version[1] for version in (old, new) if version is not None)
+    return min(date.fromisoformat(d) for d in dates) if dates else None
+
+
+def _week_end(day: date) -> np.datetime64:
+    return week_ending(np.datetime64(day, "D"), settings.WEEK_END_WEEKDAY)
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, JSON
+from app.core.database import Base
+
+class PipelineRun(Base):
+    """
+    One run of the weekly pipeline, keyed by the week it processes.
+    """
+    __tablename__ = "pipeline_runs"
+
+    run_key = Column(String, primary_key=True) # e.g. "weekly:2024-01-19"
+    symbols = Column(JSON, nullable=False)
+    status = Column(String, nullable=False) # running, complete or failed
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+
+class StageCheckpoint(Base):
+    """
+    Outcome of one pipeline stage for one symbol (or for the whole universe),
+    so a resumed run skips the work already done.
+    """
+    __tablename__ = "pipeline_checkpoints"
+    __table_args__ = (
+        # One checkpoint per stage and symbol; the conflict target for upserts and stage claims
+        Index("uq_pipeline_checkpoints_run_stage_symbol", "run_key", "stage", "symbol", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_key = Column(String, ForeignKey("pipeline_runs.run_key"), nullable=False)
+    stage = Column(String, nullable=False)
+    symbol = Column(String, nullable=False) # "*" for cross-sectional stages
+    status = Column(String, nullable=False) # running, done or failed
+    instrument_id = Column(Integer)
+    since = Column(Date) # first daily bar the ingest stage wrote, None when nothing was new
+    started_at = Column(DateTime, nullable=False)
+    seconds = Column(Float)
+    error = Column(String)
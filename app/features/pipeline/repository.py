@@ -0,0 +1,124 @@
+from datetime import date, datetime
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import List, Optional, Sequence
+
+from . import models
+
+_CHECKPOINT_KEY_COLUMNS = ["run_key", "stage", "symbol"]
+
+# --- Pipeline Run Repository ---
+
+def get_run(db: Session, run_key: str) -> Optional[models.PipelineRun]:
+    """
+    Retrieves a pipeline run by its key.
+    """
+    return db.get(models.PipelineRun, run_key)
+
+
+def save_run(
+    db: Session, run_key: str, symbols: List[str], status: str, started_at: datetime,
+    finished_at: Optional[datetime] = None,
+) -> models.PipelineRun:
+    """
+    Inserts or replaces a pipeline run and commits.
+    """
+    run = db.get(models.PipelineRun, run_key)
+    if run is None:
+        run = models.PipelineRun(run_key=run_key)
+        db.add(run)
+    run.symbols = list(symbols)
+    run.status = status
+    run.started_at = started_at
+    run.finished_at = finished_at
+    db.commit()
+    return run
+
+
+# --- Stage Checkpoint Repository ---
+
+def get_checkpoints(db: Session, run_key: str, stage: Optional[str] = None) -> List[models.StageCheckpoint]:
+    """
+    Returns the checkpoints of a run (optionally of one stage) in the order they were first written.
+    """
+    query = db.query(models.StageCheckpoint).filter(models.StageCheckpoint.run_key == run_key)
+    if stage is not None:
+        query = query.filter(models.StageCheckpoint.stage == stage)
+    return query.order_by(models.StageCheckpoint.id).all()
+
+
+def get_checkpoint(db: Session, run_key: str, stage: str, symbol: str) -> Optional[models.StageCheckpoint]:
+    return (
+        db.query(models.StageCheckpoint)
+        .filter_by(run_key=run_key, stage=stage, symbol=symbol)
+        .first()
+    )
+
+
+def save_checkpoint(
+    db: Session,
+    run_key: str,
+    stage: str,
+    symbol: str,
+    status: str,
+    started_at: datetime,
+    seconds: Optional[float] = None,
+    instrument_id: Optional[int] = None,
+    since: Optional[date] = None,
+    error: Optional[str] = None,
+):
+    """
+    Inserts or replaces the checkpoint of a stage for a symbol and commits, so
+    the stage's own writes and its checkpoint are committed together.
+    """
+    row = {
+        "run_key": run_key, "stage": stage, "symbol": symbol, "status": status, "started_at": started_at,
+        "seconds": seconds, "instrument_id": instrument_id, "since": since, "error": error,
+    }
+    stmt = _dialect_insert(db)(models.StageCheckpoint).values(row)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=_CHECKPOINT_KEY_COLUMNS,
+        set_={name: stmt.excluded[name] for name in row if name not in _CHECKPOINT_KEY_COLUMNS},
+    ))
+    db.commit()
+
+
+def claim_stage(db: Session, run_key: str, stage: str, symbol: str, started_at: datetime) -> bool:
+    """
+    Marks a stage as running unless it already has a checkpoint. Returns True
+    for the one caller whose claim was inserted, so concurrent workers reaching
+    the same barrier start the next stage once.
+    """
+    stmt = _dialect_insert(db)(models.StageCheckpoint).values(
+        run_key=run_key, stage=stage, symbol=symbol, status="running", started_at=started_at
+    )
+    result = db.execute(stmt.on_conflict_do_nothing(index_elements=_CHECKPOINT_KEY_COLUMNS))
+    db.commit()
+    return result.rowcount == 1
+
+
+def delete_checkpoints(
+    db: Session,
+    run_key: str,
+    stages: Sequence[str],
+    symbols: Optional[Sequence[str]] = None,
+    status: Optional[str] = None,
+) -> int:
+    """
+    Deletes a run's checkpoints of the given stages (optionally only of some
+    symbols, or with one status) and commits. Returns the number deleted.
+    """
+    query = db.query(models.StageCheckpoint).filter(
+        models.StageCheckpoint.run_key == run_key, models.StageCheckpoint.stage.in_(list(stages))
+    )
+    if symbols is not None:
+        query = query.filter(models.StageCheckpoint.symbol.in_(list(symbols)))
+    if status is not None:
+        query = query.filter(models.StageCheckpoint.status == status)
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def _dialect_insert(db: Session):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
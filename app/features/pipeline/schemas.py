@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Dict
+
+# Timing of one pipeline stage across the instruments it ran for
+class StageTiming(BaseModel):
+    completed: int
+    failed: int
+    busy_seconds: float # summed over instruments, i.e. worker time
+    max_seconds: float # slowest single instrument
+    wall_seconds: float # first start to last finish, i.e. elapsed time with the fan-out
+
+# Progress of a run against the NFR-1 processing window
+class RunReport(BaseModel):
+    run_key: str
+    status: str
+    elapsed_seconds: float
+    deadline_seconds: float
+    deadline_used: float # fraction of the window used so far
+    stages: Dict[str, StageTiming]
+    failed_symbols: Dict[str, str] # symbol -> error of the stage it failed in
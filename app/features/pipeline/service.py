@@ -0,0 +1,378 @@
+import time
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models, repository, schemas
+from app.core import metrics
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.data_ingestion import resampling
+from app.features.data_ingestion import service as market_data_service
+
+logger = get_logger(__name__)
+
+# The weekly run as a task graph:
+#
+#   ingest                                 (per symbol, fanned out)
+#      |
+#   barrier
+#      |
+#   validate                               (whole universe, one pass)
+#      |
+#   resample -> signals                    (per symbol, fanned out)
+#                  |
+#               barrier
+#                  |
+#           relative_strength              (whole universe)
+#                  |
+#                exits                     (open positions)
+#                  |
+#             performance                  (strategy and benchmark)
+#
+# Each symbol moves through its stages independently, one message per stage,
+# so workers pick up whichever symbol is ready. Validation judges gaps against
+# the sessions the whole universe traded, so it waits until every symbol's
+# bars are in; resample and signals then fan out again. The "signals" stage
+# advances the streaming indicator state and stores the signals it triggers in
+# one commit. Relative strength ranks the instruments against each other and
+# so waits until every symbol has settled (finished or failed). At a barrier
+# the last symbol to settle claims the next stage through a unique checkpoint
+# row, so exactly one worker starts it.
+#
+# Every stage writes a checkpoint with its outcome and duration when it is
+# done. Starting the run for the same week again resumes it: each symbol
+# continues at its first stage without a "done" checkpoint (a failed stage is
+# retried, its failure cleared), and the cross-sectional stages after the
+# earliest of them run again. Symbols that only have stages after such a
+# cross-sectional stage left wait for its fan-out. Exits follow the ranking
+# because the cast-off rule reads the ranking that stage stores.
+
+INGEST = "ingest"
+VALIDATE = "validate"
+RESAMPLE = "resample"
+SIGNALS = "signals"
+RELATIVE_STRENGTH = "relative_strength"
+EXITS = "exits"
+PERFORMANCE = "performance"
+
+STAGES = (INGEST, VALIDATE, RESAMPLE, SIGNALS, RELATIVE_STRENGTH, EXITS, PERFORMANCE) # in run order
+INSTRUMENT_STAGES = (INGEST, RESAMPLE, SIGNALS)
+UNIVERSE_STAGES = (VALIDATE, RELATIVE_STRENGTH, EXITS, PERFORMANCE)
+UNIVERSE = "*" # symbol of the checkpoints of cross-sectional stages
+
+RUNNING, DONE, FAILED = "running", "done", "failed"
+COMPLETE = "complete"
+
+# A unit of work: (stage, symbol), with UNIVERSE as the symbol of cross-sectional stages
+Step = Tuple[str, str]
+
+
+def run_key_for(week_end: date) -> str:
+    return f"weekly:{week_end.isoformat()}"
+
+
+def latest_week_end(as_of: Optional[date] = None) -> date:
+    """
+    The last week end on or before `as_of` (default: today).
+    """
+    day = np.datetime64(as_of or date.today(), "D") - np.timedelta64(6, "D")
+    return resampling.week_ending(day, settings.WEEK_END_WEEKDAY).astype(object)
+
+
+def start_run(db: Session, symbols: Iterable[str], week_end: Optional[date] = None) -> Tuple[str, List[Step]]:
+    """
+    Starts the pipeline run of a week, or resumes it if it was started before.
+    Symbols not yet part of the run are added. Returns the run key and the
+    steps to execute first; none when the run is already complete.
+    """
+    run_key = run_key_for(week_end or latest_week_end())
+    run = repository.get_run(db, run_key)
+    if run is not None and run.status == COMPLETE:
+        return run_key, []
+    symbols = list(dict.fromkeys([*(run.symbols if run is not None else []), *symbols]))
+    started_at = run.started_at if run is not None else _now()
+    repository.save_run(db, run_key, symbols, RUNNING, started_at)
+
+    done = {(c.stage, c.symbol) for c in repository.get_checkpoints(db, run_key) if c.status == DONE}
+    pending = {}
+    for symbol in symbols:
+        stages = [stage for stage in INSTRUMENT_STAGES if (stage, symbol) not in done]
+        if stages:
+            pending[symbol] = stages[0]
+    if run is not None:
+        logger.info("pipeline_resumed", run_key=run_key, pending_symbols=len(pending))
+    # The run restarts at the earliest stage not done: a symbol's pending stage
+    # or an unfinished cross-sectional one
+    unfinished = [STAGES.index(stage) for stage in UNIVERSE_STAGES if (stage, UNIVERSE) not in done]
+    positions = [STAGES.index(stage) for stage in pending.values()] + unfinished
+    if not positions:
+        _finish_run(db, run_key)
+        return run_key, []
+    # The cross-sectional stages from there on have to see what the remaining
+    # symbols write; symbols beyond the first of them wait for its fan-out
+    rerun = [stage for stage in UNIVERSE_STAGES if STAGES.index(stage) >= min(positions)]
+    repository.delete_checkpoints(db, run_key, rerun)
+    # Cleared before the retries start, so a barrier never counts a retried symbol as settled
+    repository.delete_checkpoints(db, run_key, INSTRUMENT_STAGES, symbols=list(pending), status=FAILED)
+    steps = [(stage, symbol) for symbol, stage in pending.items() if STAGES.index(stage) < STAGES.index(rerun[0])]
+    if steps:
+        return run_key, steps
+    repository.claim_stage(db, run_key, rerun[0], UNIVERSE, _now())
+    return run_key, [(rerun[0], UNIVERSE)]
+
+
+def run_step(db: Session, run_key: str, stage: str, symbol: str) -> List[Step]:
+    """
+    Executes one step of a run and checkpoints it. Returns the steps it unlocks.
+    """
+    if stage in UNIVERSE_STAGES:
+        return run_universe_stage(db, run_key, stage)
+    return run_instrument_stage(db, run_key, stage, symbol)
+
+
+def run_instrument_stage(db: Session, run_key: str, stage: str, symbol: str) -> List[Step]:
+    """
+    Runs a per-symbol stage. A failure is recorded in the symbol's checkpoint
+    and stops that symbol only; the rest of the run carries on.
+    """
+    if _is_done(db, run_key, stage, symbol):
+        return [] # a redelivered message
+    ingested = None if stage == INGEST else repository.get_checkpoint(db, run_key, INGEST, symbol)
+    started_at, started = _now(), time.perf_counter()
+    try:
+        with metrics.span(f"pipeline.{stage}", symbol=symbol):
+            instrument_id, since = _INSTRUMENT_STAGES[stage](db, symbol, ingested)
+    except Exception as e:
+        db.rollback()
+        logger.warning("pipeline_stage_failed", run_key=run_key, stage=stage, symbol=symbol, error=str(e))
+        repository.save_checkpoint(
+            db, run_key, stage, symbol, FAILED, started_at, time.perf_counter() - started, error=str(e)
+        )
+        return _settle(db, run_key, _barrier_stage(stage))
+
+    repository.save_checkpoint(
+        db, run_key, stage, symbol, DONE, started_at, time.perf_counter() - started, instrument_id, since
+    )
+    following = STAGES[STAGES.index(stage) + 1]
+    if following in INSTRUMENT_STAGES:
+        return [(following, symbol)]
+    return _settle(db, run_key, stage)
+
+
+def run_universe_stage(db: Session, run_key: str, stage: str) -> List[Step]:
+    """
+    Runs a cross-sectional stage over the whole universe once every symbol has
+    settled at the barrier before it.
+    """
+    checkpoint = repository.get_checkpoint(db, run_key, stage, UNIVERSE)
+    if checkpoint is not None and checkpoint.status == DONE:
+        return []
+    started_at = checkpoint.started_at if checkpoint is not None else _now()
+    started = time.perf_counter()
+    try:
+        with metrics.span(f"pipeline.{stage}"):
+            _UNIVERSE_STAGES[stage](db)
+    except Exception as e:
+        db.rollback()
+        logger.warning("pipeline_stage_failed", run_key=run_key, stage=stage, error=str(e))
+        repository.save_checkpoint(
+            db, run_key, stage, UNIVERSE, FAILED, started_at, time.perf_counter() - started, error=str(e)
+        )
+        _finish_run(db, run_key)
+        return []
+
+    repository.save_checkpoint(db, run_key, stage, UNIVERSE, DONE, started_at, time.perf_counter() - started)
+    if stage == STAGES[-1]:
+        _finish_run(db, run_key)
+        return []
+    following = STAGES[STAGES.index(stage) + 1]
+    if following in INSTRUMENT_STAGES:
+        return _fan_out(db, run_key, following)
+    if repository.claim_stage(db, run_key, following, UNIVERSE, _now()):
+        return [(following, UNIVERSE)]
+    return []
+
+
+def run_locally(session_factory: Callable[[], Session], symbols: Iterable[str], week_end: Optional[date] = None) -> str:
+    """
+    Runs (or resumes) the pipeline in this process, one step at a time, without
+    a broker. Returns the run key.
+    """
+    db = session_factory()
+    try:
+        run_key, steps = start_run(db, symbols, week_end)
+    finally:
+        db.close()
+    queue = deque(steps)
+    while queue:
+        stage, symbol = queue.popleft()
+        db = session_factory()
+        try:
+            queue.extend(run_step(db, run_key, stage, symbol))
+        finally:
+            db.close()
+    return run_key
+
+
+def run_report(db: Session, run_key: str) -> schemas.RunReport:
+    """
+    Per-stage timings of a run and how much of the NFR-1 window it has used.
+    """
+    run = repository.get_run(db, run_key)
+    if run is None:
+        raise ValueError(f"No pipeline run {run_key}")
+    checkpoints = [c for c in repository.get_checkpoints(db, run_key) if c.status != RUNNING]
+    stages = {}
+    for stage in STAGES:
+        rows = [c for c in checkpoints if c.stage == stage]
+        if not rows:
+            continue
+        seconds = [c.seconds or 0.0 for c in rows]
+        finished = max(c.started_at + timedelta(seconds=s) for c, s in zip(rows, seconds))
+        stages[stage] = schemas.StageTiming(
+            completed=sum(c.status == DONE for c in rows),
+            failed=sum(c.status == FAILED for c in rows),
+            busy_seconds=sum(seconds),
+            max_seconds=max(seconds),
+            wall_seconds=(finished - min(c.started_at for c in rows)).total_seconds(),
+        )
+    elapsed = ((run.finished_at or _now()) - run.started_at).total_seconds()
+    deadline = settings.PIPELINE_DEADLINE_HOURS * 3600
+    return schemas.RunReport(
+        run_key=run_key,
+        status=run.status,
+        elapsed_seconds=elapsed,
+        deadline_seconds=deadline,
+        deadline_used=elapsed / deadline,
+        stages=stages,
+        failed_symbols={c.symbol: c.error or "" for c in checkpoints if c.status == FAILED},
+    )
+
+
+def _settle(db: Session, run_key: str, stage: str) -> List[Step]:
+    # A barrier: the cross-sectional stage after `stage` starts once every symbol finished `stage` or failed
+    run = repository.get_run(db, run_key)
+    settled = {
+        c.symbol for c in repository.get_checkpoints(db, run_key)
+        if c.status == FAILED or (c.stage == stage and c.status == DONE)
+    }
+    if not set(run.symbols) <= settled:
+        return []
+    following = STAGES[STAGES.index(stage) + 1]
+    if repository.claim_stage(db, run_key, following, UNIVERSE, _now()):
+        return [(following, UNIVERSE)]
+    return []
+
+
+def _fan_out(db: Session, run_key: str, stage: str) -> List[Step]:
+    # Every symbol that has not failed continues at its first stage from `stage` to the next barrier not done yet
+    phase = STAGES[STAGES.index(stage):STAGES.index(_barrier_stage(stage)) + 1]
+    checkpoints = repository.get_checkpoints(db, run_key)
+    failed = {c.symbol for c in checkpoints if c.status == FAILED}
+    done = {(c.stage, c.symbol) for c in checkpoints if c.status == DONE}
+    steps = []
+    for symbol in repository.get_run(db, run_key).symbols:
+        pending = [stage for stage in phase if (stage, symbol) not in done]
+        if pending and symbol not in failed:
+            steps.append((pending[0], symbol))
+    return steps or _settle(db, run_key, phase[-1])
+
+
+def _barrier_stage(stage: str) -> str:
+    # The last per-symbol stage before the barrier that follows `stage`
+    position = STAGES.index(stage)
+    while STAGES[position + 1] in INSTRUMENT_STAGES:
+        position += 1
+    return STAGES[position]
+
+
+def _is_done(db: Session, run_key: str, stage: str, symbol: str) -> bool:
+    checkpoint = repository.get_checkpoint(db, run_key, stage, symbol)
+    return checkpoint is not None and checkpoint.status == DONE
+
+
+def _finish_run(db: Session, run_key: str):
+    run = repository.get_run(db, run_key)
+    failed = any(c.status == FAILED for c in repository.get_checkpoints(db, run_key))
+    repository.save_run(db, run_key, run.symbols, FAILED if failed else COMPLETE, run.started_at, _now())
+    report = run_report(db, run_key)
+    logger.info(
+        "pipeline_finished", run_key=run_key, status=report.status,
+        elapsed_seconds=round(report.elapsed_seconds, 3), deadline_used=round(report.deadline_used, 4),
+        stage_wall_seconds={stage: round(timing.wall_seconds, 3) for stage, timing in report.stages.items()},
+        failed_symbols=sorted(report.failed_symbols),
+    )
+
+
+def _now() -> datetime:
+    # Naive UTC, as stored in the DateTime columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# --- Stages ---
+# Per-symbol stages get the symbol's ingest checkpoint (None for ingest itself)
+# and return (instrument_id, since) to record in their own checkpoint.
+
+def _ingest(db: Session, symbol: str, ingested: None) -> Tuple[Optional[int], Optional[date]]:
+    new_bars = market_data_service.ingest_data_for_symbol(db, symbol)
+    instrument = market_data_repository.get_instrument_by_symbol(db, symbol)
+    return (
+        instrument.id if instrument is not None else None,
+        min(bar.date for bar in new_bars) if new_bars else None,
+    )
+
+
+def _resample(db: Session, symbol: str, ingested: models.StageCheckpoint) -> Tuple[Optional[int], Optional[date]]:
+    if ingested.since is not None:
+        market_data_service.refresh_weekly_bars(db, {ingested.instrument_id: ingested.since})
+    return ingested.instrument_id, ingested.since
+
+
+def _signals(db: Session, symbol: str, ingested: models.StageCheckpoint) -> Tuple[Optional[int], Optional[date]]:
+    from app.features.signal_generation import service as signal_service # deferred: loads the signal engine
+
+    if ingested.since is not None:
+        # The completed weeks the resample stage recomputed; bars already folded into the state are skipped
+        first_week = resampling.week_starting(np.datetime64(ingested.since, "D"), settings.WEEK_END_WEEKDAY)
+        weekly = market_data_repository.load_weekly_bar_arrays(
+            db, [ingested.instrument_id], start_date=(first_week - np.timedelta64(7, "D")).astype(object),
+            completed_only=True,
+        )
+        signal_service.advance_signals(db, ingested.instrument_id, weekly)
+    return ingested.instrument_id, ingested.since
+
+
+def _validate(db: Session):
+    # Every instrument with bars not validated yet, against the sessions the universe traded
+    market_data_service.validate_universe(db)
+
+
+def _relative_strength(db: Session):
+    from app.features.signal_generation import service as signal_service
+
+    signal_service.update_relative_strength(db)
+
+
+def _exits(db: Session):
+    from app.features.portfolio_management import service as portfolio_service
+
+    portfolio_service.evaluate_exits(db)
+
+
+def _performance(db: Session):
+    from app.features.performance_analytics import service as performance_service
+
+    performance_service.refresh_performance(db)
+
+
+_INSTRUMENT_STAGES: Dict[str, Callable] = {
+    INGEST: _ingest, RESAMPLE: _resample, SIGNALS: _signals,
+}
+_UNIVERSE_STAGES: Dict[str, Callable[[Session], None]] = {
+    VALIDATE: _validate, RELATIVE_STRENGTH: _relative_strength, EXITS: _exits, PERFORMANCE: _performance,
+}
@@ -0,0 +1,51 @@
+from datetime import date
+from typing import List, Optional
+
+import dramatiq
+
+from . import service
+from app.core.broker import configure_broker
+from app.core.database import SessionLocal
+
+# Dramatiq actors running the weekly pipeline (see service.py for the graph).
+# Each message is one step; a step enqueues the steps it unlocks, so the
+# per-symbol stages spread over every worker on the "pipeline" queue.
+#
+#   dramatiq app.features.pipeline.tasks --processes 4 --threads 4
+
+configure_broker()
+
+QUEUE = "pipeline"
+
+
+@dramatiq.actor(queue_name=QUEUE, max_retries=3)
+def run_pipeline_step(run_key: str, stage: str, symbol: str):
+    """
+    Executes one step and enqueues the steps it unlocks. Stage errors are
+    checkpointed by the service; a retry only happens when that fails too
+    (e.g. the database is unreachable).
+    """
+    db = SessionLocal()
+    try:
+        steps = service.run_step(db, run_key, stage, symbol)
+    finally:
+        db.close()
+    enqueue(run_key, steps)
+
+
+@dramatiq.actor(queue_name=QUEUE, max_retries=3)
+def start_pipeline(symbols: List[str], week_end: Optional[str] = None):
+    """
+    Starts or resumes the run of a week (ISO date; default: the latest week end).
+    """
+    db = SessionLocal()
+    try:
+        run_key, steps = service.start_run(db, symbols, date.fromisoformat(week_end) if week_end else None)
+    finally:
+        db.close()
+    enqueue(run_key, steps)
+
+
+def enqueue(run_key: str, steps: List[service.Step]):
+    for stage, symbol in steps:
+        run_pipeline_step.send(run_key, stage, symbol)
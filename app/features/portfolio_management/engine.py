@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import schemas
+from app.features.backtesting.engine import CAST_OFF_EXIT, STOP_EXIT, TIME_EXIT
+
+# Exit reasons, in the order they are checked. The backtest's counter-signal exit
+# is not repeated here: the signal engine already stores the SELL signal itself.
+EXIT_REASONS = (STOP_EXIT, CAST_OFF_EXIT, TIME_EXIT)
+
+# Layered exits (docs/specs.md, section 6) for every open position at once.
+# Arrays are (n_positions, n_weeks) on a shared axis of week ends, one row per
+# position, so an instrument held twice simply appears twice. Nothing steps
+# through time: a short position's prices are negated, which turns both its
+# extreme price and its stop into running maxima, and a running maximum over
+# the whole window is one `fmax.accumulate` seeded with the state carried from
+# the previous evaluation. The rules match the backtest's: the stop is the
+# extreme since entry minus k x ATR, only ever tightened, and is hit by a close
+# through it; the cast-off fires once a position that reached the cast-off
+# percentile falls below it (mirrored for shorts); the time exit fires in the
+# `max_holding_weeks`-th week, counting the entry week as the first.
+
+
+@dataclass(frozen=True)
+class StopState:
+    """
+    Per-position state carried from one evaluation to the next. Prices are
+    actual prices (not negated); NaN and NaT mean not evaluated yet.
+    """
+    extreme: np.ndarray # highest high (LONG) or lowest low (SHORT) since entry
+    stop: np.ndarray
+    atr: np.ndarray # latest weekly ATR
+    reached_top: np.ndarray # bool
+    through: np.ndarray # datetime64[D], latest week folded in
+
+
+@dataclass(frozen=True)
+class ExitEvaluation:
+    state: StopState # after the last week evaluated
+    stops: np.ndarray # stop level at each week's close
+    exit_week: np.ndarray # column of the first week an exit triggered, -1 for none
+    exit_reason: np.ndarray # index into EXIT_REASONS, -1 for none
+
+
+def direction_sign(directions) -> np.ndarray:
+    """
+    +1 for LONG and -1 for SHORT positions.
+    """
+    return np.where(np.asarray(directions) == schemas.SHORT, -1.0, 1.0)
+
+
+def evaluate_exits(
+    dates: np.ndarray,
+    entry_week: np.ndarray,
+    sign: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    atr: np.ndarray,
+    percentiles: np.ndarray,
+    state: StopState,
+    params: schemas.ExitParameters,
+) -> ExitEvaluation:
+    """
+    Folds the completed weeks after `state.through` (from the entry week for a
+    new position) into every position's stop state and finds the first week an
+    exit triggers. `entry_week` is the week end of each entry date; a week
+    without a close for a position is skipped for it.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    if not len(dates):
+        none = np.full(len(sign), -1)
+        return ExitEvaluation(state=state, stops=np.empty((len(sign), 0)), exit_week=none, exit_reason=none)
+    first_week = np.where(np.isnat(state.through), entry_week, state.through + np.timedelta64(1, "D"))
+    active = (dates >= first_week[:, np.newaxis]) & np.isfinite(close)
+    s = sign[:, np.newaxis]
+
+    favourable = np.where(active, s * np.where(s > 0, high, low), np.nan)
+    extreme = _running_max(sign * state.extreme, favourable)
+    stops = _running_max(sign * state.stop, np.where(active, extreme - params.atr_multiplier * atr, np.nan))
+
+    cast_off = params.relative_strength.cast_off_percentile
+    strength = np.where(s > 0, percentiles, 100.0 - percentiles)
+    with np.errstate(invalid="ignore"):
+        reached_top = state.reached_top[:, np.newaxis] | np.logical_or.accumulate(active & (strength >= cast_off), axis=1)
+        weeks_held = (dates - entry_week[:, np.newaxis]).astype(np.int64) // 7 + 1
+        conditions = active & np.stack([
+            s * close < stops,
+            reached_top & (strength < cast_off),
+            weeks_held >= params.max_holding_weeks,
+        ])
+
+    triggered = conditions.any(axis=0)
+    has_exit = triggered.any(axis=1)
+    exit_week = np.where(has_exit, triggered.argmax(axis=1), -1)
+    rows = np.arange(len(sign))
+    exit_reason = np.where(has_exit, conditions[:, rows, np.maximum(exit_week, 0)].argmax(axis=0), -1)
+
+    last = _last_index(active)
+    new_state = StopState(
+        extreme=sign * _pick(extreme, last, sign * state.extreme),
+        stop=sign * _pick(stops, last, sign * state.stop),
+        atr=_pick(atr, _last_index(active & np.isfinite(atr)), state.atr),
+        reached_top=_pick(reached_top, last, state.reached_top),
+        through=_pick(np.broadcast_to(dates, active.shape), last, state.through),
+    )
+    return ExitEvaluation(state=new_state, stops=sign[:, np.newaxis] * stops, exit_week=exit_week, exit_reason=exit_reason)
+
+
+def live_stops(
+    sign: np.ndarray, state: StopState, high: np.ndarray, low: np.ndarray, params: schemas.ExitParameters
+) -> np.ndarray:
+    """
+    Stop levels including the week in progress: `high` and `low` hold each
+    position's daily bars since its last evaluated week (NaN elsewhere). The
+    week's ATR is only known once it completes, so the stored ATR is used.
+    """
+    favourable = np.where(sign[:, np.newaxis] > 0, high, low) * sign[:, np.newaxis]
+    week_so_far = np.fmax.reduce(favourable, axis=1, initial=-np.inf) # -inf where there are no bars yet
+    extreme = np.fmax(sign * state.extreme, np.where(np.isfinite(week_so_far), week_so_far, np.nan))
+    with np.errstate(invalid="ignore"):
+        return sign * np.fmax(sign * state.stop, extreme - params.atr_multiplier * state.atr)
+
+
+def _running_max(seed: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Running maximum along time starting from `seed`, skipping NaN.
+    """
+    return np.fmax.accumulate(np.hstack([seed[:, np.newaxis], values]), axis=1)[:, 1:]
+
+
+def _last_index(mask: np.ndarray) -> np.ndarray:
+    """
+    Column of the last True in each row, -1 for none.
+    """
+    return np.where(mask, np.arange(mask.shape[1]), -1).max(axis=1, initial=-1)
+
+
+def _pick(values: np.ndarray, columns: np.ndarray, fallback: np.ndarray) -> np.ndarray:
+    """
+    values[row, columns[row]] for every row, or `fallback` where the column is -1.
+    """
+    return np.where(columns >= 0, values[np.arange(len(columns)), np.maximum(columns, 0)], fallback)
@@ -0,0 +1,31 @@
+from sqlalchemy import Boolean, Column, Integer, String, Float, Date, ForeignKey, Index
+from app.core.database import Base
+from app.features.data_ingestion.models import Price
+
+class Position(Base):
+    """
+    A trade the user executed and recorded, with the trailing-stop state the
+    weekly exit evaluation carries forward while it is open.
+    """
+    __tablename__ = "positions"
+    __table_args__ = (
+        Index("idx_positions_instrument_id", "instrument_id"),
+        Index("idx_positions_status", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    instrument_id = Column(Integer, ForeignKey("instruments.id", ondelete="RESTRICT"), nullable=False)
+    entry_date = Column(Date, nullable=False)
+    exit_date = Column(Date)
+    entry_price = Column(Price, nullable=False)
+    exit_price = Column(Price)
+    size = Column(Price, nullable=False)
+    direction = Column(String(10), nullable=False) # LONG or SHORT
+    status = Column(String(10), nullable=False) # OPEN or CLOSED
+
+    # Stop state, as of the last completed week evaluated
+    extreme_price = Column(Float) # highest high (LONG) or lowest low (SHORT) since entry
+    stop_price = Column(Float) # ATR trailing stop; only ever tightened
+    atr = Column(Float) # ATR of that week, for live stop levels during the next one
+    reached_top = Column(Boolean, nullable=False, default=False) # has reached the cast-off percentile
+    evaluated_through = Column(Date) # latest week end folded into the state
@@ -0,0 +1,56 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+
+from . import models, schemas
+
+# --- Position Repository ---
+
+def create_position(db: Session, position: schemas.PositionCreate) -> models.Position:
+    """
+    Records a position the user opened.
+    """
+    db_position = models.Position(**position.model_dump(), reached_top=False)
+    db.add(db_position)
+    db.commit()
+    db.refresh(db_position)
+    return db_position
+
+
+def get_position(db: Session, position_id: int) -> Optional[models.Position]:
+    """
+    Retrieves a position by its id.
+    """
+    return db.get(models.Position, position_id)
+
+
+def get_positions(db: Session, status: Optional[str] = None) -> List[models.Position]:
+    """
+    Retrieves every position, optionally only those with the given status, in entry order.
+    """
+    query = db.query(models.Position)
+    if status is not None:
+        query = query.filter(models.Position.status == status)
+    return query.order_by(models.Position.entry_date, models.Position.id).all()
+
+
+def update_position(db: Session, db_position: models.Position, changes: schemas.PositionUpdate) -> models.Position:
+    """
+    Applies the fields set in `changes` (e.g. to close the position) and commits.
+    """
+    for field, value in changes.model_dump(exclude_unset=True).items():
+        setattr(db_position, field, value)
+    db.commit()
+    db.refresh(db_position)
+    return db_position
+
+
+def save_stop_states(db: Session, states: List[Dict[str, Any]]) -> int:
+    """
+    Writes the carried-forward stop state of many positions in one bulk UPDATE
+    by primary key; each dict holds "id" and the state columns. Does not commit,
+    so the state is written atomically with the exit signals it triggered.
+    """
+    if states:
+        db.execute(update(models.Position), states)
+    return len(states)
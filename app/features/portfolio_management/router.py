@@ -0,0 +1,46 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from . import repository, schemas
+from app.core.database import get_db
+
+router = APIRouter()
+
+
+@router.get("/positions/", response_model=List[schemas.Position])
+def list_positions(
+    status: Optional[str] = Query(None, pattern="^(OPEN|CLOSED)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Lists positions in entry order, optionally only the open or closed ones.
+    """
+    return repository.get_positions(db, status)
+
+
+@router.post("/positions/", response_model=schemas.Position, status_code=201)
+def create_position(position: schemas.PositionCreate, db: Session = Depends(get_db)):
+    return repository.create_position(db, position)
+
+
+@router.get("/positions/status", response_model=List[schemas.PositionStatus])
+def position_statuses(as_of: Optional[date] = None, db: Session = Depends(get_db)):
+    """
+    Live stop level and unrealised P&L of every open position, for the dashboard.
+    """
+    from . import service # deferred: loads the signal engine and the cache client
+
+    return service.position_statuses(db, as_of)
+
+
+@router.put("/positions/{position_id}", response_model=schemas.Position)
+def update_position(position_id: int, changes: schemas.PositionUpdate, db: Session = Depends(get_db)):
+    """
+    Updates a position, e.g. to record its exit and close it.
+    """
+    db_position = repository.get_position(db, position_id)
+    if db_position is None:
+        raise HTTPException(status_code=404, detail="Position not found")
+    return repository.update_position(db, db_position, changes)
@@ -0,0 +1,58 @@
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import Literal, Optional
+
+from app.features.signal_generation.schemas import RelativeStrengthParameters
+
+LONG, SHORT = "LONG", "SHORT"
+OPEN, CLOSED = "OPEN", "CLOSED"
+
+# Pydantic schema for Position
+class PositionBase(BaseModel):
+    instrument_id: int
+    entry_date: date
+    entry_price: float
+    size: float
+    direction: Literal["LONG", "SHORT"] = LONG
+
+class PositionCreate(PositionBase):
+    status: Literal["OPEN", "CLOSED"] = OPEN
+
+class PositionUpdate(BaseModel):
+    exit_date: Optional[date] = None
+    exit_price: Optional[float] = None
+    status: Optional[Literal["OPEN", "CLOSED"]] = None
+
+class Position(PositionBase):
+    id: int
+    exit_date: Optional[date] = None
+    exit_price: Optional[float] = None
+    status: str
+    stop_price: Optional[float] = None
+    evaluated_through: Optional[date] = None
+
+    class Config:
+        from_attributes = True
+
+# Live view of an open position for the dashboard
+class PositionStatus(BaseModel):
+    position_id: int
+    instrument_id: int
+    direction: str
+    entry_date: date
+    entry_price: float
+    size: float
+    mark_date: Optional[date] = None # date of the latest daily close
+    mark_price: Optional[float] = None
+    stop_price: Optional[float] = None # trailing stop including this week's bars so far
+    stop_distance: Optional[float] = None # fraction of the mark price left before the stop
+    unrealized_pnl: Optional[float] = None
+    return_pct: Optional[float] = None
+    weeks_held: int
+
+# Tunable parameters of the layered exit strategy (docs/specs.md, section 6)
+class ExitParameters(BaseModel):
+    relative_strength: RelativeStrengthParameters = Field(default_factory=RelativeStrengthParameters)
+    atr_period: int = 21
+    atr_multiplier: float = 3.0 # trailing stop distance from the extreme price since entry
+    max_holding_weeks: int = 4 # time-based safety exit
@@ -0,0 +1,182 @@
+from datetime import date
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import engine, models, repository, schemas
+from app.core import cache, metrics
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.data_ingestion.resampling import week_ending
+from app.features.signal_generation import indicators, repository as signal_repository
+from app.features.signal_generation import schemas as signal_schemas
+from app.features.signal_generation import service as signal_service
+
+logger = get_logger(__name__)
+
+EXIT_SIGNAL = "EXIT"
+
+# ATR is Wilder-smoothed, so the bar it is seeded with never drops out entirely.
+# After this many periods its weight is below 1e-5, so a window this long gives
+# the full-history ATR without loading the full history.
+ATR_WARMUP_PERIODS = 12
+
+# Daily bars loaded before the first unevaluated day, so every position has a
+# close to mark against even when its instrument has no new bars this week
+_MARK_LOOKBACK_DAYS = 14
+
+
+@metrics.timed("portfolio.exits")
+def evaluate_exits(
+    db: Session, week_end: Optional[date] = None, params: Optional[schemas.ExitParameters] = None
+) -> List[signal_schemas.SignalCreate]:
+    """
+    Advances the stop state of every open position through the completed weeks
+    up to `week_end` (default: the latest) and stores an EXIT signal, with the
+    exit reason, for each position whose exit triggered. One bar query and one
+    array evaluation cover all positions, and only weeks not yet folded into a
+    position's state are evaluated. Positions stay open: the signal is a
+    recommendation, and closing the position is up to the user.
+    """
+    params = params or schemas.ExitParameters()
+    positions = repository.get_positions(db, schemas.OPEN)
+    if not positions:
+        return []
+    ids, rows, sign, entry_week, state = _position_arrays(positions)
+
+    first_week = np.where(np.isnat(state.through), entry_week, state.through + np.timedelta64(1, "D")).min()
+    warmup = np.timedelta64(7 * ATR_WARMUP_PERIODS * params.atr_period, "D")
+    bars = market_data_repository.load_weekly_bar_arrays(
+        db, ids.tolist(), start_date=(first_week - warmup).astype(object), end_date=week_end, completed_only=True
+    )
+    _, dates, prices = bars.to_matrix(fields=("high", "low", "close"), instrument_ids=ids)
+    atr = indicators.atr(prices["high"], prices["low"], prices["close"], params.atr_period)
+    window = dates >= first_week
+    dates = dates[window]
+
+    evaluation = engine.evaluate_exits(
+        dates, entry_week, sign,
+        prices["high"][rows][:, window], prices["low"][rows][:, window], prices["close"][rows][:, window],
+        atr[rows][:, window], _percentiles(db, ids, dates, params)[rows], state, params,
+    )
+
+    exiting = np.flatnonzero(evaluation.exit_week >= 0)
+    signals = [
+        signal_schemas.SignalCreate(
+            instrument_id=positions[i].instrument_id, date=dates[evaluation.exit_week[i]].astype(object),
+            signal_type=EXIT_SIGNAL, reason=engine.EXIT_REASONS[evaluation.exit_reason[i]],
+        )
+        for i in exiting.tolist()
+    ]
+    new = evaluation.state
+    repository.save_stop_states(db, [
+        {
+            "id": position.id, "extreme_price": _optional(new.extreme[i]), "stop_price": _optional(new.stop[i]),
+            "atr": _optional(new.atr[i]), "reached_top": bool(new.reached_top[i]),
+            "evaluated_through": None if np.isnat(new.through[i]) else new.through[i].astype(object),
+        }
+        for i, position in enumerate(positions)
+    ])
+    signal_repository.upsert_signals(db, signals) # commits the stop state together with the signals
+    if signals:
+        cache.invalidate_instruments(sorted({s.instrument_id for s in signals}))
+    logger.info("exits_evaluated", positions=len(positions), weeks=len(dates), exits=len(signals))
+    return signals
+
+
+@metrics.timed("portfolio.status")
+def position_statuses(
+    db: Session, as_of: Optional[date] = None, params: Optional[schemas.ExitParameters] = None
+) -> List[schemas.PositionStatus]:
+    """
+    Live stop level and unrealised P&L of every open position, for the
+    dashboard: the stored stop state is tightened with the daily bars since the
+    last evaluated week, and positions are marked at their latest daily close.
+    Two queries (the positions and one batch of daily bars) whatever the number
+    of positions.
+    """
+    params = params or schemas.ExitParameters()
+    positions = repository.get_positions(db, schemas.OPEN)
+    if not positions:
+        return []
+    ids, rows, sign, entry_week, state = _position_arrays(positions)
+    entry_dates = np.array([p.entry_date for p in positions], dtype="datetime64[D]")
+    since = np.where(np.isnat(state.through), entry_dates, state.through + np.timedelta64(1, "D"))
+
+    start = since.min() - np.timedelta64(_MARK_LOOKBACK_DAYS, "D")
+    bars = market_data_repository.load_bar_arrays(db, ids.tolist(), start_date=start.astype(object), end_date=as_of)
+    _, days, prices = bars.to_matrix(fields=("high", "low", "close"), instrument_ids=ids)
+    unevaluated = days >= since[:, np.newaxis]
+    stops = engine.live_stops(
+        sign, state,
+        np.where(unevaluated, prices["high"][rows], np.nan), np.where(unevaluated, prices["low"][rows], np.nan), params,
+    )
+
+    # Mark at the latest close; a column of NaN keeps the lookup valid when no bars came back
+    close = np.hstack([prices["close"][rows], np.full((len(positions), 1), np.nan)])
+    last = np.where(np.isfinite(close), np.arange(close.shape[1]), -1).max(axis=1)
+    marks = close[np.arange(len(positions)), last]
+    entry_prices = np.array([p.entry_price for p in positions], dtype=float)
+    sizes = np.array([p.size for p in positions], dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pnl = sign * (marks - entry_prices) * sizes
+        returns = sign * (marks / entry_prices - 1.0)
+        distance = sign * (marks - stops) / marks
+    current_week = week_ending(np.datetime64(as_of or date.today(), "D"), settings.WEEK_END_WEEKDAY)
+    weeks_held = (current_week - entry_week).astype(np.int64) // 7 + 1
+
+    return [
+        schemas.PositionStatus(
+            position_id=p.id, instrument_id=p.instrument_id, direction=p.direction, entry_date=p.entry_date,
+            entry_price=p.entry_price, size=p.size,
+            mark_date=days[last[i]].astype(object) if last[i] >= 0 else None, mark_price=_optional(marks[i]),
+            stop_price=_optional(stops[i]), stop_distance=_optional(distance[i]),
+            unrealized_pnl=_optional(pnl[i]), return_pct=_optional(returns[i]), weeks_held=int(weeks_held[i]),
+        )
+        for i, p in enumerate(positions)
+    ]
+
+
+def _position_arrays(positions: Sequence[models.Position]):
+    """
+    Columnar view of positions: (instrument ids, row of each position in them,
+    direction signs, entry week ends, stored stop state). A position never
+    evaluated starts with its entry price as the extreme.
+    """
+    instrument_ids = np.array([p.instrument_id for p in positions], dtype=np.int64)
+    ids = np.unique(instrument_ids)
+    entry_prices = np.array([p.entry_price for p in positions], dtype=float)
+    extreme = np.array([p.extreme_price for p in positions], dtype=float)
+    state = engine.StopState(
+        extreme=np.where(np.isnan(extreme), entry_prices, extreme),
+        stop=np.array([p.stop_price for p in positions], dtype=float),
+        atr=np.array([p.atr for p in positions], dtype=float),
+        reached_top=np.array([bool(p.reached_top) for p in positions]),
+        through=np.array([p.evaluated_through for p in positions], dtype="datetime64[D]"),
+    )
+    entry_week = week_ending(np.array([p.entry_date for p in positions], dtype="datetime64[D]"), settings.WEEK_END_WEEKDAY)
+    sign = engine.direction_sign([p.direction for p in positions])
+    return ids, np.searchsorted(ids, instrument_ids), sign, entry_week, state
+
+
+def _percentiles(db: Session, ids: np.ndarray, dates: np.ndarray, params: schemas.ExitParameters) -> np.ndarray:
+    """
+    Relative-strength percentiles of `ids` on `dates`, NaN where not ranked.
+    The cached gauge holds the ranking of the last week it folded in, which the
+    weekly pipeline advances just before exits are evaluated.
+    """
+    percentiles = np.full((len(ids), len(dates)), np.nan)
+    ranking = signal_service.latest_relative_strength(db, params=params.relative_strength)
+    if not len(ranking.dates) or not len(ranking.instrument_ids):
+        return percentiles
+    columns = np.flatnonzero(dates == ranking.dates[-1])
+    ranked = np.minimum(np.searchsorted(ranking.instrument_ids, ids), len(ranking.instrument_ids) - 1)
+    found = ranking.instrument_ids[ranked] == ids
+    percentiles[np.ix_(np.flatnonzero(found), columns)] = ranking.percentiles[ranked[found], -1:]
+    return percentiles
+
+
+def _optional(value) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
@@ -0,0 +1,52 @@
+import numpy as np
+from datetime import date
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from . import repository, schemas
+from app.core import cache
+
+# Cached signal reads (the single-instrument pages of /signals/), keyed by
+# the instrument's cache version (bumped when signals or bars are written for
+# the instrument).
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def get_signals_for_instrument(
+    db: Session, instrument_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None
+) -> List[schemas.Signal]:
+    """
+    Cached `repository.get_signals_for_instrument`.
+    """
+    def load():
+        return [
+            schemas.Signal.model_validate(signal)
+            for signal in repository.get_signals_for_instrument(db, instrument_id, start_date, end_date)
+        ]
+
+    return cache.read_through(
+        "signals", cache.instrument_scope(instrument_id), f"{start_date}:{end_date}",
+        load, _encode_signals, _decode_signals,
+    )
+
+
+def _encode_signals(signals: List[schemas.Signal]) -> bytes:
+    return cache.pack_columns({
+        "id": np.array([s.id for s in signals], dtype=np.int64),
+        "instrument_id": np.array([s.instrument_id for s in signals], dtype=np.int64),
+        "date": (np.array([s.date for s in signals], dtype="datetime64[D]") - _EPOCH).astype(np.int32),
+        "signal_type": [s.signal_type for s in signals],
+        "reason": [s.reason for s in signals],
+    })
+
+
+def _decode_signals(payload: bytes) -> List[schemas.Signal]:
+    columns = cache.unpack_columns(payload)
+    dates = (_EPOCH + columns["date"].astype("timedelta64[D]")).astype(object)
+    return [
+        schemas.Signal.model_construct(id=id_, instrument_id=instrument_id, date=day, signal_type=signal_type, reason=reason)
+        for id_, instrument_id, day, signal_type, reason in zip(
+            columns["id"].tolist(), columns["instrument_id"].tolist(), dates, columns["signal_type"], columns["reason"]
+        )
+    ]
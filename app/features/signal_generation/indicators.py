@@ -0,0 +1,240 @@
+import numpy as np
+from typing import Dict
+
+from .schemas import SignalParameters
+
+# Every function works along the last axis (time) and is vectorised across any
+# leading axes, so a (n_instruments, n_bars) matrix is processed in one call.
+# Missing bars are NaN and never raise; indicator values are NaN until enough
+# observations exist.
+
+# Row order of the vote stack returned by `indicator_votes`
+INDICATOR_NAMES = ("MACD", "RSI", "Stochastic", "Candle/SMA", "Trend Force")
+
+BUY = 1
+SELL = -1
+
+# Keys of the mapping returned by `indicator_values`
+VALUE_NAMES = (
+    "macd_scaled", "rsi", "stoch_fast", "stoch_slow", "sma_high", "sma_low", "trend_fast", "trend_slow", "atr",
+)
+
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple moving average. Windows containing a NaN yield NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    pad = np.zeros(values.shape[:-1] + (1,))
+    sums = np.concatenate([pad, np.cumsum(np.where(valid, values, 0.0), axis=-1)], axis=-1)
+    counts = np.concatenate([pad, np.cumsum(valid, axis=-1)], axis=-1)
+
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return out
+    window_sums = sums[..., window:] - sums[..., :-window]
+    window_counts = counts[..., window:] - counts[..., :-window]
+    out[..., window - 1:] = np.where(window_counts == window, window_sums / window, np.nan)
+    return out
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling maximum over the trailing `window` bars.
+    """
+    return _rolling_reduce(values, window, np.max)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling minimum over the trailing `window` bars.
+    """
+    return _rolling_reduce(values, window, np.min)
+
+
+def _rolling_reduce(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+    out[..., window - 1:] = reducer(windows, axis=-1)
+    return out
+
+
+def ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Exponentially weighted mean seeded with the first observation.
+    The recursion runs over time only; each step is one array operation across
+    all leading axes. NaN bars produce NaN output and leave the average unchanged.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    state = np.full(values.shape[:-1], np.nan)
+    for t in range(values.shape[-1]):
+        x = values[..., t]
+        missing = np.isnan(x)
+        state = np.where(np.isnan(state), x, np.where(missing, state, state + alpha * (x - state)))
+        out[..., t] = np.where(missing, np.nan, state)
+    return out
+
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    Exponential moving average with the conventional alpha = 2 / (span + 1).
+    """
+    return _mask_warmup(ewm(values, 2.0 / (span + 1)), values, span)
+
+
+def _mask_warmup(result: np.ndarray, values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Blanks out values computed from fewer than `period` observations.
+    """
+    seen = np.cumsum(~np.isnan(np.asarray(values, dtype=float)), axis=-1)
+    return np.where(seen >= period, result, np.nan)
+
+
+def diff(values: np.ndarray) -> np.ndarray:
+    """
+    First difference, NaN for the first bar.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    out[..., 1:] = values[..., 1:] - values[..., :-1]
+    return out
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9):
+    """
+    Returns the MACD line, its signal line and the histogram.
+    """
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def normalize_0_100(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rescales values to 0-100 relative to their trailing `window` range.
+    """
+    low = rolling_min(values, window)
+    high = rolling_max(values, window)
+    span = high - low
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scaled = np.where(span > 0, 100.0 * (values - low) / span, 50.0)
+    return np.where(np.isnan(span), np.nan, scaled)
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Relative Strength Index using Wilder smoothing (alpha = 1 / period).
+    """
+    delta = diff(close)
+    avg_gain = ewm(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0)), 1.0 / period)
+    avg_loss = ewm(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0)), 1.0 / period)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = np.where(avg_loss > 0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss), 100.0)
+    value = np.where(np.isnan(avg_gain) | np.isnan(avg_loss), np.nan, value)
+    return _mask_warmup(value, delta, period)
+
+
+def full_stochastic(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14, smooth: int = 3):
+    """
+    Full Stochastic Slow. Returns (fast, slow): the smoothed %K ("FastStoch")
+    and its moving average %D ("SlowStoch").
+    """
+    lowest = rolling_min(low, period)
+    highest = rolling_max(high, period)
+    span = highest - lowest
+    with np.errstate(invalid="ignore", divide="ignore"):
+        raw_k = np.where(span > 0, 100.0 * (np.asarray(close, dtype=float) - lowest) / span, 50.0)
+    raw_k = np.where(np.isnan(span), np.nan, raw_k)
+    fast = sma(raw_k, smooth)
+    return fast, sma(fast, smooth)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    True range; the first bar falls back to high - low.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    prev_close = np.full(high.shape, np.nan)
+    prev_close[..., 1:] = np.asarray(close, dtype=float)[..., :-1]
+    # fmax skips the NaN gap terms on the first bar
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return np.where(np.isnan(high - low), np.nan, tr)
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 21) -> np.ndarray:
+    """
+    Average True Range using Wilder smoothing.
+    """
+    tr = true_range(high, low, close)
+    return _mask_warmup(ewm(tr, 1.0 / period), tr, period)
+
+
+def indicator_values(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, params: SignalParameters
+) -> Dict[str, np.ndarray]:
+    """
+    Computes every indicator series the composite rule and exits depend on,
+    keyed by VALUE_NAMES.
+    """
+    open_, high, low, close = (np.asarray(a, dtype=float) for a in (open_, high, low, close))
+    macd_line, _, _ = macd(close, params.macd_fast, params.macd_slow, params.macd_signal)
+    stoch_fast, stoch_slow = full_stochastic(high, low, close, params.stoch_period, params.stoch_smooth)
+    return {
+        "macd_scaled": normalize_0_100(macd_line, params.macd_norm_window),
+        "rsi": rsi(close, params.rsi_period),
+        "stoch_fast": stoch_fast,
+        "stoch_slow": stoch_slow,
+        "sma_high": sma(high, params.candle_sma_period),
+        "sma_low": sma(low, params.candle_sma_period),
+        "trend_fast": sma(close, params.trend_fast),
+        "trend_slow": sma(close, params.trend_slow),
+        "atr": atr(high, low, close, params.atr_period),
+    }
+
+
+def votes_from_values(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+    values: Dict[str, np.ndarray], params: SignalParameters,
+) -> np.ndarray:
+    """
+    Applies the per-indicator BUY/SELL thresholds to precomputed indicator values.
+    Works equally on whole series and on the scalars of a single new bar.
+    """
+    open_, high, low, close = (np.asarray(a, dtype=float) for a in (open_, high, low, close))
+    non_doji = np.abs(close - open_) > params.doji_body_ratio * (high - low)
+    stoch_fast, stoch_slow = values["stoch_fast"], values["stoch_slow"]
+
+    # NaN comparisons are False, so missing or warming-up values never vote.
+    buys = np.stack([
+        values["macd_scaled"] < params.macd_buy_below,
+        values["rsi"] < params.rsi_buy_below,
+        (stoch_fast < stoch_slow) & (stoch_fast < params.stoch_buy_below),
+        non_doji & (close > values["sma_high"]),
+        values["trend_fast"] > values["trend_slow"],
+    ])
+    sells = np.stack([
+        values["macd_scaled"] > params.macd_sell_above,
+        values["rsi"] > params.rsi_sell_above,
+        (stoch_fast > stoch_slow) & (stoch_fast > params.stoch_sell_above),
+        non_doji & (close < values["sma_low"]),
+        values["trend_fast"] < values["trend_slow"],
+    ])
+    return buys.astype(np.int8) * BUY + sells.astype(np.int8) * SELL
+
+
+def indicator_votes(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, params: SignalParameters
+) -> np.ndarray:
+    """
+    Evaluates the five composite entry indicators and returns an int8 array of
+    shape (5, *close.shape) holding BUY (+1), SELL (-1) or 0 per bar, in
+    INDICATOR_NAMES order.
+    """
+    values = indicator_values(open_, high, low, close, params)
+    return votes_from_values(open_, high, low, close, values, params)
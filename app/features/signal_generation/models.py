@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, JSON, LargeBinary, text
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class Signal(Base):
     __tablename__ = "signals"
+    __table_args__ = (
+        # One signal of each type per instrument per week; the conflict target for upserts.
+        # A unique index rather than a constraint, so the migration can add it to an existing table.
+        Index("uq_signals_instrument_date_type", "instrument_id", "date", "signal_type", unique=True),
+        Index("idx_signals_instrument_date", "instrument_id", text("date DESC")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     instrument_id = Column(Integer, ForeignKey("instruments.id"), nullable=False)
@@ -12,3 +18,37 @@ class Signal(Base):
     reason = Column(String)
 
     instrument = relationship("Instrument", back_populates="signals")
+
+class SignalRevision(Base):
+    """
+    Write counter per instrument, bumped in the same transaction as every write
+    to its signals, in-place reason updates included.
+    """
+    __tablename__ = "signal_revisions"
+
+    instrument_id = Column(Integer, ForeignKey("instruments.id"), primary_key=True)
+    revision = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, nullable=False) # naive UTC time of the latest write
+
+class IndicatorState(Base):
+    """
+    Rolling indicator state per instrument, so each run only processes new bars.
+    """
+    __tablename__ = "indicator_states"
+
+    instrument_id = Column(Integer, ForeignKey("instruments.id"), primary_key=True)
+    last_date = Column(Date, nullable=False) # latest bar folded into the state
+    params = Column(JSON, nullable=False) # SignalParameters the state was built with
+    state = Column(JSON, nullable=False)
+
+class RelativeStrengthState(Base):
+    """
+    Cached rolling relative-strength state per universe of instruments.
+    """
+    __tablename__ = "relative_strength_states"
+
+    universe_key = Column(String(40), primary_key=True) # relative_strength.universe_key of the instrument ids
+    instrument_ids = Column(JSON, nullable=False)
+    last_date = Column(Date, nullable=False) # latest week folded into the state
+    params = Column(JSON, nullable=False) # RelativeStrengthParameters the state was built with
+    state = Column(LargeBinary, nullable=False)
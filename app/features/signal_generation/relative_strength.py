@@ -0,0 +1,200 @@
+import hashlib
+import io
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .schemas import RelativeStrengthParameters
+
+# Relative Strength Gauge (docs/specs.md, section 4) for a whole universe.
+#
+# For every pair (i, j) the price ratio is taken in log space,
+# r_ij = log(close_i) - log(close_j), so its rolling mean and variance can be
+# assembled from per-pair rolling sums of log prices. Those sums are N x N
+# matrices updated by one rank-1 add and one rank-1 subtract per week, which
+# makes a new week O(N^2) for the full pairwise matrix instead of
+# O(N^2 * window). The z-scored ratio's change over `roc_period` weeks is the
+# ROC differential; an instrument's score is its mean ROC differential against
+# the rest of the universe, and instruments are ranked by that score.
+
+_RELATIVE_TOLERANCE = 1e-12
+
+
+@dataclass(frozen=True)
+class RelativeStrengthRanking:
+    """
+    Per-week relative-strength scores, ranks and percentiles.
+    Matrices have shape (n_instruments, n_weeks). Rank 1 is the strongest
+    instrument; rank 0 and NaN percentile mean not enough history to rank.
+    """
+    instrument_ids: np.ndarray # int64
+    dates: np.ndarray # datetime64[D]
+    scores: np.ndarray # float64, mean ROC differential against the universe
+    ranks: np.ndarray # int64
+    percentiles: np.ndarray # float64, 100 = strongest, 0 = weakest
+
+    def top_quartile(self, cast_off_percentile: float = 75.0) -> np.ndarray:
+        """
+        Boolean matrix of instruments at or above the cast-off percentile, i.e.
+        the ones the relative-strength retention rule keeps.
+        """
+        with np.errstate(invalid="ignore"):
+            return self.percentiles >= cast_off_percentile
+
+
+def rank_scores(scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ranks instruments by score within each week (column), descending.
+    Returns (ranks, percentiles); NaN scores get rank 0 and a NaN percentile.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    valid = np.isfinite(scores)
+    order = np.argsort(np.where(valid, -scores, np.inf), axis=0, kind="stable")
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    positions = np.broadcast_to(np.arange(1, scores.shape[0] + 1).reshape((-1,) + (1,) * (scores.ndim - 1)), scores.shape)
+    np.put_along_axis(ranks, order, positions, axis=0)
+    ranks[~valid] = 0
+
+    n_valid = valid.sum(axis=0)
+    percentiles = 100.0 * (n_valid - ranks) / np.maximum(n_valid - 1, 1)
+    percentiles[~valid] = np.nan
+    return ranks, percentiles
+
+
+def universe_key(instrument_ids: Sequence[int]) -> str:
+    """
+    Stable key for a set of instruments, used to store one gauge state per universe.
+    """
+    ids = ",".join(str(i) for i in sorted(int(i) for i in instrument_ids))
+    return hashlib.sha1(ids.encode()).hexdigest()
+
+
+class RelativeStrengthGauge:
+    """
+    Rolling pairwise relative-strength state for a fixed universe of instruments.
+    """
+
+    def __init__(self, instrument_ids: Sequence[int], params: RelativeStrengthParameters, state: Optional[bytes] = None):
+        self.instrument_ids = np.asarray(instrument_ids, dtype=np.int64)
+        self.params = params
+        n, w, k = len(self.instrument_ids), params.zscore_window, params.roc_period
+
+        # Ring buffers: the last `w` weeks of log closes and the last `k` z-score matrices
+        self.log_closes = np.full((n, w), np.nan)
+        self.position = 0
+        self.z_history = np.full((k, n, n), np.nan)
+        self.z_position = 0
+        self.last_date: Optional[date] = None
+        self.scores = np.full(n, np.nan) # scores of the last week folded in
+        if state is not None:
+            self._load(state)
+
+        self.zscores = np.full((n, n), np.nan) # latest z-scored log price ratio, per pair
+        self.roc = np.full((n, n), np.nan) # latest ROC differential, per pair
+        self._resync()
+
+    def update(self, week: date, closes: np.ndarray) -> np.ndarray:
+        """
+        Folds one week of closes (one per instrument, NaN if missing) into the
+        rolling sums and returns each instrument's relative-strength score.
+        """
+        w = self.params.zscore_window
+        new = np.log(np.asarray(closes, dtype=np.float64))
+        old = self.log_closes[:, self.position].copy()
+        self._accumulate(new, 1.0)
+        self._accumulate(old, -1.0)
+        self.log_closes[:, self.position] = new
+        self.position = (self.position + 1) % w
+        self.last_date = week
+        if self.position == 0:
+            # Re-derive the sums from the buffer once per window to stop rounding drift
+            self._resync()
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (self.sums - self.sums.T) / w
+            mean_square = (self.squares + self.squares.T - 2.0 * self.products) / w
+            variance = mean_square - mean * mean
+            ratio = new[:, np.newaxis] - new[np.newaxis, :]
+            # Variances at rounding-noise level (e.g. an instrument against itself) are undefined
+            defined = (self.counts == w) & (variance > _RELATIVE_TOLERANCE * (self.squares + self.squares.T) / w)
+            np.fill_diagonal(defined, False)
+            self.zscores = np.where(defined, (ratio - mean) / np.sqrt(variance), np.nan)
+
+        self.roc = self.zscores - self.z_history[self.z_position]
+        self.z_history[self.z_position] = self.zscores
+        self.z_position = (self.z_position + 1) % self.params.roc_period
+
+        # Mean ROC differential against every other instrument with a defined pair
+        defined = np.isfinite(self.roc)
+        counts = defined.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.scores = np.where(counts > 0, np.where(defined, self.roc, 0.0).sum(axis=1) / counts, np.nan)
+        return self.scores
+
+    def to_state(self) -> bytes:
+        """
+        Serialises the ring buffers; the rolling sums are rebuilt from them on load.
+        """
+        buffer = io.BytesIO()
+        np.savez(
+            buffer, log_closes=self.log_closes, z_history=self.z_history,
+            positions=np.array([self.position, self.z_position]), scores=self.scores,
+            last_date=np.array([self.last_date], dtype="datetime64[D]"),
+        )
+        return buffer.getvalue()
+
+    def _load(self, state: bytes):
+        with np.load(io.BytesIO(state)) as saved:
+            self.log_closes = saved["log_closes"]
+            self.z_history = saved["z_history"]
+            self.position, self.z_position = (int(p) for p in saved["positions"])
+            if "scores" in saved.files: # absent from states saved before the scores were kept
+                self.scores = saved["scores"]
+            last_date = saved["last_date"][0]
+            self.last_date = None if np.isnat(last_date) else last_date.astype(object)
+
+    def _accumulate(self, log_closes: np.ndarray, sign: float):
+        valid = np.isfinite(log_closes)
+        x = np.where(valid, log_closes, 0.0)
+        v = valid.astype(np.float64)
+        self.counts += sign * np.outer(v, v) # weeks where both instruments have a close
+        self.sums += sign * np.outer(x, v) # sum of log_i over those weeks
+        self.squares += sign * np.outer(x * x, v) # sum of log_i^2 over those weeks
+        self.products += sign * np.outer(x, x) # sum of log_i * log_j
+
+    def _resync(self):
+        valid = np.isfinite(self.log_closes)
+        x = np.where(valid, self.log_closes, 0.0)
+        v = valid.astype(np.float64)
+        self.counts = v @ v.T
+        self.sums = x @ v.T
+        self.squares = (x * x) @ v.T
+        self.products = x @ x.T
+
+
+def relative_strength(
+    instrument_ids: Sequence[int],
+    dates: np.ndarray,
+    close: np.ndarray,
+    params: Optional[RelativeStrengthParameters] = None,
+    gauge: Optional[RelativeStrengthGauge] = None,
+) -> Tuple[RelativeStrengthRanking, RelativeStrengthGauge]:
+    """
+    Computes relative-strength rankings for a (n_instruments, n_weeks) matrix of
+    weekly closes. Each week is one vectorised step over the full pairwise
+    matrix. Pass the `gauge` from a previous call to continue from its cached
+    sums; the returned gauge holds the state after the last week.
+    """
+    params = params or RelativeStrengthParameters()
+    gauge = gauge or RelativeStrengthGauge(instrument_ids, params)
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    scores = np.full((len(gauge.instrument_ids), len(dates)), np.nan)
+    for t, week in enumerate(dates.astype(object)):
+        scores[:, t] = gauge.update(week, close[:, t])
+    ranks, percentiles = rank_scores(scores)
+    ranking = RelativeStrengthRanking(
+        instrument_ids=gauge.instrument_ids, dates=dates, scores=scores, ranks=ranks, percentiles=percentiles
+    )
+    return ranking, gauge
@@ -0,0 +1,259 @@
+import functools
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from datetime import date, datetime, timezone
+
+from . import models, schemas
+
+# Keyset pagination key of signals: (instrument_id, date, id)
+SignalKey = Tuple[int, date, int]
+
+# Signals per INSERT ... ON CONFLICT statement; a whole week of a large universe fits in one
+_UPSERT_BATCH_SIZE = 5_000
+_SIGNAL_KEY_COLUMNS = ["instrument_id", "date", "signal_type"]
+
+# --- Signal Repository ---
+
+def create_signals(db: Session, signals: List[schemas.SignalCreate]) -> List[models.Signal]:
+    """
+    Bulk creates signal records.
+    """
+    db_signals = [models.Signal(**signal.model_dump()) for signal in signals]
+    db.add_all(db_signals)
+    _bump_signal_revisions(db, {signal.instrument_id for signal in signals})
+    db.commit()
+    return db_signals
+
+
+def upsert_signals(db: Session, signals: List[schemas.SignalCreate]) -> int:
+    """
+    Idempotently writes signals: a signal whose (instrument_id, date, signal_type)
+    is already stored only has its reason updated, so re-running a week never
+    duplicates rows. Commits, together with anything else pending in the session.
+    Returns the number of distinct signals written.
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement; keep the last duplicate
+    rows = list({(s.instrument_id, s.date, s.signal_type): s.model_dump() for s in signals}.values())
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    for start in range(0, len(rows), _UPSERT_BATCH_SIZE):
+        stmt = dialect_insert(models.Signal).values(rows[start:start + _UPSERT_BATCH_SIZE])
+        db.execute(stmt.on_conflict_do_update(index_elements=_SIGNAL_KEY_COLUMNS, set_={"reason": stmt.excluded.reason}))
+    _bump_signal_revisions(db, {row["instrument_id"] for row in rows})
+    db.commit()
+    return len(rows)
+
+
+def _bump_signal_revisions(db: Session, instrument_ids: Iterable[int]) -> None:
+    """
+    Advances the write counter of each instrument, within the caller's transaction.
+    """
+    ids = sorted(set(instrument_ids))
+    if not ids:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    db.execute(
+        _revision_upsert(db.get_bind().dialect.name),
+        [{"instrument_id": instrument_id, "revision": 1, "updated_at": now} for instrument_id in ids],
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _revision_upsert(dialect_name: str):
+    # Built once per dialect, against the table, as for market data revisions
+    table = models.SignalRevision.__table__
+    stmt = (postgresql.insert if dialect_name == "postgresql" else sqlite.insert)(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.instrument_id],
+        set_={"revision": table.c.revision + 1, "updated_at": stmt.excluded.updated_at},
+    )
+
+
+def get_latest_signals(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    instrument_ids: Optional[Sequence[int]] = None,
+    signal_types: Optional[Sequence[str]] = None,
+) -> List[models.Signal]:
+    """
+    Returns the most recent signal of every instrument within the date range
+    (e.g. the current week), ordered by instrument, in a single query: signals
+    are ranked per instrument by a row_number() window over the
+    (instrument_id, date DESC) index and only the first of each is kept.
+    """
+    s = models.Signal
+    rank = func.row_number().over(partition_by=s.instrument_id, order_by=(s.date.desc(), s.id.desc())).label("rank")
+    conditions = _signal_filters(instrument_ids, start_date, end_date, None)
+    if signal_types is not None:
+        conditions.append(s.signal_type.in_(list(signal_types)))
+    ranked = select(s.id, rank).where(*conditions).subquery()
+    return (
+        db.query(s).join(ranked, s.id == ranked.c.id).filter(ranked.c.rank == 1)
+        .order_by(s.instrument_id).all()
+    )
+
+
+def get_signal_history(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    instrument_ids: Optional[Sequence[int]] = None,
+    signal_types: Optional[Sequence[str]] = None,
+) -> List[models.Signal]:
+    """
+    Retrieves the signals of many instruments within a date range, ordered by
+    (instrument_id, date) so the query is served by the composite index.
+    """
+    s = models.Signal
+    conditions = _signal_filters(instrument_ids, start_date, end_date, None)
+    if signal_types is not None:
+        conditions.append(s.signal_type.in_(list(signal_types)))
+    return db.query(s).filter(*conditions).order_by(s.instrument_id, s.date, s.signal_type).all()
+
+
+def get_signals_for_instrument(
+    db: Session, instrument_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None
+) -> List[models.Signal]:
+    """
+    Retrieves signals for a specific instrument, optionally filtered by a date range.
+    """
+    query = db.query(models.Signal).filter(models.Signal.instrument_id == instrument_id)
+    if start_date:
+        query = query.filter(models.Signal.date >= start_date)
+    if end_date:
+        query = query.filter(models.Signal.date <= end_date)
+    return query.order_by(models.Signal.date.asc()).all()
+
+
+def get_signals_marker(
+    db: Session, instrument_ids: Optional[Sequence[int]] = None
+) -> Tuple[Tuple[int, int], Optional[datetime]]:
+    """
+    Returns ((count, sum of write counters), time of the latest write) over the
+    instruments' (default: all) signal revisions. The pair changes with every
+    write to their signals, including a reason rewritten in place.
+    """
+    rev = models.SignalRevision
+    query = db.query(func.count(rev.instrument_id), func.coalesce(func.sum(rev.revision), 0), func.max(rev.updated_at))
+    if instrument_ids is not None:
+        query = query.filter(rev.instrument_id.in_(list(instrument_ids)))
+    count, total, updated_at = query.one()
+    return (count, int(total)), updated_at
+
+
+def find_signal_page_end(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    after: Optional[SignalKey] = None,
+    limit: int = 10_000,
+) -> Tuple[Optional[SignalKey], bool]:
+    """
+    Locates the last signal of the page of `limit` signals after the `after` key.
+    Returns (last key of the page or None if the page is empty, whether more signals follow).
+    """
+    s = models.Signal
+    query = select(s.instrument_id, s.date, s.id).where(*_signal_filters(instrument_ids, start_date, end_date, after))
+    rows = db.execute(query.order_by(s.instrument_id, s.date, s.id).offset(limit - 1).limit(2)).all()
+    if rows:
+        return tuple(rows[0]), len(rows) > 1
+    last = db.execute(query.order_by(s.instrument_id.desc(), s.date.desc(), s.id.desc()).limit(1)).first()
+    return (tuple(last) if last else None), False
+
+
+def iter_signal_batches(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    after: Optional[SignalKey] = None,
+    until: Optional[SignalKey] = None,
+    batch_size: int = 5_000,
+) -> Iterator[List[Tuple[int, date, int, str, Optional[str]]]]:
+    """
+    Yields (instrument_id, date, id, signal_type, reason) rows with keys in
+    (after, until], in batches of at most `batch_size` keyset-paginated rows.
+    """
+    s = models.Signal
+    while True:
+        query = select(s.instrument_id, s.date, s.id, s.signal_type, s.reason).where(
+            *_signal_filters(instrument_ids, start_date, end_date, after)
+        )
+        if until is not None:
+            query = query.where(tuple_(s.instrument_id, s.date, s.id) <= tuple_(*until))
+        batch = db.execute(query.order_by(s.instrument_id, s.date, s.id).limit(batch_size)).all()
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        after = tuple(batch[-1][:3])
+
+
+def _signal_filters(instrument_ids, start_date, end_date, after) -> list:
+    s = models.Signal
+    conditions = []
+    if instrument_ids is not None:
+        conditions.append(s.instrument_id.in_(list(instrument_ids)))
+    if start_date:
+        conditions.append(s.date >= start_date)
+    if end_date:
+        conditions.append(s.date <= end_date)
+    if after is not None:
+        conditions.append(tuple_(s.instrument_id, s.date, s.id) > tuple_(*after))
+    return conditions
+
+
+# --- Indicator State Repository ---
+
+def get_indicator_state(db: Session, instrument_id: int) -> Optional[models.IndicatorState]:
+    """
+    Retrieves the persisted streaming indicator state for an instrument.
+    """
+    return db.get(models.IndicatorState, instrument_id)
+
+
+def save_indicator_state(
+    db: Session, instrument_id: int, last_date: date, params: Dict[str, Any], state: Dict[str, Any]
+) -> models.IndicatorState:
+    """
+    Inserts or replaces the streaming indicator state for an instrument.
+    Does not commit, so the state can be written atomically with its signals.
+    """
+    db_state = db.get(models.IndicatorState, instrument_id)
+    if db_state is None:
+        db_state = models.IndicatorState(instrument_id=instrument_id)
+        db.add(db_state)
+    db_state.last_date = last_date
+    db_state.params = params
+    db_state.state = state
+    return db_state
+
+
+# --- Relative Strength State Repository ---
+
+def get_relative_strength_state(db: Session, universe_key: str) -> Optional[models.RelativeStrengthState]:
+    """
+    Retrieves the cached relative-strength state for a universe.
+    """
+    return db.get(models.RelativeStrengthState, universe_key)
+
+
+def save_relative_strength_state(
+    db: Session, universe_key: str, instrument_ids: List[int], last_date: date, params: Dict[str, Any], state: bytes
+) -> models.RelativeStrengthState:
+    """
+    Inserts or replaces the cached relative-strength state for a universe.
+    Does not commit.
+    """
+    db_state = db.get(models.RelativeStrengthState, universe_key)
+    if db_state is None:
+        db_state = models.RelativeStrengthState(universe_key=universe_key)
+        db.add(db_state)
+    db_state.instrument_ids = instrument_ids
+    db_state.last_date = last_date
+    db_state.params = params
+    db_state.state = state
+    return db_state
@@ -0,0 +1,122 @@
+import numpy as np
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import repository, schemas
+from app.core import conditional, streaming
+from app.core.config import settings
+from app.core.database import get_db, get_session_factory
+from app.core.responses import STREAM_BATCH_SIZE, parse_cursor, streaming_response
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.data_ingestion.resampling import week_ending
+
+router = APIRouter()
+
+
+@router.get("/signals/latest/", response_model=List[schemas.Signal])
+def latest_signals(
+    week_end: Optional[date] = None,
+    instrument_id: Optional[List[int]] = Query(None),
+    signal_type: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    The latest signal of every instrument within the week ending on `week_end`
+    (by default the current week), for the weekly review screen. One query for
+    the whole universe.
+    """
+    end = week_end or week_ending(np.datetime64(date.today(), "D"), settings.WEEK_END_WEEKDAY).astype(object)
+    return repository.get_latest_signals(
+        db, start_date=end - timedelta(days=6), end_date=end, instrument_ids=instrument_id, signal_types=signal_type
+    )
+
+
+@router.get("/signals/")
+def stream_signals(
+    request: Request,
+    instrument_id: Optional[List[int]] = Query(None),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100_000, ge=1, le=1_000_000),
+    format: str = Query("ndjson", pattern="^(ndjson|columnar)$"),
+    db: Session = Depends(get_db),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+):
+    """
+    Streams signals ordered by (instrument_id, date, id), paginated and
+    conditional in the same way as /market-data/. The validators follow the
+    signal and market data write counters of the requested instruments, so
+    any write to either (historical rewrites included) revalidates. A single
+    instrument's signals are read through the cache.
+    """
+    after = parse_cursor(cursor, (int, date, int)) if cursor else None
+    signals_marker, signals_modified = repository.get_signals_marker(db, instrument_id)
+    bars_marker, bars_modified = market_data_repository.get_market_data_marker(db, instrument_id)
+    last_modified = max([m for m in (signals_modified, bars_modified) if m is not None], default=None)
+    etag = conditional.make_etag(
+        "signals", sorted(instrument_id or []), start_date, end_date, after, limit, format, signals_marker, bars_marker,
+    )
+    headers = conditional.validator_headers(etag, last_modified)
+    if conditional.is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    if instrument_id is not None and len(set(instrument_id)) == 1:
+        return _stream_cached_signals(
+            db, session_factory, instrument_id[0], start_date, end_date, after, limit, format, headers
+        )
+
+    until, has_more = repository.find_signal_page_end(db, instrument_id, start_date, end_date, after, limit)
+    if has_more:
+        headers["X-Next-Cursor"] = streaming.encode_cursor(until)
+
+    def batches(session: Session) -> Iterator[dict]:
+        if until is None:
+            return
+        for rows in repository.iter_signal_batches(
+            session, instrument_id, start_date, end_date, after, until, STREAM_BATCH_SIZE
+        ):
+            instrument_ids, dates, ids, signal_types, reasons = zip(*rows)
+            yield {
+                "id": list(ids), "instrument_id": list(instrument_ids),
+                "date": np.array(dates, dtype="datetime64[D]"),
+                "signal_type": list(signal_types), "reason": [reason or "" for reason in reasons],
+            }
+
+    return streaming_response(session_factory, batches, format, headers)
+
+
+def _stream_cached_signals(
+    db: Session,
+    session_factory: Callable[[], Session],
+    instrument_id: int,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    after: Optional[Tuple[int, date, int]],
+    limit: int,
+    format: str,
+    headers: Dict[str, str],
+):
+    """
+    One page of an instrument's signals, sliced from its cached window.
+    """
+    from . import cache # deferred: the cache pulls in the Redis client, which the app imports lazily
+
+    signals = sorted(cache.get_signals_for_instrument(db, instrument_id, start_date, end_date), key=lambda s: (s.date, s.id))
+    if after is not None:
+        signals = [s for s in signals if (s.instrument_id, s.date, s.id) > tuple(after)]
+    if len(signals) > limit:
+        signals = signals[:limit]
+        headers["X-Next-Cursor"] = streaming.encode_cursor([instrument_id, signals[-1].date, signals[-1].id])
+
+    def batches(session: Session) -> Iterator[Dict[str, Any]]:
+        for start in range(0, len(signals), STREAM_BATCH_SIZE):
+            chunk = signals[start:start + STREAM_BATCH_SIZE]
+            yield {
+                "id": [s.id for s in chunk], "instrument_id": [s.instrument_id for s in chunk],
+                "date": np.array([s.date for s in chunk], dtype="datetime64[D]"),
+                "signal_type": [s.signal_type for s in chunk], "reason": [s.reason or "" for s in chunk],
+            }
+
+    return streaming_response(session_factory, batches, format, headers)
@@ -17,3 +17,31 @@ class Signal(SignalBase):
 
     class Config:
         from_attributes = True
+
+# Tunable parameters for the composite entry signal (docs/specs.md, section 3)
+class SignalParameters(BaseModel):
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    macd_norm_window: int = 52 # MACD line is rescaled to 0-100 over this many bars
+    macd_buy_below: float = 25.0
+    macd_sell_above: float = 75.0
+    rsi_period: int = 14
+    rsi_buy_below: float = 30.0
+    rsi_sell_above: float = 70.0
+    stoch_period: int = 14
+    stoch_smooth: int = 3
+    stoch_buy_below: float = 25.0
+    stoch_sell_above: float = 75.0
+    candle_sma_period: int = 10
+    doji_body_ratio: float = 0.1 # body <= ratio * range counts as a doji
+    trend_fast: int = 20
+    trend_slow: int = 50
+    alignment_window: int = 3 # weeks within which all five indicators must agree
+    atr_period: int = 21 # used by the ATR trailing stop
+
+# Tunable parameters for the Relative Strength Gauge (docs/specs.md, sections 4 and 6.2)
+class RelativeStrengthParameters(BaseModel):
+    zscore_window: int = 26 # weeks over which each price ratio is z-scored
+    roc_period: int = 4 # weeks over which the z-score's rate of change is taken
+    cast_off_percentile: float = 75.0 # positions are kept while at or above this percentile
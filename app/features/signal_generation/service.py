@@ -0,0 +1,278 @@
+import math
+import numpy as np
+from datetime import date, timedelta
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import indicators, relative_strength, repository, schemas
+from .streaming import StreamingIndicators
+from app.core import cache, metrics
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.data_ingestion.columnar import BarArrays
+
+# Entry signal types written to the signals table
+BUY_SIGNAL = "BUY"
+SELL_SIGNAL = "SELL"
+
+
+def composite_entry_signals(votes: np.ndarray, window: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Applies the composite entry rule to a vote stack from `indicators.indicator_votes`.
+    A BUY fires when every indicator voted BUY within the trailing `window` bars
+    and none voted SELL in that window (and vice versa for SELL). Only the first
+    bar of each qualifying run is flagged, so a setup produces one signal.
+    Returns boolean (buy, sell) arrays shaped like a single indicator's votes.
+    """
+    buy_seen = _seen_within(votes == indicators.BUY, window)
+    sell_seen = _seen_within(votes == indicators.SELL, window)
+
+    buy = buy_seen.all(axis=0) & ~sell_seen.any(axis=0)
+    sell = sell_seen.all(axis=0) & ~buy_seen.any(axis=0)
+    return _rising_edge(buy), _rising_edge(sell)
+
+
+def _seen_within(flags: np.ndarray, window: int) -> np.ndarray:
+    """
+    True where `flags` was set on this bar or any of the previous `window - 1` bars.
+    """
+    counts = np.cumsum(flags, axis=-1)
+    lagged = np.zeros_like(counts)
+    lagged[..., window:] = counts[..., :-window]
+    return (counts - lagged) > 0
+
+
+def _rising_edge(flags: np.ndarray) -> np.ndarray:
+    previous = np.zeros_like(flags)
+    previous[..., 1:] = flags[..., :-1]
+    return flags & ~previous
+
+
+@metrics.timed("signals.compute")
+def generate_signals(
+    instrument_ids: Sequence[int],
+    dates: np.ndarray,
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    params: Optional[schemas.SignalParameters] = None,
+) -> List[schemas.SignalCreate]:
+    """
+    Computes composite entry signals for many instruments at once.
+    Price arrays are (n_instruments, n_bars) weekly bars aligned on `dates`
+    (datetime64[D] or date objects), with NaN where an instrument has no bar.
+    """
+    params = params or schemas.SignalParameters()
+    votes = indicators.indicator_votes(open_, high, low, close, params)
+    buy, sell = composite_entry_signals(votes, params.alignment_window)
+    return signals_from_flags(instrument_ids, dates, buy, sell, params.alignment_window)
+
+
+def signals_from_flags(
+    instrument_ids: Sequence[int], dates: np.ndarray, buy: np.ndarray, sell: np.ndarray, window: int = 3
+) -> List[schemas.SignalCreate]:
+    """
+    Converts (n_instruments, n_bars) boolean signal flags into SignalCreate rows.
+    """
+    day_dates = np.asarray(dates, dtype="datetime64[D]").astype(object)
+    ids = np.asarray(instrument_ids)
+    signals = []
+    for signal_type, flags in ((BUY_SIGNAL, buy), (SELL_SIGNAL, sell)):
+        reason = f"Composite {signal_type}: {', '.join(indicators.INDICATOR_NAMES)} aligned within {window} weeks"
+        rows, cols = np.nonzero(flags)
+        signals.extend(
+            schemas.SignalCreate(instrument_id=int(ids[r]), date=day_dates[c], signal_type=signal_type, reason=reason)
+            for r, c in zip(rows, cols)
+        )
+    signals.sort(key=lambda s: (s.date, s.instrument_id))
+    return signals
+
+
+@metrics.timed("signals.universe")
+def generate_signals_for_universe(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    params: Optional[schemas.SignalParameters] = None,
+) -> List[schemas.SignalCreate]:
+    """
+    Full batch computation: loads the completed weekly bars of many instruments in
+    one columnar query and evaluates the composite rule for all of them at once.
+    Instruments quarantined by data validation are left out.
+    """
+    quarantined = market_data_repository.get_quarantined_instrument_ids(db, instrument_ids)
+    bars = market_data_repository.load_weekly_bar_arrays(db, instrument_ids, start_date, end_date, completed_only=True)
+    bars = bars.take(~np.isin(bars.instrument_ids, quarantined))
+    if instrument_ids is not None:
+        instrument_ids = [i for i in instrument_ids if i not in quarantined]
+    ids, dates, prices = bars.to_matrix(instrument_ids=instrument_ids)
+    return generate_signals(ids, dates, prices["open"], prices["high"], prices["low"], prices["close"], params)
+
+
+@metrics.timed("signals.advance")
+def advance_signals(
+    db: Session, instrument_id: int, new_bars: BarArrays, params: Optional[schemas.SignalParameters] = None
+) -> List[schemas.SignalCreate]:
+    """
+    Folds newly completed weekly bars into the instrument's persisted indicator
+    state and stores any composite signals they trigger. Cost is O(new bars), not
+    O(history). When no usable state exists yet (first run, or parameters changed),
+    the state is rebuilt once by replaying the stored weekly history; signals are
+    still only emitted for the new bars.
+    An instrument quarantined by data validation gets no signals and its state
+    is not advanced; the weeks it missed are replayed once it is cleared.
+    """
+    params = params or schemas.SignalParameters()
+    new_bars = new_bars.for_instrument(instrument_id)
+    if not len(new_bars):
+        return []
+    if market_data_repository.get_quarantined_instrument_ids(db, [instrument_id]):
+        return []
+    first_new_date = new_bars.dates[0].astype(object)
+
+    db_state = repository.get_indicator_state(db, instrument_id)
+    if db_state is not None and db_state.params == params.model_dump():
+        stream = StreamingIndicators(params, db_state.state)
+        if first_new_date > stream.last_date + timedelta(days=7):
+            # Weeks were skipped (e.g. during a quarantine): catch up from the stored bars
+            bars = market_data_repository.load_weekly_bar_arrays(
+                db, [instrument_id], start_date=stream.last_date + timedelta(days=1),
+                end_date=new_bars.dates[-1].astype(object), completed_only=True,
+            )
+        else:
+            bars = new_bars.take(new_bars.dates > np.datetime64(stream.last_date, "D"))
+    else:
+        stream = StreamingIndicators(params)
+        bars = market_data_repository.load_weekly_bar_arrays(
+            db, [instrument_id], end_date=new_bars.dates[-1].astype(object), completed_only=True
+        )
+    if not len(bars):
+        return []
+
+    buy_dates, sell_dates = [], []
+    for bar_date, open_, high, low, close in zip(
+        bars.dates.astype(object), bars.open.tolist(), bars.high.tolist(), bars.low.tolist(), bars.close.tolist()
+    ):
+        buy, sell = stream.update(bar_date, open_, high, low, close)
+        if bar_date >= first_new_date:
+            if buy:
+                buy_dates.append(bar_date)
+            if sell:
+                sell_dates.append(bar_date)
+
+    signals = _signals_for_dates(instrument_id, buy_dates, sell_dates, params.alignment_window)
+    repository.save_indicator_state(db, instrument_id, stream.last_date, params.model_dump(), stream.to_state())
+    repository.upsert_signals(db, signals) # commits the state together with the signals
+    if signals:
+        cache.invalidate_instruments([instrument_id])
+    return signals
+
+
+def _signals_for_dates(
+    instrument_id: int, buy_dates: List[date], sell_dates: List[date], window: int
+) -> List[schemas.SignalCreate]:
+    dates = sorted(set(buy_dates) | set(sell_dates))
+    day_dates = np.array(dates, dtype="datetime64[D]")
+    buy = np.isin(day_dates, np.array(buy_dates, dtype="datetime64[D]"))[np.newaxis, :]
+    sell = np.isin(day_dates, np.array(sell_dates, dtype="datetime64[D]"))[np.newaxis, :]
+    return signals_from_flags([instrument_id], day_dates, buy, sell, window)
+
+
+def verify_indicator_state(
+    db: Session, instrument_id: int, params: Optional[schemas.SignalParameters] = None
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Verification mode: recomputes every indicator over the full weekly history with
+    the batch engine and compares the last values with the persisted streaming
+    state. Returns {name: (streaming, batch)} for each value that disagrees; an
+    empty dict means the state is consistent.
+    """
+    params = params or schemas.SignalParameters()
+    db_state = repository.get_indicator_state(db, instrument_id)
+    if db_state is None:
+        return {}
+    bars = market_data_repository.load_weekly_bar_arrays(
+        db, [instrument_id], end_date=db_state.last_date, completed_only=True
+    )
+    batch = indicators.indicator_values(bars.open, bars.high, bars.low, bars.close, params)
+    streamed = StreamingIndicators(params, db_state.state).values
+
+    mismatches = {}
+    for name in indicators.VALUE_NAMES:
+        expected = float(batch[name][-1])
+        actual = streamed.get(name, math.nan)
+        both_missing = math.isnan(expected) and math.isnan(actual)
+        if not both_missing and not math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9):
+            mismatches[name] = (actual, expected)
+    return mismatches
+
+
+@metrics.timed("signals.relative_strength")
+def update_relative_strength(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    params: Optional[schemas.RelativeStrengthParameters] = None,
+) -> relative_strength.RelativeStrengthRanking:
+    """
+    Advances the cached Relative Strength Gauge of a universe (default: every
+    instrument with completed weekly bars) and returns the rankings of the weeks
+    it folded in. Only weeks that every instrument has completed are folded, so
+    an instrument ingested late does not leave a permanent gap. The state is
+    rebuilt from the full weekly history on the first run or when the universe
+    or parameters change.
+    """
+    params = params or schemas.RelativeStrengthParameters()
+    latest = market_data_repository.get_latest_weekly_dates(
+        db, list(instrument_ids) if instrument_ids is not None else None
+    )
+    ids = sorted(int(i) for i in (instrument_ids if instrument_ids is not None else latest))
+    key = relative_strength.universe_key(ids)
+
+    db_state = repository.get_relative_strength_state(db, key)
+    if db_state is not None and db_state.params == params.model_dump():
+        gauge = relative_strength.RelativeStrengthGauge(ids, params, db_state.state)
+        start_date = db_state.last_date + timedelta(days=1)
+    else:
+        gauge, start_date = None, None
+
+    if latest:
+        bars = market_data_repository.load_weekly_bar_arrays(
+            db, ids, start_date=start_date, end_date=min(latest.values()), completed_only=True
+        )
+    else:
+        bars = BarArrays.empty()
+    _, dates, prices = bars.to_matrix(fields=("close",), instrument_ids=ids)
+    ranking, gauge = relative_strength.relative_strength(ids, dates, prices["close"], params, gauge)
+    if len(dates):
+        repository.save_relative_strength_state(
+            db, key, ids, gauge.last_date, params.model_dump(), gauge.to_state()
+        )
+        db.commit()
+    return ranking
+
+
+def latest_relative_strength(
+    db: Session,
+    instrument_ids: Optional[Sequence[int]] = None,
+    params: Optional[schemas.RelativeStrengthParameters] = None,
+) -> relative_strength.RelativeStrengthRanking:
+    """
+    The ranking of the last week folded into a universe's cached gauge (default
+    universe as in `update_relative_strength`), read from the stored state without
+    loading any bars. Has no weeks when the gauge was not built with `params`.
+    """
+    params = params or schemas.RelativeStrengthParameters()
+    if instrument_ids is None:
+        instrument_ids = market_data_repository.get_latest_weekly_dates(db)
+    ids = sorted(int(i) for i in instrument_ids)
+    db_state = repository.get_relative_strength_state(db, relative_strength.universe_key(ids))
+    if db_state is None or db_state.params != params.model_dump():
+        scores, dates = np.empty((len(ids), 0)), np.empty(0, dtype="datetime64[D]")
+    else:
+        gauge = relative_strength.RelativeStrengthGauge(ids, params, db_state.state)
+        scores, dates = gauge.scores[:, np.newaxis], np.array([gauge.last_date], dtype="datetime64[D]")
+    ranks, percentiles = relative_strength.rank_scores(scores)
+    return relative_strength.RelativeStrengthRanking(
+        instrument_ids=np.asarray(ids, dtype=np.int64), dates=dates, scores=scores, ranks=ranks, percentiles=percentiles
+    )
@@ -0,0 +1,215 @@
+import math
+from collections import deque
+from datetime import date
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import indicators
+from .schemas import SignalParameters
+
+# Incremental counterpart of `indicators.indicator_values` / `indicator_votes`
+# for a single instrument. Each bar costs O(longest window), independent of
+# history length, and the state round-trips through plain JSON so it can be
+# persisted between weekly runs. The recursions and warm-up rules mirror the
+# batch functions exactly, which is what `service.verify_indicator_state`
+# checks.
+
+
+class _Ewm:
+    """
+    Exponentially weighted mean seeded with the first observation, plus the
+    number of observations seen (for warm-up masking).
+    """
+
+    def __init__(self, alpha: float, value: Optional[float] = None, count: int = 0):
+        self.alpha = alpha
+        self.value = value
+        self.count = count
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        self.count += 1
+        return self.value
+
+    def masked(self, period: int) -> float:
+        return self.value if self.value is not None and self.count >= period else math.nan
+
+
+class _Window:
+    """
+    Fixed-length ring buffer of the most recent values.
+    """
+
+    def __init__(self, size: int, values: Optional[List[Optional[float]]] = None):
+        self.values: Deque[float] = deque(
+            (math.nan if v is None else v for v in (values or [])), maxlen=size
+        )
+
+    def push(self, x: float):
+        self.values.append(x)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.values.maxlen and not any(math.isnan(v) for v in self.values)
+
+    def mean(self, last: Optional[int] = None) -> float:
+        items = list(self.values)[-last:] if last else list(self.values)
+        if len(items) < (last or self.values.maxlen) or any(math.isnan(v) for v in items):
+            return math.nan
+        return sum(items) / len(items)
+
+    def max(self) -> float:
+        return max(self.values) if self.full else math.nan
+
+    def min(self) -> float:
+        return min(self.values) if self.full else math.nan
+
+    def dump(self) -> List[Optional[float]]:
+        return [None if math.isnan(v) else v for v in self.values]
+
+
+class StreamingIndicators:
+    """
+    Rolling indicator and composite-signal state for one instrument.
+    """
+
+    def __init__(self, params: SignalParameters, state: Optional[Dict[str, Any]] = None):
+        self.params = params
+        state = state or {}
+        ewm = state.get("ewm", {})
+        windows = state.get("windows", {})
+        p = params
+
+        self.last_date: Optional[date] = date.fromisoformat(state["last_date"]) if state.get("last_date") else None
+        self.prev_close: Optional[float] = state.get("prev_close")
+
+        self.ema_fast = _Ewm(2.0 / (p.macd_fast + 1), *ewm.get("ema_fast", (None, 0)))
+        self.ema_slow = _Ewm(2.0 / (p.macd_slow + 1), *ewm.get("ema_slow", (None, 0)))
+        self.avg_gain = _Ewm(1.0 / p.rsi_period, *ewm.get("avg_gain", (None, 0)))
+        self.avg_loss = _Ewm(1.0 / p.rsi_period, *ewm.get("avg_loss", (None, 0)))
+        self.atr = _Ewm(1.0 / p.atr_period, *ewm.get("atr", (None, 0)))
+
+        self.macd_lines = _Window(p.macd_norm_window, windows.get("macd_lines"))
+        self.stoch_highs = _Window(p.stoch_period, windows.get("stoch_highs"))
+        self.stoch_lows = _Window(p.stoch_period, windows.get("stoch_lows"))
+        self.raw_k = _Window(p.stoch_smooth, windows.get("raw_k"))
+        self.fast_k = _Window(p.stoch_smooth, windows.get("fast_k"))
+        self.candle_highs = _Window(p.candle_sma_period, windows.get("candle_highs"))
+        self.candle_lows = _Window(p.candle_sma_period, windows.get("candle_lows"))
+        self.closes = _Window(max(p.trend_fast, p.trend_slow), windows.get("closes"))
+
+        # Votes of the last `alignment_window` bars and the previous composite flags
+        self.recent_votes: Deque[List[int]] = deque(state.get("recent_votes", []), maxlen=p.alignment_window)
+        self.prev_buy: bool = state.get("prev_buy", False)
+        self.prev_sell: bool = state.get("prev_sell", False)
+        self.values: Dict[str, float] = {
+            name: (math.nan if v is None else v) for name, v in state.get("values", {}).items()
+        }
+
+    def update(self, bar_date: date, open_: float, high: float, low: float, close: float) -> Tuple[bool, bool]:
+        """
+        Advances the state by one bar and returns the composite (buy, sell) flags
+        for that bar.
+        """
+        p = self.params
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        macd_line = (
+            fast - slow if self.ema_fast.count >= p.macd_fast and self.ema_slow.count >= p.macd_slow else math.nan
+        )
+        self.macd_lines.push(macd_line)
+        low_macd, high_macd = self.macd_lines.min(), self.macd_lines.max()
+        if math.isnan(low_macd):
+            macd_scaled = math.nan
+        elif high_macd > low_macd:
+            macd_scaled = 100.0 * (macd_line - low_macd) / (high_macd - low_macd)
+        else:
+            macd_scaled = 50.0
+
+        if self.prev_close is None:
+            rsi = math.nan
+            true_range = high - low
+        else:
+            delta = close - self.prev_close
+            gain = self.avg_gain.update(max(delta, 0.0))
+            loss = self.avg_loss.update(max(-delta, 0.0))
+            rsi = 100.0 - 100.0 / (1.0 + gain / loss) if loss > 0 else 100.0
+            if self.avg_gain.count < p.rsi_period:
+                rsi = math.nan
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.atr.update(true_range)
+
+        self.stoch_highs.push(high)
+        self.stoch_lows.push(low)
+        highest, lowest = self.stoch_highs.max(), self.stoch_lows.min()
+        if math.isnan(highest):
+            raw_k = math.nan
+        elif highest > lowest:
+            raw_k = 100.0 * (close - lowest) / (highest - lowest)
+        else:
+            raw_k = 50.0
+        self.raw_k.push(raw_k)
+        stoch_fast = self.raw_k.mean()
+        self.fast_k.push(stoch_fast)
+
+        self.candle_highs.push(high)
+        self.candle_lows.push(low)
+        self.closes.push(close)
+
+        self.values = {
+            "macd_scaled": macd_scaled,
+            "rsi": rsi,
+            "stoch_fast": stoch_fast,
+            "stoch_slow": self.fast_k.mean(),
+            "sma_high": self.candle_highs.mean(),
+            "sma_low": self.candle_lows.mean(),
+            "trend_fast": self.closes.mean(p.trend_fast),
+            "trend_slow": self.closes.mean(p.trend_slow),
+            "atr": self.atr.masked(p.atr_period),
+        }
+        self.prev_close = close
+        self.last_date = bar_date
+
+        votes = indicators.votes_from_values(
+            open_, high, low, close, {k: np.float64(v) for k, v in self.values.items()}, p
+        )
+        self.recent_votes.append([int(v) for v in votes])
+        window = np.array(self.recent_votes)
+        buy_seen = (window == indicators.BUY).any(axis=0)
+        sell_seen = (window == indicators.SELL).any(axis=0)
+        buy_now = bool(buy_seen.all() and not sell_seen.any())
+        sell_now = bool(sell_seen.all() and not buy_seen.any())
+
+        buy, sell = buy_now and not self.prev_buy, sell_now and not self.prev_sell
+        self.prev_buy, self.prev_sell = buy_now, sell_now
+        return buy, sell
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        Serialises the state to JSON-compatible types (NaN becomes None).
+        """
+        return {
+            "last_date": self.last_date.isoformat() if self.last_date else None,
+            "prev_close": self.prev_close,
+            "ewm": {
+                name: [e.value, e.count]
+                for name, e in (
+                    ("ema_fast", self.ema_fast), ("ema_slow", self.ema_slow), ("avg_gain", self.avg_gain),
+                    ("avg_loss", self.avg_loss), ("atr", self.atr),
+                )
+            },
+            "windows": {
+                name: w.dump()
+                for name, w in (
+                    ("macd_lines", self.macd_lines), ("stoch_highs", self.stoch_highs),
+                    ("stoch_lows", self.stoch_lows), ("raw_k", self.raw_k), ("fast_k", self.fast_k),
+                    ("candle_highs", self.candle_highs), ("candle_lows", self.candle_lows),
+                    ("closes", self.closes),
+                )
+            },
+            "recent_votes": [list(v) for v in self.recent_votes],
+            "prev_buy": self.prev_buy,
+            "prev_sell": self.prev_sell,
+            "values": {name: None if math.isnan(v) else v for name, v in self.values.items()},
+        }
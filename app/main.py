@@ -1,18 +1,31 @@
-from fastapi import FastAPI
-from app.core.logging import setup_logging
-from app.core.database import engine, Base
-from app.features.data_ingestion.models import Instrument, MarketData
-from app.features.signal_generation.models import Signal
+from contextlib import asynccontextmanager
 
-# Create all tables
-# In a real application, you would use Alembic for migrations
-Base.metadata.create_all(bind=engine)
+from fastapi import FastAPI, Response
+from app.core import metrics
+from app.core.logging import setup_logging
+from app.core.database import dispose_engine, get_engine
+from app.features.charting.router import router as charting_router
+from app.features.data_ingestion.router import router as data_ingestion_router
+from app.features.performance_analytics.router import router as performance_analytics_router
+from app.features.portfolio_management.router import router as portfolio_management_router
+from app.features.signal_generation.router import router as signal_generation_router
 
-app = FastAPI()
+# Tables are created by the migration step (`python -m scripts.migrate_database`),
+# not on import; the engine and its pool are set up when the application starts.
 
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     setup_logging()
+    get_engine()
+    yield
+    dispose_engine()
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(data_ingestion_router)
+app.include_router(signal_generation_router)
+app.include_router(charting_router)
+app.include_router(portfolio_management_router)
+app.include_router(performance_analytics_router)
 
 @app.get("/")
 def read_root():
@@ -21,3 +34,11 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """
+    Stage timings, database statement counts and durations, cache outcomes and
+    rows written, in the Prometheus text format.
+    """
+    return Response(metrics.render_prometheus(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,296 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+from unittest import mock
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.logging import setup_logging
+from app.core.migrations import load_models, run_migrations
+from app.features.data_ingestion import models, repository, resampling, schemas, service
+from app.features.signal_generation import service as signal_service
+
+from . import synthetic
+
+# Timings of the hot paths of the weekly pipeline on synthetic data, for
+# universes of several sizes, compared against a stored baseline.
+#
+# Every universe size gets a freshly created schema; each path is run
+# `repeats` times and its best time is kept, the least noisy estimate of what
+# the code costs. A path regresses when it is slower than its baseline by more
+# than `threshold` (relative) and `min_delta` seconds (absolute, so that
+# millisecond-scale timings do not fail on scheduler noise).
+#
+#     python -m benchmarks.run_benchmarks                       # SQLite, compare
+#     python -m benchmarks.run_benchmarks --update-baseline     # record a new baseline
+#     python -m benchmarks.run_benchmarks --database-url postgresql+psycopg2://.../bench --allow-reset
+#
+# Timings depend on the machine: record the baseline on the machine that runs
+# the comparison.
+
+PATHS = (
+    "bulk_create_market_data",
+    "bulk_upsert_market_data",
+    "get_market_data_for_instrument",
+    "load_bar_arrays",
+    "resample_weekly",
+    "generate_signals",
+    "ingest_data_for_symbol",
+)
+DEFAULT_SIZES = (10, 100, 1000)
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+# Sessions held back from the initial load and delivered by the ingestion benchmark
+INGEST_SESSIONS = 5
+
+
+def backend_name(database_url: str) -> str:
+    return make_url(database_url).get_backend_name()
+
+
+def prepare_database(database_url: str, allow_reset: bool = False) -> Engine:
+    """
+    Creates an engine and an empty schema. Dropping the tables of anything but
+    SQLite needs `allow_reset`: point the benchmark at a scratch database.
+    """
+    sqlite = backend_name(database_url) == "sqlite"
+    if not sqlite and not allow_reset:
+        raise ValueError(f"Refusing to drop the tables of {make_url(database_url).render_as_string()} without allow_reset")
+    engine = create_engine(database_url, connect_args={"check_same_thread": False} if sqlite else {})
+    load_models()
+    Base.metadata.drop_all(bind=engine)
+    run_migrations(engine)
+    return engine
+
+
+def best_time(run: Callable[[], object], repeats: int, setup: Optional[Callable[[], object]] = None) -> float:
+    """
+    Fastest of `repeats` timed calls of `run`; `setup` runs untimed before each.
+    """
+    best = math.inf
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def benchmark_universe(engine: Engine, n_instruments: int, years: float, repeats: int = 3, seed: int = 0) -> Dict[str, Dict]:
+    """
+    Times every path in PATHS for `n_instruments` instruments with `years` of
+    daily bars. Returns {path: {"seconds": best time, "rows": rows processed}}.
+    """
+    bars = synthetic.generate_bars(n_instruments, years, gap_probability=0.01, outages=1, seed=seed)
+    ids = bars.unique_instrument_ids().tolist()
+    symbols = {f"SYN{instrument_id:05d}": instrument_id for instrument_id in ids}
+    days = np.unique(bars.dates)
+    cutoff, last_day = days[-INGEST_SESSIONS - 1], days[-1].astype(object)
+    history = bars.take(bars.dates <= cutoff)
+    rows = [
+        schemas.MarketDataCreate(instrument_id=i, date=d, open=o, high=h, low=l, close=c, volume=v)
+        for i, d, o, h, l, c, v in zip(
+            history.instrument_ids.tolist(), history.dates.astype(object), history.open.tolist(),
+            history.high.tolist(), history.low.tolist(), history.close.tolist(), history.volume.tolist(),
+        )
+    ]
+    read_start, read_end = days[len(days) // 4].astype(object), days[3 * len(days) // 4].astype(object)
+
+    db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    results = {}
+
+    def record(path: str, seconds: float, n_rows: int):
+        results[path] = {"seconds": round(seconds, 6), "rows": int(n_rows)}
+
+    def delete_bars(after=None):
+        query = db.query(models.MarketData)
+        if after is not None:
+            query = query.filter(models.MarketData.date > after)
+        query.delete(synchronize_session=False)
+        db.commit()
+        db.expunge_all()
+
+    try:
+        db.add_all([
+            models.Instrument(id=instrument_id, symbol=symbol, name=symbol, asset_class="Synthetic")
+            for symbol, instrument_id in symbols.items()
+        ])
+        db.commit()
+
+        # Ingestion: ORM inserts into an empty table, then the idempotent upsert over the same rows
+        record("bulk_create_market_data", best_time(
+            lambda: repository.bulk_create_market_data(db, rows), repeats, setup=delete_bars,
+        ), len(rows))
+        db.expunge_all()
+        record("bulk_upsert_market_data", best_time(
+            lambda: repository.bulk_upsert_market_data(db, rows), repeats,
+        ), len(rows))
+
+        # Range reads over the middle half of the history
+        def read_each_instrument():
+            count = sum(len(repository.get_market_data_for_instrument(db, i, read_start, read_end)) for i in ids)
+            db.expunge_all()
+            return count
+        record("get_market_data_for_instrument", best_time(read_each_instrument, repeats), read_each_instrument())
+        record("load_bar_arrays", best_time(
+            lambda: repository.load_bar_arrays(db, None, read_start, read_end), repeats,
+        ), len(repository.load_bar_arrays(db, None, read_start, read_end)))
+
+        # Weekly bars and composite signals for the whole universe
+        record("resample_weekly", best_time(
+            lambda: resampling.resample_weekly(history, settings.WEEK_END_WEEKDAY), repeats,
+        ), len(history))
+        weekly, _, complete = resampling.resample_weekly(history, settings.WEEK_END_WEEKDAY)
+        weekly = weekly.take(complete)
+        matrix_ids, dates, prices = weekly.to_matrix()
+        record("generate_signals", best_time(
+            lambda: signal_service.generate_signals(
+                matrix_ids, dates, prices["open"], prices["high"], prices["low"], prices["close"],
+            ), repeats,
+        ), len(weekly))
+
+        # A daily run: every symbol fetches its last sessions from a stubbed provider and upserts them
+        def fetch(symbol, start_date=None):
+            return synthetic.provider_bars(bars, symbols[symbol], start_date)
+
+        def ingest_all():
+            latest = repository.get_latest_market_data_dates(db)
+            with mock.patch.object(service, "fetch_data_from_source", fetch), contextlib.redirect_stdout(io.StringIO()):
+                for symbol in symbols:
+                    service.ingest_data_for_symbol(db, symbol, latest_dates=latest, as_of=last_day)
+        record("ingest_data_for_symbol", best_time(
+            ingest_all, repeats, setup=lambda: delete_bars(after=cutoff.astype(object)),
+        ), len(bars) - len(history))
+    finally:
+        db.close()
+    return results
+
+
+def run_suite(
+    database_url: Optional[str] = None,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    years: float = 1.0,
+    repeats: int = 3,
+    allow_reset: bool = False,
+    seed: int = 0,
+) -> Dict:
+    """
+    Benchmarks every universe size on a fresh schema. Without a database URL a
+    temporary SQLite file is used.
+    """
+    previous_cache = settings.CACHE_ENABLED
+    settings.CACHE_ENABLED = False # time the database paths, not Redis
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            url = database_url or f"sqlite:///{Path(scratch) / 'benchmark.db'}"
+            by_size = {}
+            for n_instruments in sizes:
+                engine = prepare_database(url, allow_reset)
+                try:
+                    by_size[str(n_instruments)] = benchmark_universe(engine, n_instruments, years, repeats, seed)
+                finally:
+                    engine.dispose()
+    finally:
+        settings.CACHE_ENABLED = previous_cache
+    return {"years": years, "results": {backend_name(url): by_size}}
+
+
+def find_regressions(current: Dict, baseline: Dict, threshold: float = 0.25, min_delta: float = 0.01) -> List[str]:
+    """
+    Paths slower than their baseline by more than `threshold` (relative) and
+    `min_delta` seconds. Paths, sizes or backends absent from the baseline are
+    not compared.
+    """
+    if baseline.get("years") != current.get("years"):
+        raise ValueError(f"Baseline covers {baseline.get('years')} years, this run {current.get('years')}")
+    regressions = []
+    for backend, by_size in current["results"].items():
+        for size, paths in by_size.items():
+            for path, result in paths.items():
+                reference = baseline.get("results", {}).get(backend, {}).get(size, {}).get(path)
+                if reference is None:
+                    continue
+                seconds, limit = result["seconds"], reference["seconds"] * (1 + threshold)
+                if seconds > limit and seconds - reference["seconds"] > min_delta:
+                    regressions.append(
+                        f"{backend} {size} instruments {path}: {seconds:.4f}s vs baseline {reference['seconds']:.4f}s "
+                        f"(+{seconds / reference['seconds'] - 1:.0%})"
+                    )
+    return regressions
+
+
+def merge_baseline(baseline: Dict, current: Dict) -> Dict:
+    """
+    The baseline updated with this run's results, keeping other backends and sizes.
+    """
+    if baseline.get("years") != current["years"]:
+        baseline = {}
+    merged = {"years": current["years"], "results": {k: dict(v) for k, v in baseline.get("results", {}).items()}}
+    for backend, by_size in current["results"].items():
+        merged["results"].setdefault(backend, {}).update(by_size)
+    return merged
+
+
+def format_report(current: Dict, baseline: Optional[Dict] = None) -> str:
+    lines = [f"{'backend':<10}{'size':>6}  {'path':<32}{'seconds':>10}{'us/row':>10}{'baseline':>10}"]
+    for backend, by_size in current["results"].items():
+        for size, paths in by_size.items():
+            for path, result in paths.items():
+                reference = ((baseline or {}).get("results", {}).get(backend, {}).get(size, {}).get(path) or {}).get("seconds")
+                per_row = 1e6 * result["seconds"] / result["rows"] if result["rows"] else float("nan")
+                lines.append(
+                    f"{backend:<10}{size:>6}  {path:<32}{result['seconds']:>10.4f}{per_row:>10.2f}"
+                    f"{'' if reference is None else format(reference, '.4f'):>10}"
+                )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the ingestion, read and signal hot paths on synthetic data.")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark. Defaults to a temporary SQLite file.")
+    parser.add_argument(
+        "--allow-reset", action="store_true",
+        help="Allow dropping and recreating the tables of a non-SQLite database. Use a scratch database."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Universe sizes to benchmark.")
+    parser.add_argument("--years", type=float, default=1.0, help="Years of daily bars per instrument.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per path; the fastest is kept.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline results file.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown against the baseline.")
+    parser.add_argument("--min-delta", type=float, default=0.01, help="Slowdowns below this many seconds are ignored.")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run's results into the baseline file.")
+    args = parser.parse_args()
+    setup_logging()
+    # Spans are still timed and filtered, as in production, but not printed
+    logging.getLogger().setLevel(logging.WARNING)
+
+    try:
+        current = run_suite(args.database_url, args.sizes, args.years, args.repeats, args.allow_reset)
+    except ValueError as e:
+        parser.error(str(e))
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    print(format_report(current, baseline))
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(merge_baseline(baseline or {}, current), indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+    elif baseline is not None:
+        regressions = find_regressions(current, baseline, args.threshold, args.min_delta)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
@@ -0,0 +1,90 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.features.data_ingestion.columnar import BarArrays
+
+# Deterministic synthetic OHLCV history for benchmarks and tests.
+#
+# Closes follow a geometric random walk per instrument; open, high and low are
+# drawn around it so every bar satisfies low <= open/close <= high. Sessions
+# are weekdays. Gaps are whole missing sessions: single days dropped at random
+# with `gap_probability`, plus `outages` runs of several consecutive sessions
+# per instrument, the pattern the data validation step looks for. The same
+# arguments always produce the same bars.
+
+DEFAULT_START = date(2015, 1, 5) # a Monday
+SESSIONS_PER_YEAR = 252
+
+
+def trading_days(start: date, n_sessions: int) -> np.ndarray:
+    """
+    The first `n_sessions` weekdays on or after `start`, as datetime64[D].
+    """
+    first = np.busday_offset(np.datetime64(start, "D"), 0, roll="forward")
+    return np.busday_offset(first, np.arange(n_sessions))
+
+
+def generate_bars(
+    n_instruments: int,
+    years: float = 1.0,
+    start: date = DEFAULT_START,
+    gap_probability: float = 0.0,
+    outages: int = 0,
+    outage_sessions: int = 5,
+    first_instrument_id: int = 1,
+    seed: int = 0,
+) -> BarArrays:
+    """
+    Daily bars for instruments `first_instrument_id` onwards, `years` of
+    sessions each, starting at `start`. Drift, volatility and price level vary
+    per instrument.
+    """
+    rng = np.random.default_rng(seed)
+    n_sessions = max(1, int(round(years * SESSIONS_PER_YEAR)))
+    days = trading_days(start, n_sessions)
+
+    drift = rng.normal(0.0003, 0.0004, (n_instruments, 1))
+    volatility = rng.uniform(0.008, 0.03, (n_instruments, 1))
+    level = rng.uniform(10, 500, (n_instruments, 1))
+    returns = drift + volatility * rng.standard_normal((n_instruments, n_sessions))
+    close = level * np.exp(np.cumsum(returns, axis=1))
+    previous = np.concatenate([level, close[:, :-1]], axis=1)
+    open_ = previous * np.exp(0.3 * volatility * rng.standard_normal((n_instruments, n_sessions)))
+    wick = volatility * np.abs(rng.standard_normal((2, n_instruments, n_sessions)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.lognormal(13, 1, (n_instruments, n_sessions)).astype(np.int64)
+
+    keep = rng.random((n_instruments, n_sessions)) >= gap_probability
+    if outages and n_sessions > outage_sessions:
+        rows = np.repeat(np.arange(n_instruments), outages)
+        starts = rng.integers(1, n_sessions - outage_sessions, len(rows))
+        for offset in range(outage_sessions):
+            keep[rows, starts + offset] = False
+    # The first session always trades, so every instrument has history
+    keep[:, 0] = True
+
+    ids = np.arange(first_instrument_id, first_instrument_id + n_instruments, dtype=np.int64)
+    return BarArrays(
+        instrument_ids=np.repeat(ids, n_sessions)[keep.ravel()],
+        dates=np.tile(days, n_instruments)[keep.ravel()],
+        open=open_[keep], high=high[keep], low=low[keep], close=close[keep], volume=volume[keep],
+    )
+
+
+def provider_bars(bars: BarArrays, instrument_id: int, start_date: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    One instrument's bars in the format the data providers return, dated on or after `start_date`.
+    """
+    own = bars.for_instrument(instrument_id)
+    if start_date is not None:
+        own = own.take(own.dates >= np.datetime64(start_date, "D"))
+    return [
+        {"date": day, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for day, o, h, l, c, v in zip(
+            own.dates.astype(object), own.open.tolist(), own.high.tolist(), own.low.tolist(),
+            own.close.tolist(), own.volume.tolist(),
+        )
+    ]
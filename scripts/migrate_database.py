@@ -0,0 +1,6 @@
+from app.core.migrations import run_migrations
+
+if __name__ == "__main__":
+    print("Applying database migrations...")
+    run_migrations()
+    print("Database is up to date.")
@@ -1,19 +1,62 @@
 import argparse
+import time
+from typing import Any, Callable, List, Optional
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
-from app.features.data_ingestion import service
+from app.core.logging import setup_logging
+from app.features.data_ingestion import repository, schemas, service
+from app.features.data_ingestion.columnar import BarArrays
 
-def main(symbols: list[str], db_session: Session):
+AfterIngest = Callable[[Session, BarArrays], Any]
+
+def advance_signals_for_new_bars(db: Session, weekly_bars: BarArrays):
+    """
+    Advances the streaming signal state by exactly the weekly bars just completed.
+    """
+    # Imported here so plain ingestion runs do not load the signal engine
+    from app.features.signal_generation import service as signal_service
+    signal_service.advance_signals(db, int(weekly_bars.instrument_ids[0]), weekly_bars)
+
+def main(symbols: list[str], db_session: Session, after_ingest: Optional[AfterIngest] = None) -> List[schemas.IngestionResult]:
     """
     Main function to run the data ingestion for a list of symbols.
     """
+    results = []
+    latest_dates = repository.get_latest_market_data_dates(db_session)
     for symbol in symbols:
+        started = time.perf_counter()
         try:
             print(f"--- Ingesting data for {symbol} ---")
-            service.ingest_data_for_symbol(db=db_session, symbol=symbol)
+            service.ingest_symbol(db=db_session, symbol=symbol, latest_dates=latest_dates, after_ingest=after_ingest)
             print(f"--- Finished ingestion for {symbol} ---")
+            results.append(schemas.IngestionResult(
+                symbol=symbol, succeeded=True, elapsed_seconds=time.perf_counter() - started
+            ))
         except Exception as e:
+            # Reset the shared session so the next symbol does not inherit a failed transaction.
+            db_session.rollback()
             print(f"Failed to ingest data for {symbol}. Error: {e}")
+            results.append(schemas.IngestionResult(
+                symbol=symbol, succeeded=False, elapsed_seconds=time.perf_counter() - started, error=str(e)
+            ))
+    return results
+
+def run_parallel(symbols: list[str], workers: int, after_ingest: Optional[AfterIngest] = None) -> List[schemas.IngestionResult]:
+    """
+    Runs the ingestion with a bounded pool of workers, each using its own session.
+    """
+    return service.ingest_symbols_concurrently(SessionLocal, symbols, max_workers=workers, after_ingest=after_ingest)
+
+def print_summary(results: List[schemas.IngestionResult], wall_clock_seconds: float):
+    """
+    Prints a per-symbol success/failure/latency summary.
+    """
+    print(f"{'SYMBOL':<12} {'STATUS':<8} {'SECONDS':>8}  ERROR")
+    for result in results:
+        status = "OK" if result.succeeded else "FAILED"
+        print(f"{result.symbol:<12} {status:<8} {result.elapsed_seconds:>8.2f}  {result.error or ''}")
+    failed = sum(1 for result in results if not result.succeeded)
+    print(f"{len(results) - failed} succeeded, {failed} failed in {wall_clock_seconds:.2f}s")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run data ingestion for specified symbols.")
@@ -22,10 +65,50 @@ if __name__ == "__main__":
         nargs="+",
         help="A list of symbols to ingest data for (e.g., AAPL GOOGL)."
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=f"Number of symbols to ingest concurrently (e.g., {service.DEFAULT_INGESTION_WORKERS}). Defaults to 1 (serial)."
+    )
+    parser.add_argument(
+        "--signals",
+        action="store_true",
+        help="Advance the streaming signal state and the relative-strength rankings with the newly completed weekly bars."
+    )
     args = parser.parse_args()
+    setup_logging()
+    symbols = list(dict.fromkeys(args.symbols))
+    # Signals wait for the validation pass below, so only collect the completed weeks here
+    completed_weeks: List[BarArrays] = []
+    after_ingest = (lambda db, weekly_bars: completed_weeks.append(weekly_bars)) if args.signals else None
+
+    started = time.perf_counter()
+    if args.workers > 1:
+        results = run_parallel(symbols=symbols, workers=args.workers, after_ingest=after_ingest)
+    else:
+        db = SessionLocal()
+        try:
+            results = main(symbols=symbols, db_session=db, after_ingest=after_ingest)
+        finally:
+            db.close()
+    print_summary(results, time.perf_counter() - started)
 
     db = SessionLocal()
     try:
-        main(symbols=args.symbols, db_session=db)
+        statuses = service.validate_universe(db)
+        quarantined = sorted(i for i, status in statuses.items() if status.quarantined)
+        print(f"Validated {len(statuses)} instrument(s), quarantined: {quarantined or 'none'}")
     finally:
         db.close()
+
+    if args.signals:
+        from app.features.signal_generation import service as signal_service
+        db = SessionLocal()
+        try:
+            for weekly_bars in completed_weeks:
+                advance_signals_for_new_bars(db, weekly_bars)
+            ranking = signal_service.update_relative_strength(db)
+            print(f"Relative strength updated for {len(ranking.dates)} new week(s)")
+        finally:
+            db.close()
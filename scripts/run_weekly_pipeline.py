@@ -0,0 +1,61 @@
+import argparse
+from datetime import date
+from app.core.database import SessionLocal
+from app.core.logging import setup_logging
+from app.features.pipeline import schemas, service
+
+def print_report(report: schemas.RunReport):
+    """
+    Prints the per-stage timings of a run and its share of the NFR-1 window.
+    """
+    print(f"Run {report.run_key}: {report.status}, {report.elapsed_seconds:.1f}s elapsed "
+          f"({report.deadline_used:.2%} of the {report.deadline_seconds / 3600:g}h window)")
+    print(f"{'STAGE':<18} {'DONE':>6} {'FAILED':>6} {'WALL S':>9} {'BUSY S':>9} {'MAX S':>8}")
+    for stage, timing in report.stages.items():
+        print(f"{stage:<18} {timing.completed:>6} {timing.failed:>6} {timing.wall_seconds:>9.2f} "
+              f"{timing.busy_seconds:>9.2f} {timing.max_seconds:>8.2f}")
+    for symbol, error in report.failed_symbols.items():
+        print(f"FAILED {symbol}: {error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Start, or resume, the weekly pipeline run: ingest, validate, resample, signals, relative strength."
+    )
+    parser.add_argument("symbols", nargs="*", help="Symbols to process (a resumed run keeps its own symbols too).")
+    parser.add_argument(
+        "--week-end",
+        type=date.fromisoformat,
+        default=None,
+        help="Week end date (YYYY-MM-DD) identifying the run. Defaults to the latest week end."
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Run every step in this process instead of enqueueing them for the dramatiq workers."
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="Only print the stage timings of the run."
+    )
+    args = parser.parse_args()
+    setup_logging()
+    week_end = args.week_end or service.latest_week_end()
+    run_key = service.run_key_for(week_end)
+
+    if not args.report:
+        if args.local:
+            service.run_locally(SessionLocal, args.symbols, week_end)
+        else:
+            from app.features.pipeline import tasks
+            tasks.start_pipeline.send(args.symbols, week_end.isoformat())
+            print(f"Enqueued {run_key}; follow it with --report")
+            raise SystemExit(0)
+
+    db = SessionLocal()
+    try:
+        print_report(service.run_report(db, run_key))
+    except ValueError as e:
+        print(e)
+    finally:
+        db.close()
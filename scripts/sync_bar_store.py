@@ -0,0 +1,23 @@
+import argparse
+import time
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.features.data_ingestion.mmap_store import MemoryMappedBarStore
+from app.features.data_ingestion.storage import DatabaseBarStore, copy_new_bars
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy new daily bars from the database into the memory-mapped bar store.")
+    parser.add_argument(
+        "--path",
+        default=None,
+        help="Root directory of the memory-mapped store. Defaults to BAR_STORE_PATH."
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        copied = copy_new_bars(DatabaseBarStore(db), MemoryMappedBarStore(args.path or settings.BAR_STORE_PATH))
+    finally:
+        db.close()
+    print(f"Copied {copied} bars in {time.perf_counter() - started:.2f}s")
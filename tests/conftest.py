@@ -0,0 +1,13 @@
+import pytest
+
+from app.core import cache
+from app.core.config import settings
+
+@pytest.fixture(autouse=True)
+def no_redis_cache(monkeypatch):
+    """
+    Keeps tests off the network: the Redis cache is disabled unless a test installs a client.
+    """
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    monkeypatch.setattr(cache, "_client", None)
+    cache.stats.reset()
@@ -0,0 +1,124 @@
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, text
+from structlog.testing import capture_logs
+
+from app.core import cache, metrics
+from app.features.data_ingestion import service
+from tests.features.data_ingestion.test_repository import db_session, engine
+
+def test_prometheus_exposition_format():
+    """
+    Tests counters and histograms render as Prometheus text, with cumulative buckets.
+    """
+    registry = metrics.Registry()
+    requests = metrics.Counter("test_requests_total", "Requests.", ("path",), registry=registry)
+    latency = metrics.Histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+    requests.inc(path='/a"b')
+    requests.inc(2, path="/c")
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP test_requests_total Requests.",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{path="/a\\"b"} 1',
+        'test_requests_total{path="/c"} 2',
+        "# HELP test_latency_seconds Latency.",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{le="0.1"} 1',
+        'test_latency_seconds_bucket{le="1.0"} 3',
+        'test_latency_seconds_bucket{le="+Inf"} 4',
+        "test_latency_seconds_sum 4.05",
+        "test_latency_seconds_count 4",
+    ]
+    with pytest.raises(ValueError, match="labels"):
+        requests.inc(route="/a")
+    with pytest.raises(ValueError, match="already registered"):
+        metrics.Counter("test_requests_total", "Again.", registry=registry)
+
+def test_spans_nest_and_count_queries():
+    """
+    Tests a top-level span logs the time of its nested stages and every
+    statement run inside it, nested spans are timed but not logged, and a
+    failing span is logged as an error.
+    """
+    sqlite = create_engine("sqlite:///:memory:")
+    metrics.instrument_engine(sqlite)
+    metrics.instrument_engine(sqlite) # listeners are only added once
+    selects = metrics.DB_QUERIES.value(statement="SELECT")
+
+    with capture_logs() as logs:
+        with metrics.span("test.outer", symbol="SPY") as outer:
+            with sqlite.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                with metrics.span("test.inner"):
+                    connection.execute(text("SELECT 2"))
+                    with metrics.span("test.innermost"):
+                        pass
+            outer.set(rows=3)
+        with pytest.raises(RuntimeError):
+            with metrics.span("test.failing"):
+                raise RuntimeError("boom")
+
+    assert [event["stage"] for event in logs] == ["test.outer", "test.failing"]
+    assert metrics.STAGE_SECONDS.count(stage="test.innermost") >= 1
+    outer_event = logs[0]
+    assert outer_event["log_level"] == "info"
+    assert outer_event["symbol"] == "SPY" and outer_event["rows"] == 3
+    assert outer_event["db_queries"] == 2
+    assert set(outer_event["stages_ms"]) == {"test.inner", "test.innermost"}
+    assert outer_event["duration_ms"] >= outer_event["stages_ms"]["test.inner"]
+    assert (logs[1]["stage"], logs[1]["status"]) == ("test.failing", "error")
+
+    assert metrics.DB_QUERIES.value(statement="SELECT") == selects + 2
+    assert metrics.STAGE_SECONDS.count(stage="test.failing") >= 1
+    assert metrics.statement_type("  insert into x values (1)") == "INSERT"
+    assert metrics.statement_type("PRAGMA table_info(x)") == "OTHER"
+
+def test_ingestion_records_stages_and_rows(db_session):
+    """
+    Tests ingesting a symbol times each stage, counts its rows and logs instead of printing.
+    """
+    metrics.instrument_engine(engine)
+    bars = [
+        {"date": date(2024, 1, day), "open": 10.0, "high": 11.0, "low": 9.0, "close": 10.5, "volume": 100}
+        for day in (2, 3, 4)
+    ]
+    fetches = metrics.STAGE_SECONDS.count(stage="ingest.fetch")
+    lookups = metrics.STAGE_SECONDS.count(stage="ingest.lookup")
+    written = metrics.ROWS_WRITTEN.value(symbol="OBS")
+
+    with patch.object(service, "fetch_data_from_source", return_value=bars), capture_logs() as logs:
+        service.ingest_symbol(db_session, "OBS")
+
+    assert metrics.ROWS_WRITTEN.value(symbol="OBS") == written + 3
+    assert metrics.STAGE_SECONDS.count(stage="ingest.fetch") == fetches + 1
+    assert metrics.STAGE_SECONDS.count(stage="ingest.lookup") == lookups + 1
+    top = [event for event in logs if event["event"] == "span" and event["log_level"] == "info"]
+    assert [event["stage"] for event in top] == ["ingest.symbol"]
+    assert top[0]["rows"] == 3
+    assert top[0]["db_queries"] > 0
+    assert {"ingest.daily_bars", "ingest.lookup", "ingest.fetch", "ingest.create_instrument", "ingest.write",
+            "ingest.resample"} <= set(top[0]["stages_ms"])
+    assert any(event["event"] == "instrument_created" for event in logs)
+
+def test_cache_outcomes_are_counted():
+    hits = metrics.CACHE_REQUESTS.value(namespace="bars", outcome="hits")
+    cache.stats.record("bars", "hits")
+    assert metrics.CACHE_REQUESTS.value(namespace="bars", outcome="hits") == hits + 1
+
+def test_metrics_endpoint():
+    pytest.importorskip("fastapi.testclient")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with metrics.span("test.endpoint"):
+        pass
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'fcm_stage_duration_seconds_count{stage="test.endpoint"}' in response.text
+    assert "# TYPE fcm_db_queries_total counter" in response.text
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core import migrations
+
+# Cumulative import time allowed for the modules an API replica or worker loads
+# before serving; generous enough for a cold CI runner, tight enough to catch
+# an import that connects to the database or pulls in a heavy dependency.
+IMPORT_TIME_BUDGET_SECONDS = 2.0
+
+STARTUP_MODULES = (
+    "app.core.config",
+    "app.core.database",
+    "app.core.migrations",
+    "app.core.streaming",
+    "app.features.data_ingestion.repository",
+    "app.features.signal_generation.repository",
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+def _import_in_subprocess(modules):
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + "from app.core import database, config\n"
+        "print(json.dumps({\n"
+        "    'seconds': time.perf_counter() - started,\n"
+        "    'engine_created': database._engine is not None,\n"
+        "    'settings_loaded': config._settings is not None,\n"
+        "    'modules': sorted(sys.modules),\n"
+        "}))\n"
+    )
+    # Without DATABASE_URL/REDIS_URL: importing must not need them
+    env = {key: value for key, value in os.environ.items() if key not in ("DATABASE_URL", "REDIS_URL")}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+def test_importing_does_not_create_engine_or_load_settings():
+    result = _import_in_subprocess(STARTUP_MODULES)
+    assert not result["engine_created"]
+    assert not result["settings_loaded"]
+    # Only needed by the cache, the ingestion runner and the application itself
+    for module in ("redis", "structlog", "requests", "app.features.signal_generation.service"):
+        assert module not in result["modules"]
+
+def test_import_time_within_budget():
+    result = _import_in_subprocess(STARTUP_MODULES)
+    assert result["seconds"] < IMPORT_TIME_BUDGET_SECONDS
+
+def test_application_import_defers_engine():
+    pytest.importorskip("fastapi")
+    result = _import_in_subprocess(("app.main",))
+    assert not result["engine_created"]
+    assert "redis" not in result["modules"]
+    assert result["seconds"] < IMPORT_TIME_BUDGET_SECONDS
+
+def test_run_migrations_is_idempotent():
+    from sqlalchemy import create_engine, inspect
+
+    engine = create_engine("sqlite:///:memory:")
+    migrations.run_migrations(engine)
+    migrations.run_migrations(engine)
+    tables = set(inspect(engine).get_table_names())
+    assert {"instruments", "market_data", "weekly_market_data", "signals"} <= tables
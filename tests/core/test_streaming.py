@@ -0,0 +1,69 @@
+import json
+import struct
+import numpy as np
+import pytest
+from datetime import date, datetime
+
+from app.core import codec, conditional, streaming
+
+def test_cursor_round_trip_and_validation():
+    """
+    Tests cursors decode back to typed keys and malformed cursors are rejected.
+    """
+    cursor = streaming.encode_cursor([42, date(2024, 3, 1)])
+    assert streaming.decode_cursor(cursor, (int, date)) == (42, date(2024, 3, 1))
+    for bad in ("not-a-cursor", streaming.encode_cursor([1]), streaming.encode_cursor(["x", "2024-01-01"])):
+        with pytest.raises(ValueError):
+            streaming.decode_cursor(bad, (int, date))
+
+def batches():
+    yield {"instrument_id": np.array([1, 1]), "date": np.array(["2024-01-02", "2024-01-03"], dtype="datetime64[D]"), "close": np.array([1.5, 2.0])}
+    yield {"instrument_id": np.array([2]), "date": np.array(["2024-01-02"], dtype="datetime64[D]"), "close": np.array([3.0])}
+
+def test_ndjson_stream_writes_one_object_per_row():
+    """
+    Tests NDJSON rendering, one chunk per batch, with ISO dates.
+    """
+    chunks = list(streaming.ndjson_stream(batches()))
+    assert len(chunks) == 2
+    rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert rows[0] == {"instrument_id": 1, "date": "2024-01-02", "close": 1.5}
+    assert [row["instrument_id"] for row in rows] == [1, 1, 2]
+
+def test_columnar_stream_frames_decode():
+    """
+    Tests columnar frames are length-prefixed packed columns with epoch-day dates.
+    """
+    body = b"".join(streaming.columnar_stream(batches()))
+    frames, offset = [], 0
+    while offset < len(body):
+        (size,) = struct.unpack_from("<I", body, offset)
+        frames.append(codec.unpack_columns(body[offset + 4:offset + 4 + size]))
+        offset += 4 + size
+    assert len(frames) == 2
+    assert frames[0]["date"].tolist() == [19724, 19725]
+    assert frames[1]["close"].tolist() == [3.0]
+
+def test_conditional_requests():
+    """
+    Tests If-None-Match and If-Modified-Since handling.
+    """
+    etag = conditional.make_etag("bars", [(1, date(2024, 1, 3))])
+    assert etag == conditional.make_etag("bars", [(1, date(2024, 1, 3))])
+    assert etag != conditional.make_etag("bars", [(1, date(2024, 1, 4))])
+
+    assert conditional.is_not_modified({"if-none-match": etag}, etag)
+    assert conditional.is_not_modified({"if-none-match": f'"x", {etag.replace("W/", "")}'}, etag)
+    assert not conditional.is_not_modified({"if-none-match": '"other"'}, etag, date(2024, 1, 3))
+
+    headers = conditional.validator_headers(etag, date(2024, 1, 3))
+    assert headers["Last-Modified"] == "Wed, 03 Jan 2024 00:00:00 GMT"
+    assert conditional.is_not_modified({"if-modified-since": headers["Last-Modified"]}, etag, date(2024, 1, 3))
+    assert not conditional.is_not_modified({"if-modified-since": headers["Last-Modified"]}, etag, date(2024, 1, 4))
+
+    # Write times (naive UTC) compare at whole seconds
+    written = datetime(2024, 1, 3, 14, 30, 5, 250000)
+    headers = conditional.validator_headers(etag, written)
+    assert headers["Last-Modified"] == "Wed, 03 Jan 2024 14:30:05 GMT"
+    assert conditional.is_not_modified({"if-modified-since": headers["Last-Modified"]}, etag, written)
+    assert not conditional.is_not_modified({"if-modified-since": headers["Last-Modified"]}, etag, datetime(2024, 1, 3, 14, 30, 6))
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from datetime import date
+
+from app.features.backtesting import engine, schemas
+from app.features.signal_generation import indicators
+
+DATES = np.datetime64("2024-01-05") + np.arange(10) * 7
+
+def make_inputs(n, n_weeks=10, buys=(), sells=(), atr=1.0, scores=None, percentiles=None):
+    """
+    Entry inputs with BUY/SELL flags at the given (row, week) positions.
+    """
+    buy = np.zeros((n, n_weeks), dtype=bool)
+    sell = np.zeros((n, n_weeks), dtype=bool)
+    for row, week in buys:
+        buy[row, week] = True
+    for row, week in sells:
+        sell[row, week] = True
+    return engine.EntryInputs(
+        buy=buy, sell=sell, atr=np.full((n, n_weeks), atr),
+        scores=np.zeros((n, n_weeks)) if scores is None else scores,
+        percentiles=np.full((n, n_weeks), np.nan) if percentiles is None else percentiles,
+    )
+
+def run(close, inputs, **params):
+    close = np.asarray(close, dtype=float)
+    params = schemas.BacktestParameters(**params)
+    return engine.simulate(np.arange(1, len(close) + 1), DATES[:close.shape[1]], close, close, close, inputs, params)
+
+def test_time_exit_after_max_holding_weeks():
+    """
+    Tests a BUY fills at the next open and is closed after four weeks.
+    """
+    close = [[10, 10, 10, 11, 12, 13, 14, 15, 16, 17]]
+    result = run(close, make_inputs(1, buys=[(0, 1)]), max_positions=1, atr_multiplier=100)
+
+    [trade] = result.trades
+    assert (trade.entry_date, trade.exit_date) == (date(2024, 1, 19), date(2024, 2, 16))
+    assert (trade.entry_price, trade.exit_price, trade.exit_reason) == (10, 14, engine.TIME_EXIT)
+    assert trade.shares == pytest.approx(500)
+    assert result.equity[-1] == pytest.approx(7000)
+    assert result.summary.final_equity == pytest.approx(7000)
+    assert result.summary.win_rate == 1.0
+
+def test_atr_stop_only_tightens():
+    """
+    Tests the trailing stop follows the highest high and exits on a close below it.
+    """
+    close = [[10, 10, 12, 14, 13.5, 11.5, 11, 11, 11, 11]]
+    atr = np.array([[1, 1, 1, 1, 3, 3, 1, 1, 1, 1]], dtype=float)
+    inputs = make_inputs(1, buys=[(0, 1)])
+    inputs = engine.EntryInputs(**{**inputs.__dict__, "atr": atr})
+    result = run(close, inputs, max_positions=1, atr_multiplier=2, max_holding_weeks=10)
+
+    # Stop reaches 14 - 2 = 12 at week 3 and the ATR jump at week 4 must not loosen
+    # it, so the week 5 close of 11.5 exits at the week 6 open
+    [trade] = result.trades
+    assert trade.exit_reason == engine.STOP_EXIT
+    assert (trade.exit_date, trade.exit_price) == (date(2024, 2, 16), 11)
+
+def test_allocation_prefers_stronger_relative_strength():
+    """
+    Tests that with fewer slots than qualifiers the highest scores enter, in equal slots.
+    """
+    close = np.full((3, 10), 20.0)
+    scores = np.array([[0.1], [0.9], [0.5]]) * np.ones((3, 10))
+    inputs = make_inputs(3, buys=[(0, 0), (1, 0), (2, 0)], scores=scores)
+    result = run(close, inputs, max_positions=2, max_holding_weeks=3, atr_multiplier=100)
+
+    assert sorted(trade.instrument_id for trade in result.trades) == [2, 3]
+    assert all(trade.shares == pytest.approx(125) for trade in result.trades)
+
+def test_cast_off_after_leaving_top_quartile():
+    """
+    Tests a position is cast off once it drops out of the top quartile, and that
+    one which never reached it is not.
+    """
+    close = np.full((2, 10), 50.0)
+    percentiles = np.array([
+        [90, 90, 90, 80, 60, 60, 60, 60, 60, 60],
+        [50, 50, 50, 50, 50, 50, 50, 50, 50, 50],
+    ], dtype=float)
+    inputs = make_inputs(2, buys=[(0, 1), (1, 1)], percentiles=percentiles)
+    result = run(close, inputs, max_positions=2, max_holding_weeks=6, atr_multiplier=100)
+
+    reasons = {trade.instrument_id: (trade.exit_reason, trade.exit_date) for trade in result.trades}
+    assert reasons[1] == (engine.CAST_OFF_EXIT, date(2024, 2, 9))
+    assert reasons[2] == (engine.TIME_EXIT, date(2024, 3, 1))
+
+def test_sell_signal_exits_and_open_positions_close_at_end():
+    """
+    Tests a SELL closes the position and a position still open is closed on the last bar.
+    """
+    close = np.vstack([np.linspace(10, 19, 10), np.linspace(10, 19, 10)])
+    inputs = make_inputs(2, buys=[(0, 0), (1, 7)], sells=[(0, 2)])
+    result = run(close, inputs, max_positions=2, max_holding_weeks=10, atr_multiplier=100)
+
+    assert [trade.exit_reason for trade in result.trades] == [engine.SELL_EXIT, engine.END_EXIT]
+    assert result.trades[1].exit_date == date(2024, 3, 8)
+    assert result.summary.trade_count == 2
+
+def test_summarize_drawdown_and_sharpe():
+    """
+    Tests the summary statistics on a known equity curve.
+    """
+    summary = engine.summarize(np.array([110.0, 88.0, 99.0, 132.0]), 100.0, np.array([0.2, -0.1]))
+    assert summary.total_return == pytest.approx(0.32)
+    assert summary.max_drawdown == pytest.approx(0.2)
+    returns = np.array([0.1, -0.2, 0.125, 1 / 3])
+    assert summary.sharpe_ratio == pytest.approx(returns.mean() / returns.std() * np.sqrt(52))
+    assert summary.win_rate == 0.5
+
+def test_run_backtest_uses_live_signal_logic(monkeypatch):
+    """
+    Tests an end-to-end run over price matrices: entries follow the composite signal,
+    and the equity curve is consistent with the trade list.
+    """
+    from tests.features.signal_generation.test_streaming import SHORT_PARAMS, close_band_votes
+
+    monkeypatch.setattr(indicators, "votes_from_values", close_band_votes)
+    rng = np.random.default_rng(8)
+    n, n_weeks = 6, 120
+    close = 100 + np.cumsum(rng.normal(0, 2, (n, n_weeks)), axis=-1)
+    dates = np.datetime64("2020-01-03") + np.arange(n_weeks) * 7
+    params = schemas.BacktestParameters(
+        signal=SHORT_PARAMS, relative_strength=schemas.RelativeStrengthParameters(zscore_window=8, roc_period=2)
+    )
+    result = engine.run_backtest(np.arange(n), dates, close, close + 1, close - 1, close, params)
+
+    buy, _, _ = engine.signal_inputs(close, close + 1, close - 1, close, SHORT_PARAMS)
+    assert result.trades
+    for trade in result.trades:
+        week = int(np.searchsorted(dates, np.datetime64(trade.entry_date)))
+        assert buy[trade.instrument_id, week - 1]
+    pnl = sum(trade.shares * (trade.exit_price - trade.entry_price) for trade in result.trades)
+    assert result.equity[-1] == pytest.approx(params.initial_capital + pnl)
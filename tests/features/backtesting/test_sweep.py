@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from app.features.backtesting import engine, schemas, sweep
+
+def test_expand_grid_and_overrides():
+    """
+    Tests grid expansion and dotted parameter overrides.
+    """
+    points = sweep.expand_grid({"atr_multiplier": [2.0, 3.0], "signal.rsi_buy_below": [25, 30]})
+    assert len(points) == 4
+    params = sweep.apply_overrides(schemas.BacktestParameters(), points[-1])
+    assert (params.atr_multiplier, params.signal.rsi_buy_below) == (3.0, 30)
+    with pytest.raises(ValueError):
+        sweep.apply_overrides(schemas.BacktestParameters(), {"signal.unknown": 1})
+
+def test_sweep_matches_serial_runs():
+    """
+    Tests the process-pool sweep returns the same summaries as running each point serially.
+    """
+    rng = np.random.default_rng(2)
+    n, n_weeks = 8, 160
+    close = 50 * np.exp(np.cumsum(rng.normal(0.001, 0.04, (n, n_weeks)), axis=-1))
+    open_ = close * (1 + rng.normal(0, 0.01, (n, n_weeks)))
+    high, low = np.maximum(open_, close) * 1.02, np.minimum(open_, close) * 0.98
+    dates = np.datetime64("2019-01-04") + np.arange(n_weeks) * 7
+    base = schemas.BacktestParameters(
+        signal=schemas.SignalParameters(rsi_buy_below=60, rsi_sell_above=40, stoch_buy_below=60, stoch_sell_above=40,
+                                        macd_buy_below=60, macd_sell_above=40),
+    )
+    grid = {"atr_multiplier": [2.0, 3.0], "max_holding_weeks": [2, 4]}
+
+    results = sweep.run_sweep(np.arange(n), dates, open_, high, low, close, grid, base=base, max_workers=2)
+
+    assert [result.parameters for result in results] == sweep.expand_grid(grid)
+    for result in results:
+        params = sweep.apply_overrides(base, result.parameters)
+        expected = engine.run_backtest(np.arange(n), dates, open_, high, low, close, params).summary
+        assert result.summary == expected
@@ -0,0 +1,23 @@
+import numpy as np
+
+from app.features.charting.downsampling import lttb_indices
+
+def test_lttb_keeps_ends_and_extremes():
+    """
+    Tests the first and last points and isolated spikes survive downsampling.
+    """
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[321], y[777] = 25.0, -25.0
+    kept = lttb_indices(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert 321 in kept and 777 in kept
+
+def test_lttb_returns_short_series_unchanged():
+    x = np.arange(10, dtype=np.float64)
+    assert lttb_indices(x, x, 10).tolist() == list(range(10))
+    assert lttb_indices(x, x, 500).tolist() == list(range(10))
+    assert lttb_indices(x, x, 2).tolist() == [0, 9]
+    assert lttb_indices(x[:0], x[:0], 5).tolist() == []
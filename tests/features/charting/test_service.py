@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from datetime import date, timedelta
+
+from app.core import cache, migrations
+from app.features.charting import service
+from app.features.data_ingestion import repository as market_data_repository, schemas as market_data_schemas
+from app.features.data_ingestion import service as market_data_service
+from app.features.signal_generation import repository as signal_repository, schemas as signal_schemas
+from tests.features.data_ingestion.test_cache import fake_redis
+from tests.features.data_ingestion.test_repository import db_session
+
+FIRST_DAY = date(2020, 1, 6) # a Monday
+
+def add_instrument(db, symbol="XLK", weeks=150, seed=3):
+    """
+    Adds an instrument with `weeks` weeks of daily bars and their weekly bars.
+    """
+    instrument = market_data_repository.create_instrument(
+        db, market_data_schemas.InstrumentCreate(symbol=symbol, name=symbol, asset_class="ETF")
+    )
+    add_daily_bars(db, instrument.id, [FIRST_DAY + timedelta(weeks=w, days=d) for w in range(weeks) for d in range(5)], seed)
+    return instrument.id
+
+def add_daily_bars(db, instrument_id, days, seed=3):
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, len(days)))
+    market_data_repository.bulk_upsert_market_data(db, [
+        market_data_schemas.MarketDataCreate(
+            instrument_id=instrument_id, date=day, open=c, high=c + 1, low=c - 1, close=c, volume=1000
+        )
+        for day, c in zip(days, close.tolist())
+    ])
+    market_data_service.refresh_weekly_bars(db, {instrument_id: days[0]})
+
+def test_chart_defaults_to_two_years_with_aligned_panes(db_session):
+    instrument_id = add_instrument(db_session)
+    signal_repository.upsert_signals(db_session, [
+        signal_schemas.SignalCreate(instrument_id=instrument_id, date=day, signal_type=kind, reason="test")
+        for day, kind in [(date(2020, 3, 6), "BUY"), (date(2022, 6, 3), "SELL")]
+    ])
+
+    chart = service.get_chart(db_session, instrument_id)
+    assert chart["total_bars"] == service.DEFAULT_WEEKS == len(chart["date"])
+    assert chart["date"][-1] == np.datetime64("2022-11-18")
+    assert all(len(chart[name]) == len(chart["date"]) for name in service.SERIES)
+    # Indicators run over the whole history, so the range starts warmed up
+    assert not np.isnan(chart["rsi"][0]) and not np.isnan(chart["macd_signal"][0])
+    # Only markers inside the range
+    assert chart["marker_date"].tolist() == [date(2022, 6, 3)] and chart["marker_type"] == ["SELL"]
+
+    everything = service.get_chart(db_session, instrument_id, start_date=date(2000, 1, 1), width=40)
+    assert everything["total_bars"] == 150 and len(everything["date"]) == 40
+    assert everything["date"][0] == np.datetime64("2020-01-10")
+    assert everything["date"][-1] == chart["date"][-1]
+    assert everything["marker_type"] == ["BUY", "SELL"]
+
+def test_chart_of_unknown_instrument_is_empty(db_session):
+    chart = service.get_chart(db_session, 404)
+    assert chart["total_bars"] == 0 and len(chart["date"]) == 0 and len(chart["close"]) == 0
+
+def test_chart_is_cached_until_new_bars(db_session, fake_redis):
+    """
+    Tests chart columns are served from the cache until ingestion writes new bars.
+    """
+    instrument_id = add_instrument(db_session, weeks=20)
+    cache.stats.reset()
+    first = service.get_chart(db_session, instrument_id)
+    second = service.get_chart(db_session, instrument_id)
+    assert cache.stats.snapshot()["chart"] == {"hits": 1, "misses": 1, "errors": 0}
+    for name in ("date", *service.SERIES):
+        np.testing.assert_array_equal(first[name], second[name])
+
+    add_daily_bars(db_session, instrument_id, [FIRST_DAY + timedelta(weeks=20, days=d) for d in range(5)])
+    assert service.get_chart(db_session, instrument_id)["total_bars"] == 21
+
+def test_chart_endpoint():
+    pytest.importorskip("fastapi.testclient")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.core import streaming
+    from app.core.database import get_db
+    from app.features.charting.router import router
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    migrations.run_migrations(engine)
+    db = sessionmaker(bind=engine)()
+    instrument_id = add_instrument(db, weeks=30)
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    response = client.get(f"/charts/{instrument_id}", params={"width": 10})
+    body = response.json()
+    assert response.headers["X-Total-Bars"] == "30" and body["total_bars"] == 30
+    assert len(body["date"]) == 10 and body["date"][-1] == "2020-07-31"
+    assert set(body["panes"]) == set(service.PANES)
+    # Warm-up bars come through as null
+    assert body["panes"]["macd"]["macd_signal"][0] is None
+    assert all(len(series) == 10 for pane in body["panes"].values() for series in pane.values())
+
+    columnar = client.get(f"/charts/{instrument_id}", params={"format": "columnar"})
+    assert columnar.headers["content-type"] == streaming.COLUMNAR_MEDIA_TYPE
+    columns = cache.unpack_columns(columnar.content)
+    assert len(columns["close"]) == 30 and columns["date"][0] == (np.datetime64("2020-01-10") - np.datetime64("1970-01-01")).astype(int)
+    assert client.get(f"/charts/{instrument_id}", params={"width": 1}).status_code == 422
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+import redis
+from datetime import date
+from unittest.mock import patch
+
+from app.core import cache
+from app.core.config import settings
+from app.features.data_ingestion import cache as market_data_cache, repository, schemas, service
+from tests.features.data_ingestion.test_repository import db_session
+
+class FakeRedis:
+    """
+    In-memory stand-in for the handful of Redis commands the cache uses.
+    """
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        self.ttls[key] = ex
+        return True
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+        return int(self.data[key])
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    cache.set_client(client)
+    return client
+
+def add_bars(db, instrument_id, days, close=100.0):
+    repository.bulk_upsert_market_data(db, [
+        schemas.MarketDataCreate(instrument_id=instrument_id, date=d, open=close, high=close + 1, low=close - 1, close=close, volume=10)
+        for d in days
+    ])
+
+def test_pack_columns_round_trip():
+    """
+    Tests numeric and string columns survive the binary codec, with and without compression.
+    """
+    for n in (3, 2000):
+        columns = {"x": np.arange(n, dtype=np.int64), "y": np.linspace(0, 1, n), "s": [f"é{i}" for i in range(n)]}
+        payload = cache.pack_columns(columns)
+        decoded = cache.unpack_columns(payload)
+        assert decoded["x"].tolist() == columns["x"].tolist()
+        assert decoded["y"].tolist() == columns["y"].tolist()
+        assert decoded["s"] == columns["s"]
+    assert payload[:1] == b"Z"
+
+def test_market_data_read_through_hits_and_misses(db_session, fake_redis):
+    """
+    Tests the second identical read is served from Redis, with TTL and counters.
+    """
+    instrument = repository.create_instrument(db_session, schemas.InstrumentCreate(symbol="XLF", name="Financials", asset_class="ETF"))
+    add_bars(db_session, instrument.id, [date(2024, 1, 2), date(2024, 1, 3)])
+
+    first = market_data_cache.get_market_data_for_instrument(db_session, instrument.id, start_date=date(2024, 1, 1))
+    with patch.object(repository, "get_market_data_for_instrument", side_effect=AssertionError("database hit")):
+        second = market_data_cache.get_market_data_for_instrument(db_session, instrument.id, start_date=date(2024, 1, 1))
+
+    assert second == first
+    assert [bar.date for bar in second] == [date(2024, 1, 2), date(2024, 1, 3)]
+    assert cache.stats.snapshot()["market_data"] == {"hits": 1, "misses": 1, "errors": 0}
+    assert settings.CACHE_TTL_SECONDS in fake_redis.ttls.values()
+
+def test_ingest_invalidates_only_the_written_instrument(db_session, fake_redis):
+    """
+    Tests that ingesting new bars for one instrument makes its cached reads reload,
+    while other instruments keep their entries.
+    """
+    xlk = repository.create_instrument(db_session, schemas.InstrumentCreate(symbol="XLK", name="Tech", asset_class="ETF"))
+    xlu = repository.create_instrument(db_session, schemas.InstrumentCreate(symbol="XLU", name="Utilities", asset_class="ETF"))
+    add_bars(db_session, xlk.id, [date(2024, 1, 2)])
+    add_bars(db_session, xlu.id, [date(2024, 1, 2)])
+    for instrument in (xlk, xlu):
+        market_data_cache.get_market_data_for_instrument(db_session, instrument.id)
+
+    new_bar = {"date": date(2024, 1, 3), "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 5}
+    with patch.object(service, "fetch_data_from_source", return_value=[new_bar]):
+        service.ingest_data_for_symbol(db_session, "XLK", as_of=date(2024, 1, 3))
+
+    assert len(market_data_cache.get_market_data_for_instrument(db_session, xlk.id)) == 2
+    assert len(market_data_cache.get_market_data_for_instrument(db_session, xlu.id)) == 1
+    assert cache.stats.snapshot()["market_data"] == {"hits": 1, "misses": 3, "errors": 0}
+
+def test_instruments_list_is_cached_and_invalidated_on_create(db_session, fake_redis):
+    """
+    Tests the instrument list cache is dropped when ingestion creates an instrument.
+    """
+    repository.create_instrument(db_session, schemas.InstrumentCreate(symbol="XLV", name="Health", asset_class="ETF"))
+    assert [i.symbol for i in market_data_cache.get_instruments_page(db_session)] == ["XLV"]
+    assert [i.symbol for i in market_data_cache.get_instruments_page(db_session)] == ["XLV"]
+
+    new_bar = {"date": date(2024, 1, 3), "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 5}
+    with patch.object(service, "fetch_data_from_source", return_value=[new_bar]):
+        service.ingest_data_for_symbol(db_session, "XLB", as_of=date(2024, 1, 3))
+
+    assert [i.symbol for i in market_data_cache.get_instruments_page(db_session)] == ["XLV", "XLB"]
+    assert cache.stats.snapshot()["instruments"] == {"hits": 1, "misses": 2, "errors": 0}
+
+def test_redis_outage_falls_back_to_database(db_session, fake_redis, monkeypatch):
+    """
+    Tests reads still succeed, and count an error, when Redis is unreachable.
+    """
+    instrument = repository.create_instrument(db_session, schemas.InstrumentCreate(symbol="XLP", name="Staples", asset_class="ETF"))
+    add_bars(db_session, instrument.id, [date(2024, 1, 2)])
+    monkeypatch.setattr(fake_redis, "get", lambda key: (_ for _ in ()).throw(redis.ConnectionError("down")))
+
+    assert len(market_data_cache.get_market_data_for_instrument(db_session, instrument.id)) == 1
+    assert cache.stats.snapshot()["market_data"]["errors"] == 1
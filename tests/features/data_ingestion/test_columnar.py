@@ -0,0 +1,48 @@
+import numpy as np
+from datetime import date
+
+from app.features.data_ingestion.columnar import BarArrays
+
+def make_bars():
+    """
+    Two instruments with partially overlapping dates, given out of order.
+    """
+    return BarArrays.from_columns(
+        instrument_ids=[2, 1, 1, 2],
+        dates=["2024-01-05", "2024-01-12", "2024-01-05", "2024-01-19"],
+        open=[10, 101, 100, 11], high=[11, 103, 102, 12], low=[9, 100, 99, 10],
+        close=[10.5, 102, 101, 11.5], volume=[5, 20, 10, 6],
+    )
+
+def test_from_columns_sorts_by_instrument_and_date():
+    """
+    Tests rows are ordered by (instrument_id, date) with the expected dtypes.
+    """
+    bars = make_bars()
+    assert bars.instrument_ids.tolist() == [1, 1, 2, 2]
+    assert bars.dates.tolist() == [date(2024, 1, 5), date(2024, 1, 12), date(2024, 1, 5), date(2024, 1, 19)]
+    assert bars.close.tolist() == [101, 102, 10.5, 11.5]
+    assert bars.volume.dtype == np.int64
+
+def test_for_instrument_is_a_view():
+    """
+    Tests per-instrument slices share memory with the parent arrays.
+    """
+    bars = make_bars()
+    second = bars.for_instrument(2)
+    assert second.close.tolist() == [10.5, 11.5]
+    assert np.shares_memory(second.close, bars.close)
+    assert len(bars.for_instrument(99)) == 0
+
+def test_to_matrix_aligns_dates():
+    """
+    Tests the aligned (instrument x date) matrix, with NaN for missing bars and a caller-chosen row order.
+    """
+    ids, dates, matrices = make_bars().to_matrix(fields=("close",), instrument_ids=[2, 1, 3])
+    assert ids.tolist() == [2, 1, 3]
+    assert dates.tolist() == [date(2024, 1, 5), date(2024, 1, 12), date(2024, 1, 19)]
+    np.testing.assert_array_equal(matrices["close"], [
+        [10.5, np.nan, 11.5],
+        [101, 102, np.nan],
+        [np.nan, np.nan, np.nan],
+    ])
@@ -0,0 +1,94 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.core import migrations
+from app.features.data_ingestion import migrations as market_data_migrations, repository, schemas
+
+def old_layout_engine():
+    """
+    A database whose market_data predates the unique key, NUMERIC prices and BIGINT volume.
+    """
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE instruments (id INTEGER PRIMARY KEY, symbol VARCHAR NOT NULL, name VARCHAR, asset_class VARCHAR)"))
+        connection.execute(text(
+            "CREATE TABLE market_data (id INTEGER PRIMARY KEY, instrument_id INTEGER NOT NULL REFERENCES instruments (id), "
+            "date DATE NOT NULL, open FLOAT, high FLOAT, low FLOAT, close FLOAT, volume INTEGER)"
+        ))
+        connection.execute(text("CREATE INDEX ix_market_data_id ON market_data (id)"))
+        connection.execute(text("INSERT INTO instruments VALUES (1, 'XLK', 'Technology', 'ETF')"))
+        connection.execute(text(
+            "INSERT INTO market_data (instrument_id, date, open, high, low, close, volume) VALUES "
+            "(1, '2024-01-02', 10.5, 11.25, 10.0, 11.0, 100), (1, '2024-01-03', 11.0, 12.0, 10.5, 11.5, 200), "
+            "(1, '2024-01-03', 11.0, 12.0, 10.5, 11.75, 300)"
+        ))
+    return engine
+
+def test_migration_rebuilds_an_old_market_data_table():
+    """
+    Tests the table is converted to the new column types with its bars intact,
+    duplicate bars collapsed to the newest, and the unique key in place.
+    """
+    engine = old_layout_engine()
+    with engine.connect() as connection:
+        assert market_data_migrations.is_outdated(connection)
+    migrations.run_migrations(engine)
+
+    with engine.connect() as connection:
+        assert not market_data_migrations.is_outdated(connection)
+        rows = connection.execute(text("SELECT date, close, volume FROM market_data ORDER BY date")).all()
+    assert [tuple(row) for row in rows] == [("2024-01-02", 11.0, 100), ("2024-01-03", 11.75, 300)]
+    columns = {column["name"]: str(column["type"]) for column in inspect(engine).get_columns("market_data")}
+    assert columns["close"] == "NUMERIC(10, 4)" and columns["volume"] == "BIGINT"
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("market_data")}
+    assert indexes["uq_market_data_instrument_date"]["unique"]
+    assert "market_data_previous" in inspect(engine).get_table_names()
+
+    # Upserts hit the new unique key
+    db = sessionmaker(bind=engine)()
+    repository.bulk_upsert_market_data(db, [
+        schemas.MarketDataCreate(instrument_id=1, date=date(2024, 1, 3), open=11, high=12, low=10.5, close=11.5, volume=3_000_000_000),
+        schemas.MarketDataCreate(instrument_id=1, date=date(2024, 1, 4), open=11, high=12, low=10.5, close=11.6, volume=10),
+    ])
+    bars = repository.get_market_data_for_instrument(db, 1)
+    assert [(bar.close, bar.volume) for bar in bars] == [(11.0, 100), (11.5, 3_000_000_000), (11.6, 10)]
+    db.close()
+
+    # Nothing left to do on the next run
+    migrations.run_migrations(engine)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM market_data")).scalar() == 3
+
+def test_partitioned_layout_ddl():
+    """
+    Tests the PostgreSQL rebuild table is range-partitioned by year with the
+    partition key in every unique index, takes over the id sequence and gets a BRIN index on date.
+    """
+    statements = market_data_migrations.create_table_statements(postgresql.dialect(), "public.market_data_id_seq", range(2023, 2025))
+    table = statements[0]
+    assert table.startswith("CREATE TABLE market_data_rebuild (")
+    assert "DEFAULT nextval('public.market_data_id_seq'::regclass)" in table
+    assert "open NUMERIC(10, 4)" in table and "volume BIGINT" in table
+    assert "PRIMARY KEY (id, date)" in table and table.endswith("PARTITION BY RANGE (date)")
+    assert statements[1:4] == [
+        "CREATE TABLE market_data_rebuild_y2023 PARTITION OF market_data_rebuild FOR VALUES FROM ('2023-01-01') TO ('2024-01-01')",
+        "CREATE TABLE market_data_rebuild_y2024 PARTITION OF market_data_rebuild FOR VALUES FROM ('2024-01-01') TO ('2025-01-01')",
+        "CREATE TABLE market_data_rebuild_default PARTITION OF market_data_rebuild DEFAULT",
+    ]
+    assert "CREATE INDEX brin_market_data_rebuild_date ON market_data_rebuild USING brin (date)" in statements
+    assert "CREATE UNIQUE INDEX uq_market_data_rebuild_instrument_date ON market_data_rebuild (instrument_id, date)" in statements
+
+    unpartitioned = market_data_migrations.create_table_statements(postgresql.dialect())[0]
+    assert "PRIMARY KEY (id)" in unpartitioned and "PARTITION BY" not in unpartitioned
+
+    trigger = market_data_migrations.sync_trigger_statements()
+    assert "ON CONFLICT (instrument_id, date) DO UPDATE SET id = EXCLUDED.id" in trigger[0]
+    assert trigger[-1].startswith("CREATE TRIGGER market_data_rebuild_sync AFTER INSERT OR UPDATE OR DELETE ON market_data")
+
+def test_partitioning_needs_postgres():
+    with pytest.raises(ValueError):
+        market_data_migrations.upgrade(create_engine("sqlite://"), partition_by_year=True)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.features.data_ingestion import providers
+
+DAYS = [date(2024, 3, 4), date(2024, 3, 5), date(2024, 3, 6)]
+
+class StubProvider:
+    """
+    Local HTTP server answering in the Alpha Vantage or Polygon format.
+    `failures` responses fail with `failure_status` before it answers normally,
+    and every answer is delayed by `latency` seconds.
+    """
+
+    def __init__(self, style, latency=0.0, failures=0, failure_status=503):
+        self.style = style
+        self.latency = latency
+        self.failures = failures
+        self.failure_status = failure_status
+        self.requests = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(self.path)
+                    failing = stub.failures > 0
+                    stub.failures -= 1
+                time.sleep(stub.latency)
+                status, body = (stub.failure_status, {}) if failing else (200, stub.payload(self.path))
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def payload(self, path):
+        if self.style == "alphavantage":
+            symbol = parse_qs(urlparse(path).query)["symbol"][0]
+            price = float(len(symbol))
+            return {"Time Series (Daily)": {
+                day.isoformat(): {"1. open": price, "2. high": price + 1, "3. low": price - 1, "4. close": price, "5. volume": "100"}
+                for day in reversed(DAYS)
+            }}
+        symbol = urlparse(path).path.split("/")[4]
+        price = float(len(symbol)) + 0.5
+        return {"status": "OK", "results": [
+            {"t": int(datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp() * 1000),
+             "o": price, "h": price + 1, "l": price - 1, "c": price, "v": 200}
+            for d in DAYS
+        ]}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stubs():
+    created = []
+
+    def make(style, **kwargs):
+        stub = StubProvider(style, **kwargs)
+        created.append(stub)
+        return stub
+
+    yield make
+    for stub in created:
+        stub.close()
+
+def make_pool(*stubs, **kwargs):
+    kwargs.setdefault("backoff", 0.01)
+    connectors = [
+        (providers.AlphaVantageProvider if stub.style == "alphavantage" else providers.PolygonProvider)(
+            stub.url, "key", requests_per_second=1000, burst=1000
+        )
+        for stub in stubs
+    ]
+    return providers.ProviderPool(connectors, **kwargs)
+
+def test_parses_both_formats_and_filters_by_start_date(stubs):
+    """
+    Tests both connectors return the same bar layout, sorted and limited to the start date.
+    """
+    for style, close in (("alphavantage", 3.0), ("polygon", 3.5)):
+        pool = make_pool(stubs(style))
+        try:
+            bars = pool.fetch_bars("SPY", start_date=DAYS[1])
+        finally:
+            pool.close()
+        assert [bar["date"] for bar in bars] == DAYS[1:]
+        assert bars[0] == {"date": DAYS[1], "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": bars[0]["volume"]}
+
+def test_concurrent_fetches_share_keep_alive_connections(stubs):
+    """
+    Tests concurrent fetches overlap on one event loop and reuse a bounded set of connections.
+    """
+    stub = stubs("alphavantage", latency=0.1)
+    pool = make_pool(stub, max_connections=10)
+    symbols = [f"S{i}" for i in range(40)]
+    try:
+        started = time.perf_counter()
+        results = asyncio.run_coroutine_threadsafe(pool.fetch_many(symbols), pool._running_loop()).result()
+        elapsed = time.perf_counter() - started
+        # Same pool, later calls: no new connections needed
+        pool.fetch_bars("AGAIN")
+    finally:
+        pool.close()
+    assert all(len(results[symbol]) == 3 for symbol in symbols)
+    assert elapsed < 40 * 0.1 / 2 # serial fetching would take 4s
+    assert stub.connections <= 10
+
+def test_token_bucket_limits_request_rate():
+    """
+    Tests requests beyond the burst wait for tokens at the configured rate.
+    """
+    async def take(n):
+        bucket = providers.TokenBucket(rate=50, capacity=2)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(n):
+            await bucket.acquire()
+        return loop.time() - started
+
+    # Two tokens are available at once, the next four arrive 20ms apart
+    assert asyncio.run(take(6)) >= 4 / 50 * 0.9
+
+def test_retries_with_backoff_then_succeeds(stubs):
+    """
+    Tests retryable statuses are retried on the same provider.
+    """
+    stub = stubs("alphavantage", failures=2, failure_status=503)
+    pool = make_pool(stub, max_retries=3)
+    try:
+        assert len(pool.fetch_bars("SPY")) == 3
+    finally:
+        pool.close()
+    assert len(stub.requests) == 3
+
+def test_fails_over_to_secondary_provider(stubs):
+    """
+    Tests the secondary provider serves when the primary keeps failing, and that
+    the error names every provider when all of them fail.
+    """
+    primary, secondary = stubs("alphavantage", failures=100, failure_status=500), stubs("polygon")
+    pool = make_pool(primary, secondary, max_retries=1)
+    try:
+        bars = pool.fetch_bars("SPY")
+        assert bars[0]["close"] == 3.5
+        assert len(primary.requests) == 2
+
+        secondary.failures = 100
+        with pytest.raises(providers.ProviderError, match="alphavantage.*polygon"):
+            pool.fetch_bars("SPY")
+    finally:
+        pool.close()
+
+def test_client_errors_are_not_retried(stubs):
+    """
+    Tests a 4xx other than 429 moves straight on to the next provider.
+    """
+    primary, secondary = stubs("alphavantage", failures=1, failure_status=404), stubs("polygon")
+    pool = make_pool(primary, secondary, max_retries=3)
+    try:
+        assert pool.fetch_bars("SPY")[0]["close"] == 3.5
+    finally:
+        pool.close()
+    assert len(primary.requests) == 1
+
+def test_hedges_slow_provider(stubs):
+    """
+    Tests a slow primary is hedged by the secondary and the first answer wins.
+    """
+    primary, secondary = stubs("alphavantage", latency=1.0), stubs("polygon")
+    pool = make_pool(primary, secondary, hedge_after=0.05)
+    try:
+        started = time.perf_counter()
+        bars = pool.fetch_bars("SPY")
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.close()
+    assert bars[0]["close"] == 3.5
+    assert elapsed < 0.8
+
+def test_waiting_for_a_token_does_not_hedge(stubs):
+    """
+    Tests requests queued behind the primary's own rate limit are not hedged,
+    however long they wait, while one slow once sent still is.
+    """
+    primary, secondary = stubs("alphavantage"), stubs("polygon")
+    pool = make_pool(primary, secondary, hedge_after=0.05)
+    pool.providers[0].bucket = providers.TokenBucket(rate=20, capacity=1) # a request every 50ms
+    try:
+        results = asyncio.run_coroutine_threadsafe(pool.fetch_many([f"S{i}" for i in range(6)]), pool._running_loop()).result()
+    finally:
+        pool.close()
+    assert all(len(bars) == 3 for bars in results.values())
+    assert len(primary.requests) == 6 and secondary.requests == []
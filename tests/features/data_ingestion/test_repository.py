@@ -5,6 +5,7 @@ from app.core.database import Base
 from app.features.data_ingestion import repository, schemas
 from app.features.signal_generation.models import Signal  # Import to resolve relationship
 from datetime import date
+import numpy as np
 
 # Use an in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -99,3 +100,115 @@ def test_get_market_data_for_instrument(db_session):
     filtered_data = repository.get_market_data_for_instrument(db=db_session, instrument_id=instrument.id, start_date=date(2023, 1, 2), end_date=date(2023, 1, 2))
     assert len(filtered_data) == 1
     assert filtered_data[0].date == date(2023, 1, 2)
+
+def test_bulk_upsert_market_data_is_idempotent(db_session):
+    """
+    Tests that replaying the same bars updates them in place instead of duplicating.
+    """
+    instrument = repository.create_instrument(db=db_session, instrument=schemas.InstrumentCreate(symbol="SPY", name="SPDR S&P 500", asset_class="ETF"))
+
+    market_data_list = [
+        schemas.MarketDataCreate(instrument_id=instrument.id, date=date(2023, 1, 2), open=380, high=385, low=378, close=384, volume=900),
+        schemas.MarketDataCreate(instrument_id=instrument.id, date=date(2023, 1, 3), open=384, high=386, low=380, close=381, volume=950),
+    ]
+    assert repository.bulk_upsert_market_data(db=db_session, market_data_list=market_data_list) == 2
+    assert repository.bulk_upsert_market_data(db=db_session, market_data_list=market_data_list) == 2
+
+    revised = [
+        schemas.MarketDataCreate(instrument_id=instrument.id, date=date(2023, 1, 3), open=384, high=387, low=380, close=382, volume=990),
+        schemas.MarketDataCreate(instrument_id=instrument.id, date=date(2023, 1, 4), open=382, high=383, low=379, close=380, volume=800),
+    ]
+    repository.bulk_upsert_market_data(db=db_session, market_data_list=revised)
+
+    stored = repository.get_market_data_for_instrument(db=db_session, instrument_id=instrument.id)
+    assert [md.date for md in stored] == [date(2023, 1, 2), date(2023, 1, 3), date(2023, 1, 4)]
+    assert stored[1].close == 382
+    assert stored[1].volume == 990
+
+def test_bulk_upsert_market_data_keeps_last_duplicate(db_session):
+    """
+    Tests that duplicate (instrument_id, date) rows within one batch collapse to the last one.
+    """
+    instrument = repository.create_instrument(db=db_session, instrument=schemas.InstrumentCreate(symbol="GLD", name="SPDR Gold", asset_class="ETF"))
+
+    market_data_list = [
+        schemas.MarketDataCreate(instrument_id=instrument.id, date=date(2023, 1, 2), open=170, high=172, low=169, close=171, volume=100),
+        schemas.MarketDataCreate(instrument_id=instrument.id, date=date(2023, 1, 2), open=170, high=173, low=169, close=172.5, volume=150),
+    ]
+    assert repository.bulk_upsert_market_data(db=db_session, market_data_list=market_data_list) == 1
+
+    stored = repository.get_market_data_for_instrument(db=db_session, instrument_id=instrument.id)
+    assert len(stored) == 1
+    assert stored[0].close == 172.5
+
+def test_get_latest_market_data_dates(db_session):
+    """
+    Tests that the latest bar date is returned per instrument in one grouped query.
+    """
+    spy = repository.create_instrument(db=db_session, instrument=schemas.InstrumentCreate(symbol="SPY", name="SPDR S&P 500", asset_class="ETF"))
+    xlu = repository.create_instrument(db=db_session, instrument=schemas.InstrumentCreate(symbol="XLU", name="Utilities", asset_class="ETF"))
+    repository.create_instrument(db=db_session, instrument=schemas.InstrumentCreate(symbol="XLK", name="Technology", asset_class="ETF"))
+
+    repository.bulk_upsert_market_data(db=db_session, market_data_list=[
+        schemas.MarketDataCreate(instrument_id=spy.id, date=date(2023, 1, 2), open=1, high=1, low=1, close=1, volume=1),
+        schemas.MarketDataCreate(instrument_id=spy.id, date=date(2023, 1, 5), open=1, high=1, low=1, close=1, volume=1),
+        schemas.MarketDataCreate(instrument_id=xlu.id, date=date(2023, 1, 3), open=1, high=1, low=1, close=1, volume=1),
+    ])
+
+    assert repository.get_latest_market_data_dates(db=db_session) == {spy.id: date(2023, 1, 5), xlu.id: date(2023, 1, 3)}
+    assert repository.get_latest_market_data_dates(db=db_session, instrument_ids=[xlu.id]) == {xlu.id: date(2023, 1, 3)}
+
+def test_load_bar_arrays(db_session):
+    """
+    Tests loading several instruments' bars as columnar arrays in one query.
+    """
+    spy = repository.create_instrument(db=db_session, instrument=schemas.InstrumentCreate(symbol="SPY", name="SPDR S&P 500", asset_class="ETF"))
+    xlu = repository.create_instrument(db=db_session, instrument=schemas.InstrumentCreate(symbol="XLU", name="Utilities", asset_class="ETF"))
+    xlk = repository.create_instrument(db=db_session, instrument=schemas.InstrumentCreate(symbol="XLK", name="Technology", asset_class="ETF"))
+    repository.bulk_upsert_market_data(db=db_session, market_data_list=[
+        schemas.MarketDataCreate(instrument_id=xlu.id, date=date(2023, 1, 3), open=60, high=61, low=59, close=60.5, volume=300),
+        schemas.MarketDataCreate(instrument_id=spy.id, date=date(2023, 1, 4), open=382, high=385, low=380, close=384, volume=200),
+        schemas.MarketDataCreate(instrument_id=spy.id, date=date(2023, 1, 3), open=380, high=383, low=378, close=382, volume=100),
+        schemas.MarketDataCreate(instrument_id=xlk.id, date=date(2023, 1, 3), open=120, high=121, low=119, close=120, volume=50),
+    ])
+
+    bars = repository.load_bar_arrays(db=db_session, instrument_ids=[spy.id, xlu.id], start_date=date(2023, 1, 3))
+    assert len(bars) == 3
+    assert bars.instrument_ids.tolist() == [spy.id, spy.id, xlu.id]
+    assert bars.dates.dtype == np.dtype("datetime64[D]")
+    assert bars.dates.tolist() == [date(2023, 1, 3), date(2023, 1, 4), date(2023, 1, 3)]
+    assert bars.close.dtype == np.float64 and bars.close.tolist() == [382, 384, 60.5]
+    assert bars.volume.dtype == np.int64 and bars.volume.tolist() == [100, 200, 300]
+
+    assert len(repository.load_bar_arrays(db=db_session, instrument_ids=[spy.id], end_date=date(2022, 12, 31))) == 0
+
+def test_keyset_pages_cover_every_bar_once(db_session):
+    """
+    Tests paging market data by (instrument_id, date) cursors returns every bar exactly once.
+    """
+    ids = []
+    for symbol in ("AAA", "BBB", "CCC"):
+        instrument = repository.create_instrument(db_session, schemas.InstrumentCreate(symbol=symbol, name=symbol, asset_class="ETF"))
+        ids.append(instrument.id)
+        repository.bulk_upsert_market_data(db_session, [
+            schemas.MarketDataCreate(instrument_id=instrument.id, date=date(2024, 1, day), open=1, high=1, low=1, close=day, volume=1)
+            for day in range(1, 8)
+        ])
+
+    seen, after, pages = [], None, 0
+    while True:
+        until, has_more = repository.find_bar_page_end(db_session, ids[:2] + ids[2:], after=after, limit=5)
+        if until is None:
+            break
+        batches = list(repository.iter_bar_batches(db_session, ids, after=after, until=until, batch_size=2))
+        assert all(len(batch) <= 2 for batch in batches)
+        seen.extend((int(i), d) for batch in batches for i, d in zip(batch.instrument_ids, batch.dates.astype(object)))
+        pages += 1
+        after = until
+        if not has_more:
+            break
+
+    assert pages == 5
+    assert seen == [(i, date(2024, 1, day)) for i in ids for day in range(1, 8)]
+    page_end, has_more = repository.find_bar_page_end(db_session, [ids[1]], start_date=date(2024, 1, 6), limit=5)
+    assert page_end == (ids[1], date(2024, 1, 7)) and not has_more
@@ -0,0 +1,67 @@
+import numpy as np
+from datetime import date
+
+from app.features.data_ingestion import repository, resampling, schemas, service
+from app.features.data_ingestion.columnar import BarArrays
+from tests.features.data_ingestion.test_repository import db_session
+
+def test_week_ending_maps_to_configured_weekday():
+    """
+    Tests dates are mapped to the end of their week for Friday and Sunday week ends.
+    """
+    dates = np.array(["2024-01-01", "2024-01-05", "2024-01-06", "2024-01-08"], dtype="datetime64[D]")
+    assert resampling.week_ending(dates).tolist() == [date(2024, 1, 5), date(2024, 1, 5), date(2024, 1, 12), date(2024, 1, 12)]
+    assert resampling.week_ending(dates, 6).tolist() == [date(2024, 1, 7)] * 3 + [date(2024, 1, 14)]
+    assert resampling.week_starting(dates).tolist() == [date(2023, 12, 30), date(2023, 12, 30), date(2024, 1, 6), date(2024, 1, 6)]
+
+def test_resample_weekly_aggregates_ohlcv():
+    """
+    Tests first open, max high, min low, last close, summed volume and week completeness.
+    """
+    bars = BarArrays.from_columns(
+        instrument_ids=[1, 1, 1, 1, 2],
+        dates=["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-08", "2024-01-05"],
+        open=[10, 11, 12, 13, 50], high=[12, 15, 13, 14, 51], low=[9, 10, 8, 12, 49],
+        close=[11, 12, 12.5, 13.5, 50.5], volume=[100, 200, 300, 400, 7],
+    )
+    weekly, last_dates, complete = resampling.resample_weekly(bars)
+
+    assert weekly.instrument_ids.tolist() == [1, 1, 2]
+    assert weekly.dates.tolist() == [date(2024, 1, 5), date(2024, 1, 12), date(2024, 1, 5)]
+    assert weekly.open.tolist() == [10, 13, 50]
+    assert weekly.high.tolist() == [15, 14, 51]
+    assert weekly.low.tolist() == [8, 12, 49]
+    assert weekly.close.tolist() == [12.5, 13.5, 50.5]
+    assert weekly.volume.tolist() == [600, 400, 7]
+    assert last_dates.tolist() == [date(2024, 1, 4), date(2024, 1, 8), date(2024, 1, 5)]
+    # Thursday close (holiday Friday) is complete once the next week starts;
+    # the Monday-only week is still open
+    assert complete.tolist() == [True, False, True]
+
+def test_refresh_weekly_bars_is_incremental(db_session):
+    """
+    Tests the weekly table is rebuilt only around new daily bars and that the
+    current week is replaced, not duplicated, as the week fills in.
+    """
+    instrument = repository.create_instrument(db_session, schemas.InstrumentCreate(symbol="XLE", name="Energy", asset_class="ETF"))
+
+    def add_days(days, closes):
+        repository.bulk_upsert_market_data(db_session, [
+            schemas.MarketDataCreate(instrument_id=instrument.id, date=d, open=c, high=c + 1, low=c - 1, close=c, volume=10)
+            for d, c in zip(days, closes)
+        ])
+        return service.refresh_weekly_bars(db_session, {instrument.id: days[0]})
+
+    completed = add_days([date(2024, 1, 2), date(2024, 1, 3)], [10, 11])
+    assert len(completed) == 0
+    completed = add_days([date(2024, 1, 5)], [12])
+    assert completed.dates.tolist() == [date(2024, 1, 5)]
+    completed = add_days([date(2024, 1, 8)], [13])
+    assert completed.dates.tolist() == [date(2024, 1, 5)]
+
+    weekly = repository.load_weekly_bar_arrays(db_session, [instrument.id])
+    assert weekly.dates.tolist() == [date(2024, 1, 5), date(2024, 1, 12)]
+    assert weekly.open.tolist() == [10, 13]
+    assert weekly.close.tolist() == [12, 13]
+    assert weekly.volume.tolist() == [30, 10]
+    assert len(repository.load_weekly_bar_arrays(db_session, [instrument.id], completed_only=True)) == 1
@@ -0,0 +1,147 @@
+import json
+import pytest
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+pytest.importorskip("fastapi.testclient")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from unittest.mock import patch
+
+from app.core import cache
+from app.core.database import Base, get_db, get_session_factory
+from app.features.data_ingestion import repository, schemas, storage
+from app.features.data_ingestion.columnar import BarArrays
+from app.features.data_ingestion.router import router
+from app.features.signal_generation.models import Signal  # Import to resolve relationship
+from tests.features.data_ingestion.test_cache import fake_redis
+
+# One shared in-memory connection, since the test client serves requests from other threads
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def client():
+    Base.metadata.create_all(bind=engine)
+    app = FastAPI()
+    app.include_router(router)
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    db = TestingSessionLocal()
+    for symbol in ("XLK", "XLU", "XLE"):
+        instrument = repository.create_instrument(db, schemas.InstrumentCreate(symbol=symbol, name=symbol, asset_class="ETF"))
+        repository.bulk_upsert_market_data(db, [
+            schemas.MarketDataCreate(instrument_id=instrument.id, date=date(2024, 1, day), open=1, high=2, low=0.5, close=day, volume=10)
+            for day in range(1, 6)
+        ])
+    db.close()
+    try:
+        yield TestClient(app)
+    finally:
+        Base.metadata.drop_all(bind=engine)
+
+def test_instruments_keyset_pages(client):
+    """
+    Tests instruments are paged by id cursor via the X-Next-Cursor header.
+    """
+    first = client.get("/instruments/", params={"limit": 2})
+    assert [i["symbol"] for i in first.json()] == ["XLK", "XLU"]
+    second = client.get("/instruments/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [i["symbol"] for i in second.json()] == ["XLE"]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_market_data_streams_ndjson_pages(client):
+    """
+    Tests bars stream as NDJSON in (instrument_id, date) order across cursor pages.
+    """
+    rows, cursor = [], None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/market-data/", params=params)
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows.extend(json.loads(line) for line in response.text.splitlines())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(rows) == 15
+    assert [(r["instrument_id"], r["date"]) for r in rows] == sorted((r["instrument_id"], r["date"]) for r in rows)
+
+def test_market_data_conditional_get(client):
+    """
+    Tests an up-to-date client gets 304, and new bars change the validators.
+    """
+    first = client.get("/market-data/", params={"instrument_id": 1})
+    assert first.headers["Last-Modified"].endswith(" GMT")
+    assert client.get("/market-data/", params={"instrument_id": 1}, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    db = TestingSessionLocal()
+    repository.bulk_upsert_market_data(db, [
+        schemas.MarketDataCreate(instrument_id=1, date=date(2024, 1, 8), open=1, high=2, low=0.5, close=8, volume=10)
+    ])
+    db.close()
+    refreshed = client.get("/market-data/", params={"instrument_id": 1}, headers={"If-None-Match": first.headers["ETag"]})
+    assert refreshed.status_code == 200
+    assert len(refreshed.text.splitlines()) == 6
+
+def test_rewritten_history_changes_the_etag(client):
+    """
+    Tests a corrected historical bar is not answered with a stale 304, while
+    writes to other instruments leave the validator alone.
+    """
+    first = client.get("/market-data/", params={"instrument_id": 1})
+    db = TestingSessionLocal()
+    repository.bulk_upsert_market_data(db, [
+        schemas.MarketDataCreate(instrument_id=2, date=date(2024, 1, 8), open=1, high=2, low=0.5, close=8, volume=10)
+    ])
+    assert client.get("/market-data/", params={"instrument_id": 1}, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    repository.bulk_upsert_market_data(db, [
+        schemas.MarketDataCreate(instrument_id=1, date=date(2024, 1, 2), open=1, high=2, low=0.5, close=1.5, volume=10)
+    ])
+    db.close()
+    refreshed = client.get("/market-data/", params={"instrument_id": 1}, headers={"If-None-Match": first.headers["ETag"]})
+    assert refreshed.status_code == 200
+    assert json.loads(refreshed.text.splitlines()[1])["close"] == 1.5
+
+def test_repeated_reads_are_served_from_the_cache(client, fake_redis):
+    """
+    Tests a single instrument's pages and the instrument list come from the
+    cache the second time, page the same as the database, and that a
+    corrected bar is read again.
+    """
+    # Several instruments are streamed from the database
+    uncached = client.get("/market-data/", params={"instrument_id": [1, 2], "limit": 5}).text.splitlines()
+    pages = []
+    for _ in range(2):
+        first = client.get("/market-data/", params={"instrument_id": 1, "limit": 3})
+        second = client.get("/market-data/", params={"instrument_id": 1, "limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+        assert "X-Next-Cursor" not in second.headers
+        pages.append((first.text, second.text))
+        with patch.object(repository, "get_market_data_for_instrument", side_effect=AssertionError("database hit")):
+            assert client.get("/instruments/").json()[0]["symbol"] == "XLK"
+    assert pages[0] == pages[1]
+    assert (pages[0][0] + pages[0][1]).splitlines() == uncached
+    assert [json.loads(line)["date"] for line in pages[0][1].splitlines()] == ["2024-01-04", "2024-01-05"]
+    assert cache.stats.snapshot()["market_data"] == {"hits": 3, "misses": 1, "errors": 0}
+    assert cache.stats.snapshot()["instruments"] == {"hits": 1, "misses": 1, "errors": 0}
+
+    db = TestingSessionLocal()
+    storage.DatabaseBarStore(db).write_bars(BarArrays.from_columns(
+        instrument_ids=[1], dates=["2024-01-02"], open=[1], high=[2], low=[0.5], close=[1.5], volume=[10],
+    ))
+    db.close()
+    assert json.loads(client.get("/market-data/", params={"instrument_id": 1}).text.splitlines()[1])["close"] == 1.5
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/market-data/", params={"cursor": "bogus"}).status_code == 400
@@ -43,8 +43,8 @@ def test_ingest_data_for_new_instrument(mock_repo, db_session: Session):
         mock_repo.create_instrument.assert_called_once()
 
         # Verify that the market data was saved
-        mock_repo.bulk_create_market_data.assert_called_once()
-        call_args = mock_repo.bulk_create_market_data.call_args[1]
+        mock_repo.bulk_upsert_market_data.assert_called_once()
+        call_args = mock_repo.bulk_upsert_market_data.call_args[1]
         assert len(call_args['market_data_list']) == 2
         assert call_args['market_data_list'][0].close == 105
 
@@ -63,6 +63,7 @@ def test_ingest_data_for_existing_instrument(mock_repo, db_session: Session):
 
     with patch('app.features.data_ingestion.service.fetch_data_from_source', return_value=mock_api_data):
         mock_repo.get_instrument_by_symbol.return_value = existing_instrument
+        mock_repo.get_latest_market_data_dates.return_value = {}
 
         # --- Act ---
         service.ingest_data_for_symbol(db=db_session, symbol=symbol)
@@ -75,8 +76,8 @@ def test_ingest_data_for_existing_instrument(mock_repo, db_session: Session):
         mock_repo.create_instrument.assert_not_called()
 
         # Verify market data was still saved
-        mock_repo.bulk_create_market_data.assert_called_once()
-        assert len(mock_repo.bulk_create_market_data.call_args[1]['market_data_list']) == 1
+        mock_repo.bulk_upsert_market_data.assert_called_once()
+        assert len(mock_repo.bulk_upsert_market_data.call_args[1]['market_data_list']) == 1
 
 @patch('app.features.data_ingestion.service.repository')
 def test_ingestion_fails_if_api_fails(mock_repo, db_session: Session):
@@ -85,6 +86,7 @@ def test_ingestion_fails_if_api_fails(mock_repo, db_session: Session):
     """
     # --- Arrange ---
     symbol = "FAILCOIN"
+    mock_repo.get_latest_market_data_dates.return_value = {}
     with patch('app.features.data_ingestion.service.fetch_data_from_source', side_effect=Exception("API is down")):
 
         # --- Act & Assert ---
@@ -93,7 +95,7 @@ def test_ingestion_fails_if_api_fails(mock_repo, db_session: Session):
 
         # Verify no database writes were attempted
         mock_repo.create_instrument.assert_not_called()
-        mock_repo.bulk_create_market_data.assert_not_called()
+        mock_repo.bulk_upsert_market_data.assert_not_called()
 
 @patch('app.features.data_ingestion.service.repository')
 def test_ingestion_handles_no_new_data(mock_repo, db_session: Session):
@@ -102,6 +104,7 @@ def test_ingestion_handles_no_new_data(mock_repo, db_session: Session):
     """
     # --- Arrange ---
     symbol = "NODATACOIN"
+    mock_repo.get_latest_market_data_dates.return_value = {}
     with patch('app.features.data_ingestion.service.fetch_data_from_source', return_value=[]):
 
         # --- Act ---
@@ -110,4 +113,85 @@ def test_ingestion_handles_no_new_data(mock_repo, db_session: Session):
         # --- Assert ---
         # Verify no database writes were attempted
         mock_repo.create_instrument.assert_not_called()
-        mock_repo.bulk_create_market_data.assert_not_called()
+        mock_repo.bulk_upsert_market_data.assert_not_called()
+
+@patch('app.features.data_ingestion.service.repository')
+@patch('app.features.data_ingestion.service.ingest_symbol')
+def test_ingest_symbols_concurrently_isolates_failures(mock_ingest, mock_repo):
+    """
+    Test that each symbol gets its own session and one failure does not affect the others.
+    """
+    # --- Arrange ---
+    symbols = ["SPY", "BADSYM", "XLK"]
+    sessions = []
+
+    def session_factory():
+        session = MagicMock()
+        sessions.append(session)
+        return session
+
+    mock_repo.get_latest_market_data_dates.return_value = {}
+
+    def ingest(db, symbol, latest_dates=None, after_ingest=None):
+        if symbol == "BADSYM":
+            raise ValueError("provider rejected symbol")
+
+    mock_ingest.side_effect = ingest
+
+    # --- Act ---
+    results = service.ingest_symbols_concurrently(session_factory, symbols, max_workers=3)
+
+    # --- Assert ---
+    assert [r.symbol for r in results] == symbols
+    assert [r.succeeded for r in results] == [True, False, True]
+    assert results[1].error == "provider rejected symbol"
+    assert all(r.elapsed_seconds >= 0 for r in results)
+
+    # High-water marks are read once, then one session per symbol, each closed;
+    # only the failed one rolled back
+    mock_repo.get_latest_market_data_dates.assert_called_once()
+    assert len(sessions) == 4
+    assert all(s.close.called for s in sessions)
+    assert sum(1 for s in sessions if s.rollback.called) == 1
+
+@patch('app.features.data_ingestion.service.repository')
+def test_ingestion_skips_instrument_that_is_current(mock_repo, db_session: Session):
+    """
+    Test that an instrument whose latest bar is the latest expected bar is not refetched.
+    """
+    # --- Arrange ---
+    as_of = date(2024, 3, 8)  # a Friday
+    instrument = models.Instrument(id=3, symbol="XLU", name="XLU Name", asset_class="ETF")
+    mock_repo.get_instrument_by_symbol.return_value = instrument
+
+    with patch('app.features.data_ingestion.service.fetch_data_from_source') as mock_fetch:
+        # --- Act ---
+        service.ingest_data_for_symbol(db=db_session, symbol="XLU", latest_dates={3: as_of}, as_of=date(2024, 3, 10))
+
+        # --- Assert ---
+        mock_fetch.assert_not_called()
+        mock_repo.get_latest_market_data_dates.assert_not_called()
+        mock_repo.bulk_upsert_market_data.assert_not_called()
+
+@patch('app.features.data_ingestion.service.repository')
+def test_ingestion_fetches_only_after_high_water_mark(mock_repo, db_session: Session):
+    """
+    Test that only bars after the latest stored date are requested and written.
+    """
+    # --- Arrange ---
+    instrument = models.Instrument(id=4, symbol="XLI", name="XLI Name", asset_class="ETF")
+    mock_repo.get_instrument_by_symbol.return_value = instrument
+    mock_repo.get_latest_market_data_dates.return_value = {4: date(2024, 3, 6)}
+    mock_api_data = [
+        {'date': date(2024, 3, 6), 'open': 1, 'high': 2, 'low': 1, 'close': 2, 'volume': 10},
+        {'date': date(2024, 3, 7), 'open': 2, 'high': 3, 'low': 2, 'close': 3, 'volume': 20},
+    ]
+
+    with patch('app.features.data_ingestion.service.fetch_data_from_source', return_value=mock_api_data) as mock_fetch:
+        # --- Act ---
+        service.ingest_data_for_symbol(db=db_session, symbol="XLI", as_of=date(2024, 3, 8))
+
+        # --- Assert ---
+        assert mock_fetch.call_args[1]['start_date'] == date(2024, 3, 7)
+        written = mock_repo.bulk_upsert_market_data.call_args[1]['market_data_list']
+        assert [md.date for md in written] == [date(2024, 3, 7)]
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+from datetime import date
+
+from app.features.data_ingestion import repository, storage
+from app.features.data_ingestion.columnar import BarArrays
+from app.features.data_ingestion.mmap_store import MemoryMappedBarStore
+from tests.features.data_ingestion.test_repository import db_session
+
+def make_bars(instrument_ids, dates, base=100.0):
+    n = len(dates)
+    close = base + np.arange(n, dtype=np.float64)
+    return BarArrays.from_columns(
+        instrument_ids=instrument_ids, dates=dates, open=close - 0.5, high=close + 1, low=close - 1,
+        close=close, volume=np.arange(n) * 10,
+    )
+
+def assert_same_bars(left: BarArrays, right: BarArrays):
+    for field in ("instrument_ids", "dates", "open", "high", "low", "close", "volume"):
+        np.testing.assert_array_equal(getattr(left, field), getattr(right, field))
+
+@pytest.fixture(params=["mmap", "database"])
+def bar_store(request, tmp_path):
+    if request.param == "mmap":
+        return MemoryMappedBarStore(tmp_path / "bars")
+    return storage.DatabaseBarStore(request.getfixturevalue("db_session"))
+
+def test_backends_are_interchangeable(bar_store):
+    """
+    Tests both backends store, replace and return the same bars through the BarStore interface.
+    """
+    first = make_bars([1, 1, 2], ["2024-01-01", "2024-01-03", "2024-01-02"])
+    assert bar_store.write_bars(first) == 3
+    # A replaced bar, a later bar and a bar between two stored dates
+    update = make_bars([1, 1, 1], ["2024-01-02", "2024-01-03", "2024-01-04"], base=200.0)
+    assert bar_store.write_bars(update) == 3
+
+    loaded = bar_store.load_bars()
+    assert loaded.instrument_ids.tolist() == [1, 1, 1, 1, 2]
+    assert loaded.dates.astype(str).tolist() == ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-02"]
+    assert loaded.close.tolist() == [100.0, 200.0, 201.0, 202.0, 102.0]
+    assert bar_store.latest_dates() == {1: date(2024, 1, 4), 2: date(2024, 1, 2)}
+
+    window = bar_store.load_bars([1], start_date=date(2024, 1, 2), end_date=date(2024, 1, 3))
+    assert window.close.tolist() == [200.0, 201.0]
+
+def test_mmap_reads_are_zero_copy_views(tmp_path):
+    """
+    Tests a single instrument's bars are read-only views onto the mapped column files.
+    """
+    store = MemoryMappedBarStore(tmp_path)
+    store.write_bars(make_bars([7] * 5, np.arange("2024-01-01", "2024-01-06", dtype="datetime64[D]")))
+    bars = store.load_bars([7], start_date=date(2024, 1, 2))
+    assert isinstance(bars.close, np.memmap)
+    assert isinstance(bars.dates, np.memmap)
+    assert not bars.close.flags.writeable
+    assert bars.close.tolist() == [101.0, 102.0, 103.0, 104.0]
+    assert (tmp_path / "7" / "close.f8").stat().st_size == 5 * 8
+
+    # Another store on the same directory (e.g. another process) sees the appended bars
+    store.write_bars(make_bars([7], ["2024-01-08"], base=500.0))
+    reader = MemoryMappedBarStore(tmp_path)
+    assert reader.latest_dates() == {7: date(2024, 1, 8)}
+    assert reader.load_bars([7]).close[-1] == 500.0
+
+def test_mmap_recovers_from_interrupted_append(tmp_path):
+    """
+    Tests value columns written past the date file (an append cut short) are ignored and then truncated.
+    """
+    store = MemoryMappedBarStore(tmp_path)
+    store.write_bars(make_bars([3, 3], ["2024-01-01", "2024-01-02"]))
+    with open(tmp_path / "3" / "close.f8", "ab") as handle:
+        handle.write(np.array([999.0]).tobytes())
+    assert store.load_bars([3]).close.tolist() == [100.0, 101.0]
+
+    store.write_bars(make_bars([3], ["2024-01-03"], base=102.0))
+    assert MemoryMappedBarStore(tmp_path).load_bars([3]).close.tolist() == [100.0, 101.0, 102.0]
+
+def test_copy_new_bars_mirrors_database_incrementally(db_session, tmp_path):
+    """
+    Tests only bars after the mirror's latest date are copied, and backtest input resampled from either store matches.
+    """
+    source = storage.DatabaseBarStore(db_session)
+    days = np.arange("2024-01-01", "2024-02-01", dtype="datetime64[D]")
+    days = days[np.is_busday(days)]
+    source.write_bars(make_bars([1] * len(days), days))
+    source.write_bars(make_bars([2] * 10, days[:10], base=50.0))
+
+    mirror = MemoryMappedBarStore(tmp_path)
+    assert storage.copy_new_bars(source, mirror) == len(days) + 10
+    assert storage.copy_new_bars(source, mirror) == 0
+    source.write_bars(make_bars([2] * 3, days[10:13], base=60.0))
+    assert storage.copy_new_bars(source, mirror) == 3
+    assert_same_bars(mirror.load_bars(), source.load_bars())
+
+    weekly = storage.load_completed_weekly_bars(mirror, start_date=date(2024, 1, 8), end_date=date(2024, 1, 31))
+    assert weekly.dates.astype(str).tolist() == ["2024-01-12", "2024-01-19", "2024-01-26", "2024-01-12"]
+    assert_same_bars(weekly, storage.load_completed_weekly_bars(source, start_date=date(2024, 1, 8), end_date=date(2024, 1, 31)))
+
+def test_copy_new_bars_recopies_rewritten_history(db_session, tmp_path):
+    """
+    Tests a bar corrected or backfilled in the database reaches the mirror,
+    while bars appended afterwards are copied incrementally again.
+    """
+    source = storage.DatabaseBarStore(db_session)
+    days = np.arange("2024-01-01", "2024-02-01", dtype="datetime64[D]")
+    days = days[np.is_busday(days)]
+    source.write_bars(make_bars([1] * 10, days[:10]))
+    source.write_bars(make_bars([2] * 10, days[:10], base=50.0))
+    mirror = MemoryMappedBarStore(tmp_path)
+    storage.copy_new_bars(source, mirror)
+
+    # A correction of instrument 1 only copies instrument 1 again, in full
+    source.write_bars(make_bars([1], days[3:4], base=300.0))
+    assert storage.copy_new_bars(source, mirror) == 10
+    assert mirror.load_bars([1]).close[3] == 300.0
+    assert storage.copy_new_bars(source, mirror) == 0
+
+    # A backfilled bar (on a date the mirror lacks, before its latest) likewise
+    source.write_bars(make_bars([2], days[-1:], base=70.0))
+    assert storage.copy_new_bars(source, mirror) == 1
+    holidays = np.arange("2024-01-06", "2024-01-07", dtype="datetime64[D]")
+    source.write_bars(make_bars([2], holidays, base=65.0))
+    assert storage.copy_new_bars(source, mirror) == 12
+    assert_same_bars(mirror.load_bars(), source.load_bars())
+
+    # A new store on the same directory sees the recorded counters
+    assert MemoryMappedBarStore(tmp_path).revisions() == source.revisions()
+
@@ -0,0 +1,168 @@
+import numpy as np
+from datetime import date
+
+from app.features.data_ingestion import repository, schemas, service, validation
+from app.features.data_ingestion.columnar import BarArrays
+from app.features.signal_generation import service as signal_service
+from tests.features.data_ingestion.test_repository import db_session
+
+START = np.datetime64("2024-01-01")
+
+def sessions(n, start=START):
+    """
+    The first `n` weekdays from `start`.
+    """
+    days = np.arange(start, start + np.timedelta64(2 * n + 7, "D"), dtype="datetime64[D]")
+    return days[np.is_busday(days)][:n]
+
+def make_bars(instrument_id, dates, close):
+    close = np.asarray(close, dtype=np.float64)
+    return BarArrays.from_columns(
+        instrument_ids=np.full(len(dates), instrument_id), dates=dates,
+        open=close, high=close * 1.01, low=close * 0.99, close=close, volume=np.full(len(dates), 1000),
+    )
+
+def random_walk(n, seed):
+    return 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, n)))
+
+def concat(*parts):
+    return BarArrays.from_columns(*(
+        np.concatenate([getattr(part, field) for part in parts])
+        for field in ("instrument_ids", "dates", "open", "high", "low", "close", "volume")
+    ))
+
+def test_ohlc_issues():
+    """
+    Tests prices outside the high-low range and non-positive prices are flagged.
+    """
+    bars = BarArrays.from_columns(
+        instrument_ids=[1, 1, 1, 1], dates=sessions(4),
+        open=[10, 10, 12, 10], high=[11, 11, 11, 11], low=[9, 10.5, 9, 0], close=[10, 10.8, 10, 10], volume=[1] * 4,
+    )
+    assert validation.ohlc_issues(bars).tolist() == [False, True, True, True]
+
+def test_missing_prices_are_ohlc_issues():
+    """
+    Tests bars with a NULL open or close are flagged, not passed as consistent.
+    """
+    bars = BarArrays.from_columns(
+        instrument_ids=[1, 1, 1], dates=sessions(3),
+        open=[10, None, 10], high=[11, 11, 11], low=[9, 9, 9], close=[10, 10, None], volume=[1] * 3,
+    )
+    assert validation.validate_bars(bars).tolist() == [0, validation.OHLC, validation.OHLC]
+
+def test_gap_issues_are_calendar_aware():
+    """
+    Tests missing sessions are counted in business days, skipping weekends and
+    days on which no instrument in the universe traded.
+    """
+    days = sessions(12)
+    reference = make_bars(1, np.delete(days, 3), random_walk(11, 0)) # nobody traded on days[3]
+    gapped = make_bars(2, np.delete(days, [3, 6, 7, 8]), random_walk(8, 1))
+    single = make_bars(3, np.delete(days, [3, 10]), random_walk(10, 2))
+    bars = concat(reference, gapped, single)
+
+    flagged = bars.take(validation.gap_issues(bars, max_missing_sessions=1))
+    assert flagged.instrument_ids.tolist() == [2]
+    assert flagged.dates.tolist() == [days[9].astype(object)]
+    assert validation.gap_issues(bars, max_missing_sessions=0).sum() == 2
+    # A declared holiday is not a missing session either
+    holidays = days[[6, 7]]
+    assert not validation.gap_issues(bars, max_missing_sessions=1, holidays=holidays).any()
+
+def test_gap_issues_of_one_instrument_use_the_universe_calendar(db_session):
+    """
+    Tests a single instrument's missing sessions are flagged when it is checked
+    on its own, against the sessions the rest of the universe traded.
+    """
+    days = sessions(12)
+    gapped = make_bars(2, np.delete(days, [3, 4, 5, 6, 7]), random_walk(7, 1))
+    assert not validation.gap_issues(gapped).any()
+    assert validation.gap_issues(gapped, trading_dates=days).tolist() == [False, False, False, True, False, False, False]
+
+    ids = []
+    for symbol in ("REF", "GAPPED"):
+        ids.append(repository.create_instrument(db_session, schemas.InstrumentCreate(symbol=symbol, name=symbol, asset_class="ETF")).id)
+    repository.upsert_bar_arrays(db_session, concat(make_bars(ids[0], days, random_walk(12, 0)), make_bars(ids[1], gapped.dates, gapped.close)))
+    status = service.validate_universe(db_session, [ids[1]])[ids[1]]
+    assert status.quarantined and status.issues == [[str(days[8]), "GAP"]]
+
+def test_outlier_issues_use_rolling_mad():
+    """
+    Tests a spike far outside the trailing return distribution is flagged, and
+    that windows never reach into the previous instrument.
+    """
+    close = random_walk(60, 3)
+    close[40] *= 1.3
+    bars = concat(make_bars(1, sessions(60), random_walk(60, 4) * 10), make_bars(2, sessions(60), close))
+    flagged = np.flatnonzero(validation.outlier_issues(bars, window=20, threshold=8.0))
+    # The jump up and the fall back the next day
+    assert flagged.tolist() == [60 + 40, 60 + 41]
+
+def test_stale_issues():
+    """
+    Tests a close repeated for more than the allowed sessions is flagged from the first offending bar.
+    """
+    close = [10, 11, 11, 11, 11, 12, 12]
+    bars = make_bars(1, sessions(7), close)
+    assert validation.stale_issues(bars, max_repeats=2).tolist() == [False, False, False, False, True, False, False]
+    assert not validation.stale_issues(bars, max_repeats=3).any()
+
+def test_validate_universe_quarantines_and_signals_respect_it(db_session):
+    """
+    Tests a bad bar quarantines its instrument, the signal stage skips it, and
+    correcting the bar (or releasing the instrument) lifts the quarantine.
+    """
+    ids = []
+    for symbol in ("GOOD", "BAD"):
+        instrument = repository.create_instrument(db_session, schemas.InstrumentCreate(symbol=symbol, name=symbol, asset_class="ETF"))
+        ids.append(instrument.id)
+    good, bad = ids
+    days = sessions(90)
+    bad_close = random_walk(90, 6)
+    bad_close[80] *= 3
+    repository.upsert_bar_arrays(db_session, concat(make_bars(good, days, random_walk(90, 5)), make_bars(bad, days, bad_close)))
+
+    statuses = service.validate_universe(db_session)
+    assert not statuses[good].quarantined
+    assert statuses[bad].quarantined
+    assert statuses[bad].first_issue_date == days[80].astype(object)
+    assert statuses[bad].issues[0] == [str(days[80]), "OUTLIER"]
+    assert repository.get_quarantined_instrument_ids(db_session) == [bad]
+    # Nothing new to check
+    assert service.validate_universe(db_session, [good]) == {}
+
+    weekly = make_bars(bad, days[-1:], bad_close[-1:])
+    assert signal_service.advance_signals(db_session, bad, weekly) == []
+    assert signal_service.repository.get_indicator_state(db_session, bad) is None
+
+    # A corrected bar written in place (ingestion never rewrites held bars): re-validation lifts the quarantine
+    fixed = bad_close[79] * np.sqrt(bad_close[81] / bad_close[79])
+    repository.upsert_bar_arrays(db_session, make_bars(bad, days[80:81], [fixed]))
+    assert not service.validate_universe(db_session)[bad].quarantined
+    assert repository.get_quarantined_instrument_ids(db_session) == []
+
+    # A reviewed anomaly can be released by hand
+    repository.save_validation_statuses(db_session, [schemas.InstrumentValidation(
+        instrument_id=good, quarantined=True, issues=[], first_issue_date=date(2024, 1, 2), validated_through=date(2024, 5, 3),
+    )])
+    assert not service.release_instrument(db_session, good).quarantined
+    assert repository.get_quarantined_instrument_ids(db_session) == []
+
+def test_validation_covers_a_large_universe_in_one_pass():
+    """
+    Tests the checks run over 1000 instruments x 1 year of bars at once and only flag the injected issues.
+    """
+    n_instruments, n_days = 1000, 260
+    days = sessions(n_days)
+    rng = np.random.default_rng(9)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_instruments, n_days)), axis=1))
+    close[17, 200] = close[17, 199] # a one-day stale close is fine
+    close[42, 150:160] = close[42, 149]
+    bars = BarArrays.from_columns(
+        np.repeat(np.arange(1, n_instruments + 1), n_days), np.tile(days, n_instruments),
+        close.ravel(), close.ravel() * 1.01, close.ravel() * 0.99, close.ravel(), np.ones(n_instruments * n_days, dtype=np.int64),
+    )
+    flags = validation.validate_bars(bars, schemas.ValidationParameters())
+    assert np.unique(bars.instrument_ids[flags > 0]).tolist() == [43]
+    assert set(flags[flags > 0].tolist()) == {validation.STALE}
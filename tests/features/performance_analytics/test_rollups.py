@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from app.features.backtesting import engine
+from app.features.performance_analytics.rollups import PerformanceRollup
+
+DATES = np.datetime64("2020-01-03") + 7 * np.arange(300)
+EQUITY = 5000 * np.exp(np.cumsum(np.random.default_rng(11).normal(0.001, 0.03, len(DATES))))
+
+def rollup_in_chunks(sizes):
+    rollup, start = PerformanceRollup(), 0
+    for size in sizes:
+        rollup.append(DATES[start:start + size], EQUITY[start:start + size])
+        start += size
+    return rollup
+
+def test_window_metrics_match_a_full_scan():
+    """
+    Tests windows answered from the rollups agree with the backtest summary
+    computed over the same slice of the curve, however the weeks were appended.
+    """
+    rollup = rollup_in_chunks([1, 2, 60, 1, 100, 136])
+    rng = np.random.default_rng(12)
+    for first, last in [(0, 299), (1, 299), (37, 38), (100, 260), *rng.integers(0, 300, (40, 2)).tolist()]:
+        first, last = min(first, last), max(first, last)
+        metrics = rollup.window(DATES[first].astype(object), DATES[last].astype(object))
+        base = max(first - 1, 0)
+        if last == base:
+            assert metrics is None
+            continue
+        expected = engine.summarize(EQUITY[base + 1:last + 1], EQUITY[base], np.empty(0))
+        assert metrics.start_date == DATES[base] and metrics.end_date == DATES[last] and metrics.weeks == last - base
+        assert metrics.total_return == pytest.approx(expected.total_return)
+        assert metrics.sharpe_ratio == pytest.approx(expected.sharpe_ratio, rel=1e-6, abs=1e-9)
+        assert metrics.max_drawdown == pytest.approx(expected.max_drawdown)
+
+def test_rollups_survive_serialisation_and_truncation():
+    rollup = rollup_in_chunks([150, 150])
+    restored = PerformanceRollup(rollup.to_state())
+    window = (DATES[20].astype(object), DATES[180].astype(object))
+    assert restored.window(*window) == rollup.window(*window)
+    assert restored.last_date == DATES[-1]
+
+    truncated = restored.truncated(DATES[200].astype(object))
+    assert truncated.last_date == DATES[199]
+    truncated.append(DATES[200:], EQUITY[200:])
+    for args in (window, ()):
+        assert truncated.window(*args).model_dump() == pytest.approx(rollup.window(*args).model_dump())
+
+    with pytest.raises(ValueError):
+        truncated.append(DATES[-1:], EQUITY[-1:])
+
+def test_windows_outside_the_series_are_empty():
+    rollup = rollup_in_chunks([10])
+    assert PerformanceRollup().window() is None
+    assert rollup.window(start_date=DATES[20].astype(object)) is None
+    assert rollup.window(end_date=DATES[0].astype(object) - np.timedelta64(1, "D")) is None
+    # Drawdown of a known curve, since inception and within a window
+    known = PerformanceRollup()
+    known.append(DATES[:5], [100.0, 110.0, 88.0, 99.0, 132.0])
+    assert known.window().max_drawdown == pytest.approx(0.2)
+    assert known.window(start_date=DATES[3].astype(object)).max_drawdown == 0.0
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from datetime import date, timedelta
+
+from app.core import migrations
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.performance_analytics import repository, rollups, service
+from app.features.portfolio_management import repository as portfolio_repository, schemas as portfolio_schemas
+from tests.features.charting.test_service import add_instrument
+from tests.features.data_ingestion.test_repository import db_session
+
+WEEK_ENDS = [date(2021, 1, 1) + timedelta(weeks=w) for w in range(30)]
+
+def weekly_close(db, instrument_id, week_end):
+    return market_data_repository.load_weekly_bar_arrays(db, [instrument_id], start_date=week_end, end_date=week_end).close[0]
+
+def add_position(db, instrument_id, entry, exit_=None, direction="LONG"):
+    position = portfolio_repository.create_position(db, portfolio_schemas.PositionCreate(
+        instrument_id=instrument_id, entry_date=entry, entry_price=100.0, size=10, direction=direction,
+    ))
+    if exit_ is not None:
+        portfolio_repository.update_position(db, position, portfolio_schemas.PositionUpdate(
+            exit_date=exit_, exit_price=110.0, status=portfolio_schemas.CLOSED,
+        ))
+    return position
+
+def stored(db, series):
+    return rollups.PerformanceRollup(repository.get_rollups(db)[series].state)
+
+def test_strategy_equity_marks_open_and_closed_positions(db_session):
+    xlk, xlu = add_instrument(db_session), add_instrument(db_session, symbol="XLU", seed=4)
+    add_position(db_session, xlk, WEEK_ENDS[2] - timedelta(days=3), exit_=WEEK_ENDS[5] - timedelta(days=1))
+    add_position(db_session, xlu, WEEK_ENDS[4] - timedelta(days=4), direction="SHORT")
+
+    assert service.refresh_performance(db_session, WEEK_ENDS[8])[service.STRATEGY] == 8
+    strategy = stored(db_session, service.STRATEGY)
+    assert strategy.dates[0] == WEEK_ENDS[1] and strategy.last_date == WEEK_ENDS[8]
+    expected = [5000.0]
+    for week in WEEK_ENDS[2:9]:
+        long_pnl = 100.0 if week >= WEEK_ENDS[5] else (weekly_close(db_session, xlk, week) - 100.0) * 10
+        short_pnl = (100.0 - weekly_close(db_session, xlu, week)) * 10 if week >= WEEK_ENDS[4] else 0.0
+        expected.append(5000.0 + long_pnl + short_pnl)
+    np.testing.assert_allclose(strategy.equity, expected)
+
+def test_refresh_only_marks_new_and_edited_weeks(db_session):
+    """
+    Tests weekly refreshes, including one after a position was closed
+    retroactively, end up with the same rollups as a rebuild.
+    """
+    xlk = add_instrument(db_session)
+    position = add_position(db_session, xlk, WEEK_ENDS[1])
+    add_position(db_session, xlk, WEEK_ENDS[3], exit_=WEEK_ENDS[6])
+
+    for week in WEEK_ENDS[:12]:
+        service.refresh_performance(db_session, week)
+    assert service.refresh_performance(db_session, WEEK_ENDS[11])[service.STRATEGY] == 0
+    portfolio_repository.update_position(db_session, position, portfolio_schemas.PositionUpdate(
+        exit_date=WEEK_ENDS[8], exit_price=120.0, status=portfolio_schemas.CLOSED,
+    ))
+    # Only the weeks from the recorded exit on are marked again
+    assert service.refresh_performance(db_session, WEEK_ENDS[12])[service.STRATEGY] == 5
+    incremental = stored(db_session, service.STRATEGY)
+
+    repository.get_rollups(db_session)[service.STRATEGY].params = {}
+    db_session.commit()
+    assert service.refresh_performance(db_session, WEEK_ENDS[12])[service.STRATEGY] == 13
+    rebuilt = stored(db_session, service.STRATEGY)
+    np.testing.assert_array_equal(incremental.dates, rebuilt.dates)
+    np.testing.assert_allclose(incremental.equity, rebuilt.equity)
+    assert incremental.window().model_dump() == pytest.approx(rebuilt.window().model_dump())
+
+def test_performance_report_compares_with_the_benchmark(db_session):
+    xlk, spy = add_instrument(db_session), add_instrument(db_session, symbol="SPY", seed=9)
+    add_position(db_session, xlk, WEEK_ENDS[4])
+    service.refresh_performance(db_session, WEEK_ENDS[20])
+    service.refresh_performance(db_session, WEEK_ENDS[25])
+
+    report = service.get_performance(db_session)
+    assert report.strategy.start_date == WEEK_ENDS[3] and report.strategy.end_date == WEEK_ENDS[25]
+    # Without a start date the benchmark is measured over the same weeks
+    assert (report.benchmark.start_date, report.benchmark.end_date, report.benchmark.weeks) == (
+        report.strategy.start_date, report.strategy.end_date, report.strategy.weeks
+    )
+    benchmark_return = weekly_close(db_session, spy, WEEK_ENDS[25]) / weekly_close(db_session, spy, WEEK_ENDS[3]) - 1
+    assert report.benchmark.total_return == pytest.approx(benchmark_return)
+
+    window = service.get_performance(db_session, WEEK_ENDS[10], WEEK_ENDS[15])
+    assert window.strategy.weeks == window.benchmark.weeks == 6
+    assert service.get_performance(db_session, date(2030, 1, 1)) == service.schemas.PerformanceReport()
+
+def test_performance_endpoint():
+    pytest.importorskip("fastapi.testclient")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.core.database import get_db
+    from app.features.performance_analytics.router import router
+
+    db_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    migrations.run_migrations(db_engine)
+    db = sessionmaker(bind=db_engine)()
+    add_position(db, add_instrument(db, weeks=60), WEEK_ENDS[4])
+    service.refresh_performance(db, WEEK_ENDS[20])
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    body = client.get("/performance/", params={"start_date": WEEK_ENDS[10].isoformat()}).json()
+    assert body["strategy"]["start_date"] == WEEK_ENDS[9].isoformat() and body["strategy"]["weeks"] == 11
+    assert body["benchmark"] is None
+    assert client.get("/performance/", params={"start_date": "2030-01-01"}).json() == {"strategy": None, "benchmark": None}
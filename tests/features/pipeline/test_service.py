@@ -0,0 +1,179 @@
+import numpy as np
+import pytest
+from collections import deque
+from datetime import date
+
+from app.features.data_ingestion import repository as market_data_repository, validation
+from app.features.pipeline import repository, service
+from app.features.performance_analytics import models as performance_models # noqa: F401 (read by the universe stages)
+from app.features.portfolio_management import models as portfolio_models # noqa: F401
+from app.features.signal_generation import relative_strength, repository as signal_repository
+from tests.features.data_ingestion.test_repository import TestingSessionLocal, db_session
+
+WEEK_END = date(2024, 1, 19)
+DAYS = np.busday_offset("2022-11-07", np.arange(315), roll="forward") # 63 weeks of sessions up to WEEK_END
+
+def daily_bars(symbol):
+    rng = np.random.default_rng(sum(map(ord, symbol)))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(DAYS))))
+    open_ = close * (1 + rng.normal(0, 0.002, len(DAYS)))
+    return [
+        {"date": d, "open": o, "high": max(o, c) * 1.005, "low": min(o, c) * 0.995, "close": c, "volume": 1000}
+        for d, o, c in zip(DAYS.astype(object), open_.tolist(), close.tolist())
+    ]
+
+@pytest.fixture
+def provider(monkeypatch):
+    """
+    Serves synthetic daily bars; symbols in `provider.down` fail to fetch, and
+    `provider.missing` maps a symbol to the dates it has no bar for.
+    """
+    class FakeProvider:
+        down = set()
+        missing = {}
+
+        def fetch(self, symbol, start_date=None):
+            if symbol in self.down:
+                raise ConnectionError(f"{symbol} unavailable")
+            return [bar for bar in daily_bars(symbol) if bar["date"] not in self.missing.get(symbol, ())]
+
+    fake = FakeProvider()
+    monkeypatch.setattr("app.features.data_ingestion.service.fetch_data_from_source", fake.fetch)
+    return fake
+
+@pytest.fixture
+def calls(monkeypatch):
+    """
+    Records every stage executed, in order, as (stage, symbol).
+    """
+    executed = []
+
+    def recording(stage, run):
+        def wrapper(db, *args):
+            executed.append((stage, args[0] if args else service.UNIVERSE))
+            return run(db, *args)
+        return wrapper
+
+    for stages in (service._INSTRUMENT_STAGES, service._UNIVERSE_STAGES):
+        for stage, run in list(stages.items()):
+            monkeypatch.setitem(stages, stage, recording(stage, run))
+    return executed
+
+def test_latest_week_end():
+    assert service.latest_week_end(date(2024, 1, 20)) == WEEK_END
+    assert service.latest_week_end(WEEK_END) == WEEK_END
+    assert service.latest_week_end(date(2024, 1, 18)) == date(2024, 1, 12)
+
+def test_run_fans_out_per_symbol_then_ranks_the_universe(db_session, provider, calls):
+    """
+    Tests every symbol goes through each stage in order, validation runs once
+    after every symbol was ingested, and the ranking once after all the rest.
+    """
+    run_key = service.run_locally(TestingSessionLocal, ["XLK", "XLU"], WEEK_END)
+
+    assert sorted(calls[:2]) == [(service.INGEST, "XLK"), (service.INGEST, "XLU")]
+    assert calls[2] == (service.VALIDATE, service.UNIVERSE)
+    assert sorted(calls[3:-3]) == sorted((stage, s) for s in ("XLK", "XLU") for stage in (service.RESAMPLE, service.SIGNALS))
+    for symbol in ("XLK", "XLU"):
+        assert [stage for stage, s in calls if s == symbol] == list(service.INSTRUMENT_STAGES)
+    assert calls[-3:] == [(stage, service.UNIVERSE) for stage in service.UNIVERSE_STAGES[1:]]
+
+    ids = [market_data_repository.get_instrument_by_symbol(db_session, s).id for s in ("XLK", "XLU")]
+    assert all(signal_repository.get_indicator_state(db_session, i).last_date == WEEK_END for i in ids)
+    assert signal_repository.get_relative_strength_state(db_session, relative_strength.universe_key(ids)).last_date == WEEK_END
+
+    report = service.run_report(db_session, run_key)
+    assert report.status == service.COMPLETE and not report.failed_symbols
+    assert {stage: timing.completed for stage, timing in report.stages.items()} == {
+        service.INGEST: 2, service.VALIDATE: 1, service.RESAMPLE: 2, service.SIGNALS: 2, service.RELATIVE_STRENGTH: 1,
+        service.EXITS: 1, service.PERFORMANCE: 1,
+    }
+    assert 0 < report.deadline_used < 1
+
+def test_failed_run_resumes_from_the_failed_stage(db_session, provider, calls):
+    """
+    Tests a symbol failing does not hold back the others, and starting the run
+    again only redoes that symbol and the ranking.
+    """
+    provider.down = {"XLE"}
+    run_key = service.run_locally(TestingSessionLocal, ["XLK", "XLE"], WEEK_END)
+    report = service.run_report(db_session, run_key)
+    assert report.status == service.FAILED
+    assert report.failed_symbols == {"XLE": "XLE unavailable"}
+    assert report.stages[service.SIGNALS].completed == 1
+    assert report.stages[service.RELATIVE_STRENGTH].completed == 1
+
+    provider.down = set()
+    calls.clear()
+    service.run_locally(TestingSessionLocal, [], WEEK_END)
+    assert calls == [
+        (service.INGEST, "XLE"), (service.VALIDATE, service.UNIVERSE), (service.RESAMPLE, "XLE"), (service.SIGNALS, "XLE"),
+    ] + [(stage, service.UNIVERSE) for stage in service.UNIVERSE_STAGES[1:]]
+    assert service.run_report(db_session, run_key).status == service.COMPLETE
+
+    calls.clear()
+    assert service.run_locally(TestingSessionLocal, ["XLK", "XLE"], WEEK_END) == run_key
+    assert calls == []
+
+def test_interrupted_run_resumes_at_the_checkpoints(db_session, provider, calls):
+    run_key, steps = service.start_run(db_session, ["XLK", "XLU"], WEEK_END)
+    assert steps == [(service.INGEST, "XLK"), (service.INGEST, "XLU")]
+    assert service.run_step(db_session, run_key, *steps[0]) == [] # validation waits for XLU
+    # A redelivered message does not repeat the stage
+    assert service.run_step(db_session, run_key, *steps[0]) == []
+
+    # The worker dies here; starting again continues where each symbol stopped
+    run_key, steps = service.start_run(db_session, ["XLK", "XLU"], WEEK_END)
+    assert steps == [(service.INGEST, "XLU")]
+    assert service.run_step(db_session, run_key, *steps[0]) == [(service.VALIDATE, service.UNIVERSE)]
+    assert service.run_step(db_session, run_key, service.VALIDATE, service.UNIVERSE) == [
+        (service.RESAMPLE, "XLK"), (service.RESAMPLE, "XLU"),
+    ]
+    assert calls == [(service.INGEST, "XLK"), (service.INGEST, "XLU"), (service.VALIDATE, service.UNIVERSE)]
+
+def test_resumed_symbols_all_settle_before_the_ranking(db_session, provider, calls, monkeypatch):
+    """
+    Tests a retried symbol finishing first does not start the ranking while
+    another retried symbol is still on its way: failures are cleared on resume.
+    """
+    broken = {(service.RESAMPLE, "XLK"), (service.SIGNALS, "XLU")}
+    for stage in (service.RESAMPLE, service.SIGNALS):
+        def failing(db, symbol, ingested, stage=stage, run=service._INSTRUMENT_STAGES[stage]):
+            if (stage, symbol) in broken:
+                raise RuntimeError(f"{stage} broke")
+            return run(db, symbol, ingested)
+        monkeypatch.setitem(service._INSTRUMENT_STAGES, stage, failing)
+    run_key = service.run_locally(TestingSessionLocal, ["XLK", "XLU"], WEEK_END)
+    assert set(service.run_report(db_session, run_key).failed_symbols) == {"XLK", "XLU"}
+
+    broken.clear()
+    calls.clear()
+    run_key, steps = service.start_run(db_session, [], WEEK_END)
+    assert steps == [(service.RESAMPLE, "XLK"), (service.SIGNALS, "XLU")]
+    assert service.run_step(db_session, run_key, *steps[1]) == []
+    queue = deque([steps[0]])
+    while queue:
+        queue.extend(service.run_step(db_session, run_key, *queue.popleft()))
+    assert calls == [(service.SIGNALS, "XLU"), (service.RESAMPLE, "XLK"), (service.SIGNALS, "XLK")] + [
+        (stage, service.UNIVERSE) for stage in service.UNIVERSE_STAGES[1:]
+    ]
+    report = service.run_report(db_session, run_key)
+    assert report.status == service.COMPLETE and not report.failed_symbols
+
+def test_validation_sees_the_whole_universe(db_session, provider):
+    """
+    Tests sessions one symbol is missing are flagged as gaps, because the
+    validation stage runs over every ingested symbol at once.
+    """
+    provider.missing = {"XLU": set(DAYS[-15:-10].astype(object))}
+    service.run_locally(TestingSessionLocal, ["XLK", "XLU"], WEEK_END)
+
+    xlu = market_data_repository.get_instrument_by_symbol(db_session, "XLU").id
+    assert market_data_repository.get_quarantined_instrument_ids(db_session) == [xlu]
+    status = market_data_repository.get_validation_statuses(db_session, [xlu])[xlu]
+    assert status.issues[0] == [str(DAYS[-10]), validation.ISSUE_NAMES[validation.GAP]]
+
+def test_stage_claim_is_taken_once(db_session):
+    repository.save_run(db_session, "weekly:2024-01-19", ["XLK"], service.RUNNING, service._now())
+    assert repository.claim_stage(db_session, "weekly:2024-01-19", service.RELATIVE_STRENGTH, service.UNIVERSE, service._now())
+    assert not repository.claim_stage(db_session, "weekly:2024-01-19", service.RELATIVE_STRENGTH, service.UNIVERSE, service._now())
@@ -0,0 +1,42 @@
+import dramatiq
+from dramatiq.brokers.stub import StubBroker
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import migrations
+from app.features.pipeline import service
+from tests.features.pipeline.test_service import WEEK_END, provider
+
+# Actors bind to the global broker when declared, so install the stub before importing them
+dramatiq.set_broker(StubBroker())
+from app.features.pipeline import tasks # noqa: E402
+
+def test_workers_run_the_pipeline(monkeypatch, provider):
+    """
+    Tests the actors chain the steps through the broker until the run is complete.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    migrations.run_migrations(engine)
+    monkeypatch.setattr(tasks, "SessionLocal", sessionmaker(bind=engine))
+    broker = tasks.run_pipeline_step.broker
+    broker.flush_all()
+
+    # One worker thread: the in-memory database is a single shared connection
+    worker = dramatiq.Worker(broker, worker_threads=1, worker_timeout=100)
+    worker.start()
+    try:
+        tasks.start_pipeline.send(["XLK", "XLU", "XLE"], WEEK_END.isoformat())
+        broker.join(tasks.QUEUE, fail_fast=True)
+        worker.join()
+    finally:
+        worker.stop()
+
+    db = tasks.SessionLocal()
+    try:
+        report = service.run_report(db, service.run_key_for(WEEK_END))
+    finally:
+        db.close()
+    assert report.status == service.COMPLETE
+    assert report.stages[service.SIGNALS].completed == 3
+    assert report.stages[service.RELATIVE_STRENGTH].completed == 1
@@ -0,0 +1,77 @@
+import numpy as np
+
+from app.features.portfolio_management import engine, schemas
+
+DATES = np.arange(np.datetime64("2024-01-05"), np.datetime64("2024-03-01"), np.timedelta64(7, "D"))
+PARAMS = schemas.ExitParameters(max_holding_weeks=99)
+
+def new_state(entry_prices):
+    n = len(entry_prices)
+    return engine.StopState(
+        extreme=np.asarray(entry_prices, dtype=float), stop=np.full(n, np.nan), atr=np.full(n, np.nan),
+        reached_top=np.zeros(n, dtype=bool), through=np.full(n, np.datetime64("NaT", "D")),
+    )
+
+def evaluate(close, directions, state, dates=DATES, percentiles=None, params=PARAMS, atr=1.0):
+    close = np.asarray(close, dtype=float)
+    return engine.evaluate_exits(
+        dates, np.full(len(close), DATES[0]), engine.direction_sign(directions), close + 0.5, close - 0.5, close,
+        np.full(close.shape, atr), np.full(close.shape, np.nan) if percentiles is None else np.asarray(percentiles, dtype=float),
+        state, params,
+    )
+
+def test_trailing_stop_only_tightens_and_mirrors_for_shorts():
+    up_then_down = [100, 102, 105, 104, 103, 101.4, 101, 100]
+    result = evaluate([up_then_down, [200 - c for c in up_then_down]], ["LONG", "SHORT"], new_state([100, 100]))
+
+    long_stops, short_stops = result.stops
+    assert long_stops.tolist() == [97.5, 99.5, 102.5, 102.5, 102.5, 102.5, 102.5, 102.5]
+    np.testing.assert_allclose(short_stops, 200 - long_stops)
+    # The close of 101.4 is the first through the stop, for both directions
+    assert result.exit_week.tolist() == [5, 5]
+    assert [engine.EXIT_REASONS[r] for r in result.exit_reason] == [engine.STOP_EXIT] * 2
+    assert result.state.stop.tolist() == [102.5, 97.5] and result.state.extreme.tolist() == [105.5, 94.5]
+
+def test_cast_off_needs_the_top_quartile_first():
+    percentiles = [[60, 80, 90, 70, 80, 80, 80, 80], [60, 70, 60, 50, 60, 60, 60, 60], [40, 20, 10, 30, 20, 20, 20, 20]]
+    result = evaluate(np.full((3, len(DATES)), 100.0), ["LONG", "LONG", "SHORT"], new_state([100] * 3), percentiles=percentiles, atr=np.nan)
+    assert result.exit_week.tolist() == [3, -1, 3]
+    assert result.exit_reason.tolist() == [engine.EXIT_REASONS.index(engine.CAST_OFF_EXIT), -1, 1]
+    assert result.state.reached_top.tolist() == [True, False, True]
+    assert np.isnan(result.state.stop).all()
+
+def test_time_exit_counts_the_entry_week():
+    result = evaluate(np.full((1, len(DATES)), 100.0), ["LONG"], new_state([100]), params=schemas.ExitParameters(), atr=np.nan)
+    assert result.exit_week.tolist() == [3] and engine.EXIT_REASONS[result.exit_reason[0]] == engine.TIME_EXIT
+
+def test_carrying_the_state_forward_matches_one_pass():
+    close = 100 + np.cumsum(np.random.default_rng(5).normal(0, 2, (4, len(DATES))), axis=1)
+    percentiles = np.random.default_rng(6).uniform(0, 100, close.shape)
+    directions = ["LONG", "SHORT", "LONG", "SHORT"]
+    whole = evaluate(close, directions, new_state(close[:, 0]), percentiles=percentiles)
+
+    state = new_state(close[:, 0])
+    for week in range(len(DATES)):
+        step = engine.evaluate_exits(
+            DATES[week:week + 1], np.full(4, DATES[0]), engine.direction_sign(directions),
+            close[:, week:week + 1] + 0.5, close[:, week:week + 1] - 0.5, close[:, week:week + 1], np.ones((4, 1)),
+            percentiles[:, week:week + 1], state, PARAMS,
+        )
+        np.testing.assert_array_equal(step.stops[:, 0], whole.stops[:, week])
+        state = step.state
+    for field in ("extreme", "stop", "atr", "reached_top", "through"):
+        np.testing.assert_array_equal(getattr(state, field), getattr(whole.state, field))
+
+    # Nothing new to fold in leaves the state as it is
+    again = evaluate(close, directions, state, dates=DATES[:0].copy(), percentiles=percentiles)
+    assert again.state is state and again.exit_week.tolist() == [-1] * 4
+
+def test_live_stops_use_the_week_so_far():
+    state = engine.StopState(
+        extreme=np.array([105.0, 95.0]), stop=np.array([102.0, 98.0]), atr=np.array([1.0, 1.0]),
+        reached_top=np.zeros(2, dtype=bool), through=np.array(["2024-01-05"] * 2, dtype="datetime64[D]"),
+    )
+    high = np.array([[106.0, 107.0, np.nan], [np.nan, np.nan, np.nan]])
+    low = np.array([[104.0, 105.0, np.nan], [np.nan, np.nan, np.nan]])
+    stops = engine.live_stops(engine.direction_sign(["LONG", "SHORT"]), state, high, low, PARAMS)
+    assert stops.tolist() == [104.0, 98.0]
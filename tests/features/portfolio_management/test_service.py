@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from datetime import date, timedelta
+
+from app.core import migrations
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.portfolio_management import engine, repository, schemas, service
+from app.features.signal_generation import repository as signal_repository
+from tests.features.charting.test_service import add_instrument
+from tests.features.data_ingestion.test_repository import db_session
+
+ENTRY = date(2022, 6, 6) # a Monday; its week ends on 2022-06-10
+WEEK_ENDS = [date(2022, 6, 10) + timedelta(weeks=w) for w in range(8)]
+
+def open_positions(db, instrument_id):
+    close = market_data_repository.load_bar_arrays(db, [instrument_id], start_date=ENTRY, end_date=ENTRY).close[0]
+    return [
+        repository.create_position(db, schemas.PositionCreate(
+            instrument_id=instrument_id, entry_date=ENTRY, entry_price=close, size=10, direction=direction
+        ))
+        for direction in (schemas.LONG, schemas.SHORT)
+    ]
+
+def stored_states(db):
+    return [
+        (p.extreme_price, p.stop_price, p.atr, p.reached_top, p.evaluated_through)
+        for p in repository.get_positions(db, schemas.OPEN)
+    ]
+
+def test_weekly_evaluation_carries_the_stop_state_forward(db_session):
+    """
+    Tests evaluating one week at a time stores the same stop state as evaluating
+    all the weeks at once, and stops only ever tighten.
+    """
+    instrument_id = add_instrument(db_session)
+    positions = open_positions(db_session, instrument_id)
+    params = schemas.ExitParameters(max_holding_weeks=99)
+
+    stops = []
+    for week_end in WEEK_ENDS:
+        service.evaluate_exits(db_session, week_end, params)
+        stops.append([p.stop_price for p in repository.get_positions(db_session, schemas.OPEN)])
+    weekly = stored_states(db_session)
+    assert all(through == WEEK_ENDS[-1] for *_, through in weekly)
+    long_stops, short_stops = np.array(stops).T
+    assert (np.diff(long_stops) >= 0).all() and (np.diff(short_stops) <= 0).all()
+    assert long_stops[-1] < positions[0].entry_price < short_stops[-1]
+
+    repository.save_stop_states(db_session, [
+        {"id": p.id, "extreme_price": None, "stop_price": None, "atr": None, "reached_top": False, "evaluated_through": None}
+        for p in positions
+    ])
+    db_session.commit()
+    service.evaluate_exits(db_session, WEEK_ENDS[-1], params)
+    np.testing.assert_allclose(np.array(stored_states(db_session))[:, :3].astype(float), np.array(weekly)[:, :3].astype(float))
+
+def test_exits_are_stored_as_signals(db_session):
+    instrument_id = add_instrument(db_session)
+    open_positions(db_session, instrument_id)
+    # A stop too wide to be hit, so the time exit decides
+    params = schemas.ExitParameters(atr_multiplier=50.0)
+
+    assert service.evaluate_exits(db_session, WEEK_ENDS[2], params) == []
+    signals = service.evaluate_exits(db_session, WEEK_ENDS[5], params)
+    assert {(s.date, s.signal_type, s.reason) for s in signals} == {(WEEK_ENDS[3], service.EXIT_SIGNAL, engine.TIME_EXIT)}
+    stored = signal_repository.get_signals_for_instrument(db_session, instrument_id)
+    assert [(s.date, s.signal_type) for s in stored if s.signal_type == service.EXIT_SIGNAL] == [(WEEK_ENDS[3], "EXIT")]
+
+    # Closed positions are no longer evaluated
+    for position in repository.get_positions(db_session, schemas.OPEN):
+        repository.update_position(db_session, position, schemas.PositionUpdate(exit_date=WEEK_ENDS[4], exit_price=100, status=schemas.CLOSED))
+    assert service.evaluate_exits(db_session, WEEK_ENDS[7], params) == []
+
+def test_position_statuses_mark_every_open_position(db_session):
+    instrument_id = add_instrument(db_session)
+    other_id = add_instrument(db_session, symbol="XLU", seed=4)
+    long_position, short_position = open_positions(db_session, instrument_id)
+    service.evaluate_exits(db_session, WEEK_ENDS[3])
+    never_evaluated, _ = open_positions(db_session, other_id)
+
+    as_of = WEEK_ENDS[4] - timedelta(days=2) # mid-week
+    statuses = {s.position_id: s for s in service.position_statuses(db_session, as_of)}
+    assert len(statuses) == 4
+
+    close = market_data_repository.load_bar_arrays(db_session, [instrument_id], start_date=as_of, end_date=as_of).close[0]
+    long_status, short_status = statuses[long_position.id], statuses[short_position.id]
+    assert long_status.mark_date == as_of and long_status.mark_price == pytest.approx(close)
+    assert long_status.unrealized_pnl == pytest.approx((close - long_position.entry_price) * 10)
+    assert short_status.unrealized_pnl == pytest.approx(-long_status.unrealized_pnl)
+    assert long_status.weeks_held == 5
+    # Live stops start from the stored ones and can only have tightened since
+    assert long_status.stop_price >= repository.get_position(db_session, long_position.id).stop_price
+    assert short_status.stop_price <= repository.get_position(db_session, short_position.id).stop_price
+    # Without an evaluated ATR there is no stop yet
+    assert statuses[never_evaluated.id].stop_price is None and statuses[never_evaluated.id].mark_price is not None
+
+def test_positions_endpoints():
+    pytest.importorskip("fastapi.testclient")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.core.database import get_db
+    from app.features.portfolio_management.router import router
+
+    db_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    migrations.run_migrations(db_engine)
+    db = sessionmaker(bind=db_engine)()
+    instrument_id = add_instrument(db, weeks=30)
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    created = client.post("/positions/", json={
+        "instrument_id": instrument_id, "entry_date": "2020-06-01", "entry_price": 100.0, "size": 5, "direction": "LONG",
+    })
+    assert created.status_code == 201
+    position = created.json()
+    assert position["status"] == "OPEN" and position["stop_price"] is None
+    assert client.post("/positions/", json={**position, "direction": "SIDEWAYS"}).status_code == 422
+
+    statuses = client.get("/positions/status", params={"as_of": "2020-07-31"}).json()
+    assert [s["position_id"] for s in statuses] == [position["id"]] and statuses[0]["mark_date"] == "2020-07-31"
+
+    closed = client.put(f"/positions/{position['id']}", json={"exit_date": "2020-07-31", "exit_price": 101.0, "status": "CLOSED"})
+    assert closed.json()["status"] == "CLOSED" and closed.json()["entry_price"] == 100.0
+    assert client.get("/positions/", params={"status": "OPEN"}).json() == []
+    assert len(client.get("/positions/").json()) == 1
+    assert client.put("/positions/404", json={"status": "CLOSED"}).status_code == 404
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from app.features.signal_generation import indicators, schemas
+
+# Reference implementations written as plain Python loops over one series
+
+def naive_sma(values, window):
+    return [
+        sum(values[i - window + 1:i + 1]) / window if i >= window - 1 else np.nan
+        for i in range(len(values))
+    ]
+
+def naive_ewm(values, alpha):
+    out, state = [], None
+    for x in values:
+        state = x if state is None else state + alpha * (x - state)
+        out.append(state)
+    return out
+
+@pytest.fixture
+def prices():
+    """
+    Two deterministic random-walk instruments of 120 weekly bars.
+    """
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 2, size=(2, 120)), axis=-1)
+    open_ = close + rng.normal(0, 1, size=close.shape)
+    high = np.maximum(open_, close) + rng.uniform(0, 2, size=close.shape)
+    low = np.minimum(open_, close) - rng.uniform(0, 2, size=close.shape)
+    return open_, high, low, close
+
+def test_sma_matches_loop(prices):
+    """
+    Tests the vectorised SMA against a loop, for every instrument at once.
+    """
+    close = prices[3]
+    result = indicators.sma(close, 20)
+    for row in range(close.shape[0]):
+        np.testing.assert_allclose(result[row], naive_sma(list(close[row]), 20), equal_nan=True)
+
+def test_sma_propagates_missing_bars():
+    """
+    Tests that a window containing a NaN bar yields NaN instead of a biased average.
+    """
+    values = np.array([1.0, 2.0, np.nan, 4.0, 5.0, 6.0])
+    result = indicators.sma(values, 2)
+    np.testing.assert_allclose(result, [np.nan, 1.5, np.nan, np.nan, 4.5, 5.5], equal_nan=True)
+
+def test_ewm_matches_loop_and_skips_leading_nan():
+    """
+    Tests that the EMA recursion seeds on each series' first valid bar.
+    """
+    values = np.array([[1.0, 2.0, 3.0, 4.0], [np.nan, 10.0, 20.0, 30.0]])
+    result = indicators.ewm(values, 0.5)
+    np.testing.assert_allclose(result[0], naive_ewm([1.0, 2.0, 3.0, 4.0], 0.5))
+    np.testing.assert_allclose(result[1], [np.nan] + naive_ewm([10.0, 20.0, 30.0], 0.5), equal_nan=True)
+
+def test_rsi_bounds_and_extremes():
+    """
+    Tests RSI is 100 for a series that only rises and 0 for one that only falls.
+    """
+    up = np.arange(1.0, 31.0)
+    down = up[::-1].copy()
+    result = indicators.rsi(np.stack([up, down]), period=14)
+    assert np.isnan(result[:, :14]).all()
+    np.testing.assert_allclose(result[0, 14:], 100.0)
+    np.testing.assert_allclose(result[1, 14:], 0.0)
+
+def test_full_stochastic_range(prices):
+    """
+    Tests that the stochastic lines stay within 0-100 and %D smooths %K.
+    """
+    _, high, low, close = prices
+    fast, slow = indicators.full_stochastic(high, low, close, period=14, smooth=3)
+    valid = ~np.isnan(slow)
+    assert valid.any()
+    assert ((fast[valid] >= 0) & (fast[valid] <= 100)).all()
+    np.testing.assert_allclose(slow, indicators.sma(fast, 3), equal_nan=True)
+
+def test_atr_of_constant_range():
+    """
+    Tests that ATR equals the bar range when every bar has the same range and no gaps.
+    """
+    close = np.full(40, 100.0)
+    result = indicators.atr(close + 1.0, close - 1.0, close, period=21)
+    assert np.isnan(result[:20]).all()
+    np.testing.assert_allclose(result[20:], 2.0)
+
+def test_indicator_votes_shape_and_values(prices):
+    """
+    Tests that votes come back as a (5, n_instruments, n_bars) stack of -1/0/+1.
+    """
+    votes = indicators.indicator_votes(*prices, schemas.SignalParameters())
+    assert votes.shape == (5,) + prices[3].shape
+    assert set(np.unique(votes)) <= {-1, 0, 1}
+    # Trend force cannot vote before the slow SMA has 50 bars
+    assert (votes[4, :, :49] == 0).all()
@@ -0,0 +1,115 @@
+import numpy as np
+from datetime import date
+
+from app.features.signal_generation import relative_strength, schemas, service
+from tests.features.data_ingestion.test_repository import db_session
+
+PARAMS = schemas.RelativeStrengthParameters(zscore_window=8, roc_period=3)
+
+def make_closes(n_instruments=5, n_weeks=40, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.002, 0.03, (n_instruments, n_weeks)), axis=-1))
+    dates = np.datetime64("2023-01-06") + np.arange(n_weeks) * 7
+    return np.arange(1, n_instruments + 1), dates, close
+
+def brute_force_scores(close, params):
+    """
+    Direct per-pair computation of the z-scored log ratio's change, for comparison.
+    """
+    n, t = close.shape
+    w, k = params.zscore_window, params.roc_period
+    logs = np.log(close)
+
+    def zscore(i, j, end):
+        ratio = logs[i, end - w + 1:end + 1] - logs[j, end - w + 1:end + 1]
+        return (ratio[-1] - ratio.mean()) / ratio.std()
+
+    scores = np.full((n, t), np.nan)
+    for end in range(w - 1 + k, t):
+        for i in range(n):
+            scores[i, end] = np.mean([zscore(i, j, end) - zscore(i, j, end - k) for j in range(n) if j != i])
+    return scores
+
+def test_scores_match_pairwise_brute_force():
+    """
+    Tests the rolling-sum gauge reproduces the per-pair z-score ROC differential.
+    """
+    ids, dates, close = make_closes()
+    ranking, _ = relative_strength.relative_strength(ids, dates, close, PARAMS)
+    np.testing.assert_allclose(ranking.scores, brute_force_scores(close, PARAMS), rtol=1e-8, atol=1e-10)
+    # The ROC differential matrix is antisymmetric
+    _, gauge = relative_strength.relative_strength(ids, dates, close, PARAMS)
+    np.testing.assert_allclose(gauge.roc, -gauge.roc.T)
+
+def test_incremental_update_matches_batch():
+    """
+    Tests a gauge restored from its serialised state continues exactly like a full run.
+    """
+    ids, dates, close = make_closes(n_weeks=60)
+    full, _ = relative_strength.relative_strength(ids, dates, close, PARAMS)
+
+    first, gauge = relative_strength.relative_strength(ids, dates[:37], close[:, :37], PARAMS)
+    restored = relative_strength.RelativeStrengthGauge(ids, PARAMS, gauge.to_state())
+    assert restored.last_date == date(2023, 9, 15)
+    rest, _ = relative_strength.relative_strength(ids, dates[37:], close[:, 37:], PARAMS, restored)
+
+    np.testing.assert_allclose(np.hstack([first.scores, rest.scores]), full.scores, rtol=1e-9, atol=1e-12)
+    assert np.array_equal(rest.ranks, full.ranks[:, 37:])
+
+def test_rank_scores_orders_and_skips_missing():
+    """
+    Tests ranks, percentiles and the top-quartile cast-off with a missing score.
+    """
+    scores = np.array([[0.5], [np.nan], [2.0], [-1.0], [1.0]])
+    ranks, percentiles = relative_strength.rank_scores(scores)
+    assert ranks[:, 0].tolist() == [3, 0, 1, 4, 2]
+    np.testing.assert_allclose(percentiles[:, 0], [100 / 3, np.nan, 100, 0, 200 / 3])
+
+    ranking = relative_strength.RelativeStrengthRanking(
+        instrument_ids=np.arange(5), dates=np.array(["2024-01-05"], dtype="datetime64[D]"),
+        scores=scores, ranks=ranks, percentiles=percentiles,
+    )
+    assert ranking.top_quartile()[:, 0].tolist() == [False, False, True, False, False]
+
+def test_update_relative_strength_folds_only_new_weeks(db_session):
+    """
+    Tests the persisted gauge advances week by week to the same rankings as one batch run,
+    and waits for instruments whose latest week is not complete yet.
+    """
+    from app.features.data_ingestion import repository as md_repository, schemas as md_schemas, service as md_service
+
+    ids, dates, close = make_closes(n_instruments=3, n_weeks=30)
+    instrument_ids = []
+    for row in range(3):
+        instrument = md_repository.create_instrument(db_session, md_schemas.InstrumentCreate(symbol=f"X{row}", name=f"X{row}", asset_class="ETF"))
+        instrument_ids.append(instrument.id)
+
+    def add_weeks(rows, weeks):
+        for row in rows:
+            md_repository.bulk_upsert_market_data(db_session, [
+                md_schemas.MarketDataCreate(instrument_id=instrument_ids[row], date=d, open=c, high=c, low=c, close=c, volume=1)
+                for d, c in zip(dates[weeks].astype(object), close[row, weeks])
+            ])
+        md_service.refresh_weekly_bars(db_session, {instrument_ids[row]: dates[weeks][0].astype(object) for row in rows})
+
+    add_weeks([0, 1, 2], slice(0, 20))
+    first = service.update_relative_strength(db_session, params=PARAMS)
+    assert len(first.dates) == 20
+
+    # Only two instruments have the next week: nothing is folded yet
+    add_weeks([0, 1], slice(20, 21))
+    assert len(service.update_relative_strength(db_session, params=PARAMS).dates) == 0
+
+    add_weeks([2], slice(20, 21))
+    add_weeks([0, 1, 2], slice(21, 30))
+    rest = service.update_relative_strength(db_session, params=PARAMS)
+    assert rest.dates[0] == dates[20] and len(rest.dates) == 10
+
+    expected, _ = relative_strength.relative_strength(instrument_ids, dates, close, PARAMS)
+    np.testing.assert_allclose(np.hstack([first.scores, rest.scores]), expected.scores, rtol=1e-9, atol=1e-12)
+
+    # The stored gauge keeps the ranking of its last week
+    latest = service.latest_relative_strength(db_session, params=PARAMS)
+    assert latest.dates.tolist() == [dates[-1]]
+    np.testing.assert_array_equal(latest.percentiles[:, 0], rest.percentiles[:, -1])
+    assert len(service.latest_relative_strength(db_session).dates) == 0 # built with other parameters
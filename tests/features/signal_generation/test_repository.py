@@ -0,0 +1,158 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from app.core import migrations
+from app.features.data_ingestion import repository as market_data_repository
+from app.features.data_ingestion import schemas as market_data_schemas
+from app.features.signal_generation import repository, schemas
+from tests.features.data_ingestion.test_repository import db_session
+
+WEEKS = [date(2024, 1, 5), date(2024, 1, 12), date(2024, 1, 19)]
+
+def make_instruments(db, *symbols):
+    return [
+        market_data_repository.create_instrument(
+            db, market_data_schemas.InstrumentCreate(symbol=symbol, name=symbol, asset_class="ETF")
+        ).id
+        for symbol in symbols
+    ]
+
+def signal(instrument_id, day, signal_type="BUY", reason="aligned"):
+    return schemas.SignalCreate(instrument_id=instrument_id, date=day, signal_type=signal_type, reason=reason)
+
+def test_upsert_signals_is_idempotent(db_session):
+    """
+    Tests re-running a week updates its signals in place instead of adding rows.
+    """
+    first, second = make_instruments(db_session, "XLK", "XLU")
+    week = [signal(first, WEEKS[0]), signal(first, WEEKS[0], "SELL"), signal(second, WEEKS[0])]
+    assert repository.upsert_signals(db_session, week) == 3
+    assert repository.upsert_signals(db_session, week + [signal(first, WEEKS[0], reason="rerun")]) == 3
+
+    stored = repository.get_signal_history(db_session)
+    assert [(s.instrument_id, s.signal_type, s.reason) for s in stored] == [
+        (first, "BUY", "rerun"), (first, "SELL", "aligned"), (second, "BUY", "aligned"),
+    ]
+    assert repository.upsert_signals(db_session, []) == 0
+
+def test_latest_signals_per_instrument(db_session):
+    """
+    Tests one query returns the newest signal of each instrument within the range.
+    """
+    xlk, xlu, xle = make_instruments(db_session, "XLK", "XLU", "XLE")
+    repository.upsert_signals(db_session, [
+        signal(xlk, WEEKS[0]), signal(xlk, WEEKS[2], "SELL"),
+        signal(xlu, WEEKS[1]),
+        signal(xle, WEEKS[0], "SELL"),
+    ])
+
+    latest = repository.get_latest_signals(db_session)
+    assert [(s.instrument_id, s.date, s.signal_type) for s in latest] == [
+        (xlk, WEEKS[2], "SELL"), (xlu, WEEKS[1], "BUY"), (xle, WEEKS[0], "SELL"),
+    ]
+    this_week = repository.get_latest_signals(db_session, start_date=date(2024, 1, 13), end_date=WEEKS[2])
+    assert [s.instrument_id for s in this_week] == [xlk]
+    buys = repository.get_latest_signals(db_session, signal_types=["BUY"], instrument_ids=[xlk, xle])
+    assert [(s.instrument_id, s.date) for s in buys] == [(xlk, WEEKS[0])]
+
+def test_signal_history_range(db_session):
+    xlk, xlu = make_instruments(db_session, "XLK", "XLU")
+    repository.upsert_signals(db_session, [signal(i, week) for i in (xlk, xlu) for week in WEEKS])
+    history = repository.get_signal_history(db_session, start_date=WEEKS[1], end_date=WEEKS[2], instrument_ids=[xlu])
+    assert [(s.instrument_id, s.date) for s in history] == [(xlu, WEEKS[1]), (xlu, WEEKS[2])]
+
+def test_migration_dedupes_and_indexes_an_existing_signals_table():
+    """
+    Tests a signals table created before the unique index existed gets its
+    duplicates removed (keeping the newest) and both indexes added.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE signals (id INTEGER PRIMARY KEY, instrument_id INTEGER NOT NULL, "
+            "date DATE NOT NULL, signal_type VARCHAR NOT NULL, reason VARCHAR)"
+        ))
+        connection.execute(text(
+            "INSERT INTO signals (instrument_id, date, signal_type, reason) VALUES "
+            "(1, '2024-01-05', 'BUY', 'old'), (1, '2024-01-05', 'BUY', 'new'), (1, '2024-01-05', 'SELL', 'other')"
+        ))
+    migrations.run_migrations(engine)
+
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("signals")}
+    assert indexes["uq_signals_instrument_date_type"]["unique"]
+    assert "idx_signals_instrument_date" in indexes
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT signal_type, reason FROM signals ORDER BY signal_type")).all()
+    assert [tuple(row) for row in rows] == [("BUY", "new"), ("SELL", "other")]
+
+def test_latest_signals_endpoint():
+    pytest.importorskip("fastapi.testclient")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+    from app.core.database import get_db
+    from app.features.signal_generation.router import router
+
+    # One shared in-memory connection, since the test client serves requests from other threads
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    migrations.run_migrations(engine)
+    db = sessionmaker(bind=engine)()
+    xlk, xlu = make_instruments(db, "XLK", "XLU")
+    repository.upsert_signals(db, [signal(xlk, WEEKS[1]), signal(xlk, WEEKS[2], "SELL"), signal(xlu, WEEKS[1])])
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+
+    response = TestClient(app).get("/signals/latest/", params={"week_end": "2024-01-19"})
+    assert [(row["instrument_id"], row["signal_type"]) for row in response.json()] == [(xlk, "SELL")]
+    previous = TestClient(app).get("/signals/latest/", params={"week_end": "2024-01-12"}).json()
+    assert [(row["instrument_id"], row["date"]) for row in previous] == [(xlk, "2024-01-12"), (xlu, "2024-01-12")]
+
+def test_signals_endpoint_revalidates_rewritten_reasons():
+    """
+    Tests a reason rewritten in place, or a bar rewritten within the history,
+    changes the validators, so an up-to-date client gets 304 only until then.
+    """
+    pytest.importorskip("fastapi.testclient")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+    from app.core.database import get_db, get_session_factory
+    from app.features.signal_generation.router import router
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    migrations.run_migrations(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    xlk, xlu = make_instruments(db, "XLK", "XLU")
+    repository.upsert_signals(db, [signal(xlk, WEEKS[0], reason="old"), signal(xlu, WEEKS[0])])
+    market_data_repository.bulk_upsert_market_data(db, [
+        market_data_schemas.MarketDataCreate(instrument_id=xlk, date=day, open=1, high=2, low=0.5, close=1, volume=10)
+        for day in (date(2023, 6, 1), WEEKS[0])
+    ])
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    client = TestClient(app)
+
+    first = client.get("/signals/", params={"instrument_id": xlk})
+    assert '"reason":"old"' in first.text.replace(" ", "")
+    assert client.get("/signals/", params={"instrument_id": xlk}, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    # Signals of another instrument leave the validators alone
+    repository.upsert_signals(db, [signal(xlu, WEEKS[0], reason="other")])
+    assert client.get("/signals/", params={"instrument_id": xlk}, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    repository.upsert_signals(db, [signal(xlk, WEEKS[0], reason="new")])
+    refreshed = client.get("/signals/", params={"instrument_id": xlk}, headers={"If-None-Match": first.headers["ETag"]})
+    assert refreshed.status_code == 200
+    assert '"reason":"new"' in refreshed.text.replace(" ", "")
+
+    market_data_repository.bulk_upsert_market_data(db, [market_data_schemas.MarketDataCreate(
+        instrument_id=xlk, date=date(2023, 6, 1), open=1, high=2, low=0.5, close=1.5, volume=10,
+    )])
+    assert client.get("/signals/", params={"instrument_id": xlk}, headers={"If-None-Match": refreshed.headers["ETag"]}).status_code == 200
@@ -0,0 +1,144 @@
+import numpy as np
+from datetime import date
+
+from app.features.signal_generation import indicators, repository, schemas, service
+from tests.features.data_ingestion.test_repository import db_session
+
+def make_votes(n_bars, **columns):
+    """
+    Builds a (5, 1, n_bars) vote stack; `columns` maps bar index -> five votes.
+    """
+    votes = np.zeros((5, 1, n_bars), dtype=np.int8)
+    for bar, column in columns.items():
+        votes[:, 0, int(bar[1:])] = column
+    return votes
+
+def test_buy_when_all_five_align_within_window():
+    """
+    Tests that staggered BUY votes inside the 3-bar window trigger a single BUY.
+    """
+    votes = make_votes(6, b1=[1, 1, 0, 0, 0], b2=[0, 0, 1, 1, 0], b3=[0, 0, 0, 0, 1], b4=[1, 1, 1, 1, 1])
+    buy, sell = service.composite_entry_signals(votes, window=3)
+    assert buy[0].tolist() == [False, False, False, True, False, False]
+    assert not sell.any()
+
+def test_no_entry_when_votes_spread_beyond_window():
+    """
+    Tests that votes further apart than the window do not combine.
+    """
+    votes = make_votes(6, b0=[1, 1, 0, 0, 0], b3=[0, 0, 1, 1, 1])
+    buy, _ = service.composite_entry_signals(votes, window=3)
+    assert not buy.any()
+
+def test_counter_signal_blocks_entry():
+    """
+    Tests that a SELL vote from any indicator within the window vetoes a BUY.
+    """
+    votes = make_votes(4, b1=[1, 1, 1, 1, 1], b2=[0, -1, 0, 0, 0])
+    buy, sell = service.composite_entry_signals(votes, window=3)
+    assert buy[0].tolist() == [False, True, False, False]
+    votes = make_votes(3, b0=[0, -1, 0, 0, 0], b1=[1, 1, 1, 1, 1])
+    buy, sell = service.composite_entry_signals(votes, window=3)
+    assert not buy.any() and not sell.any()
+
+def test_sell_signal():
+    """
+    Tests the symmetric SELL rule.
+    """
+    votes = make_votes(3, b2=[-1, -1, -1, -1, -1])
+    buy, sell = service.composite_entry_signals(votes, window=3)
+    assert sell[0].tolist() == [False, False, True]
+    assert not buy.any()
+
+def test_signals_from_flags_builds_signal_rows():
+    """
+    Tests conversion of flag matrices into SignalCreate rows.
+    """
+    dates = np.array(["2024-01-05", "2024-01-12"], dtype="datetime64[D]")
+    buy = np.array([[False, True], [False, False]])
+    sell = np.array([[False, False], [True, False]])
+    signals = service.signals_from_flags([7, 9], dates, buy, sell)
+    assert [(s.instrument_id, s.date, s.signal_type) for s in signals] == [
+        (9, date(2024, 1, 5), "SELL"),
+        (7, date(2024, 1, 12), "BUY"),
+    ]
+    assert all(isinstance(s, schemas.SignalCreate) for s in signals)
+
+def test_generate_signals_end_to_end():
+    """
+    Tests the full pipeline on a synthetic universe runs and yields well-formed signals.
+    """
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(0, 3, size=(20, 260)), axis=-1)
+    open_ = close + rng.normal(0, 1.5, size=close.shape)
+    high = np.maximum(open_, close) + rng.uniform(0, 2, size=close.shape)
+    low = np.minimum(open_, close) - rng.uniform(0, 2, size=close.shape)
+    dates = np.datetime64("2019-01-04") + np.arange(260) * 7
+
+    signals = service.generate_signals(list(range(1, 21)), dates, open_, high, low, close)
+    assert all(s.signal_type in ("BUY", "SELL") for s in signals)
+    assert all(1 <= s.instrument_id <= 20 for s in signals)
+
+def test_advance_signals_is_incremental_and_verifiable(db_session, monkeypatch):
+    """
+    Tests that advancing the persisted state week by week emits the same signals as a
+    full recompute, and that the verification mode finds no drift.
+    """
+    from app.features.data_ingestion import repository as md_repository, schemas as md_schemas, service as md_service
+    from tests.features.signal_generation.test_streaming import SHORT_PARAMS as ACTIVE_PARAMS, close_band_votes
+
+    monkeypatch.setattr(indicators, "votes_from_values", close_band_votes)
+
+    instrument = md_repository.create_instrument(db_session, md_schemas.InstrumentCreate(symbol="XLY", name="Consumer Disc.", asset_class="ETF"))
+    rng = np.random.default_rng(11)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, 120))
+    open_ = close + rng.normal(0, 0.5, 120)
+    high = np.maximum(open_, close) + 0.5
+    low = np.minimum(open_, close) - 0.5
+    dates = np.datetime64("2021-01-08") + np.arange(120) * 7
+    bars = [
+        md_schemas.MarketDataCreate(instrument_id=instrument.id, date=d, open=o, high=h, low=l, close=c, volume=100)
+        for d, o, h, l, c in zip(dates.astype(object), open_, high, low, close)
+    ]
+
+    emitted = []
+    # First chunk bootstraps from stored history, then one bar per week
+    for chunk in [bars[:60]] + [[bar] for bar in bars[60:]]:
+        md_repository.bulk_upsert_market_data(db_session, chunk)
+        weekly = md_service.refresh_weekly_bars(db_session, {instrument.id: chunk[0].date})
+        emitted.extend(service.advance_signals(db_session, instrument.id, weekly, ACTIVE_PARAMS))
+
+    expected = service.generate_signals([instrument.id], dates, open_[None], high[None], low[None], close[None], ACTIVE_PARAMS)
+    assert expected
+    assert [(s.date, s.signal_type) for s in emitted] == [(s.date, s.signal_type) for s in expected]
+    assert len(repository.get_signals_for_instrument(db_session, instrument.id)) == len(expected)
+    assert service.verify_indicator_state(db_session, instrument.id, ACTIVE_PARAMS) == {}
+
+    # Replaying an already-folded bar is a no-op
+    weekly = md_service.refresh_weekly_bars(db_session, {instrument.id: bars[-1].date})
+    assert service.advance_signals(db_session, instrument.id, weekly, ACTIVE_PARAMS) == []
+
+def test_generate_signals_for_universe_matches_in_memory(db_session, monkeypatch):
+    """
+    Tests the database-backed batch run produces the same signals as the in-memory engine.
+    """
+    from app.features.data_ingestion import repository as md_repository, schemas as md_schemas, service as md_service
+    from tests.features.signal_generation.test_streaming import SHORT_PARAMS, close_band_votes
+
+    monkeypatch.setattr(indicators, "votes_from_values", close_band_votes)
+    rng = np.random.default_rng(5)
+    dates = np.datetime64("2022-01-07") + np.arange(40) * 7
+    close = 100 + np.cumsum(rng.normal(0, 2, (2, 40)), axis=-1)
+    ids = []
+    for row, symbol in enumerate(["XLK", "XLU"]):
+        instrument = md_repository.create_instrument(db_session, md_schemas.InstrumentCreate(symbol=symbol, name=symbol, asset_class="ETF"))
+        ids.append(instrument.id)
+        md_repository.bulk_upsert_market_data(db_session, [
+            md_schemas.MarketDataCreate(instrument_id=instrument.id, date=d, open=c, high=c + 1, low=c - 1, close=c, volume=1)
+            for d, c in zip(dates.astype(object), close[row])
+        ])
+    md_service.refresh_weekly_bars(db_session, {instrument_id: dates[0].astype(object) for instrument_id in ids})
+
+    from_db = service.generate_signals_for_universe(db_session, ids, params=SHORT_PARAMS)
+    in_memory = service.generate_signals(ids, dates, close, close + 1, close - 1, close, SHORT_PARAMS)
+    assert from_db and from_db == in_memory
@@ -0,0 +1,84 @@
+import json
+import math
+import numpy as np
+import pytest
+from datetime import date, timedelta
+
+from app.features.signal_generation import indicators, schemas, service
+from app.features.signal_generation.streaming import StreamingIndicators
+
+# Short periods so every indicator warms up well within the test series
+SHORT_PARAMS = schemas.SignalParameters(
+    macd_fast=3, macd_slow=6, macd_signal=3, macd_norm_window=10, rsi_period=5, stoch_period=5,
+    candle_sma_period=4, trend_fast=3, trend_slow=8, atr_period=5, alignment_window=2,
+)
+
+def close_band_votes(open_, high, low, close, values, params):
+    """
+    Stand-in for indicators.votes_from_values: all five indicators vote BUY above 102
+    and SELL below 98, so composite signals fire whenever the close leaves the band.
+    """
+    close = np.asarray(close, dtype=float)
+    vote = np.where(close > 102, 1, np.where(close < 98, -1, 0)).astype(np.int8)
+    return np.stack([vote] * 5)
+
+@pytest.fixture
+def series():
+    """
+    One instrument with 150 weekly bars.
+    """
+    rng = np.random.default_rng(3)
+    close = 100 + np.cumsum(rng.normal(0, 2, 150))
+    open_ = close + rng.normal(0, 1, 150)
+    high = np.maximum(open_, close) + rng.uniform(0, 2, 150)
+    low = np.minimum(open_, close) - rng.uniform(0, 2, 150)
+    dates = [date(2020, 1, 3) + timedelta(weeks=i) for i in range(150)]
+    return dates, open_, high, low, close
+
+def run_streaming(series, params, restart_at=75):
+    """
+    Feeds the series bar by bar, round-tripping the state through JSON once.
+    Returns the per-bar indicator values and composite flags.
+    """
+    dates, open_, high, low, close = series
+    stream = StreamingIndicators(params)
+    values, buys, sells = [], [], []
+    for t in range(len(dates)):
+        if t == restart_at:
+            stream = StreamingIndicators(params, json.loads(json.dumps(stream.to_state())))
+        buy, sell = stream.update(dates[t], open_[t], high[t], low[t], close[t])
+        values.append(dict(stream.values))
+        buys.append(buy)
+        sells.append(sell)
+    return values, buys, sells
+
+@pytest.mark.parametrize("params", [schemas.SignalParameters(), SHORT_PARAMS])
+def test_streaming_values_match_batch(series, params):
+    """
+    Tests that per-bar streaming updates reproduce every batch indicator value,
+    including across a JSON round-trip of the state halfway through.
+    """
+    _, open_, high, low, close = series
+    batch_values = indicators.indicator_values(open_, high, low, close, params)
+    streamed, _, _ = run_streaming(series, params)
+
+    for t, values in enumerate(streamed):
+        for name in indicators.VALUE_NAMES:
+            expected, actual = batch_values[name][t], values[name]
+            assert (math.isnan(expected) and math.isnan(actual)) or math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9), (name, t)
+    assert not math.isnan(streamed[-1]["trend_slow"])
+
+def test_streaming_composite_matches_batch(series, monkeypatch):
+    """
+    Tests that the streaming composite rule (window, veto, edge trigger) matches the batch rule.
+    """
+    monkeypatch.setattr(indicators, "votes_from_values", close_band_votes)
+    _, open_, high, low, close = series
+    batch_buy, batch_sell = service.composite_entry_signals(
+        indicators.indicator_votes(open_, high, low, close, SHORT_PARAMS), SHORT_PARAMS.alignment_window
+    )
+    _, buys, sells = run_streaming(series, SHORT_PARAMS)
+
+    assert buys == batch_buy.tolist()
+    assert sells == batch_sell.tolist()
+    assert any(buys) and any(sells)